@@ -0,0 +1,254 @@
+# benchmarks/run_benchmarks.py
+# ###################################################################################################
+#                                     BENCHMARK SUITE                                               #
+# ###################################################################################################
+# Generates a synthetic school into a local PostgreSQL database (or a SQLite file, --backend sqlite)#
+# and times the service and helper level hot paths of the application without any window:          #
+#     student_query, group_filtering, quest_aggregation, resource_search, item_statistics,          #
+#     item_analysis, gradebook, assessment_html, chart_rendering, csv_import                        #
+# The results are written as JSON, so two runs can be compared (--baseline).                        #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     python benchmarks/run_benchmarks.py --password *** --students 2000 --output results.json     #
+#     python benchmarks/run_benchmarks.py --password *** --baseline results.json                    #
+#     python benchmarks/run_benchmarks.py --backend sqlite --output results-sqlite.json             #
+# The target database (default: ta_benchmark) is created when it does not exist and its tables are  #
+# dropped and recreated on every run, never point it to a real school database.                     #
+#####################################################################################################
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Charts are rendered without a display
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+# The application modules are imported the same way main.py does it
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'src', 'teacher_assistant'))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from core.app_context import app_context
+from data.database import create_database
+from data.sqlite_database import sqlite_database
+from services.edu_item_services import quest_status
+from utils.assessment_helper import build_assessment_rows, replace_placeholders
+from utils.item_analysis import analyse_students
+
+import synthetic_data
+
+# Values of the template placeholders (the language settings of the template config)
+TEMPLATE_SETTINGS = {key: key for key in ['Student Name', 'Title', 'Time', 'Date', 'Duration', 'Time Unit', 'Header',
+                                          'Row', 'Score', 'Total Score', 'Teacher']}
+
+
+def measure(func, repeat:int, warmup:int=1) -> dict:
+    """ Runs `func` warmup + repeat times and returns the statistics of the measured runs (milliseconds). """
+    for _ in range(warmup): func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    return {'runs': repeat,
+            'min_ms': round(min(samples), 3),
+            'median_ms': round(statistics.median(samples), 3),
+            'mean_ms': round(statistics.fmean(samples), 3),
+            'max_ms': round(max(samples), 3),
+            'stdev_ms': round(statistics.stdev(samples), 3) if repeat > 1 else 0.0}
+
+
+class BenchmarkCases:
+    """ The measured hot paths, each case is a method named case_<name>. """
+
+    def __init__(self, generated:dict, args):
+        self.db = app_context.database
+        self.generated = generated
+        self.args = args
+        self.rng = random.Random(args.seed)
+
+        template_path = os.path.join(BENCHMARKS_DIR, '..', 'src', 'teacher_assistant', 'resources', 'templates',
+                                     '01-Quiz-Template.html')
+        with open(template_path, encoding='utf-8') as f: self.template = f.read()
+
+    def case_student_query(self):
+        rows = self.db.fetchall_named('students_all')
+        assert len(rows) == len(self.generated['student_ids'])
+
+    def case_group_filtering(self):
+        # Every group once, the same work as switching through the group combobox
+        for members in self.generated['group_members'].values():
+            self.db.fetchall_named('students_by_ids', (members,))
+
+    def case_quest_aggregation(self):
+        today = datetime.now()
+
+        for student_id in self.rng.sample(self.generated['student_ids'], k=min(50, len(self.generated['student_ids']))):
+            status = {'Waiting': 0, 'Lost': 0, 'Replied': 0, 'Delayed': 0}
+            progress = []
+
+            for record in self.db.fetchall_named('quests_by_student', (student_id,)):
+                status[quest_status(record[5], record[6], today)] += 1
+                progress.append(float(record[8]) / (float(record[2]) if record[2] else 1.0))
+
+    def case_resource_search(self):
+        for word in ('fraction', 'مثلث', 'page 1', 'zzz-no-match'):
+            self.db.fetchall_named('search_resources', (f'%{word}%',))
+
+    def case_item_statistics(self):
+        # Per-question statistics of each group, one query per group
+        for members in self.generated['group_members'].values():
+            self.db.fetchall_named('class_item_statistics', (members,))
+
+    def case_item_analysis(self):
+        # Score matrix and all item statistics of each group (NumPy), nothing is stored
+        for members in self.generated['group_members'].values():
+            analyse_students(self.db, members)
+
+    def case_gradebook(self):
+        # The gradebook page reads a whole group with one query
+        for group_id in self.generated['group_members']:
+            self.db.fetchall_named('gradebook_by_group', (group_id,))
+
+    def case_assessment_html(self):
+        for quest_id in self.generated['quest_ids'][:20]:
+            records = self.db.fetchall_named('quest_item_contents', (quest_id,))
+            html, styles, total = build_assessment_rows(self.template, records)
+
+            data = {'Student': 'Student', 'Teacher': 'Teacher', 'Title': 'Title', 'Date': '2025-01-01', 'Time': '10:00',
+                    'Duration': '30', 'Total Score': str(total), 'Template': '01-Quiz'}
+            replace_placeholders(html, TEMPLATE_SETTINGS, data)
+
+    def case_chart_rendering(self):
+        from utils import analysis
+
+        analysis.create_donut_image(12.5, 20)
+        analysis.create_line_chart_image([], [self.rng.random() for _ in range(30)])
+        analysis.create_pie_chart(values=[5, 3, 2, 1], labels=['Replied', 'Delayed', 'Lost', 'Waiting'])
+
+    def case_csv_import(self):
+        import pandas as pd
+
+        data = pd.read_csv(self.csv_file, chunksize=1000, dtype_backend='numpy_nullable', dtype=str)
+        inserted = self.db.bulk_insert_csv(data, 'personal_info', synthetic_data.CSV_COLUMN_MAPPING)
+        # Keep the table as it was for the next run
+        self.db.execute('DELETE FROM personal_info WHERE id LIKE %s;', ('9%',))
+        assert inserted == self.args.csv_rows, f'{inserted} of {self.args.csv_rows} rows imported'
+
+    def names(self):
+        return [name[5:] for name in dir(self) if name.startswith('case_')]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Headless benchmark suite of Teacher Assistant.')
+    parser.add_argument('--backend', choices=('postgresql', 'sqlite'), default='postgresql',
+                        help='sqlite: no server, the school is generated into --sqlite-path.')
+    parser.add_argument('--sqlite-path', default=os.path.join(tempfile.gettempdir(), 'ta_benchmark.sqlite3'),
+                        help='Scratch SQLite file, it is deleted and recreated.')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', default='5432')
+    parser.add_argument('--user', default='postgres')
+    parser.add_argument('--password', default=os.environ.get('PGPASSWORD', ''))
+    parser.add_argument('--database', default='ta_benchmark', help='Scratch database, its tables are recreated.')
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--resources', type=int, default=1000)
+    parser.add_argument('--quests', type=int, default=5000)
+    parser.add_argument('--csv-rows', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='*', help='Run only these cases.')
+    parser.add_argument('--output', help='Write the JSON result to this file (default: stdout).')
+    parser.add_argument('--baseline', help='A previous JSON result, the median ratio of each case is printed.')
+    return parser.parse_args(argv)
+
+
+def compare(result:dict, baseline_file:str) -> dict:
+    """ Median of this run divided by the median of the baseline run, per case. """
+    with open(baseline_file, encoding='utf-8') as f: baseline = json.load(f)
+
+    ratios = {}
+    for name, stats in result['cases'].items():
+        old = baseline.get('cases', {}).get(name)
+        if old and old.get('median_ms'):
+            ratios[name] = round(stats['median_ms'] / old['median_ms'], 3)
+
+    return ratios
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.backend == 'sqlite':
+        # A new file on every run, the schema is created by connect()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.sqlite_path + suffix): os.remove(args.sqlite_path + suffix)
+
+        database = sqlite_database()
+        database.connect(database=args.sqlite_path)
+        app_context.set_database(database)
+        server_version = f'SQLite {sqlite3.sqlite_version}'
+    else:
+        # The database is created from a maintenance connection
+        admin = psycopg2.connect(host=args.host, port=args.port, user=args.user, password=args.password, dbname='postgres')
+        admin.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        create_database(admin, args.database)
+        admin.close()
+
+        app_context.database.connect(host=args.host, port=args.port, database=args.database,
+                                     user=args.user, password=args.password)
+        server_version = f"PostgreSQL {app_context.database.fetchone('SHOW server_version;')[0]}"
+    # replace_placeholders() converts inches to pixels with the screen DPI
+    app_context.display_calulation(96)
+
+    start = time.perf_counter()
+    generated = synthetic_data.generate_school(app_context.database.connection, students=args.students,
+                                               groups=args.groups, resources=args.resources,
+                                               quests=args.quests, seed=args.seed, dialect=args.backend)
+    generation_s = time.perf_counter() - start
+
+    cases = BenchmarkCases(generated, args)
+    cases.csv_file = synthetic_data.write_students_csv(os.path.join(tempfile.mkdtemp(), 'students.csv'), args.csv_rows)
+
+    result = {'created': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'backend': server_version,
+              'sizes': {'students': args.students, 'groups': args.groups, 'resources': args.resources,
+                        'quests': args.quests, 'csv_rows': args.csv_rows},
+              'generation_s': round(generation_s, 3),
+              'cases': {}}
+
+    for name in cases.names():
+        if args.only and name not in args.only: continue
+
+        print(f'running {name} ...', file=sys.stderr)
+        result['cases'][name] = measure(getattr(cases, f'case_{name}'), args.repeat)
+
+    if args.baseline: result['ratio_to_baseline'] = compare(result, args.baseline)
+
+    app_context.database.close()
+
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
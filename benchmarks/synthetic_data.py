@@ -0,0 +1,176 @@
+# benchmarks/synthetic_data.py
+# ###################################################################################################
+#                                  SYNTHETIC SCHOOL GENERATOR                                       #
+# ###################################################################################################
+# Fills a PostgreSQL database or a SQLite file with a synthetic school for the benchmark suite:      #
+#   - N students (personal_info) with PNG photos and a few observed behaviours each                 #
+#   - M classroom groups with random members                                                        #
+#   - K educational resources with an embedded (base64) image in their content                      #
+#   - Q quests distributed over the students, with their quest_items                                #
+# The generator is deterministic for a given seed, so two runs on the same sizes are comparable.   #
+#####################################################################################################
+
+import base64
+import contextlib
+import json
+import random
+import struct
+import zlib
+from datetime import datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+from data.migrations import migrate
+
+# The tables are recreated on every run, then built by the migration steps of the application
+DROP_SCHEMA = """
+DROP TABLE IF EXISTS gradebook, item_statistics, item_analysis_runs, quest_items, quests, groups, educational_resources,
+                     observed_behaviours, personal_info, academic_years, classroom_events, schema_version CASCADE;
+"""
+
+FIRST_NAMES = ['علی', 'محمد', 'زهرا', 'فاطمه', 'رضا', 'مریم', 'حسین', 'سارا', 'Ali', 'Sara', 'Reza', 'Nima']
+LAST_NAMES  = ['احمدی', 'محمدی', 'رضایی', 'کریمی', 'حسینی', 'Karimi', 'Ahmadi', 'Moradi']
+WORDS = ['fraction', 'equation', 'triangle', 'vector', 'function', 'derivative', 'matrix', 'probability',
+         'کسر', 'معادله', 'مثلث', 'تابع', 'مشتق', 'احتمال', 'هندسه', 'جبر']
+BEHAVIOURS = ['Active in class', 'Late homework', 'Asked a good question', 'مشارکت خوب در کلاس', 'تکلیف ناقص']
+
+
+def png_bytes(width:int, height:int, rng:random.Random) -> bytes:
+    """ A small random RGB PNG built with zlib only (no imaging library needed). """
+    color = bytes(rng.randrange(256) for _ in range(3))
+    raw = b''.join(b'\x00' + color * width for _ in range(height))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+def resource_block(rng:random.Random, image_size:int) -> str:
+    """ A stored resource block (<BLOCK><style/><CONTENT/></BLOCK>) with an embedded image. """
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+    image = base64.b64encode(png_bytes(image_size, image_size // 2, rng)).decode('ascii')
+
+    return ('<BLOCK><style>.q{font-size:14px;}</style><CONTENT>'
+            f'<div class="page"><p class="q">{text}</p><img src="data:image/png;base64,{image}"></div>'
+            '</CONTENT></BLOCK>')
+
+
+def insert_rows(cur, dialect:str, sql:str, rows:list, page_size:int=100):
+    """ Multi-row INSERT of `sql` ('... VALUES %s') with execute_values (PostgreSQL) or executemany (SQLite). """
+    if dialect == 'sqlite':
+        cur.executemany(sql.replace('VALUES %s', f'VALUES ({", ".join(["?"] * len(rows[0]))})'), rows)
+    else:
+        execute_values(cur, sql, rows, page_size=page_size)
+
+
+def generate_school(connection, students:int=500, groups:int=20, resources:int=1000, quests:int=5000,
+                    behaviours_per_student:int=5, photo_size:int=96, image_size:int=160, seed:int=42,
+                    dialect:str='postgresql') -> dict:
+    """ Creates the schema and inserts the synthetic school. Returns the generated ids.
+        `dialect` 'sqlite': `connection` is the connection of a new sqlite_database file, its schema exists already. """
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    if dialect == 'sqlite':
+        # Autocommit connection: one transaction for the whole school
+        connection.execute('BEGIN;')
+    else:
+        with connection.cursor() as cur: cur.execute(DROP_SCHEMA)
+        connection.commit()
+
+        status, msg = migrate(connection)
+        if not status: raise RuntimeError(msg)
+
+    with contextlib.closing(connection.cursor()) as cur:
+
+        # ---------------------------------------------------------- students
+        student_ids = [f'{1000000 + i}' for i in range(students)]
+        rows = [(sid, rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), png_bytes(photo_size, photo_size, rng),
+                 f'0912{rng.randrange(10**7):07d}', 'Tehran', rng.choice(LAST_NAMES), f'0935{rng.randrange(10**7):07d}',
+                 '', rng.choice(['M', 'F']), (now - timedelta(days=rng.randint(14 * 365, 18 * 365))).date())
+                for sid in student_ids]
+        insert_rows(cur, dialect, 'INSERT INTO personal_info (id, fname_, lname_, photo_, phone_, address_, parent_name_, '
+                                      'parent_phone_, metadata_, gender_, birth_date_) VALUES %s', rows, page_size=500)
+
+        rows = [(now - timedelta(days=rng.randint(0, 300), minutes=rng.randint(0, 600)), sid, rng.choice(BEHAVIOURS), '')
+                for sid in student_ids for _ in range(behaviours_per_student)]
+        insert_rows(cur, dialect, 'INSERT INTO observed_behaviours (date_time_, student_id, observed_behaviour_, analysis_) '
+                                      'VALUES %s', rows, page_size=1000)
+
+        # ---------------------------------------------------------- groups
+        rows = []
+        for g in range(groups):
+            members = rng.sample(student_ids, k=min(len(student_ids), rng.randint(15, 40)))
+            rows.append((rng.randint(7, 12), 'Math', f'Group {g + 1}', '', ','.join(members), ''))
+        insert_rows(cur, dialect, 'INSERT INTO groups (grade_, book_, title_, events_, members_, description_) VALUES %s', rows)
+
+        # ---------------------------------------------------------- resources
+        rows = [(f'Book {rng.randint(1, 12)} / page {rng.randint(1, 200)} / {rng.choice(WORDS)}',
+                 resource_block(rng, image_size), rng.choice(WORDS), '', float(rng.choice([0.25, 0.5, 1, 1.5, 2])))
+                for _ in range(resources)]
+        insert_rows(cur, dialect, 'INSERT INTO educational_resources (source_, content_, metadata_, answer_, score_) '
+                                      'VALUES %s', rows, page_size=200)
+        cur.execute('SELECT id, score_ FROM educational_resources ORDER BY id;')
+        resource_scores = dict(cur.fetchall())
+        resource_ids = list(resource_scores)
+
+        # ---------------------------------------------------------- quests
+        rows, quest_rows = [], []
+        for _ in range(quests):
+            items = rng.sample(resource_ids, k=min(len(resource_ids), rng.randint(1, 10)))
+            total = sum(resource_scores[i] for i in items)
+            assign = now - timedelta(days=rng.randint(0, 200))
+            deadline = assign + timedelta(days=7)
+            replied = rng.random() < 0.7
+            reply = assign + timedelta(days=rng.randint(0, 10)) if replied else None
+            earned = [round(resource_scores[i] * rng.random(), 2) if replied else None for i in items]
+            scores = '-'.join(map(str, earned)) if replied else ''
+            configs = {'Template': rng.choice(['01-Quiz', '02-Formal-Exam']), 'Language': 'Persian'}
+
+            rows.append((rng.choice(student_ids), '-'.join(map(str, items)), total, scores,
+                         assign, deadline, reply, json.dumps(configs), '', ''))
+            quest_rows.append([(pos, i, resource_scores[i], score) for pos, (i, score) in enumerate(zip(items, earned), 1)])
+        insert_rows(cur, dialect, 'INSERT INTO quests (student_id, qb_ids_, total_score_, scores_, assign_date_, deadline_, '
+                                      'reply_date_, configs_, responses_, feedback_) VALUES %s', rows, page_size=1000)
+
+        # The ids follow the insertion order of the quests
+        cur.execute('SELECT id FROM quests ORDER BY id;')
+        quest_ids = [row[0] for row in cur.fetchall()]
+        rows = [(qid,) + item for qid, items in zip(quest_ids, quest_rows) for item in items]
+        insert_rows(cur, dialect, 'INSERT INTO quest_items (quest_id, position, resource_id, max_score, earned_score) '
+                                      'VALUES %s', rows, page_size=2000)
+
+        cur.execute('SELECT id, members_ FROM groups ORDER BY id;')
+        group_members = {gid: members.split(',') for gid, members in cur.fetchall()}
+
+        cur.execute('ANALYZE;')
+
+    connection.commit()
+
+    return {'student_ids': student_ids, 'group_members': group_members,
+            'resource_ids': resource_ids, 'quest_ids': quest_ids[:200]}
+
+
+# CSV header -> personal_info column, the same mapping as the student import of the StudentListPage
+CSV_COLUMN_MAPPING = {'ID': 'id', 'First Name': 'fname_', 'Last Name': 'lname_', 'Phone': 'phone_', 'Address': 'address_',
+                      'Parent Name': 'parent_name_', 'Parent Phone': 'parent_phone_', 'Gender': 'gender_'}
+
+
+def write_students_csv(file_path:str, count:int, seed:int=7) -> str:
+    """ A CSV file in the format of the student import of the StudentListPage. """
+    import csv
+
+    rng = random.Random(seed)
+
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(list(CSV_COLUMN_MAPPING))
+
+        for i in range(count):
+            writer.writerow([f'9{i:08d}', rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f'0912{rng.randrange(10**7):07d}',
+                             'Tehran', rng.choice(LAST_NAMES), f'0935{rng.randrange(10**7):07d}', rng.choice(['M', 'F'])])
+
+    return file_path
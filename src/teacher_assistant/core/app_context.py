@@ -2,12 +2,15 @@ import enum
 import os
 import sys
 from utils.Json_manager import JSONManager
+from utils.template_registry import TemplateRegistry
 from data.database import psycopg2_database
+from data.cache import DataCache
+from core.settings.settings_manager import SettingsManager
 from version import __version__
-# IMPORTANT: Registers the resources automatically
-# this module embeds icon resources to the app without including main files to
-# the installable package 
-from resources import resources_rc
+# IMPORTANT: Registers the resources (':/icons/...') automatically
+# the icons are embedded in the binary bundle resources/resources.rcc (core/icons.py)
+from core.icons import register_resources
+register_resources()
 
 class AppContext:
 
@@ -20,15 +23,49 @@ class AppContext:
         self.Language = 'English'                   # Application UI language
         self.WritingLanguage ="Persian"             # Writing language
         self.__database__  = psycopg2_database()
+        # Read-through cache of the groups, the roster and the resource metadata (data/cache.py)
+        self.__cache__ = DataCache(self.__database__)
+        # Worker pool of the asynchronous reads (data/async_db.py), created on first use
+        self.__async_db__ = None
         self.resource_path =''
-        self.settings_manager = JSONManager()
-        self.template_config = JSONManager()
+        # Parsed once, lookups from memory, changes written debounced (utils/Json_manager.py)
+        self.settings_manager = JSONManager(cached=True)
+        # Assessment templates and their configs, read once and shared by the threads (utils/template_registry.py)
+        self.templates = TemplateRegistry()
     
     
     @property 
     def app_version(self): return __version__
     @property 
     def database(self): return self.__database__
+    @property 
+    def cache(self): return self.__cache__
+    @property
+    def async_db(self):
+        if self.__async_db__ is None:
+            from data.async_db import AsyncDatabase
+            self.__async_db__ = AsyncDatabase(self.__database__, self.__cache__)
+        return self.__async_db__
+
+    def set_database(self, database):
+        """ Replaces the storage backend (data/backend.py), e.g. by a sqlite_database, and its cache. """
+        self.__database__ = database
+        self.__cache__ = DataCache(database)
+        # The workers of the previous backend are closed, the next call opens new ones
+        if self.__async_db__ is not None: self.__async_db__.shutdown()
+        self.__async_db__ = None
+        # The instrumentation settings apply to the new backend as well (after setup_app_directories)
+        if hasattr(self, 'appdata_path'): self.setup_query_instrumentation()
+
+    def reset_database(self):
+        """ The database was replaced under the same name (restore over it): a new session and new worker
+            connections, the cached rows are dropped. The cache object is kept, the listeners and the
+            replica worker built against it (ui/widgets/connection_form.py) stay connected to it. """
+        self.__database__.reconnect()
+        self.__cache__.clear()
+        # The swap terminated the sessions of the workers, the next call opens new ones
+        if self.__async_db__ is not None: self.__async_db__.shutdown()
+        self.__async_db__ = None
 
     @property
     def FileTypes(self): return FileTypes
@@ -71,10 +108,28 @@ class AppContext:
         self.resource_path = app_path.replace('core','')# +'resources' 
         self.resource_path = os.path.join(self.resource_path,"resources")
         
-        # Set the config manager path
-        tmp_file_path = self.resource_path +'\\templates\\01-Quiz-config.json'
-        self.template_config.set_path(tmp_file_path)
-    
+        # Folder of the assessment templates
+        self.templates.set_folder(os.path.join(self.resource_path, 'templates'))
+
+        self.setup_query_instrumentation()
+
+    # Query instrumentation is opt-in, it is enabled from the settings page (Diagnostics), the
+    # "query_instrumentation" group of the profile settings (core/settings/defaults.py).
+    # The records are written to [appdata]/logs/queries.jsonl (rotated at 5 MB, 3 backups).
+    def setup_query_instrumentation(self):
+
+        settings = SettingsManager()
+
+        if not settings.get_bool("query_instrumentation", "enabled"):
+            self.database.disable_instrumentation()
+            return
+
+        log_path = os.path.join(self.appdata_path, 'logs', 'queries.jsonl')
+
+        self.database.enable_instrumentation(log_path,
+                                             slow_threshold_ms=float(settings.get("query_instrumentation", "slow_threshold_ms", 200)),
+                                             capture_explain=settings.get_bool("query_instrumentation", "explain"))
+
     def display_calulation(self, dpi):
         
         self.DPI = dpi
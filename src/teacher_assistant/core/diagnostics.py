@@ -0,0 +1,246 @@
+# teacher_assistant/core/diagnostics.py
+# ###################################################################################################
+#                                      DIAGNOSTICS MODE                                             #
+# ###################################################################################################
+# Most of the user-visible stalls come from work on the Qt GUI thread (table builds, chart renders, #
+# synchronous database calls in initUI). The diagnostics mode has three parts:                      #
+#                                                                                                   #
+# 1. EventLoopWatchdog: a QTimer on the GUI thread stamps a heartbeat, a monitor thread checks the  #
+#    age of the heartbeat. When the event loop does not answer for longer than the threshold it is  #
+#    counted as a stall.                                                                            #
+# 2. During a stall the monitor thread samples the Python stack of the GUI thread                   #
+#    (sys._current_frames) every few milliseconds. The samples are folded into 'caller;callee'      #
+#    stacks with their hit counts, the hottest stack is the code that blocked the event loop.       #
+# 3. page_timer(): a decorator that records how long the page loaders (load_students, load_data,    #
+#    load_quests_data, ...) take on each call.                                                      #
+#                                                                                                   #
+# The collected data is shown in the settings page and can be dumped to a JSON file.               #
+#####################################################################################################
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from PySide6.QtCore import QObject, QTimer
+
+# Frames of these files are not interesting in a captured stack
+_SKIPPED_FILES = (os.sep + 'threading.py', os.sep + 'diagnostics.py')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}'
+
+
+def _fold_stack(frame, max_depth:int=40) -> str:
+    """ Returns the stack of `frame` as 'outer;...;inner' (the collapsed-stack format of flame graphs). """
+    labels = []
+
+    while frame is not None and len(labels) < max_depth:
+        if not frame.f_code.co_filename.endswith(_SKIPPED_FILES):
+            labels.append(_frame_label(frame))
+        frame = frame.f_back
+
+    return ';'.join(reversed(labels))
+
+
+class PageTimings:
+    """ Call count and durations of the decorated page loaders. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._timings = {}
+
+    def add(self, name:str, duration_ms:float):
+        with self._lock:
+            item = self._timings.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_ms': 0.0})
+            item['count'] += 1
+            item['total_ms'] += duration_ms
+            item['max_ms'] = max(item['max_ms'], duration_ms)
+            item['last_ms'] = duration_ms
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {name: {'count': t['count'],
+                           'total_ms': round(t['total_ms'], 2),
+                           'mean_ms': round(t['total_ms'] / t['count'], 2),
+                           'max_ms': round(t['max_ms'], 2),
+                           'last_ms': round(t['last_ms'], 2)}
+                    for name, t in self._timings.items()}
+
+    def clear(self):
+        with self._lock: self._timings.clear()
+
+
+class EventLoopWatchdog(QObject):
+    """ Detects event-loop stalls and samples the GUI thread stack while they last. """
+
+    def __init__(self, threshold_ms:float=200.0, heartbeat_ms:int=50, sample_interval_ms:float=5.0,
+                 max_stalls:int=100, parent=None):
+        # Must be created on the GUI thread, the heartbeat timer runs on the thread that owns it
+        super().__init__(parent)
+
+        self.threshold_ms = threshold_ms
+        self.sample_interval = sample_interval_ms / 1000.0
+        self.max_stalls = max_stalls
+
+        self.stalls = []
+        self._lock = threading.Lock()
+        self._gui_thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._running = False
+        self._monitor = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(heartbeat_ms)
+        self._timer.timeout.connect(self._beat)
+
+    @property
+    def is_running(self): return self._running
+
+    def _beat(self): self._heartbeat = time.perf_counter()
+
+    def start(self):
+        if self._running: return
+
+        self._running = True
+        self._heartbeat = time.perf_counter()
+        self._timer.start()
+
+        self._monitor = threading.Thread(target=self._watch, name='EventLoopWatchdog', daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+
+        if self._monitor is not None:
+            self._monitor.join(timeout=1.0)
+            self._monitor = None
+
+    def _watch(self):
+        # Runs on the monitor thread. threshold_ms is read on every check, it can be changed while running
+        while self._running:
+            time.sleep(self.sample_interval * 4)
+
+            stall_start = self._heartbeat
+            if time.perf_counter() - stall_start < self.threshold_ms / 1000.0: continue
+
+            # The event loop is blocked: sample the GUI thread until the heartbeat moves again
+            samples = Counter()
+
+            while self._running and self._heartbeat == stall_start:
+                frame = sys._current_frames().get(self._gui_thread_id)
+                if frame is not None: samples[_fold_stack(frame)] += 1
+                del frame
+                time.sleep(self.sample_interval)
+
+            self._record_stall(stall_start, samples)
+
+    def _record_stall(self, stall_start:float, samples:Counter):
+        duration_ms = (time.perf_counter() - stall_start) * 1000.0
+        total = sum(samples.values())
+
+        stall = {'time': datetime.now().isoformat(timespec='seconds'),
+                 'duration_ms': round(duration_ms, 1),
+                 'samples': total,
+                 'stacks': [{'stack': stack, 'hits': hits, 'share': round(hits / total, 3)}
+                            for stack, hits in samples.most_common(10)]}
+
+        with self._lock:
+            self.stalls.append(stall)
+            del self.stalls[:-self.max_stalls]
+
+    def snapshot(self) -> list:
+        with self._lock: return list(self.stalls)
+
+    def clear(self):
+        with self._lock: self.stalls.clear()
+
+
+class Diagnostics:
+    """ Entry point of the diagnostics mode (one instance: `diagnostics`). """
+
+    def __init__(self):
+        self.enabled = False
+        self.page_timings = PageTimings()
+        self.watchdog = None
+
+    def start(self, threshold_ms:float=200.0):
+        """ Starts the watchdog, call it from the GUI thread after QApplication is created. """
+        if self.watchdog is None: self.watchdog = EventLoopWatchdog(threshold_ms=threshold_ms)
+
+        # A running watchdog keeps its thread and its stalls, the new threshold applies at the next check
+        self.watchdog.threshold_ms = threshold_ms
+        self.watchdog.start()
+        self.enabled = True
+
+    def stop(self):
+        if self.watchdog is not None: self.watchdog.stop()
+        self.enabled = False
+
+    def clear(self):
+        self.page_timings.clear()
+        if self.watchdog is not None: self.watchdog.clear()
+
+    def collect(self) -> dict:
+        return {'created': datetime.now().isoformat(timespec='seconds'),
+                'enabled': self.enabled,
+                'stall_threshold_ms': self.watchdog.threshold_ms if self.watchdog else None,
+                'stalls': self.watchdog.snapshot() if self.watchdog else [],
+                'page_timings': self.page_timings.summary()}
+
+    def report(self) -> str:
+        """ Plain-text summary for the settings page. """
+        data = self.collect()
+        lines = ['PAGE TIMINGS', '-' * 60]
+
+        for name, t in sorted(data['page_timings'].items(), key=lambda item: item[1]['total_ms'], reverse=True):
+            lines.append(f"{name:<40} x{t['count']:<5} mean {t['mean_ms']:>8.1f} ms  "
+                         f"max {t['max_ms']:>8.1f} ms  last {t['last_ms']:>8.1f} ms")
+
+        lines += ['', f"EVENT-LOOP STALLS (>= {data['stall_threshold_ms']} ms)", '-' * 60]
+
+        for stall in reversed(data['stalls']):
+            lines.append(f"{stall['time']}  {stall['duration_ms']:.0f} ms  ({stall['samples']} samples)")
+
+            for item in stall['stacks'][:3]:
+                # The innermost frames are the most useful part of a long stack
+                frames = item['stack'].split(';')
+                lines.append(f"    {item['share'] * 100:5.1f}%  {' > '.join(frames[-6:])}")
+
+        return '\n'.join(lines)
+
+    def dump(self, file_path:str) -> str:
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(self.collect(), f, ensure_ascii=False, indent=2)
+
+        return file_path
+
+
+diagnostics = Diagnostics()
+
+
+def page_timer(name:str=None):
+    """ Decorator: records the duration of each call while the diagnostics mode is on. """
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not diagnostics.enabled: return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                diagnostics.page_timings.add(label, (time.perf_counter() - start) * 1000.0)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,128 @@
+# teacher_assistant/core/icons.py
+# ###################################################################################################
+#                                      ICONS AND RESOURCES                                          #
+# ###################################################################################################
+# The icons (resources/icons) are embedded under the ':/icons/' prefix of the Qt resource system.   #
+#                                                                                                   #
+# - resources/resources.rcc is the binary bundle of resources/resources.qrc. Qt maps the file into  #
+#   memory and decodes an entry when it is opened, nothing is parsed at startup. Rebuild it after   #
+#   changing the icons:                                                                             #
+#                                                                                                   #
+#       pyside6-rcc --binary resources/resources.qrc -o resources/resources.rcc                     #
+#                                                                                                   #
+#   resources/resources_rc.py (the same data as Python byte literals) is imported only when the     #
+#   bundle is missing, e.g. by a package built without it.                                          #
+#                                                                                                   #
+# - pixmap() / icon(): an icon rasterized at a size (and optionally recolored) is cached under     #
+#   (name, size, color), every combination is rendered once.                                       #
+#                                                                                                   #
+#     button.setIcon(icon('save', 24, '#D4AF37'))                                                   #
+#####################################################################################################
+
+import importlib
+import os
+from collections import OrderedDict
+
+from PySide6.QtCore import QByteArray, QFile, QIODevice, QResource, Qt
+from PySide6.QtGui import QColor, QIcon, QImage, QPainter, QPixmap
+from PySide6.QtSvg import QSvgRenderer
+
+RCC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'resources', 'resources.rcc')
+
+# Rendered pixmaps: (key, width, height, color) -> QPixmap
+MAX_CACHED_PIXMAPS = 512
+_pixmaps = OrderedDict()
+
+_registered = False
+
+
+def register_resources(rcc_path: str = RCC_PATH) -> bool:
+    """ Registers the icon bundle once, returns False when the Python fallback was used. """
+    global _registered
+    if _registered: return True
+
+    if os.path.isfile(rcc_path) and QResource.registerResource(rcc_path):
+        _registered = True
+        return True
+
+    # IMPORTANT: importing the module registers the resources
+    importlib.import_module('resources.resources_rc')
+    _registered = True
+    return False
+
+
+def _cached(key):
+    pixmap = _pixmaps.get(key)
+    if pixmap is not None: _pixmaps.move_to_end(key)
+    return pixmap
+
+
+def _store(key, pixmap: QPixmap) -> QPixmap:
+    _pixmaps[key] = pixmap
+    if len(_pixmaps) > MAX_CACHED_PIXMAPS: _pixmaps.popitem(last=False)
+    return pixmap
+
+
+def render_svg(svg_data: bytes, width: int, height: int, color: str = None) -> QPixmap:
+    """ Rasterizes SVG data (uncached). `color` tints the drawn pixels (the icons are single-colored). """
+    renderer = QSvgRenderer(QByteArray(svg_data))
+    image = QImage(width, height, QImage.Format.Format_ARGB32_Premultiplied)
+    image.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(image)
+    renderer.render(painter)
+
+    if color:
+        # Keeps the alpha of the drawing, replaces its color
+        painter.setCompositionMode(QPainter.CompositionMode.CompositionMode_SourceIn)
+        painter.fillRect(image.rect(), QColor(color))
+
+    painter.end()
+
+    return QPixmap.fromImage(image)
+
+
+def svg_pixmap(svg_data, width: int = 64, height: int = 64, color: str = None) -> QPixmap:
+    """ Cached render_svg() of SVG text or bytes. """
+    if isinstance(svg_data, str): svg_data = svg_data.encode()
+
+    key = ('svg', svg_data, width, height, color)
+
+    cached = _cached(key)
+    return cached if cached is not None else _store(key, render_svg(svg_data, width, height, color))
+
+
+def resource_path(name: str) -> str:
+    """ ':/icons/<name>', the extension .svg is added to a bare name. """
+    if name.startswith(':/'): return name
+    if '.' not in name: name += '.svg'
+    return f':/icons/{name}'
+
+
+def pixmap(name: str, size: int = 24, color: str = None) -> QPixmap:
+    """ The icon `name` of the bundle at `size` x `size` pixels, rendered once per (name, size, color). """
+    path = resource_path(name)
+    key = (path, size, size, color)
+
+    cached = _cached(key)
+    if cached is not None: return cached
+
+    if path.endswith('.svg'):
+        file = QFile(path)
+        if not file.open(QIODevice.OpenModeFlag.ReadOnly): return QPixmap()
+        data = bytes(file.readAll())
+        file.close()
+
+        return _store(key, render_svg(data, size, size, color))
+
+    # Raster icons are only scaled (no recoloring)
+    return _store(key, QPixmap(path).scaled(size, size, Qt.AspectRatioMode.KeepAspectRatio,
+                                            Qt.TransformationMode.SmoothTransformation))
+
+
+def icon(name: str, size: int = 24, color: str = None) -> QIcon:
+    return QIcon(pixmap(name, size, color))
+
+
+def clear_cache():
+    _pixmaps.clear()
@@ -7,6 +7,43 @@ DEFAULT_SETTINGS = {
         "theme": "dark",
         "font_size": 10,
     },
+    "diagnostics": {
+        "enabled": False,
+        "stall_threshold_ms": 200,
+    },
+    "query_instrumentation": {
+        "enabled": False,       # data/instrumentation.py, log: [appdata]/logs/queries.jsonl
+        "slow_threshold_ms": 200,
+        "explain": False,       # EXPLAIN plans of the slow queries (PostgreSQL only)
+    },
+    "cache": {
+        "notifications": False,
+    },
+    "live_updates": {
+        "enabled": False,
+    },
+    "replica": {
+        "enabled": False,
+        "sync_interval_s": 60,
+        "recent_days": 120,
+    },
+    "storage": {
+        "backend": "postgresql",
+        "sqlite_path": "",
+    },
+    "backup": {
+        "jobs": 0,              # parallel pg_dump jobs, 0: by the number of CPUs (data/backup_engine.py)
+        "compression": -1,      # -Z level 0..9, -1: pg_dump's default
+        "verify": True,
+    },
+    "backup_schedule": {
+        "enabled": False,       # data/backup_scheduler.py, while the app is open
+        "folder": "",           # empty: [backup to]/scheduled/<database>
+        "full_every_days": 7,
+        "incremental_every_hours": 24,
+        "keep_daily": 7,
+        "keep_weekly": 4,
+    },
     "database": {
         "host": "localhost",
         "password": "",
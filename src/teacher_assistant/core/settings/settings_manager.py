@@ -31,6 +31,12 @@ class SettingsManager:
         self.settings.endGroup()
         return value
 
+    def get_bool(self, group, key, default=False) -> bool:
+        # QSettings (INI) returns the stored booleans as 'true' / 'false' strings
+        value = self.get(group, key, default)
+        if isinstance(value, str): return value.strip().lower() in ('true', '1', 'yes', 'on')
+        return bool(value)
+
     def set(self, group, key, value):
         self.settings.beginGroup(group)
         self.settings.setValue(key, value)
@@ -0,0 +1,145 @@
+# teacher_assistant/core/startup.py
+# ###################################################################################################
+#                                           STARTUP                                                 #
+# ###################################################################################################
+# The window should be usable as soon as possible, everything else is loaded when it is needed:     #
+#                                                                                                   #
+# 1. lazy_import(): the heavy libraries (pandas, matplotlib, numpy, scipy, PIL) and the modules     #
+#    that use them at import time are bound to a LazyModule. The module is imported on the first   #
+#    attribute access (the first chart, the first CSV import, ...), not when the page module is    #
+#    imported.                                                                                      #
+# 2. The page modules are imported by the main window when the page is opened the first time.      #
+# 3. warm_webengine(): the editor pages host a QWebEngineView, the first one starts the Chromium    #
+#    processes (about a second). main.py schedules the warm-up while the connection dialog is open, #
+#    so the first page with an editor opens at once.                                               #
+# 4. startup.mark(): the timeline from the start of main.py to the first page. The report is        #
+#    written to [appdata]/logs/startup.json, in diagnostics mode it is printed as well.              #
+#####################################################################################################
+
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import types
+
+# The time origin of the report: core.startup is the first module imported by main.py
+_T0 = time.perf_counter()
+
+# Reported by the timeline when they were loaded before the first page
+HEAVY_MODULES = ('pandas', 'matplotlib', 'numpy', 'scipy', 'PIL', 'openpyxl', 'PySide6.QtWebEngineCore')
+
+
+class StartupTimer:
+
+    def __init__(self):
+        self.marks = []
+        # Lazily imported modules: name -> seconds of the import
+        self.imports = {}
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self) -> float: return (time.perf_counter() - _T0) * 1000.0
+
+    def mark(self, label: str):
+        """ Records the time of a startup step (since the start of main.py). """
+        with self._lock: self.marks.append((label, self.elapsed_ms()))
+
+    def record_import(self, name: str, seconds: float):
+        with self._lock: self.imports[name] = seconds
+
+    def report(self) -> dict:
+        with self._lock:
+            steps, previous = [], 0.0
+            for label, at_ms in self.marks:
+                steps.append({'step': label, 'at_ms': round(at_ms, 1), 'took_ms': round(at_ms - previous, 1)})
+                previous = at_ms
+
+            return {'python': sys.version.split()[0],
+                    'steps': steps,
+                    'lazy_imports_ms': {name: round(s * 1000.0, 1) for name, s in self.imports.items()},
+                    'heavy_modules_loaded': [name for name in HEAVY_MODULES if name in sys.modules]}
+
+    def summary(self) -> str:
+        lines = ['Startup timeline:']
+        report = self.report()
+        for step in report['steps']:
+            lines.append(f"  {step['at_ms']:>9.1f} ms  (+{step['took_ms']:>8.1f})  {step['step']}")
+        if report['heavy_modules_loaded']:
+            lines.append(f"  heavy modules loaded: {', '.join(report['heavy_modules_loaded'])}")
+        return '\n'.join(lines)
+
+    def finish(self, log_path: str = '', verbose: bool = False):
+        """ Last mark (the first page is shown), writes the report once. """
+        if self.finished: return
+        self.finished = True
+        self.mark('first page shown')
+
+        if verbose: print(self.summary())
+        if not log_path: return
+
+        try:
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            with open(log_path, 'w', encoding='utf-8') as f: json.dump(self.report(), f, indent=4)
+        except OSError as e:
+            print(f'[WARNING] Startup report not written: {e}')
+
+
+startup = StartupTimer()
+
+
+class LazyModule(types.ModuleType):
+    """ Stands for the module `name` until its first attribute access, then forwards to it. """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            started = time.perf_counter()
+            module = importlib.import_module(self.__name__)
+            startup.record_import(self.__name__, time.perf_counter() - started)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str):
+    """ The module `name` if it is imported already, otherwise a LazyModule that imports it on first use. """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+# ---------------------------------------------------------------- Qt WebEngine
+_webengine_page = None
+
+def prepare_webengine():
+    """ Qt WebEngine needs shared OpenGL contexts, they must be enabled before the QApplication is created
+        (an eager import of QtWebEngineWidgets used to do this implicitly). """
+    from PySide6.QtCore import Qt, QCoreApplication
+    QCoreApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+
+def warm_webengine():
+    """ Starts the Chromium processes of the default profile with a blank page, on the GUI thread. """
+    global _webengine_page
+    if _webengine_page is not None: return
+
+    try:
+        from PySide6.QtWidgets import QApplication
+        from PySide6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+
+        _webengine_page = QWebEnginePage(QWebEngineProfile.defaultProfile(), QApplication.instance())
+        _webengine_page.setHtml('<html><body></body></html>')
+        startup.mark('web engine warmed')
+
+    except ImportError as e:
+        # No WebEngine in this installation: nothing to warm
+        print(f'[WARNING] Qt WebEngine not available: {e}')
@@ -0,0 +1,144 @@
+# teacher_assistant/core/theme_compiler.py
+# ###################################################################################################
+#                                       THEME COMPILER                                              #
+# ###################################################################################################
+# The stylesheet of the application is the QSS template of PySideAbdhUI with one --role-name--      #
+# placeholder per color role, the colors of every theme are defined in color-roles.json.           #
+# ThemeCompiler turns (template, theme colors, font, property overrides) into the final QSS:        #
+#                                                                                                   #
+# 1. All placeholders are replaced in one regex pass over the template (not one pass per role).     #
+# 2. The font and the property overrides are rules appended after the template: a later rule with  #
+#    the same selector wins, so the shipped template file is never changed.                        #
+# 3. The result is cached in memory and on disk ([appdata]/cache/qss/<key>.qss). The key is a hash #
+#    of the theme colors, the overrides and the stamp (mtime, size) of the template, so a cached    #
+#    file is valid until one of them changes. On a cache hit the template is not even read: the     #
+#    startup only reads one small file.                                                             #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     compiler = ThemeCompiler(template_path, cache_dir)                                            #
+#     app.setStyleSheet(compiler.compile('default-dark', theme, font=(10, 'Segoe UI')))             #
+#####################################################################################################
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def theme_colors(theme: dict) -> dict:
+    """ {role name: color} of a theme of color-roles.json ({category: {role: {"color": ...}}}). """
+    colors = {}
+    for roles in theme.values():
+        for role_name, role_info in roles.items():
+            colors[role_name] = role_info.get("color", "")
+    return colors
+
+
+def override_rules(font=None, properties=None) -> str:
+    """ The QSS rules of the overrides, appended after the template.
+        font: (size in pt, family), properties: {selector: {property: value}} """
+    rules = []
+
+    if font:
+        size, family = font
+        size = 12 if int(size) <= 0 else int(size)
+        rules.append(f'* {{\n    font-size: {size}pt;\n    font-family: "{family}";\n}}')
+
+    for selector, values in (properties or {}).items():
+        body = ''.join(f'\n    {name}: {value};' for name, value in values.items())
+        rules.append(f'{selector} {{{body}\n}}')
+
+    return '\n\n'.join(rules)
+
+
+class ThemeCompiler:
+
+    def __init__(self, template_path: str, cache_dir: str = None):
+        self.template_path = template_path
+        # None: memory cache only
+        self.cache_dir = cache_dir
+        self._compiled = {}
+        # role names -> the regex of their placeholders
+        self._patterns = {}
+        self._lock = threading.Lock()
+
+    def key(self, theme_name: str, colors: dict, font=None, properties=None) -> str:
+        """ The cache key of a compilation: changes with the inputs and with the template file. """
+        payload = json.dumps([theme_name, colors, list(font) if font else None, properties or {},
+                              _file_stamp(self.template_path)], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def substitute(self, qss: str, colors: dict) -> str:
+        """ Replaces the --role-- placeholders of `qss` in one pass. """
+        if not colors: return qss
+
+        names = frozenset(colors)
+        pattern = self._patterns.get(names)
+        if pattern is None:
+            # The longest names first: '--primary-text--' is not matched as '--primary--' + 'text--'
+            alternatives = '|'.join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+            pattern = self._patterns[names] = re.compile(f'--({alternatives})--')
+
+        return pattern.sub(lambda m: colors[m.group(1)], qss)
+
+    def compile(self, theme_name: str, theme: dict, font=None, properties=None) -> str:
+        """ The QSS of `theme` (a theme of color-roles.json) with the overrides, from the cache if possible. """
+        colors = theme_colors(theme)
+        key = self.key(theme_name, colors, font, properties)
+
+        with self._lock:
+            qss = self._compiled.get(key)
+        if qss is not None: return qss
+
+        qss = self._read_cached(key)
+
+        if qss is None:
+            with open(self.template_path, 'r', encoding='utf-8') as f: template = f.read()
+
+            qss = self.substitute(template, colors)
+
+            rules = override_rules(font, properties)
+            if rules: qss = f'{qss}\n\n/* Overrides (core/theme_compiler.py) */\n{rules}\n'
+
+            self._write_cached(key, qss)
+
+        with self._lock:
+            self._compiled[key] = qss
+
+        return qss
+
+    def clear(self):
+        """ Drops the memory cache (the disk cache is keyed by the inputs and needs no clearing). """
+        with self._lock: self._compiled.clear()
+
+    # ---------------------------------------------------------------- disk cache
+    def _cache_file(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.qss')
+
+    def _read_cached(self, key: str):
+        if not self.cache_dir: return None
+        try:
+            with open(self._cache_file(key), 'r', encoding='utf-8') as f: return f.read()
+        except OSError:
+            return None
+
+    def _write_cached(self, key: str, qss: str):
+        if not self.cache_dir: return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Written under a temporary name and renamed: a parallel start never reads half a file
+            tmp_path = self._cache_file(key) + f'.{os.getpid()}.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f: f.write(qss)
+            os.replace(tmp_path, self._cache_file(key))
+        except OSError as e:
+            # The cache is optional, the stylesheet is applied anyway
+            print(f'[WARNING] QSS cache not written: {e}')
@@ -18,12 +18,13 @@ Utility functions for PySideAbdhUI.
 #
 # Adjust the package path argument according to where your resources are
 # located inside the package.
-import re
 import json
 import importlib.resources
 from pathlib import Path
 from PySide6.QtWidgets import QApplication
 
+from core.theme_compiler import ThemeCompiler
+
 def get_resource_path(package: str, resource: str, ext ='svg') -> Path:
     """
     Retrieve the full path to the specified resource located within the given package.
@@ -68,7 +69,7 @@ def get_color_roles(package:str='PySideAbdhUI.Widgets.resources.styles'):
 
 class ThemeManager:
     
-    def __init__(self):
+    def __init__(self, cache_dir: str = None):
         
         color_roles = get_color_roles()
         template =  get_styles_template()
@@ -77,6 +78,8 @@ class ThemeManager:
 
         self.template_path = template
         self.data = self.load()
+        # Compiled stylesheets per (theme, overrides), in memory and in `cache_dir` (core/theme_compiler.py)
+        self.compiler = ThemeCompiler(template, cache_dir)
 
     def load(self):
         with open(self.color_roles, "r", encoding="utf-8-sig") as f:
@@ -102,8 +105,10 @@ class ThemeManager:
     def switch_theme(self, new_theme_name):
 
         if new_theme_name in self.data.get("themes", {}):
-            self.data["active-theme"] = new_theme_name
-            self.save()
+            # Written only when the active theme really changes
+            if self.data.get("active-theme") != new_theme_name:
+                self.data["active-theme"] = new_theme_name
+                self.save()
             return True
         
         return False
@@ -115,22 +120,24 @@ class ThemeManager:
 
     def get_all_themes(self): return list(self.data.get("themes", {}).keys())
 
+    # The font and the widget properties are kept in color-roles.json as overrides:
+    # "overrides": {"font": [10, "Segoe UI"], "properties": {"QPushButton": {"font-family": "'Arial'"}}}
+    # they are layered over the template when the stylesheet is compiled.
+    def get_overrides(self) -> dict:
+        return self.data.setdefault("overrides", {"font": None, "properties": {}})
+
     def apply_theme(self,app: QApplication, theme_name='default-dark'):
 
         self.switch_theme(theme_name)
 
         theme = self.get_current_theme()
+        overrides = self.get_overrides()
 
         try:
-            with open(self.template_path, "r", encoding="utf-8") as f: qss = f.read()
+            # Placeholders replaced in one pass, or the cached result of an earlier run
+            qss = self.compiler.compile(self.get_current_theme_name(), theme,
+                                        font=overrides.get("font"), properties=overrides.get("properties"))
     
-            # Replace placeholders using theme values
-            for category, roles in theme.items():
-                for role_name, role_info in roles.items():
-                    placeholder = f"--{role_name}--"
-                    color = role_info.get("color", "")
-                    qss = qss.replace(placeholder, color)
-        
             # Apply stylesheet to app
             app.setStyleSheet(qss)
         except Exception as e:
@@ -140,109 +147,38 @@ class ThemeManager:
     def add_property_to_widget(self, widget_name: str, property_name: str, property_value: str):
         """
             Add or update a property for a specific widget in the stylesheet.
+            The property is an override of the template (the template file is not changed),
+            it is applied by the next apply_theme().
 
         Args:
             widget_name (str): The name of the widget (e.g., "QPushButton").
             property_name (str): The name of the property (e.g., "font-family").
             property_value (str): The value of the property (e.g., "'Arial'").
         """
+        properties = self.get_overrides().setdefault("properties", {})
+        properties.setdefault(widget_name, {})[property_name] = property_value
 
-        with open(self.template_path,'r',encoding="utf-8") as f: qss = f.read()
-
-        # Create the new property string
-        new_property = f"{property_name}: {property_value};"
-
-        # Check if the widget already has a stylesheet definition
-        widget_pattern = re.compile(rf'{widget_name}\s*{{[^}}]*}}')
-        match = widget_pattern.search(qss)
-        if match:
-            # Extract the existing stylesheet block for the widget
-            widget_style = match.group(0)
-
-            # Check if the property already exists in the widget's stylesheet
-            property_pattern = re.compile(rf'{property_name}\s*:\s*[^;]+;')
-            property_match = property_pattern.search(widget_style)
-            
-            if property_match:
-                # If the property exists, update its value
-                updated_style = widget_style.replace(property_match.group(0), new_property)
-                qss = qss.replace(widget_style, updated_style)
-    
-                print('Property updated:',property_match)
-
-                #logger.info(f"Updated property '{property_name}' to '{property_value}' for widget '{widget_name}'.")
-            else:
-                # If the property does not exist, append it to the widget's stylesheet
-                updated_style = widget_style.rstrip('}') + f"\n    {new_property}\n}}"
-                qss = qss.replace(widget_style, updated_style)
-                #logger.info(f"Added property '{property_name}: {property_value}' to widget '{widget_name}'.")
-                print('Property added:',property_match)
-
-            # Update sylesheet template
-            with open(self.template_path, 'w',encoding="utf-8") as f:
-                f.write(qss)
-                f.close()
+        self.save()
 
-            #self.apply_theme(QApplication.instance(), self.get_current_theme_name())
-
-    #import re
-    #from pathlib import Path
+        #self.apply_theme(QApplication.instance(), self.get_current_theme_name())
 
     def update_qss_font(self, font_size: int, font_family: str):
         """
-        Modify a .qss file so that the global font rule (* { ... }) uses the given
-        size and family. Other rules are left untouched.
+        Set the global font rule (* { ... }) to the given size and family. The rule is an
+        override of the template (the template file is not changed), it is applied by the
+        next apply_theme().
         
         Special widgets that have a font set via setFont() will keep their manual
         font automatically because QWidget::font overrides the stylesheet.
         """
-        with open(self.template_path,'r',encoding="utf-8") as f: 
-            raw = f.read()
-            f.close()
-        #qss_file = Path(qss_path)
-        #raw = qss_file.read_text(encoding='utf-8')
-
-        # Pattern to match the whole global * { ... } block
-        global_rule_pattern = re.compile(
-            r'(\*\s*\{)'          # opening of the * rule
-            r'([^}]+?)'           # contents (non-greedy to avoid eating following rules)
-            r'(\})',               # closing brace
-            re.DOTALL
-        )
-
         font_size  =  12 if font_size<=0 else font_size
         
-        def replace_global_rule(match):
-            """Inside the * { ... } block, replace font-size and font-family."""
-            opening = match.group(1)
-            body = match.group(2)
-            closing = match.group(3)
-
-            # Replace existing font-size / font-family declarations
-            body = re.sub(r'font-size\s*:\s*[^;]+;', f'font-size: {font_size}pt;', body)
-            body = re.sub(r'font-family\s*:\s*[^;]+;', f'font-family: "{font_family}";', body)
+        font = [font_size, font_family]
 
-            # If they were missing, append them
-            if 'font-size' not in body:
-                body += f' font-size: {font_size}pt;'
-            if 'font-family' not in body:
-                body += f' font-family: "{font_family}";'
-
-            return f'{opening}{body}{closing}'
-
-        new_qss, count = global_rule_pattern.subn(replace_global_rule, raw)
-
-        if count == 0:
-            # No global * rule found → add one at the very beginning
-            new_rule = f"* {{\n    font-size: {font_size}pt;\n    font-family: \"{font_family}\";\n}}\n\n"
-            
-            new_qss = new_rule + raw
-      
         # Write back only if something changed (avoid unnecessary I/O)
-        if new_qss != raw:
-            with open(self.template_path, 'w',encoding="utf-8") as f:
-                f.write(new_qss)
-                f.close()
+        if self.get_overrides().get("font") != font:
+            self.get_overrides()["font"] = font
+            self.save()
   
 # ========================================================================
 # Additional Package Initialization or Configuration
@@ -0,0 +1,331 @@
+# teacher_assistant/data/async_db.py
+# ###################################################################################################
+#                                   ASYNCHRONOUS DATABASE ACCESS                                    #
+# ###################################################################################################
+# The pages call app_context.database on the GUI thread: while a query runs the window does not     #
+# repaint and does not react. AsyncDatabase runs the calls on a small QThreadPool and returns a     #
+# DbFuture at once, its signals are emitted on the GUI thread when the call is done:               #
+#                                                                                                   #
+#     future = app_context.async_db.fetchall_named('behaviours_by_student', (student_id,), owner=self)
+#     future.finished.connect(self.show_behaviours)     # the rows                                 #
+#     future.failed.connect(self.show_error)            # the error message                        #
+#                                                                                                   #
+# Every pool thread has a backend of its own (StorageBackend.clone()), so a worker never shares a   #
+# connection or a transaction with the GUI thread or another worker.                                #
+#                                                                                                   #
+# Cancellation: future.cancel() takes a queued call off the pool, or interrupts the statement of a  #
+# running call (psycopg2 cancel request, sqlite3 interrupt). A cancelled future emits `cancelled`   #
+# and never `finished`, its result is dropped. A future with an `owner` (the page) is cancelled     #
+# when the owner is destroyed: navigating away from a page abandons its pending reads.             #
+#                                                                                                   #
+# Writes have no owner: a save runs to its end even if the page is closed meanwhile (and at quit).  #
+# The regions in `invalidate` are dropped from app_context.cache when the write succeeded, by       #
+# AsyncDatabase itself on the GUI thread, not by a slot of the page that may be gone.               #
+#                                                                                                   #
+# Reads through the cache (region=GROUPS / ROSTER / RESOURCES): a valid entry resolves the future   #
+# without a worker, a miss is loaded by the worker and stored in app_context.cache.                #
+#                                                                                                   #
+# Offline replica (data/replica.py): a named read that the replica serves is answered from the     #
+# local SQLite file without a worker, the workers can not connect while the server is unreachable. #
+# The worker backends share the replica for the reads that fail over to it.                         #
+#####################################################################################################
+
+import threading
+
+from PySide6.QtCore import QCoreApplication, QObject, QRunnable, QThreadPool, QTimer, Signal, Slot
+
+# DbFuture.state
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class _JobSignals(QObject):
+    # Emitted on the pool thread, delivered queued to the future on the GUI thread
+    result = Signal(object)
+    error = Signal(str)
+    # The cache regions of a successful write
+    written = Signal(tuple)
+
+
+class DbFuture(QObject):
+    """ The pending result of one call of AsyncDatabase, the signals are emitted on the GUI thread. """
+    finished = Signal(object)
+    failed = Signal(str)
+    cancelled = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.state = PENDING
+        self.result = None
+        self.error = ''
+        # A write is not cancelled by shutdown()
+        self.write = False
+        # Set by AsyncDatabase: the queued job and the backend of the worker that runs it
+        self._job = None
+        self._pool = None
+        self._backend = None
+        self._lock = threading.Lock()
+
+    def is_pending(self) -> bool: return self.state in (PENDING, RUNNING)
+
+    def then(self, on_result, on_error=None):
+        """ Connects the result (and the error) slot, returns the future for chaining. """
+        self.finished.connect(on_result)
+        if on_error is not None: self.failed.connect(on_error)
+        return self
+
+    @Slot()
+    def cancel(self):
+        """ Abandons the call: no `finished` / `failed` afterwards. """
+        with self._lock:
+            if not self.is_pending(): return
+
+            state, backend = self.state, self._backend
+            self.state = CANCELLED
+
+        if state == PENDING and self._pool is not None and self._job is not None:
+            if self._pool.tryTake(self._job): self._job.owner._jobs.discard(self._job)
+        elif backend is not None:
+            try:
+                backend.interrupt()
+            except Exception:
+                # The statement ended in the meantime, its result is dropped anyway
+                pass
+
+        self.cancelled.emit()
+        self._release()
+
+    def _start(self, backend) -> bool:
+        # On the pool thread: False when the future was cancelled before the call started
+        with self._lock:
+            if self.state != PENDING: return False
+            self.state, self._backend = RUNNING, backend
+            return True
+
+    def _stop(self):
+        # On the pool thread, after the call: a cancel() from now on does not interrupt anything
+        with self._lock: self._backend = None
+
+    @Slot(object)
+    def _resolve(self, result):
+        if self.state == CANCELLED: return
+
+        self.state, self.result = DONE, result
+        self.finished.emit(result)
+        self._release()
+
+    @Slot(str)
+    def _reject(self, message:str):
+        if self.state == CANCELLED: return
+
+        self.state, self.error = FAILED, message
+        self.failed.emit(message)
+        self._release()
+
+    def _release(self):
+        self._job = None
+        self.deleteLater()
+
+
+class _Job(QRunnable):
+
+    def __init__(self, owner:'AsyncDatabase', future:DbFuture, call, args, regions:tuple=()):
+        super().__init__()
+        # tryTake() hands a queued job back, the pool must not delete the jobs itself
+        self.setAutoDelete(False)
+
+        self.owner = owner
+        self.future = future
+        self.call = call
+        self.args = args
+        self.regions = tuple(regions)
+
+        self.signals = _JobSignals()
+        self.signals.result.connect(future._resolve)
+        self.signals.error.connect(future._reject)
+
+    def run(self):
+        try:
+            try:
+                backend = self.owner.worker_backend()
+            except Exception as e:
+                # No connection: the call fails like a failed statement
+                self.signals.error.emit(str(e))
+                return
+
+            if not self.future._start(backend): return
+
+            try:
+                result = self.call(backend, *self.args)
+
+            except Exception as e:
+                # A failed or interrupted statement leaves the transaction aborted
+                try: backend.rollback()
+                except Exception: pass
+
+                self.future._stop()
+                self.signals.error.emit(str(e))
+                return
+
+            self.future._stop()
+            if self.regions: self.signals.written.emit(self.regions)
+            self.signals.result.emit(result)
+
+        finally:
+            self.owner._jobs.discard(self)
+
+
+class AsyncDatabase(QObject):
+
+    def __init__(self, database, cache=None, max_threads:int=2, parent=None):
+        super().__init__(parent)
+
+        self.database = database
+        self.cache = cache
+
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # An idle worker keeps its connection for the next call
+        self.pool.setExpiryTimeout(-1)
+
+        self._local = threading.local()
+        self._backends = []
+        self._backends_lock = threading.Lock()
+        self._futures = set()
+        # The pool does not own the jobs (tryTake needs them), they are kept here until they ran
+        self._jobs = set()
+
+        app = QCoreApplication.instance()
+        if app is not None: app.aboutToQuit.connect(self.shutdown)
+
+    def worker_backend(self):
+        """ The backend of the calling pool thread, opened on its first call. """
+        backend = getattr(self._local, 'backend', None)
+
+        if backend is None:
+            backend = self._local.backend = self.database.clone()
+            with self._backends_lock: self._backends.append(backend)
+
+        # The replica may be started (or stopped) after the worker connected
+        backend.replica = getattr(self.database, 'replica', None)
+        return backend
+
+    # ---------------------------------------------------------------- submitting
+    def submit(self, call, *args, owner:QObject=None, invalidate:tuple=()) -> DbFuture:
+        """ Runs call(backend, *args) on a worker, the future resolves to its return value.
+            `invalidate`: cache regions dropped after the call succeeded (writes). """
+        future = DbFuture(self)
+        job = _Job(self, future, call, args, invalidate)
+
+        future._job, future._pool = job, self.pool
+        # Queued to the GUI thread: AsyncDatabase lives there and outlives the pages
+        if invalidate: job.signals.written.connect(self._invalidate)
+
+        self._jobs.add(job)
+        self._futures.add(future)
+        future.destroyed.connect(lambda *_: self._futures.discard(future))
+
+        if owner is not None: owner.destroyed.connect(future.cancel)
+
+        self.pool.start(job)
+        return future
+
+    def resolved(self, value, owner:QObject=None) -> DbFuture:
+        """ A future of a value known already, `finished` is emitted on the next turn of the event loop
+            (after the caller connected its slots). """
+        future = DbFuture(self)
+        if owner is not None: owner.destroyed.connect(future.cancel)
+
+        QTimer.singleShot(0, future, lambda: future._resolve(value))
+        return future
+
+    def rejected(self, message:str, owner:QObject=None) -> DbFuture:
+        """ A future of an error known already, `failed` is emitted on the next turn of the event loop. """
+        future = DbFuture(self)
+        if owner is not None: owner.destroyed.connect(future.cancel)
+
+        QTimer.singleShot(0, future, lambda: future._reject(message))
+        return future
+
+    def _replica_for(self, name:str):
+        # The replica when it answers the named statement now (data/replica.py serves())
+        replica = getattr(self.database, 'replica', None)
+        return replica if replica is not None and replica.serves(name) else None
+
+    def _local_read(self, read, owner:QObject=None) -> DbFuture:
+        # A read of the local replica, on the calling thread (a SQLite file, no network)
+        try:
+            return self.resolved(read(), owner)
+        except Exception as e:
+            return self.rejected(str(e), owner)
+
+    def fetchall_named(self, name:str, params=(), region:str=None, owner:QObject=None) -> DbFuture:
+        replica = self._replica_for(name)
+        if replica is not None:
+            if region is not None and self.cache is not None:
+                return self._local_read(lambda: self.cache.fetchall_named(region, name, params, database=replica), owner)
+            return self._local_read(lambda: replica.fetchall_named(name, params), owner)
+
+        if region is not None and self.cache is not None:
+            hit, rows = self.cache.peek(region, self.cache.named_key(name, params))
+            if hit: return self.resolved(rows, owner)
+
+            return self.submit(lambda backend: self.cache.fetchall_named(region, name, params, database=backend),
+                               owner=owner)
+
+        return self.submit(lambda backend: backend.fetchall_named(name, params), owner=owner)
+
+    def fetchone_named(self, name:str, params=(), region:str=None, owner:QObject=None) -> DbFuture:
+        replica = self._replica_for(name)
+        if replica is not None:
+            if region is not None and self.cache is not None:
+                return self._local_read(lambda: self.cache.fetchone_named(region, name, params, database=replica), owner)
+            return self._local_read(lambda: replica.fetchone_named(name, params), owner)
+
+        if region is not None and self.cache is not None:
+            hit, row = self.cache.peek(region, self.cache.named_key(name, params, one=True))
+            if hit: return self.resolved(row, owner)
+
+            return self.submit(lambda backend: self.cache.fetchone_named(region, name, params, database=backend),
+                               owner=owner)
+
+        return self.submit(lambda backend: backend.fetchone_named(name, params), owner=owner)
+
+    # ---------------------------------------------------------------- writes (no owner, see the header)
+    def execute_named(self, name:str, params=(), invalidate:tuple=()) -> DbFuture:
+        return self._write(lambda backend: backend.execute_named(name, params), invalidate)
+
+    def fetchall(self, query, params=None, owner:QObject=None) -> DbFuture:
+        return self.submit(lambda backend: backend.fetchall(query, params), owner=owner)
+
+    def execute_and_return(self, query, params=None, invalidate:tuple=()) -> DbFuture:
+        return self._write(lambda backend: backend.execute_and_return(query, params), invalidate)
+
+    def _write(self, call, invalidate:tuple) -> DbFuture:
+        future = self.submit(call, invalidate=invalidate)
+        future.write = True
+        return future
+
+    @Slot(tuple)
+    def _invalidate(self, regions:tuple):
+        if self.cache is not None: self.cache.invalidate(*regions)
+
+    # ---------------------------------------------------------------- shutdown
+    @Slot()
+    def shutdown(self):
+        """ Cancels the pending reads, waits for the workers (and the writes) and closes their connections. """
+        for future in list(self._futures):
+            if not future.write: future.cancel()
+
+        self.pool.waitForDone()
+
+        with self._backends_lock:
+            backends, self._backends = self._backends, []
+
+        for backend in backends:
+            try: backend.close()
+            except Exception: pass
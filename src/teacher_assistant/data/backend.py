@@ -0,0 +1,149 @@
+# teacher_assistant/data/backend.py
+# ###################################################################################################
+#                                       STORAGE BACKEND                                             #
+# ###################################################################################################
+# The operations the services and pages run on `app_context.database`. Two implementations:        #
+#                                                                                                   #
+#   psycopg2_database  (data/database.py)         PostgreSQL server, several workstations           #
+#   sqlite_database    (data/sqlite_database.py)  one local file, no server to install             #
+#                                                                                                   #
+# The named statements (data/queries.py) are the portable part: every backend has its own text of  #
+# each name. The raw SQL of execute() / fetchone() / fetchall() is written for PostgreSQL with %s   #
+# placeholders, the SQLite backend translates the placeholders and the casts only, so raw SQL has   #
+# to stay within the common subset of the two dialects.                                              #
+#                                                                                                   #
+# The server-only features (migrations, LISTEN/NOTIFY, the offline replica, pg_dump backups, the    #
+# exports) check `dialect` and are not available on SQLite.                                         #
+#####################################################################################################
+
+from processing.text.normalization import canonical, fold, normalize_column, normalize_columns
+
+
+class StorageBackend:
+
+    # 'postgresql' or 'sqlite'
+    dialect = ''
+
+    def connect(self, **params):
+        """ Opens the main connection (the GUI thread), `params` depend on the backend. """
+        raise NotImplementedError
+
+    def open_connection(self):
+        """ A new connection to the same database for a background thread, the caller closes it. """
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def clone(self):
+        """ A new backend of the same database on a connection of its own, for one worker thread
+            (data/async_db.py). The caller closes it. """
+        raise NotImplementedError
+
+    def interrupt(self):
+        """ Aborts the statement running on the connection, safe to call from another thread. """
+        raise NotImplementedError
+
+    def rollback(self):
+        """ Ends a failed or interrupted transaction, the connection is usable again. """
+        raise NotImplementedError
+
+    # ---------------------------------------------------------------- raw SQL (PostgreSQL syntax, %s placeholders)
+    def execute(self, query, params=None):
+        """ Executes an INSERT / UPDATE / DELETE and commits. """
+        raise NotImplementedError
+
+    def execute_and_return(self, query, params=None):
+        """ Executes a statement with RETURNING, commits and returns its first row. """
+        raise NotImplementedError
+
+    def fetchone(self, query, params=None):
+        raise NotImplementedError
+
+    def fetchall(self, query, params=None):
+        raise NotImplementedError
+
+    def stream(self, query, params=None):
+        """ Returns an open cursor for fetchmany(), the caller closes it. """
+        raise NotImplementedError
+
+    # ---------------------------------------------------------------- named statements (data/queries.py)
+    def execute_named(self, name, params=()):
+        raise NotImplementedError
+
+    def fetchone_named(self, name, params=()):
+        raise NotImplementedError
+
+    def fetchall_named(self, name, params=()):
+        raise NotImplementedError
+
+    # ---------------------------------------------------------------- helpers
+    def get_columns(self, table_name):
+        """ Column names of `table_name`, [] on error. """
+        try:
+            return [row[0] for row in self.fetchall_named('table_columns', (table_name,))]
+
+        except Exception as e:
+            print("Error fetching table columns:", e)
+            return []
+
+    def bulk_insert_csv(self, data, table_name, column_mapping, key_column=None):
+        """ Inserts the chunks of a pandas CSV reader, returns the number of inserted rows (0 on error).
+            key_column: the rows whose key is in the table already (or earlier in the file) are skipped. """
+        raise NotImplementedError
+
+    def existing_keys(self, table_name, key_column) -> set:
+        """ The fold()ed keys of `table_name`: the duplicates of csv_rows(seen=...). """
+        return set(normalize_column([row[0] for row in self.fetchall(f'SELECT {key_column} FROM {table_name}')], fold))
+
+    @staticmethod
+    def csv_rows(chunk, column_mapping, key_column=None, seen=None) -> list:
+        """ The rows of a pandas chunk as tuples of Python values (NaN -> None) in `column_mapping` order.<br>
+            The text is stored in canonical() form (Persian letters, ASCII digits). With `key_column` (a
+            database column of the mapping) the rows whose fold()ed key is in `seen` are dropped, the keys
+            of the returned rows are added to `seen`. """
+        # `chunk` is a pandas DataFrame, so pandas is already loaded here
+        import pandas as pd
+
+        # Validate columns
+        missing_columns = set(column_mapping.keys()) - set(chunk.columns)
+        if missing_columns:
+            raise ValueError(f"Missing columns in CSV: {missing_columns}")
+
+        # Reorder and select only needed columns
+        chunk = chunk[list(column_mapping.keys())].copy()
+
+        # 'علي' / '۰۹۱۲' typed on another keyboard layout are stored as 'علی' / '0912' (whole columns at once)
+        normalize_columns(chunk, fn=canonical)
+
+        # Convert numpy types to Python native types and handle NaN
+        rows = []
+        for _, row in chunk.iterrows():
+            processed_row = []
+            for col in column_mapping.keys():
+                value = row[col]
+                # Handle NaN/None/pd.NA
+                if pd.isna(value):
+                    processed_row.append(None)
+                # Convert numpy types (numpy.integer, numpy.floating, ...)
+                elif hasattr(value, 'item'):
+                    processed_row.append(value.item())
+                else:
+                    processed_row.append(value)
+
+            rows.append(tuple(processed_row))
+
+        if key_column is not None and seen is not None:
+            position = list(column_mapping.values()).index(key_column)
+            keys = normalize_column([row[position] for row in rows], fold)
+
+            unique = []
+            for row, key in zip(rows, keys):
+                if key is not None and key in seen: continue
+                if key is not None: seen.add(key)
+                unique.append(row)
+
+            if len(unique) < len(rows): print(f"Skipped {len(rows) - len(unique)} duplicate rows...")
+            rows = unique
+
+        return rows
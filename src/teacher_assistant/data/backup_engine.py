@@ -0,0 +1,435 @@
+# teacher_assistant/data/backup_engine.py
+# ###################################################################################################
+#                                    BACKUP AND RESTORE ENGINE                                      #
+# ###################################################################################################
+# Backups are written by pg_dump of the PostgreSQL client tools:                                    #
+#                                                                                                   #
+# - Directory format (-Fd): one file per table, written by `jobs` parallel connections (-j). The    #
+#   custom format (-Fc, one file) is still available, pg_dump writes it with one connection only.   #
+# - The compression level (-Z 0..9) is optional, pg_dump's default is gzip level 6.                 #
+# - pg_dump -v reports every step on stderr. The lines are parsed into progress events:            #
+#       progress(phase, done, total, detail)    phase: 'schema', 'data', 'verify'                   #
+#   'data' counts the dumped tables against the number of tables of the database.                   #
+# - Verification: `pg_restore --list` must read the table of contents of the new archive, it must   #
+#   list one TABLE DATA entry per dumped table, and in the directory format the data file of each   #
+#   entry must exist.                                                                               #
+#                                                                                                   #
+# RestoreEngine restores both formats with `jobs` parallel pg_restore connections (-j):             #
+#                                                                                                   #
+# - Staging: the archive is restored into a new database <target>__restore_<time>. The target is    #
+#   not touched until the restore succeeded, then both databases are renamed in one transaction    #
+#   (target -> <target>__old_<time>, staging -> target) and the old one is dropped. The target is  #
+#   unavailable for the rename only, not for the whole restore. A failed restore drops the staging  #
+#   database and leaves the target as it was. A failed swap keeps the restored staging database.    #
+# - Progress phases: 'prepare', 'schema', 'data' (restored tables / TABLE DATA entries), 'swap'.   #
+#                                                                                                   #
+# Both pipes of a tool are drained at the same time (stderr here, stdout by a thread): a tool never #
+# blocks on a full pipe. The password is passed in PGPASSWORD of the child process only. The        #
+# engines block: the page runs them on the thread pool (data/loaders.py BackupWorker and            #
+# RestoreWorker), cancel() can be called from any thread.                                           #
+#####################################################################################################
+
+import datetime
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+
+import psycopg2
+
+DIRECTORY = 'directory'
+CUSTOM = 'custom'
+
+# pg_dump -v lines (stderr)
+_DUMPING_TABLE = re.compile(r'dumping contents of table "(?P<table>[^"]+)"')
+_READING = re.compile(r'^pg_dump: (?P<step>reading .+|saving .+|identifying .+|finding .+|flagging .+)$')
+# pg_restore --list entries: '2656; 0 17001 TABLE DATA public personal_info postgres'
+_TABLE_DATA = re.compile(r'^(?P<dump_id>\d+);\s+\d+\s+\d+\s+TABLE DATA\s+(?P<schema>\S+)\s+(?P<table>\S+)')
+# pg_restore -v lines (stderr)
+_PROCESSING_DATA = re.compile(r'processing data for table "(?P<table>[^"]+)"')
+_RESTORE_STEP = re.compile(r'^pg_restore: (?P<step>creating .+|processing item .+)$')
+
+# RestoreEngine connects here to create, rename and drop databases
+MAINTENANCE_DB = 'postgres'
+
+# Seconds the swap waits for the terminated sessions of the target database to exit
+TERMINATE_TIMEOUT = 30
+
+# Counted by the 'data' phase: the tables with rows to dump
+TABLE_COUNT_QUERY = ("SELECT count(*) FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+                     "WHERE c.relkind IN ('r', 'm') AND n.nspname NOT IN ('pg_catalog', 'information_schema') "
+                     "AND n.nspname NOT LIKE 'pg_toast%' AND n.nspname NOT LIKE 'pg_temp%'")
+
+
+def pg_tool(bin_path: str, name: str) -> str:
+    """ Full path of a PostgreSQL client tool (pg_dump, pg_restore, ...) in `bin_path`, .exe on Windows.
+        Without `bin_path` the tool is searched on PATH. """
+    executable = name + '.exe' if os.name == 'nt' else name
+    if bin_path: return os.path.join(bin_path, executable)
+    return shutil.which(executable) or executable
+
+
+def default_jobs() -> int:
+    # pg_dump uses jobs + 1 connections, a few are enough for the size of a school database
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+def backup_name(database: str, fmt: str = DIRECTORY) -> str:
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{database}_backup_{timestamp}" + ('' if fmt == DIRECTORY else '.dump')
+
+
+class PgToolRunner:
+    """ Runs the PostgreSQL client tools for one database, base of BackupEngine and RestoreEngine. """
+
+    def __init__(self, bin_path: str, database: str, user: str, password: str, host: str = 'localhost', port='5432'):
+        self.bin_path = bin_path
+        self.database = database
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = str(port)
+
+        self._process = None
+        self._cancelled = False
+        # stdout of the last tool run by _run()
+        self.stdout = ''
+        self._lock = threading.Lock()
+
+    def environment(self) -> dict:
+        env = os.environ.copy()
+        env['PGPASSWORD'] = self.password
+        return env
+
+    def connection_args(self) -> list:
+        return ['-h', self.host, '-p', self.port, '-U', self.user]
+
+    def table_count(self) -> int:
+        """ Number of tables pg_dump will dump the data of, 0 when the database can not be queried. """
+        try:
+            connection = psycopg2.connect(host=self.host, port=self.port, database=self.database,
+                                          user=self.user, password=self.password)
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(TABLE_COUNT_QUERY)
+                    return int(cursor.fetchone()[0])
+            finally:
+                connection.close()
+        except Exception:
+            return 0
+
+    # ---------------------------------------------------------------- running
+    def cancel(self):
+        """ Stops the running tool: a partial backup archive (or a partial restored database) is removed. """
+        with self._lock:
+            self._cancelled = True
+            if self._process is not None and self._process.poll() is None: self._process.terminate()
+
+    def _run(self, cmd: list, on_line):
+        # Runs a tool, on_line() gets every line of its stderr (blocking reads, no polling).
+        # Returns (return code, the last lines of stderr)
+        with self._lock:
+            if self._cancelled: return -1, ''
+            self._process = subprocess.Popen(cmd, env=self.environment(), stdout=subprocess.PIPE,
+                                             stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+            process = self._process
+
+        tail = []
+        # stdout is read by a thread: a full stdout pipe would block the tool while we wait on stderr
+        stdout_lines = []
+        reader = threading.Thread(target=lambda: stdout_lines.extend(process.stdout), daemon=True)
+        reader.start()
+
+        for line in process.stderr:
+            line = line.rstrip()
+            if not line: continue
+            tail = (tail + [line])[-5:]
+            on_line(line)
+
+        process.wait()
+        reader.join()
+
+        with self._lock: self._process = None
+
+        self.stdout = ''.join(stdout_lines)
+        return process.returncode, '\n'.join(tail)
+
+
+class BackupEngine(PgToolRunner):
+
+    def command(self, path: str, fmt: str = DIRECTORY, jobs: int = None, compression: int = None) -> list:
+        cmd = [pg_tool(self.bin_path, 'pg_dump'), '-v', '-Fd' if fmt == DIRECTORY else '-Fc']
+
+        # Parallel dump needs the directory format
+        if fmt == DIRECTORY: cmd += ['-j', str(jobs or default_jobs())]
+        if compression is not None and compression >= 0: cmd += ['-Z', str(min(int(compression), 9))]
+
+        return cmd + self.connection_args() + ['-f', path, self.database]
+
+    def backup(self, path: str, fmt: str = DIRECTORY, jobs: int = None, compression: int = None,
+               verify: bool = True, progress=None) -> tuple[bool, str, str]:
+        """
+        Dumps the database to `path` (a new folder in the directory format, a file otherwise).<br>
+        `progress(phase, done, total, detail)` is called on the calling thread.<br>
+        Returns (status, message, path), the partial archive is removed on failure.
+        """
+        progress = progress or (lambda *args: None)
+
+        if fmt == DIRECTORY and os.path.exists(path):
+            return False, f"❌ Backup failed: '{path}' exists already.", None
+
+        total = self.table_count()
+        dumped = []
+
+        def on_line(line: str):
+            match = _DUMPING_TABLE.search(line)
+            if match:
+                dumped.append(match.group('table'))
+                progress('data', len(dumped), max(total, len(dumped)), match.group('table'))
+                return
+
+            match = _READING.match(line)
+            if match: progress('schema', 0, total, match.group('step'))
+
+        progress('schema', 0, total, 'starting pg_dump')
+
+        try:
+            code, error = self._run(self.command(path, fmt, jobs, compression), on_line)
+        except OSError as e:
+            return False, f"❌ Backup failed: can not run pg_dump: {e}", None
+
+        if self._cancelled:
+            self.remove(path)
+            return False, "Backup cancelled.", None
+
+        if code != 0:
+            self.remove(path)
+            return False, f"❌ Backup failed: {error}", None
+
+        if not os.path.exists(path) or (os.path.isfile(path) and os.path.getsize(path) == 0):
+            self.remove(path)
+            return False, "❌ Backup failed: Empty archive", None
+
+        if verify:
+            progress('verify', 0, len(dumped), 'pg_restore --list')
+            status, msg = self.verify(path, len(dumped))
+            if not status:
+                self.remove(path)
+                return False, f"❌ Backup verification failed: {msg}", None
+            progress('verify', len(dumped), len(dumped), msg)
+
+        done = datetime.datetime.now().strftime("%Y-%m-%d-%H:%M:%S")
+        return True, f'✅ [{done}] Backup successful ({len(dumped)} tables{", verified" if verify else ""}).', path
+
+    def verify(self, path: str, expected_tables: int = None) -> tuple[bool, str]:
+        """ Reads the table of contents of the archive with pg_restore --list. """
+        try:
+            code, error = self._run([pg_tool(self.bin_path, 'pg_restore'), '--list', path], lambda line: None)
+        except OSError as e:
+            return False, f'can not run pg_restore: {e}'
+
+        if code != 0: return False, error or f'pg_restore exited with {code}'
+
+        entries = [m for m in map(_TABLE_DATA.match, self.stdout.splitlines()) if m]
+
+        if expected_tables is not None and len(entries) != expected_tables:
+            return False, f'{len(entries)} table data entries in the archive, {expected_tables} tables were dumped'
+
+        if os.path.isdir(path):
+            # <dump id>.dat, .dat.gz, .dat.lz4 or .dat.zst depending on the compression
+            dump_ids = {name.split('.')[0] for name in os.listdir(path)}
+            missing = [f"{m.group('schema')}.{m.group('table')}" for m in entries if m.group('dump_id') not in dump_ids]
+            if missing: return False, f"data files missing for {', '.join(missing)}"
+
+        return True, f'{len(entries)} tables verified'
+
+    @staticmethod
+    def remove(path: str):
+        try:
+            if path and os.path.isdir(path): shutil.rmtree(path)
+            elif path and os.path.exists(path): os.remove(path)
+        except OSError as e:
+            print(f'Can not remove the failed backup {path}: {e}')
+
+
+class RestoreEngine(PgToolRunner):
+    """ Restores an archive of BackupEngine (directory or custom format) with parallel pg_restore jobs.
+        `database` is the maintenance database the engine connects to for CREATE / ALTER / DROP DATABASE. """
+
+    def __init__(self, bin_path: str, user: str, password: str, host: str = 'localhost', port='5432',
+                 database: str = MAINTENANCE_DB):
+        super().__init__(bin_path, database, user, password, host, port)
+
+    def command(self, path: str, target_db: str, jobs: int = None) -> list:
+        return ([pg_tool(self.bin_path, 'pg_restore'), '-v', '-j', str(jobs or default_jobs())]
+                + self.connection_args() + ['-d', target_db, path])
+
+    def restore(self, path: str, target_db: str, staging: bool = True, jobs: int = None,
+                progress=None) -> tuple[bool, str, str]:
+        """
+        Restores the archive `path` into the database `target_db`.<br>
+        staging=True: the archive is restored into a new database which replaces `target_db` when the
+        restore succeeded (target_db may exist, it is dropped after the swap).<br>
+        staging=False: `target_db` is created, it must not exist.<br>
+        Returns (status, message, database name).
+        """
+        progress = progress or (lambda *args: None)
+
+        if not os.path.exists(path): return False, f"❌ Restore failed: '{path}' not found.", None
+
+        # pg_restore reads the archive once more here, the table of contents is small
+        progress('prepare', 0, 0, 'reading the table of contents')
+        status, total = self.table_entries(path)
+        if not status: return False, f"❌ Restore failed: not a valid archive: {total}", None
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        restore_db = f'{target_db}__restore_{timestamp}' if staging else target_db
+
+        status, msg = self.execute(f'CREATE DATABASE {_identifier(restore_db)}')
+        if not status: return False, f"❌ Could not create database '{restore_db}': {msg}", None
+
+        restored = []
+
+        def on_line(line: str):
+            match = _PROCESSING_DATA.search(line)
+            if match:
+                restored.append(match.group('table'))
+                progress('data', len(restored), max(total, len(restored)), match.group('table'))
+                return
+
+            match = _RESTORE_STEP.match(line)
+            if match: progress('schema', 0, total, match.group('step'))
+
+        progress('schema', 0, total, 'starting pg_restore')
+
+        try:
+            code, error = self._run(self.command(path, restore_db, jobs), on_line)
+        except OSError as e:
+            code, error = -1, f'can not run pg_restore: {e}'
+
+        if self._cancelled or code != 0:
+            self.drop(restore_db)
+            if self._cancelled: return False, "Restore cancelled.", None
+            return False, f"❌ Restore failed: {error}", None
+
+        if staging:
+            progress('swap', 0, 1, f"replacing '{target_db}'")
+            status, msg = self.swap(restore_db, target_db, f'{target_db}__old_{timestamp}')
+            if not status:
+                # The restore itself succeeded: the staging database is kept, it can be renamed by hand
+                return False, f"❌ Restore failed: {msg}\n" \
+                              f"The restored data is kept in the database '{restore_db}'.", None
+            progress('swap', 1, 1, msg)
+
+        done = datetime.datetime.now().strftime("%Y-%m-%d-%H:%M:%S")
+        return True, f"✅ [{done}] Restore successful ({len(restored)} tables).", target_db
+
+    def table_entries(self, path: str) -> tuple[bool, object]:
+        """ (True, number of TABLE DATA entries) of the archive, (False, error) when it can not be read. """
+        try:
+            code, error = self._run([pg_tool(self.bin_path, 'pg_restore'), '--list', path], lambda line: None)
+        except OSError as e:
+            return False, f'can not run pg_restore: {e}'
+
+        if code != 0: return False, error or f'pg_restore exited with {code}'
+
+        return True, sum(1 for line in self.stdout.splitlines() if _TABLE_DATA.match(line))
+
+    # ---------------------------------------------------------------- databases
+    def _connect(self):
+        return psycopg2.connect(host=self.host, port=self.port, database=self.database,
+                                user=self.user, password=self.password)
+
+    def execute(self, *statements) -> tuple[bool, str]:
+        """ Runs statements outside a transaction (CREATE / DROP DATABASE can not run inside one). """
+        try:
+            connection = self._connect()
+            connection.autocommit = True
+            try:
+                with connection.cursor() as cursor:
+                    for statement in statements: cursor.execute(statement)
+            finally:
+                connection.close()
+        except psycopg2.Error as e:
+            return False, str(e).strip()
+
+        return True, ''
+
+    def exists(self, database: str) -> bool:
+        try:
+            connection = self._connect()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1 FROM pg_database WHERE datname = %s', (database,))
+                    return cursor.fetchone() is not None
+            finally:
+                connection.close()
+        except psycopg2.Error:
+            return False
+
+    def drop(self, database: str) -> tuple[bool, str]:
+        # WITH (FORCE) (PostgreSQL 13+) closes the sessions of the database first
+        return self.execute(f'DROP DATABASE IF EXISTS {_identifier(database)} WITH (FORCE)')
+
+    def terminate_sessions(self, database: str, timeout: float = TERMINATE_TIMEOUT) -> tuple[bool, str]:
+        """ Terminates the sessions of `database` and waits until they have exited: pg_terminate_backend()
+            only signals them, a session that still exits blocks ALTER DATABASE ... RENAME. """
+        deadline = time.monotonic() + timeout
+        try:
+            connection = self._connect()
+            connection.autocommit = True
+            try:
+                with connection.cursor() as cursor:
+                    while True:
+                        cursor.execute('SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity '
+                                       'WHERE datname = %s AND pid <> pg_backend_pid()', (database,))
+                        if cursor.fetchone()[0] == 0: return True, ''
+                        if time.monotonic() > deadline:
+                            return False, f"the sessions of '{database}' did not exit within {timeout:.0f} s"
+                        time.sleep(0.1)
+            finally:
+                connection.close()
+        except psycopg2.Error as e:
+            return False, str(e).strip()
+
+    def swap(self, restored_db: str, target_db: str, old_db: str) -> tuple[bool, str]:
+        """ Renames target_db to old_db and restored_db to target_db in one transaction, then drops old_db.
+            The sessions of target_db are closed, new ones are refused until the swap is done. """
+        if not self.exists(target_db):
+            status, msg = self.execute(f'ALTER DATABASE {_identifier(restored_db)} RENAME TO {_identifier(target_db)}')
+            return status, msg or f"'{target_db}' created"
+
+        target, restored, old = _identifier(target_db), _identifier(restored_db), _identifier(old_db)
+
+        status, msg = self.execute(f'ALTER DATABASE {target} WITH ALLOW_CONNECTIONS false')
+        if not status: return False, msg
+
+        status, msg = self.terminate_sessions(target_db)
+        if not status:
+            self.execute(f'ALTER DATABASE {target} WITH ALLOW_CONNECTIONS true')
+            return False, f"can not replace '{target_db}': {msg}"
+
+        try:
+            connection = self._connect()
+            try:
+                with connection, connection.cursor() as cursor:
+                    # Both renames are committed together: target_db always names a complete database
+                    cursor.execute(f'ALTER DATABASE {target} RENAME TO {old}')
+                    cursor.execute(f'ALTER DATABASE {restored} RENAME TO {target}')
+            finally:
+                connection.close()
+        except psycopg2.Error as e:
+            self.execute(f'ALTER DATABASE {target} WITH ALLOW_CONNECTIONS true')
+            return False, f"can not replace '{target_db}': {str(e).strip()}"
+
+        status, msg = self.drop(old_db)
+        if not status: return True, f"'{target_db}' replaced, the old database '{old_db}' was not dropped: {msg}"
+
+        return True, f"'{target_db}' replaced"
+
+
+def _identifier(name: str) -> str:
+    # A quoted SQL identifier (database names come from the settings page)
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,568 @@
+# teacher_assistant/data/backup_scheduler.py
+# ###################################################################################################
+#                                      SCHEDULED BACKUPS                                            #
+# ###################################################################################################
+# Periodic backups of a PostgreSQL database into one folder, without a click on the maintenance     #
+# page:                                                                                             #
+#                                                                                                   #
+#   full/<db>_backup_<time>/        a full dump every `full_every_days` (BackupEngine, directory     #
+#                                   format, parallel jobs)                                          #
+#   incremental/<db>_incr_<time>/   between the full dumps, every `incremental_every_hours`: the     #
+#                                   rows changed since the last full dump (updated_at_ columns of   #
+#                                   migration 9), one <table>.jsonl.gz per table                   #
+#   blobs/<ab>/<sha256>             the bytea values of the incremental exports (photos, answers),  #
+#                                   stored once per content: an unchanged photo is never written   #
+#                                   again, whatever row or export refers to it                      #
+#   schedule.json                   the runs (kind, time, base full dump, schema version)           #
+#                                                                                                   #
+# An incremental export is differential: it depends on its full dump only, a restore point is the  #
+# full dump plus (at most) one incremental export. The tables with an updated_at_ column are       #
+# exported by their changed rows plus the list of all their keys (the deleted rows), the small     #
+# tables without one are exported whole. The gradebook is not exported: its triggers rebuild it.   #
+# A schema upgrade since the last full dump makes the next run a full dump.                         #
+#                                                                                                   #
+# Retention: the newest run of each of the last `keep_daily` days and of each of the last          #
+# `keep_weekly` weeks is kept (with its full dump), the other runs and the unreferenced blobs are    #
+# deleted after every run.                                                                          #
+#                                                                                                   #
+# While the app is open BackupSchedulerThread checks every few minutes whether a run is due          #
+# (started by the connection dialog, settings "backup_schedule"). Without the app, e.g. from the     #
+# Windows task scheduler, run the due backup headless from src/teacher_assistant:                   #
+#                                                                                                   #
+#     python -m data.backup_scheduler                       the due run (full, incremental or none)  #
+#     python -m data.backup_scheduler --kind full           a full dump now                          #
+#     python -m data.backup_scheduler --list                the restore points                       #
+#     python -m data.backup_scheduler --restore <run> --into <new database>                         #
+#####################################################################################################
+
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import psycopg2
+from psycopg2.extras import Json
+from PySide6.QtCore import QMutex, QThread, QWaitCondition, Signal
+
+from data.backup_engine import DIRECTORY, BackupEngine, RestoreEngine, backup_name
+
+FULL = 'full'
+INCREMENTAL = 'incremental'
+
+# Exported by their changed rows: table -> key column (the tables of migration 9)
+INCREMENTAL_TABLES = {'academic_years': 'id', 'educational_resources': 'id', 'groups': 'id',
+                      'observed_behaviours': 'id', 'personal_info': 'id', 'quests': 'id'}
+
+# Not exported: schema_version belongs to the full dump, the gradebook is maintained by triggers
+SKIPPED_TABLES = ('schema_version', 'gradebook')
+
+# Whole tables are inserted in this order (a foreign key after the table it references), others last
+WHOLE_TABLES_ORDER = ('classroom_events', 'item_analysis_runs', 'item_statistics', 'quest_items')
+
+# A transaction that started before a full dump and committed after its snapshot has an older
+# updated_at_ than the dump: the incremental exports start a little earlier, a row twice is harmless
+OVERLAP = datetime.timedelta(minutes=10)
+
+DEFAULT_SCHEDULE = {'full_every_days': 7, 'incremental_every_hours': 24, 'keep_daily': 7, 'keep_weekly': 4}
+
+STATE_FILE = 'schedule.json'
+
+# Rows fetched per round trip by the server side cursors of the export
+_ITERSIZE = 2000
+
+
+def keep_runs(runs: list, keep_daily: int, keep_weekly: int) -> set:
+    """ Names of the runs kept by the retention policy: the newest run of each of the last `keep_daily`
+        days and of the last `keep_weekly` ISO weeks, and the full dump of every kept incremental run. """
+    newest = {}
+    for run in sorted(runs, key=lambda r: r['time']):
+        time = datetime.datetime.fromisoformat(run['time'])
+        newest[('day', time.date())] = run
+        newest[('week', tuple(time.isocalendar())[:2])] = run
+
+    days = sorted((key for key in newest if key[0] == 'day'), reverse=True)[:max(keep_daily, 0)]
+    weeks = sorted((key for key in newest if key[0] == 'week'), reverse=True)[:max(keep_weekly, 0)]
+
+    kept = {newest[key]['name'] for key in days + weeks}
+    # The newest run is the base of the next one, always kept
+    if runs: kept.add(max(runs, key=lambda r: r['time'])['name'])
+
+    kept |= {run['base'] for run in runs if run['name'] in kept and run['kind'] == INCREMENTAL}
+    return kept
+
+
+def _encode(value):
+    # JSON values of the exported rows (bytea columns are replaced by their blob hash before)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)): return value.isoformat()
+    return value
+
+
+class BackupScheduler:
+    """ The scheduled backups of one database in `folder` (see the header). """
+
+    def __init__(self, folder: str, bin_path: str, database: str, user: str, password: str,
+                 host: str = 'localhost', port='5432', schedule: dict = None, jobs: int = None,
+                 compression: int = None):
+        self.folder = folder
+        self.bin_path = bin_path
+        self.database = database
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = str(port)
+        self.schedule = {**DEFAULT_SCHEDULE, **(schedule or {})}
+        self.jobs = jobs
+        self.compression = compression
+
+        # The engine of the running full dump (cancel())
+        self._engine = None
+        self._cancelled = False
+
+    def _connect(self, database: str = None):
+        return psycopg2.connect(host=self.host, port=self.port, database=database or self.database,
+                                user=self.user, password=self.password)
+
+    # ---------------------------------------------------------------- state
+    def _state_path(self) -> str: return os.path.join(self.folder, STATE_FILE)
+
+    def runs(self) -> list:
+        """ The runs of the folder, oldest first: {name, kind, time, server_time, base, path, schema}. """
+        try:
+            with open(self._state_path(), encoding='utf-8') as f: return json.load(f).get('runs', [])
+        except (OSError, ValueError):
+            return []
+
+    def _save_runs(self, runs: list):
+        os.makedirs(self.folder, exist_ok=True)
+        # Written under a temporary name and renamed: an interrupted run never leaves half a file
+        tmp_path = self._state_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f: json.dump({'runs': runs}, f, indent=4)
+        os.replace(tmp_path, self._state_path())
+
+    def last_full(self, runs: list = None):
+        fulls = [run for run in (self.runs() if runs is None else runs) if run['kind'] == FULL]
+        return fulls[-1] if fulls else None
+
+    def due(self, now: datetime.datetime = None):
+        """ FULL, INCREMENTAL or None: the kind of run that is due at `now`. """
+        now = now or datetime.datetime.now()
+        runs = self.runs()
+        full = self.last_full(runs)
+
+        if full is None: return FULL
+        if now - datetime.datetime.fromisoformat(full['time']) >= datetime.timedelta(days=float(self.schedule['full_every_days'])):
+            return FULL
+        if now - datetime.datetime.fromisoformat(runs[-1]['time']) >= datetime.timedelta(hours=float(self.schedule['incremental_every_hours'])):
+            return INCREMENTAL
+        return None
+
+    def cancel(self):
+        """ Stops the running backup (the partial one is removed) and the runs after it. """
+        self._cancelled = True
+        if self._engine is not None: self._engine.cancel()
+
+    # ---------------------------------------------------------------- runs
+    def run(self, kind: str = None, progress=None) -> tuple[bool, str]:
+        """
+        Runs a backup of `kind` (default: the due kind, nothing when none is due) and applies the
+        retention policy.<br>
+        `progress(phase, done, total, detail)` as in data/backup_engine.py. Returns (status, message).
+        """
+        progress = progress or (lambda *args: None)
+
+        kind = kind or self.due()
+        if kind is None: return True, 'No backup is due.'
+
+        try:
+            connection = self._connect()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT now(), COALESCE(MAX(version), 0) FROM public.schema_version')
+                    server_time, schema = cursor.fetchone()
+            finally:
+                connection.close()
+        except psycopg2.Error as e:
+            return False, f'❌ Scheduled backup failed: {str(e).strip()}'
+
+        runs = self.runs()
+        base = self.last_full(runs)
+
+        # The incremental export needs a full dump of the same schema
+        if kind == INCREMENTAL and (base is None or base.get('schema') != schema): kind = FULL
+
+        if kind == FULL: status, msg, entry = self._full(server_time, schema, progress)
+        else: status, msg, entry = self._incremental(base, schema, progress)
+
+        if not status: return False, msg
+
+        runs.append(entry)
+        self._save_runs(runs)
+
+        removed = self.prune()
+        return True, msg + (f' {removed} old backups removed.' if removed else '')
+
+    def _full(self, server_time, schema: int, progress):
+        os.makedirs(os.path.join(self.folder, FULL), exist_ok=True)
+        name = backup_name(self.database, DIRECTORY)
+        path = os.path.join(self.folder, FULL, name)
+
+        self._engine = BackupEngine(self.bin_path, self.database, self.user, self.password, self.host, self.port)
+        if self._cancelled: self._engine.cancel()
+        try:
+            status, msg, path = self._engine.backup(path, DIRECTORY, self.jobs, self.compression, True, progress)
+        finally:
+            self._engine = None
+
+        if not status: return False, msg, None
+
+        entry = {'name': name, 'kind': FULL, 'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'server_time': server_time.isoformat(), 'base': None, 'path': os.path.join(FULL, name),
+                 'schema': schema}
+        return True, msg, entry
+
+    def _incremental(self, base: dict, schema: int, progress):
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f'{self.database}_incr_{timestamp}'
+        # Two runs in the same second (--kind incremental twice)
+        for n in range(1, 100):
+            if not os.path.exists(os.path.join(self.folder, INCREMENTAL, name)): break
+            name = f'{self.database}_incr_{timestamp}_{n}'
+        path = os.path.join(self.folder, INCREMENTAL, name)
+        since = datetime.datetime.fromisoformat(base['server_time']) - OVERLAP
+
+        try:
+            os.makedirs(path)
+        except OSError as e:
+            return False, f'❌ Incremental backup failed: {e}', None
+
+        try:
+            server_time, manifest = self.export_changes(path, since, progress)
+        except (OSError, psycopg2.Error, InterruptedError) as e:
+            shutil.rmtree(path, ignore_errors=True)
+            if self._cancelled: return False, 'Scheduled backup cancelled.', None
+            return False, f'❌ Incremental backup failed: {str(e).strip()}', None
+
+        manifest.update(base=base['name'], since=since.isoformat(), server_time=server_time.isoformat(), schema=schema)
+        with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as f: json.dump(manifest, f, indent=4)
+
+        changed = sum(table['rows'] for table in manifest['tables'].values() if table['key'])
+        done = datetime.datetime.now().strftime("%Y-%m-%d-%H:%M:%S")
+        entry = {'name': name, 'kind': INCREMENTAL, 'time': datetime.datetime.now().isoformat(timespec='seconds'),
+                 'server_time': server_time.isoformat(), 'base': base['name'],
+                 'path': os.path.join(INCREMENTAL, name), 'schema': schema}
+
+        return True, f'✅ [{done}] Incremental backup successful ({changed} changed rows, {manifest["new_blobs"]} new blobs).', entry
+
+    def export_changes(self, path: str, since: datetime.datetime, progress=None):
+        """ Writes the rows changed since `since` into the folder `path`, returns (server time, manifest).
+            All tables are read in one repeatable read transaction: the export is one consistent state. """
+        progress = progress or (lambda *args: None)
+        manifest = {'tables': {}, 'blobs': [], 'new_blobs': 0}
+        blobs = set()
+
+        connection = self._connect()
+        try:
+            connection.set_session(isolation_level='REPEATABLE READ', readonly=True)
+
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT now()')
+                server_time = cursor.fetchone()[0]
+
+                cursor.execute("SELECT table_name, column_name, data_type FROM information_schema.columns "
+                               "WHERE table_schema = 'public' AND table_name IN "
+                               "  (SELECT table_name FROM information_schema.tables "
+                               "   WHERE table_schema = 'public' AND table_type = 'BASE TABLE') "
+                               "ORDER BY table_name, ordinal_position")
+                columns = {}
+                for table, column, data_type in cursor.fetchall(): columns.setdefault(table, []).append((column, data_type))
+
+            tables = [table for table in columns if table not in SKIPPED_TABLES]
+
+            for done, table in enumerate(tables):
+                if self._cancelled: raise InterruptedError('cancelled')
+                progress('data', done, len(tables), table)
+
+                names = [column for column, _ in columns[table]]
+                types = [data_type for _, data_type in columns[table]]
+                # Incremental only with the updated_at_ column (a database before migration 9: whole tables)
+                key = INCREMENTAL_TABLES.get(table) if 'updated_at_' in names else None
+
+                select = f'SELECT {", ".join(_quote(name) for name in names)} FROM public.{_quote(table)}'
+                if key: select += ' WHERE updated_at_ > %s'
+
+                rows = self._export_rows(connection, select, (since,) if key else (), types,
+                                         os.path.join(path, f'{table}.jsonl.gz'), blobs, manifest)
+
+                manifest['tables'][table] = {'columns': names, 'types': types, 'key': key, 'rows': rows}
+
+                if key:
+                    with connection.cursor() as cursor:
+                        cursor.execute(f'SELECT {_quote(key)} FROM public.{_quote(table)}')
+                        keys = [row[0] for row in cursor.fetchall()]
+                    with gzip.open(os.path.join(path, f'{table}.keys.json.gz'), 'wt', encoding='utf-8') as f:
+                        json.dump(keys, f)
+
+            progress('data', len(tables), len(tables), 'done')
+
+        finally:
+            connection.rollback()
+            connection.close()
+
+        manifest['blobs'] = sorted(blobs)
+        return server_time, manifest
+
+    def _export_rows(self, connection, select: str, params: tuple, types: list, file_path: str,
+                     blobs: set, manifest: dict) -> int:
+        rows = 0
+        binary = [i for i, data_type in enumerate(types) if data_type == 'bytea']
+
+        # A server side cursor: the rows are streamed, not all loaded at once
+        with connection.cursor(name='backup_export') as cursor, \
+             gzip.open(file_path, 'wt', encoding='utf-8') as f:
+            cursor.itersize = _ITERSIZE
+            cursor.execute(select, params)
+
+            for row in cursor:
+                row = [_encode(value) for value in row]
+                for i in binary:
+                    if row[i] is not None: row[i] = self._store_blob(bytes(row[i]), blobs, manifest)
+
+                f.write(json.dumps(row, ensure_ascii=False, default=str))
+                f.write('\n')
+                rows += 1
+
+        return rows
+
+    def _store_blob(self, data: bytes, blobs: set, manifest: dict) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        blobs.add(digest)
+
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'wb') as f: f.write(data)
+            os.replace(path + '.tmp', path)
+            manifest['new_blobs'] += 1
+
+        return digest
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.folder, 'blobs', digest[:2], digest)
+
+    # ---------------------------------------------------------------- retention
+    def prune(self) -> int:
+        """ Deletes the runs the retention policy does not keep and the blobs no kept run refers to.
+            Returns the number of deleted runs. """
+        runs = self.runs()
+        kept = keep_runs(runs, int(self.schedule['keep_daily']), int(self.schedule['keep_weekly']))
+
+        removed = [run for run in runs if run['name'] not in kept]
+        if not removed: return 0
+
+        # The state first: a run that is in the list always exists on the disk
+        self._save_runs([run for run in runs if run['name'] in kept])
+        for run in removed: BackupEngine.remove(os.path.join(self.folder, run['path']))
+
+        referenced = set()
+        for run in runs:
+            if run['name'] in kept and run['kind'] == INCREMENTAL:
+                referenced.update(self._manifest(run).get('blobs', []))
+
+        blob_root = os.path.join(self.folder, 'blobs')
+        for directory, _, files in os.walk(blob_root):
+            for name in files:
+                if name not in referenced: BackupEngine.remove(os.path.join(directory, name))
+
+        return len(removed)
+
+    def _manifest(self, run: dict) -> dict:
+        try:
+            with open(os.path.join(self.folder, run['path'], 'manifest.json'), encoding='utf-8') as f: return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # ---------------------------------------------------------------- restore
+    def restore(self, name: str, target_db: str, progress=None) -> tuple[bool, str]:
+        """ Restores the run `name` (its full dump, then the incremental export) into the new database `target_db`. """
+        runs = {run['name']: run for run in self.runs()}
+        run = runs.get(name)
+        if run is None: return False, f"❌ No backup '{name}' in {self.folder}."
+
+        full = run if run['kind'] == FULL else runs.get(run['base'])
+        if full is None: return False, f"❌ The full backup '{run['base']}' of '{name}' is missing."
+
+        engine = RestoreEngine(self.bin_path, self.user, self.password, self.host, self.port)
+        status, msg, _ = engine.restore(os.path.join(self.folder, full['path']), target_db, staging=False,
+                                        jobs=self.jobs, progress=progress)
+        if not status or run['kind'] == FULL: return status, msg
+
+        try:
+            self.apply_changes(os.path.join(self.folder, run['path']), target_db)
+        except (OSError, ValueError, psycopg2.Error) as e:
+            return False, f"❌ Full backup restored into '{target_db}', the incremental backup failed: {str(e).strip()}"
+
+        return True, f"✅ '{name}' restored into '{target_db}'."
+
+    def apply_changes(self, path: str, target_db: str):
+        """ Applies an incremental export (the folder `path`) to a database restored from its full dump,
+            in one transaction. """
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f: manifest = json.load(f)
+        tables = manifest['tables']
+
+        whole = sorted((table for table, info in tables.items() if not info['key']),
+                       key=lambda t: WHOLE_TABLES_ORDER.index(t) if t in WHOLE_TABLES_ORDER else len(WHOLE_TABLES_ORDER))
+        keyed = [table for table, info in tables.items() if info['key']]
+
+        connection = self._connect(target_db)
+        try:
+            with connection, connection.cursor() as cursor:
+                for table in reversed(whole): cursor.execute(f'DELETE FROM public.{_quote(table)}')
+
+                for table in keyed:
+                    info = tables[table]
+                    key = _quote(info['key'])
+                    with gzip.open(os.path.join(path, f'{table}.keys.json.gz'), 'rt', encoding='utf-8') as f: keys = json.load(f)
+                    rows = list(self._read_rows(path, table, info))
+                    changed = [row[info['columns'].index(info['key'])] for row in rows]
+
+                    # The deleted rows, then the changed rows are written again
+                    cursor.execute(f'DELETE FROM public.{_quote(table)} WHERE NOT ({key} = ANY(%s))', (keys,))
+                    cursor.execute(f'DELETE FROM public.{_quote(table)} WHERE {key} = ANY(%s)', (changed,))
+                    self._insert(cursor, table, info, rows)
+
+                    # The identity sequence continues after the inserted keys
+                    if info['types'][info['columns'].index(info['key'])] in ('bigint', 'integer', 'smallint'):
+                        cursor.execute(f"SELECT setval(pg_get_serial_sequence(%s, %s), MAX({key})) "
+                                       f"FROM public.{_quote(table)} HAVING MAX({key}) IS NOT NULL",
+                                       (f'public.{table}', info['key']))
+
+                for table in whole: self._insert(cursor, table, tables[table], self._read_rows(path, table, tables[table]))
+        finally:
+            connection.close()
+
+    def _read_rows(self, path: str, table: str, info: dict):
+        binary = [i for i, data_type in enumerate(info['types']) if data_type == 'bytea']
+        json_columns = [i for i, data_type in enumerate(info['types']) if data_type in ('json', 'jsonb')]
+
+        with gzip.open(os.path.join(path, f'{table}.jsonl.gz'), 'rt', encoding='utf-8') as f:
+            for line in f:
+                row = json.loads(line)
+                for i in binary:
+                    if row[i] is not None:
+                        with open(self._blob_path(row[i]), 'rb') as blob: row[i] = psycopg2.Binary(blob.read())
+                for i in json_columns:
+                    if row[i] is not None: row[i] = Json(row[i])
+                yield row
+
+    @staticmethod
+    def _insert(cursor, table: str, info: dict, rows):
+        columns = ', '.join(_quote(name) for name in info['columns'])
+        values = ', '.join(['%s'] * len(info['columns']))
+        # OVERRIDING SYSTEM VALUE: the ids of GENERATED ALWAYS identity columns are restored as they were
+        cursor.executemany(f'INSERT INTO public.{_quote(table)} ({columns}) OVERRIDING SYSTEM VALUE VALUES ({values})', rows)
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class BackupSchedulerThread(QThread):
+    """ Runs the due backups of a BackupScheduler while the app is open. """
+
+    finished_run = Signal(bool, str)    # status, message
+
+    def __init__(self, scheduler: BackupScheduler, check_interval: float = 600.0, parent=None):
+        super().__init__(parent)
+
+        self.scheduler = scheduler
+        self.check_interval = check_interval
+
+        self._mutex = QMutex()
+        self._condition = QWaitCondition()
+
+    def stop(self):
+        self.requestInterruption()
+        self.scheduler.cancel()
+        self._mutex.lock()
+        self._condition.wakeAll()
+        self._mutex.unlock()
+        self.wait()
+
+    def run(self):
+        while not self.isInterruptionRequested():
+            if self.scheduler.due() is not None:
+                status, msg = self.scheduler.run()
+                if not self.isInterruptionRequested(): self.finished_run.emit(status, msg)
+
+            self._mutex.lock()
+            if not self.isInterruptionRequested(): self._condition.wait(self._mutex, int(self.check_interval * 1000))
+            self._mutex.unlock()
+
+
+def start_backup_scheduler(scheduler: BackupScheduler, check_interval: float = 600.0) -> BackupSchedulerThread:
+    thread = BackupSchedulerThread(scheduler, check_interval)
+    thread.finished_run.connect(lambda status, msg: print(msg))
+    thread.start()
+    return thread
+
+
+def scheduler_from_settings(database: str = None):
+    """ A BackupScheduler of the saved connection and the "backup_schedule" settings (setup_app_directories first).
+        The folder defaults to [backup to]/scheduled/<database>. """
+    from core.app_context import app_context
+    from core.settings.settings_manager import SettingsManager
+
+    connection = app_context.settings_manager.find_value('connection') or {}
+    database = database or connection.get('database', '')
+    settings = SettingsManager()
+
+    folder = settings.get('backup_schedule', 'folder', '') or \
+             os.path.join(app_context.settings_manager.find_value('backup to') or app_context.appdata_path,
+                          'scheduled', database)
+
+    schedule = {key: settings.get('backup_schedule', key, default) for key, default in DEFAULT_SCHEDULE.items()}
+
+    return BackupScheduler(folder, app_context.settings_manager.find_value('postgreSQL tools path') or '',
+                           database, connection.get('user', 'postgres'), connection.get('password', ''),
+                           connection.get('host', 'localhost'), connection.get('port', '5432'), schedule,
+                           jobs=int(settings.get('backup', 'jobs', 0)) or None,
+                           compression=int(settings.get('backup', 'compression', -1)))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m data.backup_scheduler',
+                                     description='Scheduled backups of the Teacher Assistant database.')
+    parser.add_argument('--kind', choices=(FULL, INCREMENTAL), help='run this kind of backup now (default: the due one)')
+    parser.add_argument('--database', help='database name (default: the saved connection)')
+    parser.add_argument('--folder', help='backup folder (default: [backup to]/scheduled/<database>)')
+    parser.add_argument('--list', action='store_true', help='list the restore points')
+    parser.add_argument('--restore', metavar='RUN', help='restore a backup of --list into the new database --into')
+    parser.add_argument('--into', metavar='DATABASE', help='the database created by --restore')
+    args = parser.parse_args(argv)
+
+    from core.app_context import app_context
+    app_context.setup_app_directories()
+
+    scheduler = scheduler_from_settings(args.database)
+    if args.folder: scheduler.folder = args.folder
+
+    if args.list:
+        for run in scheduler.runs(): print(f"{run['time']}  {run['kind']:<12} {run['name']}")
+        return 0
+
+    if args.restore:
+        if not args.into: parser.error('--restore needs --into')
+        status, msg = scheduler.restore(args.restore, args.into)
+    else:
+        status, msg = scheduler.run(args.kind)
+
+    print(msg)
+    return 0 if status else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# teacher_assistant/data/cache.py
+# ###################################################################################################
+#                                       READ-THROUGH CACHE                                          #
+# ###################################################################################################
+# The groups, the roster and the resource metadata are read by several pages again and again while #
+# they change rarely. DataCache keeps the results of these reads in memory:                        #
+#                                                                                                   #
+# - Entries are grouped in regions ('groups', 'roster', 'resources'). Every region has a version    #
+#   number, an entry is valid only while it carries the current version of its region.             #
+# - A read goes through the cache: a miss (or an outdated entry) calls the loader and stores the    #
+#   result with the current version. A region keeps at most `max_entries` results (LRU).            #
+# - The services invalidate the regions they write to: invalidate() increments the version, so     #
+#   every entry of the region is reloaded on its next read.                                         #
+# - Optional: with several running instances on one database, invalidate() also sends             #
+#   NOTIFY ta_cache '<instance>:<region>' and CacheInvalidationListener (LISTEN ta_cache) applies   #
+#   the invalidations of the other instances. A lost listener connection (server restart, restore) #
+#   is opened again after RETRY_MS and the cache is cleared: the notifications in between are lost. #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     groups = app_context.cache.fetchall_named(GROUPS, 'groups_all')                               #
+#     app_context.cache.invalidate(GROUPS)                                                          #
+#####################################################################################################
+
+import threading
+import uuid
+from collections import OrderedDict
+
+from PySide6.QtCore import QObject, QSocketNotifier, QTimer, Signal
+
+# Regions
+GROUPS = 'groups'
+ROSTER = 'roster'
+RESOURCES = 'resources'
+
+NOTIFY_CHANNEL = 'ta_cache'
+
+# Pause before the listener connects again after it lost its connection
+RETRY_MS = 5000
+
+
+def _hashable(value):
+    # Lists in the statement parameters (= ANY($1)) become tuples of the cache key
+    if isinstance(value, (list, tuple)): return tuple(_hashable(item) for item in value)
+    return value
+
+
+class DataCache:
+
+    def __init__(self, database, max_entries:int=64):
+        self.database = database
+        self.max_entries = max_entries
+        # Sent with the notifications, the listener skips the notifications of this instance
+        self.instance_id = uuid.uuid4().hex[:12]
+        self.publish = False
+
+        self._lock = threading.RLock()
+        self._versions = {}
+        # region -> OrderedDict(key -> (version, value))
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, region:str) -> int:
+        with self._lock: return self._versions.get(region, 0)
+
+    def get(self, region:str, key, loader):
+        """ Returns the cached value of `key`, calls loader() when there is no valid entry. """
+        with self._lock:
+            version = self._versions.get(region, 0)
+            entries = self._entries.setdefault(region, OrderedDict())
+            entry = entries.get(key)
+
+            if entry is not None and entry[0] == version:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+
+        # The loader runs without the lock, a slow query does not block the other regions
+        value = loader()
+
+        with self._lock:
+            # An invalidation while the loader was running: the value may be outdated, it is not stored
+            if self._versions.get(region, 0) == version:
+                entries[key] = (version, value)
+                entries.move_to_end(key)
+                while len(entries) > self.max_entries: entries.popitem(last=False)
+
+        return value
+
+    def peek(self, region:str, key):
+        """ (True, value) for a valid entry of `key`, (False, None) otherwise. Nothing is loaded. """
+        with self._lock:
+            entry = self._entries.get(region, {}).get(key)
+
+            if entry is not None and entry[0] == self._versions.get(region, 0):
+                self._entries[region].move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+
+        return False, None
+
+    @staticmethod
+    def named_key(name:str, params=(), one:bool=False):
+        """ Cache key of a named statement, fetchone_named() and fetchall_named() results are kept apart. """
+        return ('one', name, _hashable(params)) if one else (name, _hashable(params))
+
+    def fetchall_named(self, region:str, name:str, params=(), database=None):
+        """ database.fetchall_named() through the cache, the rows are shared: do not modify them.
+            `database`: the backend of a worker thread (data/async_db.py), the shared one by default. """
+        database = database or self.database
+        return self.get(region, self.named_key(name, params),
+                        lambda: database.fetchall_named(name, params))
+
+    def fetchone_named(self, region:str, name:str, params=(), database=None):
+        database = database or self.database
+        return self.get(region, self.named_key(name, params, one=True),
+                        lambda: database.fetchone_named(name, params))
+
+    def invalidate(self, *regions, publish:bool=True):
+        """ Drops the entries of the regions, call it after every write to their tables. """
+        with self._lock:
+            for region in regions:
+                self._versions[region] = self._versions.get(region, 0) + 1
+                self._entries.pop(region, None)
+
+        if publish and self.publish:
+            for region in regions:
+                try:
+                    self.database.execute('SELECT pg_notify(%s, %s);', (NOTIFY_CHANNEL, f'{self.instance_id}:{region}'))
+                except Exception:
+                    # The cache of the other instances expires on their next write, a lost message is not an error
+                    pass
+
+    def clear(self):
+        with self._lock:
+            regions = list(self._entries)
+        self.invalidate(*regions, publish=False)
+
+
+class CacheInvalidationListener(QObject):
+    """
+    LISTEN ta_cache on a connection of its own. The socket of the connection is watched by a
+    QSocketNotifier on the GUI thread, there is no polling and no extra thread.
+    """
+    invalidated = Signal(str)     # region invalidated by another instance
+
+    def __init__(self, cache:DataCache, parent=None):
+        super().__init__(parent)
+
+        self.cache = cache
+        self.connection = None
+        self._notifier = None
+        # False after stop(): no reconnect
+        self._active = False
+
+    def start(self):
+        self._active = True
+        if self.connection is not None: return
+
+        self._listen()
+
+    def _listen(self):
+        self.connection = self.cache.database.open_connection()
+        # LISTEN takes effect at commit, autocommit delivers the notifications as soon as they arrive
+        self.connection.autocommit = True
+
+        with self.connection.cursor() as cur: cur.execute(f'LISTEN {NOTIFY_CHANNEL};')
+
+        self._notifier = QSocketNotifier(self.connection.fileno(), QSocketNotifier.Type.Read, self)
+        self._notifier.activated.connect(self._on_readable)
+
+        self.cache.publish = True
+
+    def stop(self):
+        self._active = False
+        self._close()
+
+    def _close(self):
+        self.cache.publish = False
+
+        if self._notifier is not None:
+            self._notifier.setEnabled(False)
+            self._notifier.deleteLater()
+            self._notifier = None
+
+        if self.connection is not None:
+            try: self.connection.close()
+            except Exception: pass
+            self.connection = None
+
+    def _reconnect(self):
+        if not self._active or self.connection is not None: return
+
+        try:
+            self._listen()
+        except Exception:
+            # Still unreachable: the cache works on, without the other instances, until the next try
+            self._close()
+            QTimer.singleShot(RETRY_MS, self, self._reconnect)
+            return
+
+        # The invalidations sent while the listener was away are lost
+        self.cache.clear()
+
+    def _on_readable(self, *_):
+        try:
+            self.connection.poll()
+        except Exception:
+            # The server closed the connection (restart, the swap of a restore): listen again after a pause
+            self._close()
+            QTimer.singleShot(RETRY_MS, self, self._reconnect)
+            return
+
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            sender, _, region = notify.payload.partition(':')
+
+            if sender == self.cache.instance_id or not region: continue
+
+            self.cache.invalidate(region, publish=False)
+            self.invalidated.emit(region)
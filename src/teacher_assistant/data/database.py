@@ -2,105 +2,283 @@ from psycopg2 import connect
 from psycopg2.extras import execute_values
 
 import datetime
+import contextlib
 import os
-import subprocess
-import sys
-from psycopg2 import Error
+from psycopg2 import Error, InterfaceError, OperationalError
 from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT, connection
 
+from data import migrations, queries
+from data.backend import StorageBackend
+from data.backup_engine import BackupEngine, CUSTOM, RestoreEngine
+from data.instrumentation import NO_TIMER, QueryInstrumentation, QueryTimer
+from data.notifications import change_hub
 
-class psycopg2_database:
+
+class psycopg2_database(StorageBackend):
+
+    dialect = 'postgresql'
 
     def __init__(self):
         super().__init__()
+        # Names of the statements already PREPAREd in the current server session
+        self._prepared = set()
+        # Optional query measuring, see enable_instrumentation()
+        self.instrumentation = None
+        # Optional offline replica (data/replica.py): local reads and the outbox of the writes
+        self.replica = None
+        # autocommit of the sessions opened again by _reconnect_if_needed() (True: the worker clones)
+        self._autocommit = False
+        # Server pid of the session, registered with change_hub (data/notifications.py)
+        self._backend_pid = 0
 
     def connect(self,host='', port='', database= '', user='', password=''):
         self.connection = connect(host=host, port=port, database= database, user=user, password=password)
         self.connection.autocommit = False    
+        # Prepared statements belong to the server session, a new connection starts empty
+        self._prepared = set()
+        # Kept for open_connection()
+        self._connect_params = dict(host=host, port=port, database=database, user=user, password=password)
+        self._track_session()
+
+    def _track_session(self):
+        # The change notifications of the writes of the new session are local, the old pid is released
+        change_hub.remove_session(self._backend_pid)
+        self._backend_pid = change_hub.add_session(self.connection)
+
+    def open_connection(self):
+        # A new, independent connection to the same database for work on a background thread
+        # (exports, long reads), so it never shares a transaction with the GUI thread.
+        # Caller is responsible for closing it.
+        return connect(**self._connect_params)
+
+    def reconnect(self):
+        # A new session with the parameters of connect(), e.g. after a restore replaced the database
+        with contextlib.suppress(Error): self.connection.close()
+        self.connect(**self._connect_params)
   
     def execute(self, query, params=None):
         # Executes INSERT / UPDATE / DELETE
-        self.connection.cursor().execute(query, params)
-        self.connection.commit()
+        self._reconnect_if_needed()
+        with self._timed('execute', query):
+            self.connection.cursor().execute(query, params)
+            self.connection.commit()
+
+        if self.replica is not None: self.replica.note_write(query)
 
     def fetchone(self, query, params=None):
-        with self.connection.cursor() as cur:
-            cur.execute(query, params)
-            result = cur.fetchone()
-            return result
+        self._reconnect_if_needed()
+        with self._timed('fetchone', query) as timer:
+            with self.connection.cursor() as cur:
+                cur.execute(query, params)
+                result = cur.fetchone()
+                timer.set_result(result)
+        
+        self._explain_if_slow(timer, query, params)
+        return result
 
     def execute_and_return(self, query, params=None): 
-        with self.connection.cursor() as cur:
-            cur.execute(query, params)
-            self.connection.commit()
-            result = cur.fetchone()
-            return result
+        self._reconnect_if_needed()
+        with self._timed('execute_and_return', query) as timer:
+            with self.connection.cursor() as cur:
+                cur.execute(query, params)
+                self.connection.commit()
+                result = cur.fetchone()
+                timer.set_result(result)
+        
+        if self.replica is not None: self.replica.note_write(query)
+        return result
 
     
     def fetchall(self, query, params=None):
-        with self.connection.cursor() as cur:
-            cur.execute(query, params)
-            return cur.fetchall()
+        self._reconnect_if_needed()
+        with self._timed('fetchall', query) as timer:
+            with self.connection.cursor() as cur:
+                cur.execute(query, params)
+                result = cur.fetchall()
+                timer.set_result(result)
+        
+        self._explain_if_slow(timer, query, params)
+        return result
     
     def stream(self, query, params=None):
         
         # Returns a cursor that stays open for fetchmany()
         # Caller is responsible for closing it.
+        # Only the execution is measured, the rows are fetched later by the caller.
+        self._reconnect_if_needed()
+        with self._timed('stream', query):
+            cursor = self.connection.cursor()
+            cursor.execute(query, params)
         
-        cursor = self.connection.cursor()
-        cursor.execute(query, params)
         return cursor
 
-    def close(self): self.connection.close()
+    def close(self):
+        change_hub.remove_session(self._backend_pid)
+        self._backend_pid = 0
+        self.connection.close()
+
+    def clone(self):
+        backend = psycopg2_database()
+        # The replica is thread-safe (a lock around its SQLite connection): the workers read from it too
+        backend.replica = self.replica
+        backend.connect(**self._connect_params)
+        # Every read of a worker ends at once, no idle transaction keeps its snapshot
+        backend.connection.autocommit = backend._autocommit = True
+        # QueryInstrumentation is thread-safe, the workers are measured with the GUI thread
+        backend.instrumentation = self.instrumentation
+        return backend
+
+    def interrupt(self):
+        # Sends a cancel request to the server, the running statement fails with QueryCanceled
+        self.connection.cancel()
+
+    def rollback(self):
+        if not self.connection.closed: self.connection.rollback()
+
+    # ---------------------------------------------------------------- instrumentation
+    def enable_instrumentation(self, log_path=None, slow_threshold_ms=200.0, capture_explain=False, **options):
+        """ Starts measuring the queries, see data/instrumentation.py for the collected data. """
+        self.disable_instrumentation()
+        self.instrumentation = QueryInstrumentation(log_path, slow_threshold_ms, capture_explain, **options)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        if self.instrumentation is not None: self.instrumentation.close()
+        self.instrumentation = None
+
+    def _timed(self, method, query):
+        # A no-op context when the instrumentation is off, so the normal path pays almost nothing
+        if self.instrumentation is None: return contextlib.nullcontext(NO_TIMER)
+        
+        return QueryTimer(self.instrumentation, method, query)
+
+    def _explain_if_slow(self, timer, query, params=None, explained_sql=None):
+        # Captures the EXPLAIN ANALYZE plan of a slow read-only statement (once per fingerprint).
+        # EXPLAIN ANALYZE runs the statement again, so anything but a SELECT is never explained.
+        if not getattr(timer, 'slow', False): return
+        
+        text = query.decode('utf-8', errors='replace') if isinstance(query, bytes) else str(query)
+        if not text.lstrip().upper().startswith('SELECT'): return
+        
+        if not self.instrumentation.wants_plan(query): return
 
-   
-    def get_columns(self, table_name):
-        """ Fetch column names from the PostgreSQL table. """
         try:
+            with self.connection.cursor() as cur:
+                cur.execute('EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ' + (explained_sql or text), params)
+                plan = cur.fetchone()[0]
             
-            query = f"""SELECT column_name FROM information_schema.columns WHERE table_name = '{table_name}'ORDER BY ordinal_position;"""
-            with self.connection.cursor() as cursor:
-                cursor.execute(query)
-                columns = [row[0] for row in cursor.fetchall()]
-                return columns
-    
+            self.instrumentation.attach_plan(query, plan)
+        
         except Exception as e:
-            print("Error fetching table columns:", e)
-            return []
-    
-    
-    def bulk_insert_csv(self, data, table_name, column_mapping):
+            self.connection.rollback()
+            self.instrumentation.attach_plan(query, {'error': str(e)})
+
+    # ---------------------------------------------------------------- named (prepared) statements
+    # The statement text lives in data/queries.py, it is PREPAREd on first use in the
+    # current session and executed by name afterwards, so the server parses and plans it once.
+    def _execute_prepared(self, cursor, name, params=()):
+        
+        try:
+            if name not in self._prepared:
+                cursor.execute(queries.prepare_statement(name))
+                self._prepared.add(name)
+            
+            cursor.execute(queries.execute_statement(name), tuple(params or ()))
+        
+        except Exception:
+            # Leave the connection usable and resync the list of prepared statements,
+            # PREPARE is not undone by a rollback but a failed PREPARE never registered.
+            self.connection.rollback()
+            with self.connection.cursor() as cur:
+                cur.execute('SELECT name FROM pg_prepared_statements;')
+                self._prepared = {row[0] for row in cur.fetchall()}
+            raise
+
+    # ---------------------------------------------------------------- offline replica
+    def _reconnect_if_needed(self):
+        # The sync worker of the replica found the server again: a new session for the GUI thread
+        if self.replica is None or self.replica.offline or not self.connection.closed: return
+
+        # A short timeout: the GUI thread waits for it
+        self.connection = connect(**self._connect_params, connect_timeout=5)
+        self.connection.autocommit = self._autocommit
+        self._prepared = set()
+        self._track_session()
+
+    def _went_offline(self):
+        self.replica.offline = True
+        if self.replica.wake: self.replica.wake()
+
+    def execute_named(self, name, params=()):
+        # Executes a named INSERT / UPDATE / DELETE
+        try:
+            self._reconnect_if_needed()
+
+            with self._timed('execute', queries.get_query(name)):
+                with self.connection.cursor() as cur:
+                    self._execute_prepared(cur, name, params)
+                self.connection.commit()
+
+        except (OperationalError, InterfaceError):
+            if self.replica is None: raise
+            # Write-behind: the worker replays the write when the server is reachable again
+            self._went_offline()
+            self.replica.enqueue(name, params)
+            return
+
+        if self.replica is not None: self.replica.note_write(queries.get_query(name))
+
+    def _read_named(self, method, name, params):
+        # The replica answers the statements it holds (see data/replica.py), the server the others
+        if self.replica is not None:
+            if self.replica.serves(name): return getattr(self.replica, method)(name, params)
+
+            try:
+                self._reconnect_if_needed()
+                return getattr(self, f'_{method}')(name, params)
+
+            except (OperationalError, InterfaceError):
+                self._went_offline()
+                if not self.replica.serves(name): raise
+                return getattr(self.replica, method)(name, params)
+
+        return getattr(self, f'_{method}')(name, params)
+
+    def fetchone_named(self, name, params=()): return self._read_named('fetchone_named', name, params)
+
+    def fetchall_named(self, name, params=()): return self._read_named('fetchall_named', name, params)
+
+    def _fetchone_named(self, name, params=()):
+        with self._timed('fetchone', queries.get_query(name)) as timer:
+            with self.connection.cursor() as cur:
+                self._execute_prepared(cur, name, params)
+                result = cur.fetchone()
+                timer.set_result(result)
+        
+        self._explain_if_slow(timer, queries.get_query(name), tuple(params or ()), queries.execute_statement(name))
+        return result
+
+    def _fetchall_named(self, name, params=()):
+        with self._timed('fetchall', queries.get_query(name)) as timer:
+            with self.connection.cursor() as cur:
+                self._execute_prepared(cur, name, params)
+                result = cur.fetchall()
+                timer.set_result(result)
+        
+        self._explain_if_slow(timer, queries.get_query(name), tuple(params or ()), queries.execute_statement(name))
+        return result
+   
+    def bulk_insert_csv(self, data, table_name, column_mapping, key_column=None):
         """Optimized bulk insert with better memory usage and error handling."""
         try:
             # Load CSV in chunks for large files
             total_rows = 0
+            # Keys of the table and of the inserted rows: the duplicates are skipped
+            seen = self.existing_keys(table_name, key_column) if key_column else None
             
-            #import pandas as pd
             for chunk in data:
-                # Validate columns
-                missing_columns = set(column_mapping.keys()) - set(chunk.columns)
-                if missing_columns:
-                    raise ValueError(f"Missing columns in CSV: {missing_columns}")
-                
-                # Reorder and select only needed columns
-                chunk = chunk[list(column_mapping.keys())]
-
-                # Convert numpy types to Python native types and handle NaN
-                rows = []
-                for _, row in chunk.iterrows():
-                    processed_row = []
-                    for col in column_mapping.keys():
-                        value = row[col]
-                        # Handle NaN/None
-                        if not value:# pd.isna(value):
-                            processed_row.append(None)
-                        # Convert numpy types
-                        elif isinstance(value,):# (numpy.integer,numpy.floating)):
-                            processed_row.append(value.item())
-                        else:
-                            processed_row.append(value)
-
-                    rows.append(tuple(processed_row))
+                # Validated, reordered rows of Python values (data/backend.py)
+                rows = self.csv_rows(chunk, column_mapping, key_column, seen)
                 
                 # Construct SQL with original column mapping
                 sql_columns = ', '.join(column_mapping.values())
@@ -112,10 +290,12 @@ class psycopg2_database:
                     total_rows += len(rows)
                     print(f"Inserted {len(rows)} rows...")
             
+            self.connection.commit()
             print(f"Successfully inserted {total_rows} total rows into {table_name}")
             return total_rows
             
         except Exception as e:
+            self.connection.rollback()
             print(f"Error inserting data into {table_name}: {e}")
             return 0
 
@@ -164,185 +344,19 @@ def create_database(connection:connection, database: str):
 
 def initialize_database(connection:connection):
     """
-    Initialize database with tables and initial data
+    Initialize database with tables and initial data.
+    The schema is built by the migration steps of data/migrations.py, on an existing
+    database only the steps that are not applied yet are executed.
     
     Args:
-        db_name: Name of the database to initialize
-        host: Database server host
-        port: Database server port
-        user: Username for authentication
-        password: Password for authentication
+        connection: Connection to the database to initialize
     """
     
-    try:
-        
-        # Create a cursor object
-        cursor = connection.cursor()
-        
-        # Create tables
-        create_tables_query = """
-        -- Table: public.academic_years
-        -- DROP TABLE IF EXISTS public.academic_years;
-
-        CREATE TABLE IF NOT EXISTS public.academic_years
-        (
-            id bigint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 9223372036854775807 CACHE 1 ),
-            year_ smallint NOT NULL,
-            manager_id text COLLATE pg_catalog."default",
-            more_info_ text COLLATE pg_catalog."default",
-            CONSTRAINT academic_years_pkey PRIMARY KEY (id)
-            USING INDEX TABLESPACE "SCHOOLS"
-        );
-
-
-        ALTER TABLE IF EXISTS public.academic_years
-            OWNER to postgres;
-
-        -- Table: public.classroom_events
-        -- DROP TABLE IF EXISTS public.classroom_events;
-
-        CREATE TABLE IF NOT EXISTS public.classroom_events
-        (
-            meeting_no_ smallint NOT NULL,
-            pages_start_ smallint NOT NULL,
-            pages_end_ smallint NOT NULL,
-            subject_ text COLLATE pg_catalog."default" NOT NULL,
-            description_ text COLLATE pg_catalog."default" NOT NULL,
-            events_ text COLLATE pg_catalog."default",
-            analysis_ text COLLATE pg_catalog."default",
-            date_time_ timestamp without time zone NOT NULL,
-            group_id smallint
-        );
-
-        ALTER TABLE IF EXISTS public.classroom_events
-            OWNER to postgres;
-
-       -- Table: public.educational_resources
-        -- DROP TABLE IF EXISTS public.educational_resources;
-
-        CREATE TABLE IF NOT EXISTS public.educational_resources
-        (
-            id bigint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 9223372036854775807 CACHE 1 ),
-            source_ text COLLATE pg_catalog."default" NOT NULL,
-            content_ text COLLATE pg_catalog."default" NOT NULL,
-            metadata_ text COLLATE pg_catalog."default",
-            answer_ text COLLATE pg_catalog."default",
-            score_ real,
-            CONSTRAINT educational_resources_pkey PRIMARY KEY (id)
-                USING INDEX TABLESPACE "SCHOOLS"
-        );
-
-        ALTER TABLE IF EXISTS public.educational_resources
-            OWNER to postgres;
-        
-        COMMENT ON COLUMN public.educational_resources.source_
-            IS 'Stores the address of the text content.';
+    status, msg = migrations.migrate(connection)
 
-        COMMENT ON COLUMN public.educational_resources.content_
-            IS 'Stores the text content of a educational resource or any learning content from high school textbooks.';
+    if status: return True, f"Database initialized successfully. {msg}"
 
-        COMMENT ON COLUMN public.educational_resources.metadata_
-            IS 'Additional explanations about the content.';
-
-        COMMENT ON COLUMN public.educational_resources.answer_
-            IS 'Stores the answer of the content provided by the teacher.';
-        
-        -- Table: public.groups
-        -- DROP TABLE IF EXISTS public.groups;
-
-        CREATE TABLE IF NOT EXISTS public.groups
-        (
-            id smallint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 32767 CACHE 1 ),
-            grade_ smallint,
-            book_ text COLLATE pg_catalog."default",
-            title_ text COLLATE pg_catalog."default",
-            events_ text COLLATE pg_catalog."default",
-            members_ text COLLATE pg_catalog."default",
-            description_ text COLLATE pg_catalog."default",
-            CONSTRAINT groups_pkey PRIMARY KEY (id)
-                USING INDEX TABLESPACE "SCHOOLS"
-        );
-
-        ALTER TABLE IF EXISTS public.groups
-            OWNER to postgres;
-        
-        -- Table: public.observed_behaviours
-        -- DROP TABLE IF EXISTS public.observed_behaviours;
-
-        CREATE TABLE IF NOT EXISTS public.observed_behaviours
-        (
-            id bigint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 9223372036854775807 CACHE 1 ),
-            date_time_ timestamp without time zone NOT NULL,
-            student_id text COLLATE pg_catalog."default" NOT NULL,
-            observed_behaviour_ text COLLATE pg_catalog."default" NOT NULL,
-            analysis_ text COLLATE pg_catalog."default"
-        );
-
-        ALTER TABLE IF EXISTS public.observed_behaviours
-            OWNER to postgres;
-
-        -- Table: public.personal_info
-        -- DROP TABLE IF EXISTS public.personal_info;
-
-        CREATE TABLE IF NOT EXISTS public.personal_info
-        (
-            id text COLLATE pg_catalog."default" NOT NULL,
-            fname_ text COLLATE pg_catalog."default",
-            lname_ text COLLATE pg_catalog."default",
-            photo_ bytea,
-            phone_ text COLLATE pg_catalog."default",
-            address_ text COLLATE pg_catalog."default",
-            parent_name_ text COLLATE pg_catalog."default",
-            parent_phone_ text COLLATE pg_catalog."default",
-            metadata_ text COLLATE pg_catalog."default",
-            gender_ text COLLATE pg_catalog."default",
-            birth_date_ date,
-            CONSTRAINT personal_info_pkey PRIMARY KEY (id)
-                USING INDEX TABLESPACE "SCHOOLS"
-        );
-        
-        ALTER TABLE IF EXISTS public.personal_info
-            OWNER to postgres;
-
-        -- Table: public.quests
-        -- DROP TABLE IF EXISTS public.quests;
-
-        CREATE TABLE IF NOT EXISTS public.quests
-        (
-            qb_id bigint NOT NULL,
-            student_id text COLLATE pg_catalog."default" NOT NULL,
-            max_point_ real NOT NULL,
-            earned_point_ real NOT NULL DEFAULT 0,
-            date_ timestamp without time zone NOT NULL,
-            dedline_ timestamp without time zone NOT NULL,
-            answer_ bytea,
-            reply_date_ timestamp without time zone,
-            feedback_ bytea
-        );
-
-        ALTER TABLE IF EXISTS public.quests
-            OWNER to postgres;
-        
-        """
-        
-        # Execute the query
-        cursor.execute(create_tables_query)
-        
-        # Add indexes for better performance
-        #index_queries = """
-        #CREATE INDEX IF NOT EXISTS idx_edu_source ON educational_resources(source_);
-        #CREATE INDEX IF NOT EXISTS idx_edu_score ON educational_resources(score_);
-        #CREATE INDEX IF NOT EXISTS idx_settings_key ON settings(setting_key);
-        #"""
-        #cursor.execute(index_queries)
-        
-        # Commit the changes
-        connection.commit()
-
-        return True, f"Database initialized successfully"
-        
-    except (Exception, Error) as error:
-        return False, f"Error while creating PostgreSQL database: {error}"
+    return False, f"Error while initializing PostgreSQL database: {msg}"
 
 def change_database_in_session(connection:connection, database: str,password) -> bool:
     """
@@ -375,142 +389,29 @@ def change_database_in_session(connection:connection, database: str,password) ->
 
 
 def backup_postgres_db(dbname, user, password, host, port, backup_path, dump_path='C:\\Program Files\\PostgreSQL\\17\\bin\\pg_dump.exe'):
-    
-    env = os.environ.copy()
-    
-    env['PGPASSWORD'] = password
-    print(env['PGPASSWORD'])
-
-    # Use full path to pg_dump.exe
-    cmd = [
-        dump_path,  # ← Fixed path here
-        '-Fc', '-v',
-        '-h', host,
-        '-p', str(port),
-        '-U', user,
-        '-f', backup_path,
-        dbname
-    ]
+    """ Single-file backup (pg_dump -Fc) of `dbname`, returns (status, message, path).
+        The parallel directory backups and their progress are in data/backup_engine.py. """
+    engine = BackupEngine(os.path.dirname(dump_path), dbname, user, password, host, port)
 
     print(f"📦 [{datetime.datetime.now().strftime("%Y-%m-%d-%H:%M:%S")}] Starting backup for database '{dbname}' to '{backup_path}'...")
 
-    try:
-        # Start process with real-time output streaming
-        process = subprocess.Popen(cmd, env=env, stderr=subprocess.PIPE, text=True)
-
-        # Stream stderr output line by line
-        while True:
-            line = process.stderr.readline()
-            if not line:
-                if process.poll() is not None:
-                    break
-                continue
-            sys.stdout.write(f"⏳ {line}")
-            sys.stdout.flush()
-
-        # Verify completion
-        if process.returncode != 0:
-            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=process.stderr.read())
-
-        # Final verification
-        if not os.path.exists(backup_path):
-            return False, f"❌ Backup failed: File not created", None
-        
-        if os.path.getsize(backup_path) == 0:
-            os.remove(backup_path)
-            return False, "❌ Backup failed: Empty file", None
-        
-        msg = f'✅ [{datetime.datetime.now().strftime("%Y-%m-%d-%H:%M:%S")}] Backup successful.'
-        
-        print(msg)
+    status, msg, path = engine.backup(backup_path, fmt=CUSTOM)
 
-        return True, msg, backup_path
+    print(msg)
 
-    except subprocess.CalledProcessError as e:
-        
-        error = e.stderr.decode().strip() if e.stderr else str(e)
-        
-        if os.path.exists(backup_path):
-            try: os.remove(backup_path)
-            except Exception as e:
+    return status, msg, path
 
-                return False, f'Can not remove failed backup history, Error: {e}.', None 
-                
-        
-        return False, f"❌ Backup failed: {error}", None
 
-    except Exception as e:
-        return False, f"❌ Unexpected error: {str(e)}", None
+def restore_postgres_db(backup_dump_file, target_db, user, password, host, port, overwrite=False, pg_bin_path=r"C:\\Program Files\\PostgreSQL\\17\\bin", jobs=None, progress=None):
+    # backup_dump_file: a custom format file or the folder of a directory format backup
+    # overwrite=True: restored into a staging database that replaces target_db when it is complete,
+    # otherwise target_db is a new database (data/backup_engine.py RestoreEngine)
+    engine = RestoreEngine(pg_bin_path, user, password, host, port)
 
+    status, msg, db = engine.restore(backup_dump_file, target_db, staging=overwrite, jobs=jobs, progress=progress)
+    print(msg)
 
-def restore_postgres_db(backup_dump_file, target_db, user, password, host, port, overwrite=False, pg_bin_path=r"C:\\Program Files\\PostgreSQL\\17\\bin"):
-    
-    pg_restore_path = os.path.join(pg_bin_path, "pg_restore.exe")
-    createdb_path = os.path.join(pg_bin_path, "createdb.exe")
-    dropdb_path = os.path.join(pg_bin_path, "dropdb.exe")
-
-    env = os.environ.copy()
-    env['PGPASSWORD'] = password
-
-    # Drop the database if overwrite is True
-    if overwrite:
-        print(f"⚠️ Dropping existing database '{target_db}'...")
-        drop_cmd = [
-            dropdb_path,
-            '-h', host,
-            '-p', str(port),
-            '-U', user,
-            target_db
-        ]
-        subprocess.run(drop_cmd, env=env, check=False)
-
-    # Create the database
-    print(f"📘 Creating new database '{target_db}'...")
-    create_cmd = [
-        createdb_path,
-        '-h', host,
-        '-p', str(port),
-        '-U', user,
-        target_db
-    ]
-    try:
-        subprocess.run(create_cmd, env=env, check=True)
-    except subprocess.CalledProcessError as e:
-        return False, f"❌ Could not create database: {e}", target_db
-
-    # Restore the database from the dump
-    print(f"📥 Restoring dump '{backup_dump_file}' into '{target_db}'...")
-    restore_cmd = [
-        pg_restore_path,
-        '-h', host,
-        '-p', str(port),
-        '-U', user,
-        '-d', target_db,
-        '-v',
-        backup_dump_file
-    ]
-    
-    try:
-        process = subprocess.Popen(restore_cmd, env=env, stderr=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
-
-        while True:
-            out_line = process.stdout.readline()
-            err_line = process.stderr.readline()
-            if not out_line and not err_line and process.poll() is not None:
-                break
-            if out_line:
-                sys.stdout.write(f"📄 {out_line}")
-            if err_line:
-                sys.stderr.write(f"⚠️ {err_line}")
-
-        if process.returncode != 0:
-            return False, f"❌ Restore failed with return code {process.returncode}", backup_dump_file
-
-        print(f"✅ [{datetime.datetime.now().strftime('%Y-%m-%d-%H:%M:%S')}] Restore completed successfully.")
-        return True, "✅ Restore successful.", target_db
-
-    except Exception as e:
-        return False, f"❌ Unexpected error during restore: {e}", backup_dump_file
+    return status, msg, db if status else backup_dump_file
 
 def find_postgresql_bin():
     """
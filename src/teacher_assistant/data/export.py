@@ -0,0 +1,224 @@
+# teacher_assistant/data/export.py
+# ###################################################################################################
+#                                          DATA EXPORT                                              #
+# ###################################################################################################
+# Exports the roster, the group memberships, the quest results and the behaviour logs to CSV or    #
+# XLSX for the administration system of the school.                                                #
+#                                                                                                   #
+# The rows are never loaded as a whole: every dataset is read through a server-side (named) cursor #
+# in batches of `batch_size` rows and each batch is written to the file before the next one is     #
+# fetched. The XLSX files are written by openpyxl in write-only mode, which streams the rows of a   #
+# sheet to disk as well, so the memory use does not depend on the size of the school.              #
+#                                                                                                   #
+# The statements are plain SQL, not entries of the query catalog: a server-side cursor is opened  #
+# with DECLARE, and DECLARE can not run a PREPAREd statement.                                       #
+#                                                                                                   #
+# Progress is reported after every batch with progress(dataset, done, total), is_cancelled() is    #
+# checked before every batch. A cancelled or failed export leaves no partial file behind.          #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     connection = app_context.database.open_connection()                                           #
+#     status, msg = export_datasets(connection, ['roster', 'quest_results'], 'marks.xlsx')          #
+#####################################################################################################
+
+import csv
+import json
+import os
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from psycopg2 import Error
+
+
+@dataclass(frozen=True)
+class Dataset:
+    title: str
+    headers: list
+    query: str
+    # Row count for the progress report (a cheap count of the base table)
+    count_query: str
+
+
+DATASETS = {
+    'roster': Dataset(
+        'Roster',
+        ['Id', 'First Name', 'Last Name', 'Gender', 'Birth Date', 'Phone', 'Address', 'Parent Name', 'Parent Phone'],
+        'SELECT id, fname_, lname_, gender_, birth_date_, phone_, address_, parent_name_, parent_phone_ '
+        'FROM personal_info ORDER BY lname_, fname_, id',
+        'SELECT count(*) FROM personal_info'),
+
+    'group_members': Dataset(
+        'Group members',
+        ['Group Id', 'Group', 'Grade', 'Book', 'Student Id', 'First Name', 'Last Name'],
+        'SELECT g.id, g.title_, g.grade_, g.book_, m.student_id, p.fname_, p.lname_ '
+        'FROM groups g '
+        "CROSS JOIN LATERAL unnest(string_to_array(replace(g.members_, ' ', ''), ',')) WITH ORDINALITY AS m(student_id, ord) "
+        'LEFT JOIN personal_info p ON p.id = m.student_id '
+        "WHERE m.student_id <> '' ORDER BY g.grade_, g.title_, g.id, m.ord",
+        "SELECT count(*) FROM groups g, unnest(string_to_array(replace(g.members_, ' ', ''), ',')) m WHERE m <> ''"),
+
+    'quest_results': Dataset(
+        'Quest results',
+        ['Quest Id', 'Student Id', 'First Name', 'Last Name', 'Title', 'Template', 'Assign Date', 'Deadline',
+         'Reply Date', 'Total Score', 'Earned Score'],
+        "SELECT q.id, q.student_id, p.fname_, p.lname_, q.configs_->>'Title', q.configs_->>'Template', "
+        '       q.assign_date_, q.deadline_, q.reply_date_, q.total_score_, '
+        '       (SELECT SUM(qi.earned_score) FROM quest_items qi WHERE qi.quest_id = q.id) '
+        'FROM quests q LEFT JOIN personal_info p ON p.id = q.student_id '
+        'ORDER BY q.student_id, q.assign_date_',
+        'SELECT count(*) FROM quests'),
+
+    'behaviours': Dataset(
+        'Behaviours',
+        ['Id', 'Student Id', 'First Name', 'Last Name', 'Date', 'Observed Behaviour', 'Analysis'],
+        'SELECT b.id, b.student_id, p.fname_, p.lname_, b.date_time_, b.observed_behaviour_, b.analysis_ '
+        'FROM observed_behaviours b LEFT JOIN personal_info p ON p.id = b.student_id '
+        'ORDER BY b.student_id, b.date_time_',
+        'SELECT count(*) FROM observed_behaviours'),
+}
+
+FORMATS = ('csv', 'xlsx')
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _cell(value):
+    # Values a spreadsheet can hold: json columns as text, binary columns are left out
+    if value is None or isinstance(value, (str, int, float, date, datetime)): return value
+    if isinstance(value, (dict, list)): return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (bytes, memoryview)): return None
+
+    return str(value)
+
+
+def _stream_rows(connection, dataset:Dataset, batch_size:int, progress, is_cancelled):
+    """ Yields the rows of `dataset` batch by batch from a server-side cursor. """
+    with connection.cursor() as cur:
+        cur.execute(dataset.count_query)
+        total = cur.fetchone()[0]
+
+    done = 0
+    if progress: progress(dataset.title, done, total)
+
+    # A named cursor is a server-side cursor: fetchmany() reads the next batch from the server
+    with connection.cursor(name=f'export_{id(dataset)}') as cur:
+        cur.itersize = batch_size
+        cur.execute(dataset.query)
+
+        while True:
+            if is_cancelled and is_cancelled(): raise ExportCancelled()
+
+            rows = cur.fetchmany(batch_size)
+            if not rows: break
+
+            yield rows
+
+            done += len(rows)
+            if progress: progress(dataset.title, done, max(total, done))
+
+
+def _write_csv(connection, dataset:Dataset, file_path:str, batch_size:int, progress, is_cancelled) -> int:
+    count = 0
+
+    # utf-8-sig: Excel opens the Persian text correctly only with the BOM
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(dataset.headers)
+
+        for rows in _stream_rows(connection, dataset, batch_size, progress, is_cancelled):
+            writer.writerows([_cell(value) for value in row] for row in rows)
+            count += len(rows)
+
+    return count
+
+
+def _write_xlsx(connection, datasets:list, file_path:str, batch_size:int, progress, is_cancelled) -> int:
+    # Optional dependency, only needed for XLSX
+    from openpyxl import Workbook
+
+    # write_only: the rows of a sheet go to a temporary file as they are appended
+    workbook = Workbook(write_only=True)
+    count = 0
+
+    try:
+        for dataset in datasets:
+            sheet = workbook.create_sheet(title=dataset.title[:31])
+            sheet.append(dataset.headers)
+
+            for rows in _stream_rows(connection, dataset, batch_size, progress, is_cancelled):
+                for row in rows: sheet.append([_cell(value) for value in row])
+                count += len(rows)
+
+        workbook.save(file_path)
+
+    except BaseException:
+        # Releases the temporary files of the sheets, the workbook is not saved
+        for sheet in workbook.worksheets: sheet.close()
+        raise
+
+    return count
+
+
+def export_datasets(connection, names:list, file_path:str, fmt:str=None, batch_size:int=2000,
+                    progress=None, is_cancelled=None):
+    """
+    Exports the `names` datasets (keys of DATASETS).<br>
+    `xlsx`: one workbook with a sheet per dataset,<br>
+    `csv` : one file per dataset; `file_path` is a directory when there is more than one dataset.<br>
+    `connection` should be a connection of its own (psycopg2_database.open_connection()), the export
+    runs in one read-only transaction so all datasets are a consistent snapshot.<br>
+    Returns (status, message).
+    """
+    fmt = (fmt or os.path.splitext(file_path)[1].lstrip('.') or 'csv').lower()
+
+    if fmt not in FORMATS: return False, f'Unknown export format: {fmt}.'
+
+    unknown = [name for name in names if name not in DATASETS]
+    if unknown or not names: return False, f'Unknown dataset(s): {", ".join(unknown) or "none"}.'
+
+    datasets = [DATASETS[name] for name in names]
+
+    # The target files: each one is written under a temporary name and renamed when complete
+    if fmt == 'xlsx':
+        targets = [file_path]
+    elif len(names) == 1 and not os.path.isdir(file_path):
+        targets = [file_path]
+    else:
+        os.makedirs(file_path, exist_ok=True)
+        targets = [os.path.join(file_path, f'{name}.csv') for name in names]
+
+    partials = [f'{target}.part' for target in targets]
+    autocommit = connection.autocommit
+
+    try:
+        connection.autocommit = False
+        connection.set_session(readonly=True, isolation_level='REPEATABLE READ')
+
+        if fmt == 'xlsx':
+            count = _write_xlsx(connection, datasets, partials[0], batch_size, progress, is_cancelled)
+        else:
+            count = sum(_write_csv(connection, dataset, partial, batch_size, progress, is_cancelled)
+                        for dataset, partial in zip(datasets, partials))
+
+        for partial, target in zip(partials, targets): os.replace(partial, target)
+
+        return True, f'{count} row(s) exported to {file_path}.'
+
+    except ExportCancelled:
+        return False, 'Export cancelled.'
+
+    except ImportError as e:
+        return False, f'XLSX export needs the openpyxl package: {e}.'
+
+    except (Error, OSError) as e:
+        return False, f'Export failed: {e}.'
+
+    finally:
+        for partial in partials:
+            if os.path.exists(partial): os.remove(partial)
+
+        connection.rollback()
+        connection.set_session(readonly='DEFAULT', isolation_level='DEFAULT')
+        connection.autocommit = autocommit
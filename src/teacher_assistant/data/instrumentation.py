@@ -0,0 +1,313 @@
+# teacher_assistant/data/instrumentation.py
+# ###################################################################################################
+#                                   QUERY INSTRUMENTATION                                           #
+# ###################################################################################################
+# Optional measuring layer of psycopg2_database. When it is enabled every execute / fetch call is   #
+# recorded with:                                                                                    #
+#   - the statement fingerprint (query name or the SQL text with its literals removed)              #
+#   - the duration                                                                                  #
+#   - the rows returned and an estimate of the transferred bytes                                    #
+#   - the calling page (first frame of the call stack that belongs to the ui package)               #
+#                                                                                                   #
+# The records are aggregated into an in-process latency histogram, the slow ones are kept for the   #
+# "slow queries" report (optionally with their EXPLAIN ANALYZE plan) and every record is appended to #
+# a rotating JSON-lines file for offline analysis.                                                  #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     app_context.database.enable_instrumentation(log_path, slow_threshold_ms=200, capture_explain=True)
+#     print(app_context.database.instrumentation.report())                                         #
+#####################################################################################################
+
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# Upper bounds (milliseconds) of the latency histogram buckets, the last bucket is open ended.
+HISTOGRAM_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST        = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE     = re.compile(r'\s+')
+
+
+def fingerprint(query) -> str:
+    """ Normalizes a SQL statement so the calls that differ only in their values are grouped together. """
+    if isinstance(query, bytes): query = query.decode('utf-8', errors='replace')
+
+    text = str(query)
+    text = _STRING_LITERAL.sub('?', text)
+    text = _NUMBER_LITERAL.sub('?', text)
+    text = text.replace('%s', '?')
+    text = _IN_LIST.sub('(?...)', text)
+    text = _WHITESPACE.sub(' ', text).strip().rstrip(';')
+
+    return text.lower()
+
+
+def estimate_size(rows) -> int:
+    """ Approximate number of bytes of the returned rows (text and binary values dominate the payload). """
+    if not rows: return 0
+
+    size = 0
+    for row in rows:
+        if row is None: continue
+        for value in row:
+            if value is None: continue
+            if isinstance(value, (bytes, bytearray, memoryview)): size += len(value)
+            elif isinstance(value, str): size += len(value.encode('utf-8'))
+            else: size += 8
+
+    return size
+
+
+def calling_page() -> str:
+    """ Returns 'module.function' of the nearest caller that lives in the ui package. """
+    frame = sys._getframe(2)
+    fallback = ''
+    ui_dir = os.sep + 'ui' + os.sep
+    data_dir = os.sep + 'data' + os.sep
+
+    while frame is not None:
+        filename = frame.f_code.co_filename
+
+        if ui_dir in filename:
+            return f'{os.path.splitext(os.path.basename(filename))[0]}.{frame.f_code.co_name}'
+
+        if not fallback and data_dir not in filename:
+            fallback = f'{os.path.splitext(os.path.basename(filename))[0]}.{frame.f_code.co_name}'
+
+        frame = frame.f_back
+
+    return fallback
+
+
+class QueryStats:
+    """ Aggregated measures of one statement fingerprint. """
+
+    def __init__(self, fingerprint:str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = float('inf')
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.pages = set()
+        self.buckets = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+
+    def add(self, duration_ms:float, rows:int, size:int, page:str):
+        self.count += 1
+        self.total_ms += duration_ms
+        self.min_ms = min(self.min_ms, duration_ms)
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.rows += rows
+        self.bytes += size
+        if page: self.pages.add(page)
+
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                return
+
+        self.buckets[-1] += 1
+
+    @property
+    def mean_ms(self): return self.total_ms / self.count if self.count else 0.0
+
+    def to_dict(self):
+        return {'fingerprint': self.fingerprint,
+                'count': self.count,
+                'total_ms': round(self.total_ms, 3),
+                'mean_ms': round(self.mean_ms, 3),
+                'min_ms': round(self.min_ms, 3) if self.count else 0.0,
+                'max_ms': round(self.max_ms, 3),
+                'rows': self.rows,
+                'bytes': self.bytes,
+                'pages': sorted(self.pages),
+                'histogram': dict(zip([f'<={b}ms' for b in HISTOGRAM_BUCKETS] + [f'>{HISTOGRAM_BUCKETS[-1]}ms'],
+                                      self.buckets))}
+
+
+class QueryInstrumentation:
+    """ Collects the query records of a psycopg2_database instance. """
+
+    def __init__(self, log_path:str=None, slow_threshold_ms:float=200.0, capture_explain:bool=False,
+                 max_slow_queries:int=50, max_bytes:int=5 * 1024 * 1024, backup_count:int=3):
+
+        self.slow_threshold_ms = slow_threshold_ms
+        self.capture_explain = capture_explain
+        self.max_slow_queries = max_slow_queries
+        self.log_path = log_path
+
+        self._stats = {}
+        self._slow = []
+        self._explained = set()
+        self._lock = threading.Lock()
+        self._logger = None
+
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+
+            handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            # A private logger, the records must not reach the root logger handlers
+            self._logger = logging.getLogger(f'teacher_assistant.queries.{id(self)}')
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+            self._logger.addHandler(handler)
+
+    def record(self, method:str, query, duration_ms:float, rows:int=0, size:int=0, page:str='', error:str=''):
+        """ Adds one measured call, returns True when the call is slower than the threshold. """
+        key = fingerprint(query)
+        slow = duration_ms >= self.slow_threshold_ms
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(key)
+
+            stats.add(duration_ms, rows, size, page)
+
+            if slow:
+                self._slow.append({'time': datetime.now().isoformat(timespec='seconds'),
+                                   'fingerprint': key,
+                                   'method': method,
+                                   'duration_ms': round(duration_ms, 3),
+                                   'rows': rows,
+                                   'page': page,
+                                   'plan': None})
+                # Keep only the slowest entries
+                self._slow.sort(key=lambda item: item['duration_ms'], reverse=True)
+                del self._slow[self.max_slow_queries:]
+
+        if self._logger is not None:
+            entry = {'time': datetime.now().isoformat(timespec='milliseconds'), 'method': method,
+                     'fingerprint': key, 'duration_ms': round(duration_ms, 3), 'rows': rows,
+                     'bytes': size, 'page': page, 'slow': slow}
+
+            if error: entry['error'] = error
+
+            self._logger.info(json.dumps(entry, ensure_ascii=False))
+
+        return slow
+
+    def wants_plan(self, query) -> bool:
+        """ True when the plan of a slow statement has to be captured (only once per fingerprint). """
+        if not self.capture_explain: return False
+
+        key = fingerprint(query)
+
+        with self._lock:
+            if key in self._explained: return False
+            self._explained.add(key)
+
+        return True
+
+    def attach_plan(self, query, plan):
+        key = fingerprint(query)
+
+        with self._lock:
+            for item in self._slow:
+                if item['fingerprint'] == key and item['plan'] is None:
+                    item['plan'] = plan
+
+        if self._logger is not None:
+            self._logger.info(json.dumps({'time': datetime.now().isoformat(timespec='milliseconds'),
+                                          'fingerprint': key, 'plan': plan}, ensure_ascii=False, default=str))
+
+    def histogram(self) -> dict:
+        """ Aggregated stats of all fingerprints, keyed by fingerprint. """
+        with self._lock:
+            return {key: stats.to_dict() for key, stats in self._stats.items()}
+
+    def slow_queries(self, limit:int=20) -> list:
+        with self._lock:
+            return [dict(item) for item in self._slow[:limit]]
+
+    def report(self, limit:int=20) -> str:
+        """ Plain-text report of the slowest statements and the most expensive fingerprints. """
+        lines = [f'SLOW QUERIES (>= {self.slow_threshold_ms} ms)', '-' * 60]
+
+        for item in self.slow_queries(limit):
+            lines.append(f"{item['duration_ms']:>10.1f} ms  {item['rows']:>7} rows  {item['page'] or '-'}")
+            lines.append(f"    {item['fingerprint']}")
+            if item['plan'] is not None:
+                lines.append('    plan: ' + json.dumps(item['plan'], ensure_ascii=False, default=str)[:2000])
+
+        lines += ['', 'TOTAL TIME BY STATEMENT', '-' * 60]
+
+        stats = sorted(self.histogram().values(), key=lambda s: s['total_ms'], reverse=True)
+
+        for s in stats[:limit]:
+            lines.append(f"{s['total_ms']:>10.1f} ms  x{s['count']:<6} mean {s['mean_ms']:.1f} ms  "
+                         f"max {s['max_ms']:.1f} ms  {s['rows']} rows  {s['bytes']} bytes")
+            lines.append(f"    {s['fingerprint']}")
+
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._slow.clear()
+            self._explained.clear()
+
+    def close(self):
+        if self._logger is None: return
+
+        for handler in list(self._logger.handlers):
+            handler.close()
+            self._logger.removeHandler(handler)
+
+        self._logger = None
+
+
+class _NoTimer:
+    # Stand-in of QueryTimer while the instrumentation is disabled
+    slow = False
+    def set_result(self, rows): pass
+
+NO_TIMER = _NoTimer()
+
+
+class QueryTimer:
+    """ Context manager used by the storage backends to time one call. """
+
+    __slots__ = ('instrumentation', 'method', 'query', 'rows', 'size', 'page', 'slow', '_start')
+
+    def __init__(self, instrumentation:QueryInstrumentation, method:str, query):
+        self.instrumentation = instrumentation
+        self.method = method
+        self.query = query
+        self.rows = 0
+        self.size = 0
+        self.slow = False
+        self.page = ''
+
+    def set_result(self, rows):
+        """ Records the returned rows (a list of tuples or a single tuple). """
+        if rows is None: return
+
+        if isinstance(rows, tuple): rows = [rows]
+
+        self.rows = len(rows)
+        self.size = estimate_size(rows)
+
+    def __enter__(self):
+        self.page = calling_page()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start) * 1000.0
+        error = f'{exc_type.__name__}: {exc}' if exc_type else ''
+
+        self.slow = self.instrumentation.record(self.method, self.query, duration_ms,
+                                                self.rows, self.size, self.page, error)
+        return False
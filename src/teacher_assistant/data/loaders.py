@@ -3,6 +3,8 @@ import time
 from PySide6.QtCore import Signal, QObject, QRunnable, Slot
 
 from core.app_context import app_context
+from data.export import export_datasets
+from data.backup_engine import BackupEngine, DIRECTORY, RestoreEngine
 
 # Signals class for thread-safe communication between worker thread and main UI thread
 # This allows the background worker to emit events that the main thread can listen to
@@ -97,3 +99,116 @@ class DataLoaderWorker(QRunnable):
         """
         self.is_running = False
 
+
+
+# Signals of the ExportWorker
+class ExportSignals(QObject):
+    progress = Signal(str, int, int)    # dataset title, exported rows, total rows of the dataset
+    finished = Signal(bool, str)        # status, message - emitted once, also after an error or a cancel
+
+# Exports datasets (data/export.py) to a file in Qt's thread pool.
+# The worker opens a connection of its own, the export never blocks the queries of the GUI thread.
+class ExportWorker(QRunnable):
+
+    def __init__(self, names:list, file_path:str, fmt:str=None, batch_size:int=2000):
+        super().__init__()
+
+        self.names = names
+        self.file_path = file_path
+        self.fmt = fmt
+        self.batch_size = batch_size
+
+        self.signals = ExportSignals()
+
+        # Set by stop(), checked by the export before every batch
+        self.is_running = True
+
+    @Slot()
+    def run(self):
+        connection = None
+        try:
+            # Server-side cursors and PostgreSQL SQL (data/export.py)
+            if app_context.database.dialect != 'postgresql':
+                status, message = False, 'Export is available with a PostgreSQL database only.'
+            else:
+                connection = app_context.database.open_connection()
+
+                status, message = export_datasets(connection, self.names, self.file_path, self.fmt, self.batch_size,
+                                                  progress=self.signals.progress.emit,
+                                                  is_cancelled=lambda: not self.is_running)
+        except Exception as e:
+            status, message = False, f'Export failed: {e}.'
+
+        finally:
+            self.is_running = False
+            if connection: connection.close()
+
+        self.signals.finished.emit(status, message)
+
+    def stop(self):
+        """ Cancels the export, the partial file is removed. """
+        self.is_running = False
+
+
+# Signals of the BackupWorker
+class BackupSignals(QObject):
+    progress = Signal(str, int, int, str)   # phase ('schema', 'data', 'verify', ...), done, total, detail
+    finished = Signal(bool, str, str)       # status, message, path of the archive / restored database ('' on failure)
+
+# Runs a pg_dump backup (data/backup_engine.py) in Qt's thread pool, the GUI thread only gets the signals.
+class BackupWorker(QRunnable):
+
+    def __init__(self, engine:BackupEngine, path:str, fmt:str=DIRECTORY, jobs:int=None, compression:int=None,
+                 verify:bool=True):
+        super().__init__()
+
+        self.engine = engine
+        self.path = path
+        self.fmt = fmt
+        self.jobs = jobs
+        self.compression = compression
+        self.verify = verify
+
+        self.signals = BackupSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            status, message, path = self.engine.backup(self.path, self.fmt, self.jobs, self.compression,
+                                                       self.verify, progress=self.signals.progress.emit)
+        except Exception as e:
+            status, message, path = False, f'Backup failed: {e}.', None
+
+        self.signals.finished.emit(status, message, path or '')
+
+    def stop(self):
+        """ Cancels the backup, the partial archive is removed. """
+        self.engine.cancel()
+
+# Runs a pg_restore (data/backup_engine.py RestoreEngine) in Qt's thread pool, with the signals of BackupWorker.
+class RestoreWorker(QRunnable):
+
+    def __init__(self, engine:RestoreEngine, path:str, target_db:str, staging:bool=True, jobs:int=None):
+        super().__init__()
+
+        self.engine = engine
+        self.path = path
+        self.target_db = target_db
+        self.staging = staging
+        self.jobs = jobs
+
+        self.signals = BackupSignals()
+
+    @Slot()
+    def run(self):
+        try:
+            status, message, database = self.engine.restore(self.path, self.target_db, self.staging, self.jobs,
+                                                            progress=self.signals.progress.emit)
+        except Exception as e:
+            status, message, database = False, f'Restore failed: {e}.', None
+
+        self.signals.finished.emit(status, message, database or '')
+
+    def stop(self):
+        """ Cancels the restore, the partially restored database is dropped. """
+        self.engine.cancel()
@@ -0,0 +1,635 @@
+# teacher_assistant/data/migrations.py
+# ###################################################################################################
+#                                    SCHEMA MIGRATIONS                                              #
+# ###################################################################################################
+# The database schema is built by ordered, numbered migration steps. The applied steps are stored  #
+# in the schema_version table, so a database created by an older version of the app is upgraded    #
+# by running only the steps it has not seen yet.                                                    #
+#                                                                                                   #
+# A step is either transactional (all statements in one transaction with the version row) or      #
+# `concurrent`: statements like CREATE INDEX CONCURRENTLY can not run inside a transaction, they   #
+# run in autocommit mode and do not lock the table against writes, so an existing deployment can   #
+# be upgraded while it is in use. Every statement of a step must be safe to run twice (IF NOT      #
+# EXISTS), a concurrent step that stops half way is simply run again on the next start.             #
+#                                                                                                   #
+# Several workstations share one database and migrate on login: migrate() holds a session-level     #
+# advisory lock (MIGRATION_LOCK) while it reads the version and applies the steps, a second client  #
+# waits and then finds the steps applied. The waiting client polls pg_try_advisory_lock(): a        #
+# statement blocked in pg_advisory_lock() would be a transaction that CREATE INDEX CONCURRENTLY of  #
+# the lock holder waits for (a deadlock).                                                           #
+#                                                                                                   #
+# Adding a step: append a Migration with the next version number to MIGRATIONS, never edit or      #
+# renumber a step that has been released.                                                          #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     status, msg = migrate(app_context.database.connection)                                       #
+#####################################################################################################
+
+import re
+import time
+from dataclasses import dataclass, field
+
+from psycopg2 import Error
+from psycopg2.extensions import connection
+
+# Key of the advisory lock of migrate() (any bigint, the same in every client)
+MIGRATION_LOCK = 7_310_042_001
+# Seconds a client waits for the migration of another client
+LOCK_TIMEOUT = 600
+
+# The index names of the CREATE INDEX statements of a step
+_CREATED_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.I)
+
+SCHEMA_VERSION_TABLE = """
+    CREATE TABLE IF NOT EXISTS public.schema_version
+    (
+        version integer NOT NULL,
+        description text NOT NULL,
+        applied_at timestamp without time zone NOT NULL DEFAULT now(),
+        CONSTRAINT schema_version_pkey PRIMARY KEY (version)
+    );
+"""
+
+# Version 1: the tables as they were created by initialize_database() (without tablespace / owner,
+# the tables belong to the connected user and the default tablespace of the database).
+BASELINE_SCHEMA = """
+    -- Table: public.academic_years
+
+    CREATE TABLE IF NOT EXISTS public.academic_years
+    (
+        id bigint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 9223372036854775807 CACHE 1 ),
+        year_ smallint NOT NULL,
+        manager_id text COLLATE pg_catalog."default",
+        more_info_ text COLLATE pg_catalog."default",
+        CONSTRAINT academic_years_pkey PRIMARY KEY (id)
+    );
+
+    -- Table: public.classroom_events
+
+    CREATE TABLE IF NOT EXISTS public.classroom_events
+    (
+        meeting_no_ smallint NOT NULL,
+        pages_start_ smallint NOT NULL,
+        pages_end_ smallint NOT NULL,
+        subject_ text COLLATE pg_catalog."default" NOT NULL,
+        description_ text COLLATE pg_catalog."default" NOT NULL,
+        events_ text COLLATE pg_catalog."default",
+        analysis_ text COLLATE pg_catalog."default",
+        date_time_ timestamp without time zone NOT NULL,
+        group_id smallint
+    );
+
+    -- Table: public.educational_resources
+
+    CREATE TABLE IF NOT EXISTS public.educational_resources
+    (
+        id bigint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 9223372036854775807 CACHE 1 ),
+        source_ text COLLATE pg_catalog."default" NOT NULL,
+        content_ text COLLATE pg_catalog."default" NOT NULL,
+        metadata_ text COLLATE pg_catalog."default",
+        answer_ text COLLATE pg_catalog."default",
+        score_ real,
+        CONSTRAINT educational_resources_pkey PRIMARY KEY (id)
+    );
+
+    COMMENT ON COLUMN public.educational_resources.source_
+        IS 'Stores the address of the text content.';
+
+    COMMENT ON COLUMN public.educational_resources.content_
+        IS 'Stores the text content of a educational resource or any learning content from high school textbooks.';
+
+    COMMENT ON COLUMN public.educational_resources.metadata_
+        IS 'Additional explanations about the content.';
+
+    COMMENT ON COLUMN public.educational_resources.answer_
+        IS 'Stores the answer of the content provided by the teacher.';
+
+    -- Table: public.groups
+
+    CREATE TABLE IF NOT EXISTS public.groups
+    (
+        id smallint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 32767 CACHE 1 ),
+        grade_ smallint,
+        book_ text COLLATE pg_catalog."default",
+        title_ text COLLATE pg_catalog."default",
+        events_ text COLLATE pg_catalog."default",
+        members_ text COLLATE pg_catalog."default",
+        description_ text COLLATE pg_catalog."default",
+        CONSTRAINT groups_pkey PRIMARY KEY (id)
+    );
+
+    -- Table: public.observed_behaviours
+
+    CREATE TABLE IF NOT EXISTS public.observed_behaviours
+    (
+        id bigint NOT NULL GENERATED ALWAYS AS IDENTITY ( INCREMENT 1 START 100 MINVALUE 1 MAXVALUE 9223372036854775807 CACHE 1 ),
+        date_time_ timestamp without time zone NOT NULL,
+        student_id text COLLATE pg_catalog."default" NOT NULL,
+        observed_behaviour_ text COLLATE pg_catalog."default" NOT NULL,
+        analysis_ text COLLATE pg_catalog."default"
+    );
+
+    -- Table: public.personal_info
+
+    CREATE TABLE IF NOT EXISTS public.personal_info
+    (
+        id text COLLATE pg_catalog."default" NOT NULL,
+        fname_ text COLLATE pg_catalog."default",
+        lname_ text COLLATE pg_catalog."default",
+        photo_ bytea,
+        phone_ text COLLATE pg_catalog."default",
+        address_ text COLLATE pg_catalog."default",
+        parent_name_ text COLLATE pg_catalog."default",
+        parent_phone_ text COLLATE pg_catalog."default",
+        metadata_ text COLLATE pg_catalog."default",
+        gender_ text COLLATE pg_catalog."default",
+        birth_date_ date,
+        CONSTRAINT personal_info_pkey PRIMARY KEY (id)
+    );
+
+    -- Table: public.quests
+
+    CREATE TABLE IF NOT EXISTS public.quests
+    (
+        qb_id bigint NOT NULL,
+        student_id text COLLATE pg_catalog."default" NOT NULL,
+        max_point_ real NOT NULL,
+        earned_point_ real NOT NULL DEFAULT 0,
+        date_ timestamp without time zone NOT NULL,
+        dedline_ timestamp without time zone NOT NULL,
+        answer_ bytea,
+        reply_date_ timestamp without time zone,
+        feedback_ bytea
+    );
+
+"""
+
+# Version 2: the columns of quests that the application reads and writes. Databases created from the
+# first DDL have the old columns (qb_id, max_point_, ...) with NOT NULL, they are kept but relaxed so
+# the application inserts do not fail on them.
+QUESTS_APPLICATION_COLUMNS = """
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS id bigint GENERATED ALWAYS AS IDENTITY;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS qb_ids_ text;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS total_score_ real;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS scores_ text;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS assign_date_ timestamp without time zone;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS deadline_ timestamp without time zone;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS reply_date_ timestamp without time zone;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS configs_ jsonb;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS responses_ text;
+    ALTER TABLE public.quests ADD COLUMN IF NOT EXISTS feedback_ text;
+
+    DO $$
+    DECLARE
+        legacy text;
+    BEGIN
+        FOREACH legacy IN ARRAY ARRAY['qb_id', 'max_point_', 'earned_point_', 'date_', 'dedline_'] LOOP
+            IF EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_schema = 'public' AND table_name = 'quests' AND column_name = legacy) THEN
+                EXECUTE format('ALTER TABLE public.quests ALTER COLUMN %I DROP NOT NULL', legacy);
+            END IF;
+        END LOOP;
+
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint
+                       WHERE conrelid = 'public.quests'::regclass AND contype = 'p') THEN
+            ALTER TABLE public.quests ADD CONSTRAINT quests_pkey PRIMARY KEY (id);
+        END IF;
+    END
+    $$;
+"""
+
+# Version 5: one row per question of a quest instead of the dash-joined qb_ids_ / scores_ strings.
+# The existing quests are backfilled, position is the 1-based index in qb_ids_ and the earned score
+# is the value at the same index of scores_. resource_id has no foreign key: a resource may be deleted
+# after it was assigned, and the custom assignments use the free id 99.
+QUEST_ITEMS = """
+    CREATE TABLE IF NOT EXISTS public.quest_items
+    (
+        quest_id bigint NOT NULL,
+        "position" smallint NOT NULL,
+        resource_id bigint NOT NULL,
+        max_score real,
+        earned_score real,
+        CONSTRAINT quest_items_pkey PRIMARY KEY (quest_id, "position"),
+        CONSTRAINT quest_items_quest_fkey FOREIGN KEY (quest_id) REFERENCES public.quests (id) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_quest_items_resource ON public.quest_items (resource_id);
+
+    INSERT INTO public.quest_items (quest_id, "position", resource_id, max_score, earned_score)
+    SELECT q.id, ids.ord, ids.rid::bigint, r.score_,
+           CASE WHEN scores.val ~ '^[0-9]+(\\.[0-9]+)?$' THEN scores.val::real END
+    FROM public.quests q
+    CROSS JOIN LATERAL unnest(string_to_array(q.qb_ids_, '-')) WITH ORDINALITY AS ids(rid, ord)
+    LEFT JOIN LATERAL (SELECT trim((string_to_array(q.scores_, '-'))[ids.ord]) AS val) scores ON true
+    LEFT JOIN public.educational_resources r ON r.id = ids.rid::bigint
+    WHERE ids.rid ~ '^[0-9]+$'
+    ON CONFLICT DO NOTHING;
+"""
+
+# Version 6: results of the item analysis (utils/item_analysis.py). `scope` names the analysed set of
+# students or quests ('group:12', 'quests:...'), one row per question in item_statistics and one summary
+# row (reliability and the distribution of the total scores) in item_analysis_runs.
+ITEM_STATISTICS = """
+    CREATE TABLE IF NOT EXISTS public.item_analysis_runs
+    (
+        scope text NOT NULL,
+        computed_at timestamp without time zone NOT NULL DEFAULT now(),
+        students integer NOT NULL,
+        items integer NOT NULL,
+        cronbach_alpha real,
+        mean_percent real,
+        stdev_percent real,
+        distribution jsonb,
+        CONSTRAINT item_analysis_runs_pkey PRIMARY KEY (scope)
+    );
+
+    CREATE TABLE IF NOT EXISTS public.item_statistics
+    (
+        scope text NOT NULL,
+        resource_id bigint NOT NULL,
+        responses integer NOT NULL,
+        max_score real,
+        mean_score real,
+        difficulty real,
+        discrimination real,
+        point_biserial real,
+        alpha_if_deleted real,
+        distribution jsonb,
+        CONSTRAINT item_statistics_pkey PRIMARY KEY (scope, resource_id),
+        CONSTRAINT item_statistics_run_fkey FOREIGN KEY (scope)
+            REFERENCES public.item_analysis_runs (scope) ON DELETE CASCADE
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_item_statistics_resource ON public.item_statistics (resource_id);
+"""
+
+# Version 7: the gradebook, one row per (group, student, quest) with the earned score summed from quest_items.
+# It is maintained by triggers, a write to quests / quest_items refreshes only the rows of the changed quests
+# (statement level triggers with transition tables: one refresh per statement, not per row), a change of
+# groups.members_ refreshes the rows of that group. The gradebook page reads a whole group with one query.
+GRADEBOOK = """
+    CREATE TABLE IF NOT EXISTS public.gradebook
+    (
+        group_id bigint NOT NULL,
+        student_id text NOT NULL,
+        quest_id bigint NOT NULL,
+        title_ text,
+        assign_date_ timestamp without time zone,
+        deadline_ timestamp without time zone,
+        reply_date_ timestamp without time zone,
+        total_score_ real,
+        earned_score_ real,
+        CONSTRAINT gradebook_pkey PRIMARY KEY (group_id, student_id, quest_id)
+    );
+
+    CREATE INDEX IF NOT EXISTS idx_gradebook_quest ON public.gradebook (quest_id);
+
+    -- Rows of the given quests (ids) or of one group (group_ids), for every group the student is a member of
+    CREATE OR REPLACE FUNCTION public.gradebook_rows(ids bigint[], group_ids bigint[])
+    RETURNS SETOF public.gradebook LANGUAGE sql STABLE AS $$
+        SELECT g.id, q.student_id, q.id, COALESCE(q.configs_->>'Title', q.configs_->>'Template', ''),
+               q.assign_date_, q.deadline_, q.reply_date_, q.total_score_,
+               (SELECT SUM(qi.earned_score) FROM public.quest_items qi WHERE qi.quest_id = q.id)
+        FROM public.groups g
+        CROSS JOIN LATERAL unnest(string_to_array(replace(g.members_, ' ', ''), ',')) AS m(student_id)
+        JOIN public.quests q ON q.student_id = m.student_id
+        WHERE (ids IS NULL OR q.id = ANY(ids)) AND (group_ids IS NULL OR g.id = ANY(group_ids));
+    $$;
+
+    CREATE OR REPLACE FUNCTION public.gradebook_refresh_quests(ids bigint[])
+    RETURNS void LANGUAGE sql AS $$
+        DELETE FROM public.gradebook WHERE quest_id = ANY(ids);
+        INSERT INTO public.gradebook SELECT * FROM public.gradebook_rows(ids, NULL) ON CONFLICT DO NOTHING;
+    $$;
+
+    CREATE OR REPLACE FUNCTION public.gradebook_refresh_group(group_ids bigint[])
+    RETURNS void LANGUAGE sql AS $$
+        DELETE FROM public.gradebook WHERE group_id = ANY(group_ids);
+        INSERT INTO public.gradebook SELECT * FROM public.gradebook_rows(NULL, group_ids) ON CONFLICT DO NOTHING;
+    $$;
+
+    -- quests (id) and quest_items (quest_id): collects the changed quest ids from the transition tables
+    CREATE OR REPLACE FUNCTION public.gradebook_on_quests() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        ids bigint[];
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM new_rows', TG_ARGV[0]) INTO ids;
+        ELSIF TG_OP = 'DELETE' THEN
+            EXECUTE format('SELECT array_agg(DISTINCT %I) FROM old_rows', TG_ARGV[0]) INTO ids;
+        ELSE
+            EXECUTE format('SELECT array_agg(id) FROM (SELECT %1$I AS id FROM new_rows UNION SELECT %1$I FROM old_rows) t',
+                           TG_ARGV[0]) INTO ids;
+        END IF;
+        IF ids IS NOT NULL THEN PERFORM public.gradebook_refresh_quests(ids); END IF;
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE OR REPLACE FUNCTION public.gradebook_on_groups() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM public.gradebook WHERE group_id = OLD.id;
+        ELSIF TG_OP = 'INSERT' OR NEW.members_ IS DISTINCT FROM OLD.members_ THEN
+            PERFORM public.gradebook_refresh_group(ARRAY[NEW.id]);
+        END IF;
+        RETURN NULL;
+    END;
+    $$;
+
+    DROP TRIGGER IF EXISTS gradebook_quests_insert ON public.quests;
+    DROP TRIGGER IF EXISTS gradebook_quests_update ON public.quests;
+    DROP TRIGGER IF EXISTS gradebook_quests_delete ON public.quests;
+    DROP TRIGGER IF EXISTS gradebook_items_insert ON public.quest_items;
+    DROP TRIGGER IF EXISTS gradebook_items_update ON public.quest_items;
+    DROP TRIGGER IF EXISTS gradebook_items_delete ON public.quest_items;
+    DROP TRIGGER IF EXISTS gradebook_groups ON public.groups;
+
+    CREATE TRIGGER gradebook_quests_insert AFTER INSERT ON public.quests REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.gradebook_on_quests('id');
+    CREATE TRIGGER gradebook_quests_update AFTER UPDATE ON public.quests
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.gradebook_on_quests('id');
+    CREATE TRIGGER gradebook_quests_delete AFTER DELETE ON public.quests REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.gradebook_on_quests('id');
+
+    CREATE TRIGGER gradebook_items_insert AFTER INSERT ON public.quest_items REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.gradebook_on_quests('quest_id');
+    CREATE TRIGGER gradebook_items_update AFTER UPDATE ON public.quest_items
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.gradebook_on_quests('quest_id');
+    CREATE TRIGGER gradebook_items_delete AFTER DELETE ON public.quest_items REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION public.gradebook_on_quests('quest_id');
+
+    CREATE TRIGGER gradebook_groups AFTER INSERT OR UPDATE OR DELETE ON public.groups
+        FOR EACH ROW EXECUTE FUNCTION public.gradebook_on_groups();
+
+    TRUNCATE public.gradebook;
+    INSERT INTO public.gradebook SELECT * FROM public.gradebook_rows(NULL, NULL) ON CONFLICT DO NOTHING;
+"""
+
+# Row-level change notifications (data/notifications.py): one NOTIFY ta_changes per statement with the
+# table, the operation and the key of the changed rows. TG_ARGV[0] is the key column: the students of
+# observed_behaviours are sent, the views show the latest behaviour in the student row.
+# The payload of a NOTIFY is limited to 8000 bytes: the keys are sent in chunks of 200, a statement that
+# changes more than 2000 rows sends "ids": null (the listeners reload).
+CHANGE_NOTIFICATIONS = """
+    CREATE OR REPLACE FUNCTION public.notify_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+    DECLARE
+        ids jsonb;
+        total integer;
+        chunk constant integer := 200;
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            EXECUTE format('SELECT jsonb_agg(DISTINCT %I) FROM new_rows', TG_ARGV[0]) INTO ids;
+        ELSIF TG_OP = 'DELETE' THEN
+            EXECUTE format('SELECT jsonb_agg(DISTINCT %I) FROM old_rows', TG_ARGV[0]) INTO ids;
+        ELSE
+            EXECUTE format('SELECT jsonb_agg(id) FROM (SELECT %1$I AS id FROM new_rows UNION SELECT %1$I FROM old_rows) t',
+                           TG_ARGV[0]) INTO ids;
+        END IF;
+
+        IF ids IS NULL THEN RETURN NULL; END IF;
+
+        total := jsonb_array_length(ids);
+
+        IF total > 10 * chunk THEN
+            PERFORM pg_notify('ta_changes', jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'key', TG_ARGV[0],
+                                                               'pid', pg_backend_pid(), 'ids', NULL)::text);
+            RETURN NULL;
+        END IF;
+
+        FOR i IN 0 .. (total - 1) / chunk LOOP
+            PERFORM pg_notify('ta_changes', jsonb_build_object('table', TG_TABLE_NAME, 'op', TG_OP, 'key', TG_ARGV[0],
+                              'pid', pg_backend_pid(),
+                              'ids', (SELECT jsonb_agg(e) FROM jsonb_array_elements(ids) WITH ORDINALITY AS a(e, n)
+                                      WHERE n > i * chunk AND n <= (i + 1) * chunk))::text);
+        END LOOP;
+
+        RETURN NULL;
+    END;
+    $$;
+
+    DO $$
+    DECLARE
+        t record;
+    BEGIN
+        FOR t IN SELECT * FROM (VALUES ('personal_info', 'id'), ('observed_behaviours', 'student_id'),
+                                       ('groups', 'id'), ('educational_resources', 'id')) AS v(tab, key) LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS notify_insert ON public.%I', t.tab);
+            EXECUTE format('DROP TRIGGER IF EXISTS notify_update ON public.%I', t.tab);
+            EXECUTE format('DROP TRIGGER IF EXISTS notify_delete ON public.%I', t.tab);
+
+            EXECUTE format('CREATE TRIGGER notify_insert AFTER INSERT ON public.%I REFERENCING NEW TABLE AS new_rows '
+                           'FOR EACH STATEMENT EXECUTE FUNCTION public.notify_changes(%L)', t.tab, t.key);
+            EXECUTE format('CREATE TRIGGER notify_update AFTER UPDATE ON public.%I '
+                           'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                           'FOR EACH STATEMENT EXECUTE FUNCTION public.notify_changes(%L)', t.tab, t.key);
+            EXECUTE format('CREATE TRIGGER notify_delete AFTER DELETE ON public.%I REFERENCING OLD TABLE AS old_rows '
+                           'FOR EACH STATEMENT EXECUTE FUNCTION public.notify_changes(%L)', t.tab, t.key);
+        END LOOP;
+    END;
+    $$;
+"""
+
+# Time of the last change of a row, read by the incremental backups (data/backup_scheduler.py).
+# The existing rows get the time of the migration (now() is stable: no table rewrite). An UPDATE that
+# changes nothing does not touch the row.
+UPDATED_AT_COLUMNS = """
+    CREATE OR REPLACE FUNCTION public.touch_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        NEW.updated_at_ := now();
+        RETURN NEW;
+    END;
+    $$;
+
+    DO $$
+    DECLARE
+        tab text;
+    BEGIN
+        FOREACH tab IN ARRAY ARRAY['academic_years', 'educational_resources', 'groups', 'observed_behaviours',
+                                   'personal_info', 'quests'] LOOP
+            EXECUTE format('ALTER TABLE public.%I ADD COLUMN IF NOT EXISTS updated_at_ timestamp with time zone '
+                           'NOT NULL DEFAULT now()', tab);
+            EXECUTE format('DROP TRIGGER IF EXISTS touch_updated_at ON public.%I', tab);
+            EXECUTE format('CREATE TRIGGER touch_updated_at BEFORE UPDATE ON public.%I '
+                           'FOR EACH ROW WHEN (OLD.* IS DISTINCT FROM NEW.*) '
+                           'EXECUTE FUNCTION public.touch_updated_at()', tab);
+        END LOOP;
+    END;
+    $$;
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: list = field(default_factory=list)
+    # True: every statement runs in autocommit mode (CREATE INDEX CONCURRENTLY)
+    concurrent: bool = False
+
+
+MIGRATIONS = [
+    Migration(1, 'baseline schema', [BASELINE_SCHEMA]),
+
+    Migration(2, 'quests application columns', [QUESTS_APPLICATION_COLUMNS]),
+
+    # Indexes of the hot queries (data/queries.py)
+    Migration(3, 'performance indexes', [
+        # resource search: ORDER BY score_ DESC NULLS LAST, Id DESC
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_edu_score ON public.educational_resources (score_ DESC NULLS LAST, id DESC);',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_edu_source ON public.educational_resources (source_);',
+        # quests_by_student: WHERE student_id = $1 ORDER BY assign_date_ DESC
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quests_student ON public.quests (student_id, assign_date_ DESC);',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quests_deadline ON public.quests (deadline_);',
+        # behaviours_by_student and the last behaviour of the student list
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_behaviours_student_date ON public.observed_behaviours (student_id, date_time_ DESC);',
+    ], concurrent=True),
+
+    # Newest behaviour of each student (LATERAL ... ORDER BY date_time_ DESC, id DESC LIMIT 1),
+    # id is part of the key so a timestamp tie is still answered from the index
+    Migration(4, 'latest behaviour index', [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_behaviours_student_latest '
+        'ON public.observed_behaviours (student_id, date_time_ DESC, id DESC);',
+        'DROP INDEX CONCURRENTLY IF EXISTS public.idx_behaviours_student_date;',
+    ], concurrent=True),
+
+    Migration(5, 'quest items', [QUEST_ITEMS]),
+
+    Migration(6, 'item statistics', [ITEM_STATISTICS]),
+
+    Migration(7, 'gradebook', [GRADEBOOK]),
+
+    Migration(8, 'change notifications', [CHANGE_NOTIFICATIONS]),
+
+    Migration(9, 'updated-at columns', [UPDATED_AT_COLUMNS]),
+
+    # The rows changed since the last full backup: WHERE updated_at_ > $1
+    Migration(10, 'updated-at indexes', [
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_personal_info_updated ON public.personal_info (updated_at_);',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_behaviours_updated ON public.observed_behaviours (updated_at_);',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_quests_updated ON public.quests (updated_at_);',
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_edu_updated ON public.educational_resources (updated_at_);',
+    ], concurrent=True),
+
+    # idx_edu_source (migration 3) serves no query: the resource search is a '%text%' ILIKE over source_,
+    # content_, metadata_ and the id (OR), a btree can not answer a leading wildcard. The index only
+    # slowed down the writes of the resources.
+    Migration(11, 'drop unused source index', [
+        'DROP INDEX CONCURRENTLY IF EXISTS public.idx_edu_source;',
+    ], concurrent=True),
+]
+
+
+def current_version(conn:connection) -> int:
+    """ Highest applied migration version, 0 for a database without schema_version. """
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.schema_version');")
+        if cur.fetchone()[0] is None: return 0
+
+        cur.execute('SELECT COALESCE(MAX(version), 0) FROM public.schema_version;')
+        return cur.fetchone()[0]
+
+
+def pending_migrations(conn:connection) -> list:
+    version = current_version(conn)
+    conn.rollback()
+    return [m for m in MIGRATIONS if m.version > version]
+
+
+def _drop_invalid_indexes(cur, migration:Migration):
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind, IF NOT EXISTS would skip it.
+    # Only the indexes of this step: an index that another session is building is invalid as well
+    names = [name for statement in migration.statements for name in _CREATED_INDEX.findall(statement)]
+    if not names: return
+
+    cur.execute("""SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                   JOIN pg_namespace n ON n.oid = c.relnamespace
+                   WHERE NOT i.indisvalid AND n.nspname = 'public' AND c.relname = ANY(%s);""", (names,))
+
+    for (name,) in cur.fetchall():
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS public."{name}";')
+
+
+def _lock(cur) -> bool:
+    deadline = time.monotonic() + LOCK_TIMEOUT
+
+    while True:
+        cur.execute('SELECT pg_try_advisory_lock(%s);', (MIGRATION_LOCK,))
+        if cur.fetchone()[0]: return True
+        if time.monotonic() > deadline: return False
+        time.sleep(0.5)
+
+
+def _apply(conn:connection, migration:Migration):
+
+    if migration.concurrent:
+        conn.autocommit = True
+
+        with conn.cursor() as cur:
+            _drop_invalid_indexes(cur, migration)
+
+            for statement in migration.statements: cur.execute(statement)
+
+            cur.execute('INSERT INTO public.schema_version (version, description) VALUES (%s, %s);',
+                        (migration.version, migration.description))
+    else:
+        conn.autocommit = False
+
+        with conn.cursor() as cur:
+            for statement in migration.statements: cur.execute(statement)
+
+            cur.execute('INSERT INTO public.schema_version (version, description) VALUES (%s, %s);',
+                        (migration.version, migration.description))
+        conn.commit()
+
+
+def migrate(conn:connection, target:int=None):
+    """
+    Applies the pending migrations up to `target` (default: the latest).<br>
+    Returns (status, message), the autocommit mode of the connection is restored.
+    """
+    autocommit = conn.autocommit
+    applied = []
+    locked = False
+
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            # Waits for a client that is migrating now, the version is read after the lock (its steps are done)
+            locked = _lock(cur)
+            if not locked: return False, 'Database migration stopped: another workstation is still upgrading the schema.'
+
+            cur.execute(SCHEMA_VERSION_TABLE)
+
+        conn.autocommit = False
+
+        for migration in pending_migrations(conn):
+            if target is not None and migration.version > target: break
+
+            _apply(conn, migration)
+            applied.append(migration.version)
+
+        if not applied: return True, f'Database schema is up to date (version {current_version(conn)}).'
+
+        return True, f'Database schema upgraded to version {applied[-1]} (applied: {", ".join(map(str, applied))}).'
+
+    except (Exception, Error) as error:
+        if not conn.autocommit: conn.rollback()
+        done = f' after version {applied[-1]}' if applied else ''
+        return False, f'Database migration stopped{done}: {error}'
+
+    finally:
+        if not conn.autocommit: conn.rollback()
+
+        if locked:
+            try:
+                conn.autocommit = True
+                with conn.cursor() as cur: cur.execute('SELECT pg_advisory_unlock(%s);', (MIGRATION_LOCK,))
+            except Error:
+                # A lost connection released the lock with its session
+                pass
+
+        conn.autocommit = autocommit
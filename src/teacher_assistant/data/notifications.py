@@ -0,0 +1,188 @@
+# teacher_assistant/data/notifications.py
+# ###################################################################################################
+#                                     CHANGE NOTIFICATIONS                                          #
+# ###################################################################################################
+# Several workstations (teachers of one department) share one database. The triggers of migration 8 #
+# send NOTIFY ta_changes after every statement on personal_info, observed_behaviours, groups and     #
+# educational_resources, the payload is a JSON object:                                              #
+#                                                                                                   #
+#     {"table": "personal_info", "op": "UPDATE", "key": "id", "pid": 4711, "ids": ["1001", ...]}    #
+#                                                                                                   #
+# `ids` are the values of the key column of the changed rows (the student of a behaviour), null     #
+# when the statement changed too many rows: the views reload. `pid` is the backend of the writer.   #
+#                                                                                                   #
+# ChangeListener is a QThread with a connection of its own, it waits on the socket of the           #
+# connection (LISTEN ta_changes) and passes every notification to `change_hub` on the GUI thread.   #
+# The hub drops the cached regions of the table (data/cache.py) and emits `changed(Change)`: the    #
+# open pages re-read only the rows in `ids` and apply them to their models.                         #
+# `Change.local` is True for the writes of this instance, the page that wrote them is up to date:   #
+# every session of the instance that writes (the GUI connection, the worker clones of async_db.py,  #
+# the sync connection of the replica) registers its server pid with change_hub.add_session().       #
+#                                                                                                   #
+# After a lost connection the thread reconnects and the hub emits `resync`: the notifications sent  #
+# in the meantime are lost, the pages reload.                                                       #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     listener = start_listener(app_context.database, app_context.cache)                            #
+#     change_hub.changed.connect(self.on_table_changed)                                             #
+#####################################################################################################
+
+import json
+import select
+from dataclasses import dataclass
+
+from PySide6.QtCore import QObject, QThread, Signal, Slot
+from psycopg2 import Error
+
+from data.cache import GROUPS, RESOURCES, ROSTER
+
+CHANNEL = 'ta_changes'
+
+# Cached regions read from each notified table
+TABLE_REGIONS = {
+    'personal_info': (ROSTER,),
+    'observed_behaviours': (ROSTER,),
+    'groups': (GROUPS,),
+    'educational_resources': (RESOURCES,),
+}
+
+
+@dataclass
+class Change:
+    table: str
+    op: str
+    key: str
+    # None: too many rows, reload everything of the table
+    ids: list
+    pid: int = 0
+    local: bool = False
+
+
+def parse_change(payload:str):
+    """ Change of a ta_changes payload, None for a payload it does not understand. """
+    try:
+        data = json.loads(payload)
+        return Change(data['table'], data['op'], data.get('key', 'id'), data.get('ids'), int(data.get('pid') or 0))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class ChangeHub(QObject):
+    """ Lives on the GUI thread, the pages connect to its signals whether a listener runs or not. """
+    changed = Signal(object)    # Change
+    resync = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.cache = None
+        # Server pids of the open sessions of this instance. The sessions register from their own
+        # threads: add / discard / in of a set are atomic
+        self.local_pids = set()
+
+    def add_session(self, connection) -> int:
+        """ The writes of `connection` are local from now on, returns its pid for remove_session(). """
+        pid = connection.get_backend_pid()
+        self.local_pids.add(pid)
+        return pid
+
+    def remove_session(self, pid:int):
+        """ Called when the session closes, the server may give its pid to a session of another workstation. """
+        self.local_pids.discard(pid)
+
+    @Slot(object)
+    def dispatch(self, change:Change):
+
+        change.local = change.pid in self.local_pids
+
+        # The writes of this instance already invalidated the cache (services)
+        if self.cache and not change.local:
+            self.cache.invalidate(*TABLE_REGIONS.get(change.table, ()), publish=False)
+
+        self.changed.emit(change)
+
+    @Slot()
+    def reconnected(self):
+        if self.cache: self.cache.clear()
+        self.resync.emit()
+
+
+change_hub = ChangeHub()
+
+
+class ChangeListener(QThread):
+
+    received = Signal(object)   # Change, queued to the hub
+    reconnected = Signal()
+
+    # Seconds between two checks of the stop request, and before a reconnect
+    POLL_INTERVAL = 0.5
+    RETRY_INTERVAL = 5.0
+
+    def __init__(self, database, parent=None):
+        super().__init__(parent)
+
+        self.database = database
+
+    def _listen(self):
+        connection = self.database.open_connection()
+        # LISTEN takes effect at commit, autocommit delivers the notifications as soon as they arrive
+        connection.autocommit = True
+
+        with connection.cursor() as cur: cur.execute(f'LISTEN {CHANNEL};')
+
+        return connection
+
+    def _sleep(self, seconds:float):
+        waited = 0.0
+        while waited < seconds and not self.isInterruptionRequested():
+            self.msleep(int(self.POLL_INTERVAL * 1000))
+            waited += self.POLL_INTERVAL
+
+    def run(self):
+        connection = None
+        lost = False
+
+        while not self.isInterruptionRequested():
+            try:
+                if connection is None:
+                    connection = self._listen()
+                    if lost: self.reconnected.emit()
+                    lost = False
+
+                # Waits on the socket, no query runs while nothing changes
+                if select.select([connection], [], [], self.POLL_INTERVAL) == ([], [], []): continue
+
+                connection.poll()
+
+                while connection.notifies:
+                    change = parse_change(connection.notifies.pop(0).payload)
+                    if change: self.received.emit(change)
+
+            except (Error, OSError) as e:
+                print(f'Change listener: {e}')
+
+                if connection is not None and not connection.closed: connection.close()
+                connection = None
+                lost = True
+
+                self._sleep(self.RETRY_INTERVAL)
+
+        if connection is not None and not connection.closed: connection.close()
+
+    def stop(self):
+        self.requestInterruption()
+        self.wait()
+
+
+def start_listener(database, cache=None) -> ChangeListener:
+    """ Starts a ChangeListener that feeds `change_hub`, stop it with listener.stop(). """
+    change_hub.cache = cache
+
+    listener = ChangeListener(database)
+    # Queued connections: the slots run on the GUI thread
+    listener.received.connect(change_hub.dispatch)
+    listener.reconnected.connect(change_hub.reconnected)
+    listener.start()
+
+    return listener
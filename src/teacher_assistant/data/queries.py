@@ -0,0 +1,266 @@
+# teacher_assistant/data/queries.py
+# ###################################################################################################
+#                                      QUERY CATALOG                                                #
+# ###################################################################################################
+# Named, parameterized statements used by the pages and services. Every statement is written with   #
+# PostgreSQL positional parameters ($1, $2, ...) so it can be PREPAREd once per connection and then #
+# executed by name. The statement text never changes between calls, the server reuses the plan and  #
+# the values (Persian text included) are always passed as parameters, never quoted into the SQL.    #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     app_context.database.fetchall_named('behaviours_by_student', (student_id,))                   #
+#####################################################################################################
+
+import re
+
+# Student list of the StudentListPage: personal info with the newest observed behaviour of each student.
+# LATERAL ... LIMIT 1 reads one row per student from idx_behaviours_student_latest
+# (student_id, date_time_ DESC, id DESC) instead of aggregating the whole table, id breaks timestamp ties.
+_STUDENT_LIST = (
+    'SELECT t1.Id, t1.fname_, t1.lname_, t1.phone_, t1.address_, t1.photo_, '
+    't2.date_time_, t2.observed_behaviour_, t1.parent_name_, t1.parent_phone_, '
+    't1.metadata_, t1.birth_date_, t1.gender_ '
+    'FROM personal_info t1 '
+    'LEFT JOIN LATERAL ('
+    '  SELECT b.date_time_, b.observed_behaviour_ FROM observed_behaviours b '
+    '  WHERE b.student_id = t1.id '
+    '  ORDER BY b.date_time_ DESC, b.id DESC LIMIT 1'
+    ') t2 ON true '
+)
+
+QUERIES = {
+    # ------------------------------------------------------------------ personal_info
+    'students_all':
+        _STUDENT_LIST + 'ORDER BY t1.fname_, t1.lname_, t1.Id',
+
+    # $1: list of student ids (members of a group)
+    'students_by_ids':
+        _STUDENT_LIST + 'WHERE t1.id = ANY($1::text[]) ORDER BY t1.fname_, t1.lname_, t1.Id',
+
+    # ------------------------------------------------------------------ groups
+    'groups_all':
+        'SELECT id, grade_, book_, title_, events_, members_, description_ FROM groups ORDER BY id',
+
+    # ------------------------------------------------------------------ observed_behaviours
+    'behaviours_by_student':
+        'SELECT Id, date_time_, observed_behaviour_, analysis_ FROM observed_behaviours '
+        'WHERE student_id = $1 ORDER BY date_time_ DESC',
+
+    # ------------------------------------------------------------------ educational_resources
+    'resource_answer_and_metadata':
+        'SELECT answer_, metadata_ FROM educational_resources WHERE Id = $1',
+
+    'resource_by_id':
+        'SELECT Id, source_, score_, content_, answer_, metadata_ FROM educational_resources WHERE Id = $1',
+
+    'resource_next':
+        'SELECT Id, source_, score_, content_, answer_, metadata_ FROM educational_resources '
+        'WHERE Id > $1 ORDER BY Id ASC LIMIT 1',
+
+    'resource_previous':
+        'SELECT Id, source_, score_, content_, answer_, metadata_ FROM educational_resources '
+        'WHERE Id < $1 ORDER BY Id DESC LIMIT 1',
+
+    'resource_first':
+        'SELECT Id, source_, score_, content_, answer_, metadata_ FROM educational_resources '
+        'WHERE Id > 0 ORDER BY Id ASC LIMIT 1',
+
+    'update_resource_metadata':
+        'UPDATE educational_resources SET metadata_ = $1 WHERE Id = $2',
+
+    'update_resource_source':
+        'UPDATE educational_resources SET source_ = $1 WHERE Id = $2',
+
+    'update_resource_score':
+        'UPDATE educational_resources SET score_ = $1 WHERE Id = $2',
+
+    'update_resource_answer':
+        'UPDATE educational_resources SET answer_ = $1 WHERE Id = $2',
+
+    'delete_resource':
+        'DELETE FROM educational_resources WHERE Id = $1',
+
+    # $1: the search text wrapped in '%', e.g. '%fraction%'
+    'search_resources':
+        'SELECT Id, source_, content_, score_, metadata_ FROM educational_resources '
+        'WHERE source_ ILIKE $1 OR content_ ILIKE $1 OR metadata_ ILIKE $1 OR TEXT(Id) ILIKE $1 '
+        'ORDER BY score_ DESC NULLS LAST, Id DESC',
+
+    # search_resources restricted to the rows of a change notification, $2: list of resource ids
+    'search_resources_by_ids':
+        'SELECT Id, source_, content_, score_, metadata_ FROM educational_resources '
+        'WHERE Id = ANY($2::bigint[]) AND (source_ ILIKE $1 OR content_ ILIKE $1 OR metadata_ ILIKE $1 OR TEXT(Id) ILIKE $1) '
+        'ORDER BY score_ DESC NULLS LAST, Id DESC',
+
+    # $1: list of resource ids, the rows keep the order of the list
+    'resources_content_by_ids':
+        'SELECT content_, score_ FROM educational_resources WHERE id = ANY($1::bigint[]) '
+        'ORDER BY array_position($1::bigint[], id)',
+
+    # ------------------------------------------------------------------ quests
+    # The 9th column is the earned score of the quest summed from quest_items
+    'quests_by_student':
+        'SELECT q.id, q.qb_ids_, q.total_score_, q.scores_, q.assign_date_, q.deadline_, q.reply_date_, q.configs_, '
+        '       COALESCE((SELECT SUM(qi.earned_score) FROM quest_items qi WHERE qi.quest_id = q.id), 0) '
+        'FROM quests q WHERE q.student_id = $1 ORDER BY q.assign_date_ DESC',
+
+    # The 2nd column is the array of the earned scores in question order
+    'quest_answers':
+        'SELECT q.responses_, '
+        '       ARRAY(SELECT qi.earned_score FROM quest_items qi WHERE qi.quest_id = q.id ORDER BY qi.position), '
+        '       q.feedback_ '
+        'FROM quests q WHERE q.id = $1',
+
+    # Questions of a quest in the assigned order, with the score they had when the quest was assigned
+    'quest_item_contents':
+        'SELECT r.content_, COALESCE(qi.max_score, r.score_) FROM quest_items qi '
+        'JOIN educational_resources r ON r.id = qi.resource_id '
+        'WHERE qi.quest_id = $1 ORDER BY qi.position',
+
+    # $1 student, $2 resource ids, $3 their scores, $4 assign date, $5 deadline, $6 configs (json).
+    # One statement: the quest and its items are inserted atomically, qb_ids_ / total_score_ are kept for older readers.
+    'assign_quest':
+        'WITH q AS ('
+        '  INSERT INTO quests (student_id, qb_ids_, total_score_, assign_date_, deadline_, configs_) '
+        "  SELECT $1, array_to_string($2::bigint[], '-'), (SELECT SUM(s) FROM unnest($3::real[]) s), "
+        '         $4::timestamp, $5::timestamp, $6::jsonb '
+        '  RETURNING id) '
+        'INSERT INTO quest_items (quest_id, position, resource_id, max_score) '
+        'SELECT q.id, i.ord, i.rid, i.score FROM q, unnest($2::bigint[], $3::real[]) WITH ORDINALITY AS i(rid, score, ord)',
+
+    # $1 student, $2 resource id, $3 max score, $4 earned score, $5 assign date, $6 deadline, $7 reply date,
+    # $8 response, $9 feedback. A single-item quest entered by hand (custom assignment).
+    'insert_custom_quest':
+        'WITH q AS ('
+        '  INSERT INTO quests (student_id, qb_ids_, total_score_, scores_, assign_date_, deadline_, reply_date_, '
+        '                      configs_, responses_, feedback_) '
+        "  VALUES ($1, $2::bigint::text, $3::real, $4::real::text, $5, $6, $7, '{\"Template\": \"Custom\"}'::jsonb, $8, $9) "
+        '  RETURNING id) '
+        'INSERT INTO quest_items (quest_id, position, resource_id, max_score, earned_score) '
+        'SELECT q.id, 1, $2::bigint, $3::real, $4::real FROM q',
+
+    # $1 reply date, $2 feedback, $3 scores in question order, $4 responses, $5 quest id.
+    # A question without a score stays NULL in quest_items and an empty field in scores_.
+    'save_quest_answers':
+        'WITH items AS ('
+        '  UPDATE quest_items qi SET earned_score = s.score '
+        '  FROM unnest($3::real[]) WITH ORDINALITY AS s(score, ord) '
+        '  WHERE qi.quest_id = $5 AND qi.position = s.ord) '
+        'UPDATE quests SET reply_date_ = $1, feedback_ = $2, '
+        "       scores_ = array_to_string($3::real[], '-', ''), responses_ = $4 "
+        'WHERE id = $5',
+
+    # Per-question statistics of a class: $1 the student ids of the class
+    'class_item_statistics':
+        'SELECT qi.resource_id, COUNT(*), COUNT(qi.earned_score), AVG(qi.earned_score), '
+        '       AVG(qi.earned_score / NULLIF(qi.max_score, 0)) '
+        'FROM quests q JOIN quest_items qi ON qi.quest_id = q.id '
+        'WHERE q.student_id = ANY($1::text[]) '
+        'GROUP BY qi.resource_id ORDER BY qi.resource_id',
+
+    # ------------------------------------------------------------------ gradebook
+    # The whole gradebook of a group (maintained by the triggers of migration 7), students in name order
+    'gradebook_by_group':
+        'SELECT g.student_id, p.fname_, p.lname_, g.quest_id, g.title_, g.assign_date_, g.deadline_, g.reply_date_, '
+        '       g.total_score_, g.earned_score_ '
+        'FROM gradebook g JOIN personal_info p ON p.id = g.student_id '
+        'WHERE g.group_id = $1 ORDER BY p.lname_, p.fname_, g.student_id, g.assign_date_',
+
+    'gradebook_groups':
+        'SELECT id, title_, grade_, book_ FROM groups ORDER BY grade_, title_',
+
+    # ------------------------------------------------------------------ item analysis
+    # Score matrix of the item analysis: the last attempt of each student on each question.
+    # $1 the student ids of a group
+    'item_scores_by_students':
+        'SELECT DISTINCT ON (q.student_id, qi.resource_id) q.student_id, qi.resource_id, qi.earned_score, qi.max_score '
+        'FROM quests q JOIN quest_items qi ON qi.quest_id = q.id '
+        'WHERE q.student_id = ANY($1::text[]) AND q.reply_date_ IS NOT NULL '
+        'ORDER BY q.student_id, qi.resource_id, q.assign_date_ DESC, q.id DESC',
+
+    # $1 the quest ids of one assessment (the quests assigned together)
+    'item_scores_by_quests':
+        'SELECT DISTINCT ON (q.student_id, qi.resource_id) q.student_id, qi.resource_id, qi.earned_score, qi.max_score '
+        'FROM quests q JOIN quest_items qi ON qi.quest_id = q.id '
+        'WHERE q.id = ANY($1::bigint[]) AND q.reply_date_ IS NOT NULL '
+        'ORDER BY q.student_id, qi.resource_id, q.assign_date_ DESC, q.id DESC',
+
+    # $1 scope, $2 students, $3 items, $4 alpha, $5 mean %, $6 stdev %, $7 distribution (json)
+    'save_item_analysis_run':
+        'INSERT INTO item_analysis_runs (scope, students, items, cronbach_alpha, mean_percent, stdev_percent, distribution) '
+        'VALUES ($1, $2, $3, $4, $5, $6, $7::jsonb) '
+        'ON CONFLICT (scope) DO UPDATE SET computed_at = now(), students = EXCLUDED.students, items = EXCLUDED.items, '
+        '    cronbach_alpha = EXCLUDED.cronbach_alpha, mean_percent = EXCLUDED.mean_percent, '
+        '    stdev_percent = EXCLUDED.stdev_percent, distribution = EXCLUDED.distribution',
+
+    # $1 scope, $2.. one array per column: all rows of the run in one statement,
+    # the questions that are no longer part of the scope are removed
+    'save_item_statistics':
+        'WITH removed AS (DELETE FROM item_statistics WHERE scope = $1 AND resource_id <> ALL($2::bigint[])) '
+        'INSERT INTO item_statistics (scope, resource_id, responses, max_score, mean_score, difficulty, '
+        '                             discrimination, point_biserial, alpha_if_deleted, distribution) '
+        'SELECT $1, s.rid, s.n, s.max, s.mean, s.difficulty, s.discrimination, s.pb, s.alpha, s.dist::jsonb '
+        'FROM unnest($2::bigint[], $3::integer[], $4::real[], $5::real[], $6::real[], $7::real[], $8::real[], '
+        '            $9::real[], $10::text[]) AS s(rid, n, max, mean, difficulty, discrimination, pb, alpha, dist) '
+        'ON CONFLICT (scope, resource_id) DO UPDATE SET responses = EXCLUDED.responses, '
+        '    max_score = EXCLUDED.max_score, mean_score = EXCLUDED.mean_score, difficulty = EXCLUDED.difficulty, '
+        '    discrimination = EXCLUDED.discrimination, point_biserial = EXCLUDED.point_biserial, '
+        '    alpha_if_deleted = EXCLUDED.alpha_if_deleted, distribution = EXCLUDED.distribution',
+
+    'item_statistics_by_scope':
+        'SELECT s.resource_id, r.source_, s.responses, s.max_score, s.mean_score, s.difficulty, s.discrimination, '
+        '       s.point_biserial, s.alpha_if_deleted, s.distribution '
+        'FROM item_statistics s LEFT JOIN educational_resources r ON r.id = s.resource_id '
+        'WHERE s.scope = $1 ORDER BY s.discrimination NULLS LAST, s.resource_id',
+
+    'delete_quest':
+        'DELETE FROM quests WHERE id = $1',
+
+    # ------------------------------------------------------------------ personal_info
+    'delete_personal_info':
+        'DELETE FROM personal_info WHERE id = $1',
+
+    # ------------------------------------------------------------------ catalog
+    'table_columns':
+        'SELECT column_name FROM information_schema.columns WHERE table_name = $1 ORDER BY ordinal_position',
+}
+
+# Columns of educational_resources that EduItemViewModel.update_value() is allowed to change.
+# The column name can not be a parameter, so each column has its own prepared statement.
+RESOURCE_COLUMN_UPDATES = {
+    'metadata_': 'update_resource_metadata',
+    'source_'  : 'update_resource_source',
+    'score_'   : 'update_resource_score',
+    'answer_'  : 'update_resource_answer',
+}
+
+_PARAM_PATTERN = re.compile(r'\$(\d+)')
+
+
+def get_query(name: str) -> str:
+    """ Returns the statement text registered under `name`. """
+    try:
+        return QUERIES[name]
+    except KeyError:
+        raise KeyError(f'Unknown query name: "{name}".') from None
+
+
+def param_count(name: str) -> int:
+    """ Number of positional parameters ($n) the statement expects. """
+    numbers = [int(n) for n in _PARAM_PATTERN.findall(get_query(name))]
+    return max(numbers) if numbers else 0
+
+
+def prepare_statement(name: str) -> str:
+    """ Builds the `PREPARE` command of a named statement. """
+    return f'PREPARE {name} AS {get_query(name)}'
+
+
+def execute_statement(name: str) -> str:
+    """ Builds the `EXECUTE` command of a prepared statement with psycopg2 placeholders. """
+    count = param_count(name)
+
+    if count == 0: return f'EXECUTE {name}'
+
+    return f'EXECUTE {name} ({", ".join(["%s"] * count)})'
+
@@ -0,0 +1,489 @@
+# teacher_assistant/data/replica.py
+# ###################################################################################################
+#                                     OFFLINE LOCAL REPLICA                                         #
+# ###################################################################################################
+# An optional SQLite copy of the read-mostly data, for classrooms with a slow or unreliable link to #
+# the school server:                                                                                #
+#                                                                                                   #
+#   personal_info          without the photos (a small thumbnail instead) and with the latest      #
+#                          observed behaviour of each student (the columns of the student list)    #
+#   groups                 all columns                                                              #
+#   educational_resources  the metadata (source, score, metadata, answer), not the content          #
+#   quests                 the quests assigned in the last `recent_days` days, with the earned sum  #
+#                                                                                                   #
+# Reads: psycopg2_database routes the named statements of LOCAL_QUERIES to the replica. A statement #
+# is answered locally once the replica was synced and none of its tables has a pending write of    #
+# this instance (read-your-writes: the server answers until the next sync brought the write back). #
+# The statements over partial data (quests_by_student: recent quests only) are answered locally     #
+# only while the server is unreachable.                                                             #
+#                                                                                                   #
+# Writes: always sent to the server. A named write that fails because the server is unreachable is #
+# kept in the outbox table (write-behind) and replayed in order by ReplicaSyncWorker when the       #
+# server is back. A replayed write that the server rejects stays in the outbox with its error.      #
+#                                                                                                   #
+# ReplicaSyncWorker (QThread) pushes the outbox and pulls the tables every `interval` seconds, and  #
+# at once after a local write. Its connection is a connection of its own.                           #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     path = os.path.join(app_context.appdata_path, 'replica-school.sqlite3')                       #
+#     worker = start_replica(app_context.database, path, app_context.cache)                         #
+#     ...                                                                                           #
+#     worker.stop()                                                                                 #
+#####################################################################################################
+
+import base64
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QMutex, QThread, QWaitCondition, Qt, Signal
+from PySide6.QtGui import QImage
+from psycopg2 import Error, InterfaceError, OperationalError
+
+from data import queries
+from data.notifications import TABLE_REGIONS, change_hub
+
+# Errors of a lost or refused server connection (the other errors are errors of the statement)
+CONNECTION_ERRORS = (OperationalError, InterfaceError)
+
+THUMBNAIL_SIZE = (100, 130)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS personal_info (
+        id TEXT PRIMARY KEY, fname_ TEXT, lname_ TEXT, phone_ TEXT, address_ TEXT, thumbnail_ BLOB,
+        photo_md5_ TEXT, last_date_time_ TEXT, last_behaviour_ TEXT, parent_name_ TEXT, parent_phone_ TEXT,
+        metadata_ TEXT, birth_date_ TEXT, gender_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS groups (
+        id INTEGER PRIMARY KEY, grade_ INTEGER, book_ TEXT, title_ TEXT, events_ TEXT, members_ TEXT, description_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS educational_resources (
+        id INTEGER PRIMARY KEY, source_ TEXT, score_ REAL, metadata_ TEXT, answer_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS quests (
+        id INTEGER PRIMARY KEY, student_id TEXT, qb_ids_ TEXT, total_score_ REAL, scores_ TEXT, assign_date_ TEXT,
+        deadline_ TEXT, reply_date_ TEXT, configs_ TEXT, earned_score_ REAL);
+
+    CREATE INDEX IF NOT EXISTS idx_quests_student ON quests (student_id, assign_date_ DESC);
+
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, name_ TEXT NOT NULL, params_ TEXT NOT NULL, created_ TEXT NOT NULL,
+        error_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS sync_state (key_ TEXT PRIMARY KEY, value_ TEXT);
+"""
+
+
+@dataclass(frozen=True)
+class LocalQuery:
+    sql: str
+    # Tables the statement reads, a pending write to one of them sends the statement to the server
+    tables: tuple
+    # Column index -> converter of the stored text ('datetime', 'date', 'json')
+    converters: dict
+    # False: the replica holds a part of the rows, the statement is answered locally only offline
+    complete: bool = True
+    # Parameter indexes passed as a JSON array (= ANY($n) of the server statement)
+    array_params: tuple = ()
+
+
+_STUDENT_LIST = ('SELECT id, fname_, lname_, phone_, address_, thumbnail_, last_date_time_, last_behaviour_, '
+                 'parent_name_, parent_phone_, metadata_, birth_date_, gender_ FROM personal_info ')
+_STUDENT_CONVERTERS = {6: 'datetime', 11: 'date'}
+
+LOCAL_QUERIES = {
+    'students_all': LocalQuery(_STUDENT_LIST + 'ORDER BY fname_, lname_, id',
+                               ('personal_info', 'observed_behaviours'), _STUDENT_CONVERTERS),
+
+    'students_by_ids': LocalQuery(_STUDENT_LIST + 'WHERE id IN (SELECT value FROM json_each(?)) ORDER BY fname_, lname_, id',
+                                  ('personal_info', 'observed_behaviours'), _STUDENT_CONVERTERS, array_params=(0,)),
+
+    'groups_all': LocalQuery('SELECT id, grade_, book_, title_, events_, members_, description_ FROM groups ORDER BY id',
+                             ('groups',), {}),
+
+    'resource_answer_and_metadata': LocalQuery('SELECT answer_, metadata_ FROM educational_resources WHERE id = ?',
+                                               ('educational_resources',), {}),
+
+    'quests_by_student': LocalQuery('SELECT id, qb_ids_, total_score_, scores_, assign_date_, deadline_, reply_date_, '
+                                    'configs_, COALESCE(earned_score_, 0) FROM quests WHERE student_id = ? '
+                                    'ORDER BY assign_date_ DESC',
+                                    ('quests', 'quest_items'),
+                                    {4: 'datetime', 5: 'datetime', 6: 'datetime', 7: 'json'}, complete=False),
+}
+
+# Tables written by a statement: INSERT INTO x, UPDATE x, DELETE FROM x
+_WRITE_PATTERN = re.compile(r'\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(?:public\.)?"?(\w+)', re.IGNORECASE)
+
+# Server reads of the pull, plain SQL like data/export.py (they run once per sync on the worker connection)
+_PULL_STUDENTS = (
+    'SELECT p.id, p.fname_, p.lname_, p.phone_, p.address_, md5(p.photo_), t2.date_time_, t2.observed_behaviour_, '
+    '       p.parent_name_, p.parent_phone_, p.metadata_, p.birth_date_, p.gender_ '
+    'FROM personal_info p '
+    'LEFT JOIN LATERAL (SELECT b.date_time_, b.observed_behaviour_ FROM observed_behaviours b '
+    '                   WHERE b.student_id = p.id ORDER BY b.date_time_ DESC, b.id DESC LIMIT 1) t2 ON true')
+_PULL_PHOTOS = 'SELECT id, photo_ FROM personal_info WHERE id = ANY(%s)'
+_PULL_GROUPS = 'SELECT id, grade_, book_, title_, events_, members_, description_ FROM groups'
+_PULL_RESOURCES = 'SELECT id, source_, score_, metadata_, answer_ FROM educational_resources'
+_PULL_QUESTS = (
+    'SELECT q.id, q.student_id, q.qb_ids_, q.total_score_, q.scores_, q.assign_date_, q.deadline_, q.reply_date_, '
+    '       q.configs_, (SELECT SUM(qi.earned_score) FROM quest_items qi WHERE qi.quest_id = q.id) '
+    "FROM quests q WHERE q.assign_date_ >= now() - make_interval(days => %s)")
+
+
+def _to_text(value):
+    # Values stored by SQLite as text: ISO dates, JSON documents
+    if isinstance(value, (datetime, date)): return value.isoformat()
+    if isinstance(value, (dict, list)): return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _convert(value, kind:str):
+    if value is None: return None
+    if kind == 'datetime': return datetime.fromisoformat(value)
+    if kind == 'date': return date.fromisoformat(value)
+    if kind == 'json': return json.loads(value)
+    return value
+
+
+def _encode_param(value):
+    # The outbox keeps the parameters as JSON, the values JSON can not hold are tagged
+    if isinstance(value, datetime): return {'$datetime': value.isoformat()}
+    if isinstance(value, date): return {'$date': value.isoformat()}
+    if isinstance(value, (bytes, bytearray, memoryview)): return {'$bytes': base64.b64encode(bytes(value)).decode('ascii')}
+    if isinstance(value, (list, tuple)): return [_encode_param(item) for item in value]
+    return value
+
+
+def _decode_param(value):
+    if isinstance(value, list): return [_decode_param(item) for item in value]
+    if isinstance(value, dict) and len(value) == 1:
+        (tag, text), = value.items()
+        if tag == '$datetime': return datetime.fromisoformat(text)
+        if tag == '$date': return date.fromisoformat(text)
+        if tag == '$bytes': return base64.b64decode(text)
+    return value
+
+
+def make_thumbnail(photo:bytes):
+    """ PNG bytes of the photo scaled into THUMBNAIL_SIZE, None when it is not an image. """
+    image = QImage()
+    if not photo or not image.loadFromData(bytes(photo)): return None
+
+    image = image.scaled(*THUMBNAIL_SIZE, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, 'PNG')
+
+    return bytes(data)
+
+
+class LocalReplica:
+
+    def __init__(self, path:str, recent_days:int=120):
+        self.path = path
+        self.recent_days = recent_days
+
+        # The GUI thread reads while the worker writes: one connection, serialized by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL;')
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self._lock = threading.RLock()
+
+        # table -> sequence number of the last local write that a sync has not brought back yet
+        self._pending = {}
+        self._write_sequence = 0
+
+        # Set by psycopg2_database after a connection error, cleared by the worker after a successful sync
+        self.offline = False
+        # Woken by the local writes: the worker syncs at once
+        self.wake = None
+
+    # ---------------------------------------------------------------- state
+    def _state(self, key:str, default=None):
+        row = self.connection.execute('SELECT value_ FROM sync_state WHERE key_ = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_state(self, key:str, value):
+        self.connection.execute('INSERT INTO sync_state (key_, value_) VALUES (?, ?) '
+                                'ON CONFLICT (key_) DO UPDATE SET value_ = excluded.value_', (key, str(value)))
+
+    @property
+    def last_sync(self):
+        with self._lock: value = self._state('last_sync')
+        return datetime.fromisoformat(value) if value else None
+
+    def pending_writes(self) -> int:
+        with self._lock: return self.connection.execute('SELECT count(*) FROM outbox').fetchone()[0]
+
+    def failed_writes(self) -> list:
+        """ (id, name, error) of the queued writes the server rejected. """
+        with self._lock:
+            return self.connection.execute('SELECT id, name_, error_ FROM outbox WHERE error_ IS NOT NULL ORDER BY id').fetchall()
+
+    # ---------------------------------------------------------------- reads
+    def serves(self, name:str) -> bool:
+        """ True when the named statement is answered by the replica now (see the module header). """
+        local = LOCAL_QUERIES.get(name)
+        if local is None or self.last_sync is None: return False
+
+        if self.offline: return True
+
+        if not local.complete: return False
+
+        with self._lock: return not any(table in self._pending for table in local.tables)
+
+    def _run(self, name:str, params):
+        local = LOCAL_QUERIES[name]
+        params = [json.dumps(list(value)) if i in local.array_params else _to_text(value)
+                  for i, value in enumerate(params or ())]
+
+        with self._lock: rows = self.connection.execute(local.sql, params).fetchall()
+
+        if not local.converters: return rows
+
+        return [tuple(_convert(value, local.converters[i]) if i in local.converters else value
+                      for i, value in enumerate(row)) for row in rows]
+
+    def fetchall_named(self, name:str, params=()):
+        return self._run(name, params)
+
+    def fetchone_named(self, name:str, params=()):
+        rows = self._run(name, params)
+        return rows[0] if rows else None
+
+    # ---------------------------------------------------------------- writes
+    def note_write(self, sql):
+        """ Called after a write of this instance: its tables are read from the server until the next sync. """
+        text = sql.decode('utf-8', errors='replace') if isinstance(sql, bytes) else str(sql)
+        tables = {table.lower() for table in _WRITE_PATTERN.findall(text)}
+        if not tables: return
+
+        with self._lock:
+            self._write_sequence += 1
+            for table in tables: self._pending[table] = self._write_sequence
+
+        if self.wake: self.wake()
+
+    def enqueue(self, name:str, params=()):
+        """ Keeps a named write for the worker, the server is unreachable. """
+        with self._lock:
+            self.connection.execute('INSERT INTO outbox (name_, params_, created_) VALUES (?, ?, ?)',
+                                    (name, json.dumps(_encode_param(list(params or ()))), datetime.now().isoformat()))
+            self.connection.commit()
+
+        self.note_write(queries.get_query(name))
+
+    # ---------------------------------------------------------------- sync (worker thread)
+    def push(self, server) -> int:
+        """ Replays the outbox on the `server` connection in order, returns the number of replayed writes. """
+        with self._lock:
+            entries = self.connection.execute('SELECT id, name_, params_ FROM outbox WHERE error_ IS NULL ORDER BY id').fetchall()
+
+        if not entries: return 0
+
+        # The statements are PREPAREd once per replay on the worker connection
+        with server.cursor() as cur: cur.execute('DEALLOCATE ALL;')
+        prepared = set()
+        count = 0
+
+        for Id, name, params in entries:
+            try:
+                with server.cursor() as cur:
+                    if name not in prepared:
+                        cur.execute(queries.prepare_statement(name))
+                        prepared.add(name)
+                    cur.execute(queries.execute_statement(name), tuple(_decode_param(json.loads(params))))
+                server.commit()
+
+            except CONNECTION_ERRORS:
+                # Offline again: the remaining writes wait for the next sync
+                raise
+
+            except (Error, KeyError) as e:
+                # Rejected by the server: kept with its error, the next writes are replayed
+                server.rollback()
+                with self._lock:
+                    self.connection.execute('UPDATE outbox SET error_ = ? WHERE id = ?', (str(e), Id))
+                    self.connection.commit()
+                continue
+
+            with self._lock:
+                self.connection.execute('DELETE FROM outbox WHERE id = ?', (Id,))
+                self.connection.commit()
+            count += 1
+
+        return count
+
+    def pull(self, server) -> list:
+        """ Copies the server tables into the replica, returns the names of the refreshed tables. """
+        with self._lock: sequence = self._write_sequence
+
+        # One snapshot of all tables
+        server.set_session(readonly=True, isolation_level='REPEATABLE READ')
+        try:
+            with server.cursor() as cur:
+                cur.execute(_PULL_STUDENTS)
+                students = cur.fetchall()
+
+                # Thumbnails only for the new and the changed photos
+                with self._lock: known = dict(self.connection.execute('SELECT id, photo_md5_ FROM personal_info').fetchall())
+                changed = [row[0] for row in students if row[5] and known.get(row[0]) != row[5]]
+                thumbnails = {}
+                if changed:
+                    cur.execute(_PULL_PHOTOS, (changed,))
+                    thumbnails = {Id: make_thumbnail(photo) for Id, photo in cur.fetchall()}
+
+                cur.execute(_PULL_GROUPS)
+                groups = cur.fetchall()
+                cur.execute(_PULL_RESOURCES)
+                resources = cur.fetchall()
+                cur.execute(_PULL_QUESTS, (self.recent_days,))
+                quests = cur.fetchall()
+        finally:
+            server.rollback()
+            server.set_session(readonly='DEFAULT', isolation_level='DEFAULT')
+
+        with self._lock:
+            db = self.connection
+            try:
+                db.execute('BEGIN')
+
+                db.executemany(
+                    'INSERT INTO personal_info (id, fname_, lname_, phone_, address_, photo_md5_, last_date_time_, '
+                    '  last_behaviour_, parent_name_, parent_phone_, metadata_, birth_date_, gender_) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET fname_ = excluded.fname_, lname_ = excluded.lname_, '
+                    '  phone_ = excluded.phone_, address_ = excluded.address_, photo_md5_ = excluded.photo_md5_, '
+                    '  last_date_time_ = excluded.last_date_time_, last_behaviour_ = excluded.last_behaviour_, '
+                    '  parent_name_ = excluded.parent_name_, parent_phone_ = excluded.parent_phone_, '
+                    '  metadata_ = excluded.metadata_, birth_date_ = excluded.birth_date_, gender_ = excluded.gender_',
+                    [tuple(_to_text(value) for value in row) for row in students])
+                db.executemany('UPDATE personal_info SET thumbnail_ = ? WHERE id = ?',
+                               [(thumbnail, Id) for Id, thumbnail in thumbnails.items()])
+                db.execute('UPDATE personal_info SET thumbnail_ = NULL WHERE photo_md5_ IS NULL')
+                db.execute('DELETE FROM personal_info WHERE id NOT IN (SELECT value FROM json_each(?))',
+                           (json.dumps([row[0] for row in students]),))
+
+                for table, columns, rows in (('groups', 7, groups), ('educational_resources', 5, resources),
+                                             ('quests', 10, quests)):
+                    db.execute(f'DELETE FROM {table}')
+                    db.executemany(f'INSERT INTO {table} VALUES ({", ".join(["?"] * columns)})',
+                                   [tuple(_to_text(value) for value in row) for row in rows])
+
+                self._set_state('last_sync', datetime.now().isoformat())
+                db.commit()
+
+            except BaseException:
+                db.rollback()
+                raise
+
+            # The writes made before this pull are in the replica now
+            self._pending = {table: seq for table, seq in self._pending.items() if seq > sequence}
+
+        return ['personal_info', 'groups', 'educational_resources', 'quests']
+
+    def close(self):
+        with self._lock: self.connection.close()
+
+
+class ReplicaSyncWorker(QThread):
+
+    synced = Signal(list)           # refreshed tables
+    online_changed = Signal(bool)
+    failed = Signal(str)
+
+    def __init__(self, database, replica:LocalReplica, interval:float=60.0, parent=None):
+        super().__init__(parent)
+
+        self.database = database
+        self.replica = replica
+        self.interval = interval
+
+        self._mutex = QMutex()
+        self._condition = QWaitCondition()
+        self._requested = False
+
+        replica.wake = self.request_sync
+
+    def request_sync(self):
+        self._mutex.lock()
+        self._requested = True
+        self._condition.wakeAll()
+        self._mutex.unlock()
+
+    def stop(self):
+        self.requestInterruption()
+        self.request_sync()
+        self.wait()
+
+    def _wait(self, seconds:float):
+        self._mutex.lock()
+        if not self._requested and not self.isInterruptionRequested():
+            self._condition.wait(self._mutex, int(seconds * 1000))
+        self._requested = False
+        self._mutex.unlock()
+
+    def run(self):
+        server = None
+        # The replayed writes are writes of this instance (data/notifications.py)
+        server_pid = 0
+
+        while not self.isInterruptionRequested():
+            try:
+                if server is None or server.closed:
+                    change_hub.remove_session(server_pid)
+                    server = self.database.open_connection()
+                    server_pid = change_hub.add_session(server)
+
+                self.replica.push(server)
+                tables = self.replica.pull(server)
+
+                if self.replica.offline:
+                    self.replica.offline = False
+                    self.online_changed.emit(True)
+
+                self.synced.emit(tables)
+
+            except CONNECTION_ERRORS:
+                if server is not None and not server.closed: server.close()
+                server = None
+                change_hub.remove_session(server_pid)
+
+                if not self.replica.offline:
+                    self.replica.offline = True
+                    self.online_changed.emit(False)
+
+            except (Error, sqlite3.Error) as e:
+                self.failed.emit(f'Replica sync failed: {e}')
+
+            # A short pause after a burst of writes, then the normal interval (or the next write)
+            time.sleep(0.2)
+            self._wait(self.interval)
+
+        if server is not None and not server.closed: server.close()
+        change_hub.remove_session(server_pid)
+
+
+def start_replica(database, path:str, cache=None, interval:float=60.0, recent_days:int=120) -> ReplicaSyncWorker:
+    """ Opens the replica at `path`, routes the reads of `database` to it and starts the sync worker. """
+    replica = LocalReplica(path, recent_days)
+    database.replica = replica
+
+    worker = ReplicaSyncWorker(database, replica, interval)
+
+    # The cached rows of the refreshed tables are read again (from the replica)
+    if cache is not None:
+        worker.synced.connect(lambda tables: cache.invalidate(*{region for table in tables
+                                                                for region in TABLE_REGIONS.get(table, ())},
+                                                              publish=False))
+    worker.failed.connect(print)
+    worker.start()
+
+    return worker
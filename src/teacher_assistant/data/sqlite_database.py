@@ -0,0 +1,635 @@
+# teacher_assistant/data/sqlite_database.py
+# ###################################################################################################
+#                                     EMBEDDED SQLITE BACKEND                                       #
+# ###################################################################################################
+# The whole database in one local file, for a single teacher on one computer: nothing to install,  #
+# nothing to configure. The benchmarks use it to run without a server as well.                      #
+#                                                                                                   #
+# The schema is the schema of migration 8 in SQLite types. The differences:                         #
+#   - the gradebook is a view (SQLite has no statement level triggers with transition tables),      #
+#     it is computed from groups.members_ / quests / quest_items when it is read                    #
+#   - jsonb columns are TEXT declared JSON, timestamps are ISO text declared TIMESTAMP / DATE:      #
+#     the converters below return them as dict / datetime / date like psycopg2 does                 #
+#   - no change notifications and no replica (one workstation)                                      #
+#                                                                                                   #
+# Versions: PRAGMA user_version. A new file gets SCHEMA and SCHEMA_VERSION, a file of an older      #
+# version gets the steps of UPGRADES after its version (like data/migrations.py), all in one        #
+# transaction with the new user_version. A change of the schema goes into SCHEMA and, as the next   #
+# version, into UPGRADES; SCHEMA_VERSION is the last version.                                       #
+#                                                                                                   #
+# Named statements: SQLITE_QUERIES has its own text of every name of data/queries.py with numbered #
+# parameters (?1, ?2, ...). A list parameter (= ANY($1::text[]) on the server) is sent as a JSON    #
+# array and read with json_each(). A statement the server runs as one data-modifying CTE is a       #
+# tuple of statements here, they run in one transaction.                                            #
+#                                                                                                   #
+# Raw SQL (execute / fetchall ...) is written for PostgreSQL: %s placeholders, ::casts, ILIKE and   #
+# the public. schema prefix are translated, the rest has to be common SQL.                          #
+#                                                                                                   #
+# Connection: WAL journal (the readers of the background threads do not block the writer),          #
+# synchronous=NORMAL (a commit is durable at the next checkpoint, safe against a crash of the app), #
+# the temporary b-trees in memory, a 20 MB page cache and 256 MB memory mapped reads.               #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     database = sqlite_database()                                                                  #
+#     database.connect(database=os.path.join(app_context.appdata_path, 'teacher_assistant.sqlite3'))#
+#     app_context.set_database(database)                                                            #
+#####################################################################################################
+
+import contextlib
+import json
+import re
+import sqlite3
+from datetime import date, datetime
+
+from data import queries
+from data.backend import StorageBackend
+from data.instrumentation import NO_TIMER, QueryInstrumentation, QueryTimer
+
+SCHEMA_VERSION = 8
+
+PRAGMAS = (
+    'PRAGMA journal_mode = WAL;',
+    'PRAGMA synchronous = NORMAL;',
+    'PRAGMA foreign_keys = ON;',
+    'PRAGMA temp_store = MEMORY;',
+    'PRAGMA cache_size = -20000;',
+    'PRAGMA mmap_size = 268435456;',
+    'PRAGMA busy_timeout = 5000;',
+)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS academic_years (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, year_ INTEGER NOT NULL, manager_id TEXT, more_info_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS classroom_events (
+        meeting_no_ INTEGER NOT NULL, pages_start_ INTEGER NOT NULL, pages_end_ INTEGER NOT NULL,
+        subject_ TEXT NOT NULL, description_ TEXT NOT NULL, events_ TEXT, analysis_ TEXT,
+        date_time_ TIMESTAMP NOT NULL, group_id INTEGER);
+
+    CREATE TABLE IF NOT EXISTS educational_resources (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, source_ TEXT NOT NULL, content_ TEXT NOT NULL, metadata_ TEXT, answer_ TEXT,
+        score_ REAL);
+
+    CREATE TABLE IF NOT EXISTS groups (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, grade_ INTEGER, book_ TEXT, title_ TEXT, events_ TEXT, members_ TEXT,
+        description_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS observed_behaviours (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, date_time_ TIMESTAMP NOT NULL, student_id TEXT NOT NULL,
+        observed_behaviour_ TEXT NOT NULL, analysis_ TEXT);
+
+    CREATE TABLE IF NOT EXISTS personal_info (
+        id TEXT PRIMARY KEY, fname_ TEXT, lname_ TEXT, photo_ BLOB, phone_ TEXT, address_ TEXT, parent_name_ TEXT,
+        parent_phone_ TEXT, metadata_ TEXT, gender_ TEXT, birth_date_ DATE);
+
+    CREATE TABLE IF NOT EXISTS quests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT NOT NULL, qb_ids_ TEXT, total_score_ REAL, scores_ TEXT,
+        assign_date_ TIMESTAMP, deadline_ TIMESTAMP, reply_date_ TIMESTAMP, configs_ JSON, responses_ TEXT,
+        feedback_ TEXT);
+
+    -- WITHOUT ROWID: an insert does not change last_insert_rowid(), the statements that insert a quest
+    -- and then its items read the id of the quest from it
+    CREATE TABLE IF NOT EXISTS quest_items (
+        quest_id INTEGER NOT NULL REFERENCES quests (id) ON DELETE CASCADE, position INTEGER NOT NULL,
+        resource_id INTEGER NOT NULL, max_score REAL, earned_score REAL,
+        PRIMARY KEY (quest_id, position)) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS item_analysis_runs (
+        scope TEXT PRIMARY KEY, computed_at TIMESTAMP NOT NULL DEFAULT (datetime('now', 'localtime')),
+        students INTEGER NOT NULL, items INTEGER NOT NULL, cronbach_alpha REAL, mean_percent REAL,
+        stdev_percent REAL, distribution JSON);
+
+    CREATE TABLE IF NOT EXISTS item_statistics (
+        scope TEXT NOT NULL REFERENCES item_analysis_runs (scope) ON DELETE CASCADE, resource_id INTEGER NOT NULL,
+        responses INTEGER NOT NULL, max_score REAL, mean_score REAL, difficulty REAL, discrimination REAL,
+        point_biserial REAL, alpha_if_deleted REAL, distribution JSON,
+        PRIMARY KEY (scope, resource_id));
+
+    -- AUTOINCREMENT: the ids are never reused, like the identity columns. Those of the server start at 100
+    -- (quests at 1), the resource id 99 is the free id of the custom assignments.
+    INSERT INTO sqlite_sequence (name, seq)
+        VALUES ('academic_years', 99), ('educational_resources', 99), ('groups', 99), ('observed_behaviours', 99);
+
+    -- The indexes of migrations 3 - 6 and 11 (NULLs sort first in SQLite, score_ DESC puts them last already)
+    CREATE INDEX IF NOT EXISTS idx_edu_score ON educational_resources (score_ DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_quests_student ON quests (student_id, assign_date_ DESC);
+    CREATE INDEX IF NOT EXISTS idx_quests_deadline ON quests (deadline_);
+    CREATE INDEX IF NOT EXISTS idx_behaviours_student_latest
+        ON observed_behaviours (student_id, date_time_ DESC, id DESC);
+    CREATE INDEX IF NOT EXISTS idx_quest_items_resource ON quest_items (resource_id);
+    CREATE INDEX IF NOT EXISTS idx_item_statistics_resource ON item_statistics (resource_id);
+
+    -- The gradebook table of migration 7 as a view: members_ is a comma separated list of student ids
+    CREATE VIEW IF NOT EXISTS gradebook AS
+        SELECT g.id AS group_id, q.student_id AS student_id, q.id AS quest_id,
+               COALESCE(json_extract(q.configs_, '$.Title'), json_extract(q.configs_, '$.Template'), '') AS title_,
+               q.assign_date_ AS assign_date_, q.deadline_ AS deadline_, q.reply_date_ AS reply_date_,
+               q.total_score_ AS total_score_,
+               (SELECT SUM(qi.earned_score) FROM quest_items qi WHERE qi.quest_id = q.id) AS earned_score_
+        FROM groups g
+        JOIN json_each('["' || replace(replace(COALESCE(g.members_, ''), ' ', ''), ',', '","') || '"]') m
+        JOIN quests q ON q.student_id = m.value;
+"""
+
+# The ';' separated statements that bring a file of version - 1 to version, by version (9, 10 ...)
+UPGRADES = {}
+
+# ------------------------------------------------------------------ named statements
+# Same names, columns and row order as data/queries.py
+
+# Newest observed behaviour of each student: one probe of idx_behaviours_student_latest per student
+_STUDENT_LIST = (
+    'SELECT t1.id, t1.fname_, t1.lname_, t1.phone_, t1.address_, t1.photo_, '
+    't2.date_time_, t2.observed_behaviour_, t1.parent_name_, t1.parent_phone_, '
+    't1.metadata_, t1.birth_date_, t1.gender_ '
+    'FROM personal_info t1 '
+    'LEFT JOIN observed_behaviours t2 ON t2.id = ('
+    '  SELECT b.id FROM observed_behaviours b WHERE b.student_id = t1.id '
+    '  ORDER BY b.date_time_ DESC, b.id DESC LIMIT 1) '
+)
+
+_RESOURCE_COLUMNS = 'SELECT id, source_, score_, content_, answer_, metadata_ FROM educational_resources '
+
+_RESOURCE_SEARCH = ('(source_ LIKE ?1 OR content_ LIKE ?1 OR metadata_ LIKE ?1 OR CAST(id AS TEXT) LIKE ?1) '
+                    'ORDER BY score_ DESC NULLS LAST, id DESC')
+
+# DISTINCT ON (student, question) ... ORDER BY assign date DESC: the first row of each window
+_LAST_ATTEMPTS = (
+    'SELECT student_id, resource_id, earned_score, max_score FROM ('
+    '  SELECT q.student_id, qi.resource_id, qi.earned_score, qi.max_score, '
+    '         ROW_NUMBER() OVER (PARTITION BY q.student_id, qi.resource_id '
+    '                            ORDER BY q.assign_date_ DESC, q.id DESC) AS attempt '
+    '  FROM quests q JOIN quest_items qi ON qi.quest_id = q.id '
+    '  WHERE {scope} AND q.reply_date_ IS NOT NULL) '
+    'WHERE attempt = 1 ORDER BY student_id, resource_id'
+)
+
+SQLITE_QUERIES = {
+    # ------------------------------------------------------------------ personal_info
+    'students_all':
+        _STUDENT_LIST + 'ORDER BY t1.fname_, t1.lname_, t1.id',
+
+    'students_by_ids':
+        _STUDENT_LIST + 'WHERE t1.id IN (SELECT value FROM json_each(?1)) ORDER BY t1.fname_, t1.lname_, t1.id',
+
+    # ------------------------------------------------------------------ groups
+    'groups_all':
+        'SELECT id, grade_, book_, title_, events_, members_, description_ FROM groups ORDER BY id',
+
+    # ------------------------------------------------------------------ observed_behaviours
+    'behaviours_by_student':
+        'SELECT id, date_time_, observed_behaviour_, analysis_ FROM observed_behaviours '
+        'WHERE student_id = ?1 ORDER BY date_time_ DESC',
+
+    # ------------------------------------------------------------------ educational_resources
+    'resource_answer_and_metadata':
+        'SELECT answer_, metadata_ FROM educational_resources WHERE id = ?1',
+
+    'resource_by_id':    _RESOURCE_COLUMNS + 'WHERE id = ?1',
+    'resource_next':     _RESOURCE_COLUMNS + 'WHERE id > ?1 ORDER BY id ASC LIMIT 1',
+    'resource_previous': _RESOURCE_COLUMNS + 'WHERE id < ?1 ORDER BY id DESC LIMIT 1',
+    'resource_first':    _RESOURCE_COLUMNS + 'WHERE id > 0 ORDER BY id ASC LIMIT 1',
+
+    'update_resource_metadata': 'UPDATE educational_resources SET metadata_ = ?1 WHERE id = ?2',
+    'update_resource_source':   'UPDATE educational_resources SET source_ = ?1 WHERE id = ?2',
+    'update_resource_score':    'UPDATE educational_resources SET score_ = ?1 WHERE id = ?2',
+    'update_resource_answer':   'UPDATE educational_resources SET answer_ = ?1 WHERE id = ?2',
+
+    'delete_resource':
+        'DELETE FROM educational_resources WHERE id = ?1',
+
+    # LIKE of SQLite ignores the case of ASCII letters only (ILIKE of the server all letters)
+    'search_resources':
+        'SELECT id, source_, content_, score_, metadata_ FROM educational_resources WHERE ' + _RESOURCE_SEARCH,
+
+    'search_resources_by_ids':
+        'SELECT id, source_, content_, score_, metadata_ FROM educational_resources '
+        'WHERE id IN (SELECT value FROM json_each(?2)) AND ' + _RESOURCE_SEARCH,
+
+    'resources_content_by_ids':
+        'SELECT r.content_, r.score_ FROM json_each(?1) ids JOIN educational_resources r ON r.id = ids.value '
+        'ORDER BY ids.key',
+
+    # ------------------------------------------------------------------ quests
+    'quests_by_student':
+        'SELECT q.id, q.qb_ids_, q.total_score_, q.scores_, q.assign_date_, q.deadline_, q.reply_date_, q.configs_, '
+        '       COALESCE((SELECT SUM(qi.earned_score) FROM quest_items qi WHERE qi.quest_id = q.id), 0.0) '
+        'FROM quests q WHERE q.student_id = ?1 ORDER BY q.assign_date_ DESC',
+
+    # The array of the server is a JSON array, the column name declares it for the JSON converter
+    'quest_answers':
+        'SELECT q.responses_, '
+        '       (SELECT json_group_array(earned_score) FROM '
+        '          (SELECT qi.earned_score FROM quest_items qi WHERE qi.quest_id = q.id ORDER BY qi.position)) '
+        '         AS "scores [JSON]", '
+        '       q.feedback_ '
+        'FROM quests q WHERE q.id = ?1',
+
+    'quest_item_contents':
+        'SELECT r.content_, COALESCE(qi.max_score, r.score_) FROM quest_items qi '
+        'JOIN educational_resources r ON r.id = qi.resource_id '
+        'WHERE qi.quest_id = ?1 ORDER BY qi.position',
+
+    'assign_quest': (
+        'INSERT INTO quests (student_id, qb_ids_, total_score_, assign_date_, deadline_, configs_) '
+        "SELECT ?1, (SELECT group_concat(value, '-') FROM json_each(?2)), (SELECT SUM(value) FROM json_each(?3)), "
+        '       ?4, ?5, ?6',
+        'INSERT INTO quest_items (quest_id, position, resource_id, max_score) '
+        'SELECT last_insert_rowid(), r.key + 1, r.value, s.value '
+        'FROM json_each(?2) r JOIN json_each(?3) s ON s.key = r.key',
+    ),
+
+    'insert_custom_quest': (
+        'INSERT INTO quests (student_id, qb_ids_, total_score_, scores_, assign_date_, deadline_, reply_date_, '
+        '                    configs_, responses_, feedback_) '
+        "VALUES (?1, CAST(?2 AS TEXT), ?3, CAST(?4 AS TEXT), ?5, ?6, ?7, '{\"Template\": \"Custom\"}', ?8, ?9)",
+        'INSERT INTO quest_items (quest_id, position, resource_id, max_score, earned_score) '
+        'VALUES (last_insert_rowid(), 1, ?2, ?3, ?4)',
+    ),
+
+    'save_quest_answers': (
+        'UPDATE quest_items SET earned_score = (SELECT s.value FROM json_each(?3) s WHERE s.key + 1 = quest_items.position) '
+        'WHERE quest_id = ?5 AND position <= json_array_length(?3)',
+        'UPDATE quests SET reply_date_ = ?1, feedback_ = ?2, '
+        "       scores_ = (SELECT group_concat(COALESCE(value, ''), '-') FROM json_each(?3)), responses_ = ?4 "
+        'WHERE id = ?5',
+    ),
+
+    'class_item_statistics':
+        'SELECT qi.resource_id, COUNT(*), COUNT(qi.earned_score), AVG(qi.earned_score), '
+        '       AVG(qi.earned_score / NULLIF(qi.max_score, 0)) '
+        'FROM quests q JOIN quest_items qi ON qi.quest_id = q.id '
+        'WHERE q.student_id IN (SELECT value FROM json_each(?1)) '
+        'GROUP BY qi.resource_id ORDER BY qi.resource_id',
+
+    # ------------------------------------------------------------------ gradebook
+    'gradebook_by_group':
+        'SELECT g.student_id, p.fname_, p.lname_, g.quest_id, g.title_, g.assign_date_, g.deadline_, g.reply_date_, '
+        '       g.total_score_, g.earned_score_ '
+        'FROM gradebook g JOIN personal_info p ON p.id = g.student_id '
+        'WHERE g.group_id = ?1 ORDER BY p.lname_, p.fname_, g.student_id, g.assign_date_',
+
+    'gradebook_groups':
+        'SELECT id, title_, grade_, book_ FROM groups ORDER BY grade_, title_',
+
+    # ------------------------------------------------------------------ item analysis
+    'item_scores_by_students':
+        _LAST_ATTEMPTS.format(scope='q.student_id IN (SELECT value FROM json_each(?1))'),
+
+    'item_scores_by_quests':
+        _LAST_ATTEMPTS.format(scope='q.id IN (SELECT value FROM json_each(?1))'),
+
+    'save_item_analysis_run':
+        'INSERT INTO item_analysis_runs (scope, students, items, cronbach_alpha, mean_percent, stdev_percent, distribution) '
+        'VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7) '
+        "ON CONFLICT (scope) DO UPDATE SET computed_at = datetime('now', 'localtime'), students = excluded.students, "
+        '    items = excluded.items, cronbach_alpha = excluded.cronbach_alpha, mean_percent = excluded.mean_percent, '
+        '    stdev_percent = excluded.stdev_percent, distribution = excluded.distribution',
+
+    # The columns are parallel JSON arrays, joined on the array index.
+    # WHERE true: an INSERT ... SELECT with an upsert clause needs a WHERE (parser ambiguity of ON)
+    'save_item_statistics': (
+        'DELETE FROM item_statistics WHERE scope = ?1 AND resource_id NOT IN (SELECT value FROM json_each(?2))',
+        'INSERT INTO item_statistics (scope, resource_id, responses, max_score, mean_score, difficulty, '
+        '                             discrimination, point_biserial, alpha_if_deleted, distribution) '
+        'SELECT ?1, rid.value, n.value, mx.value, mean.value, d.value, disc.value, pb.value, alpha.value, dist.value '
+        'FROM json_each(?2) rid '
+        'JOIN json_each(?3) n ON n.key = rid.key JOIN json_each(?4) mx ON mx.key = rid.key '
+        'JOIN json_each(?5) mean ON mean.key = rid.key JOIN json_each(?6) d ON d.key = rid.key '
+        'JOIN json_each(?7) disc ON disc.key = rid.key JOIN json_each(?8) pb ON pb.key = rid.key '
+        'JOIN json_each(?9) alpha ON alpha.key = rid.key JOIN json_each(?10) dist ON dist.key = rid.key '
+        'WHERE true '
+        'ON CONFLICT (scope, resource_id) DO UPDATE SET responses = excluded.responses, '
+        '    max_score = excluded.max_score, mean_score = excluded.mean_score, difficulty = excluded.difficulty, '
+        '    discrimination = excluded.discrimination, point_biserial = excluded.point_biserial, '
+        '    alpha_if_deleted = excluded.alpha_if_deleted, distribution = excluded.distribution',
+    ),
+
+    'item_statistics_by_scope':
+        'SELECT s.resource_id, r.source_, s.responses, s.max_score, s.mean_score, s.difficulty, s.discrimination, '
+        '       s.point_biserial, s.alpha_if_deleted, s.distribution '
+        'FROM item_statistics s LEFT JOIN educational_resources r ON r.id = s.resource_id '
+        'WHERE s.scope = ?1 ORDER BY s.discrimination NULLS LAST, s.resource_id',
+
+    'delete_quest':
+        'DELETE FROM quests WHERE id = ?1',
+
+    # ------------------------------------------------------------------ personal_info
+    'delete_personal_info':
+        'DELETE FROM personal_info WHERE id = ?1',
+
+    # ------------------------------------------------------------------ catalog
+    'table_columns':
+        'SELECT name FROM pragma_table_info(?1) ORDER BY cid',
+}
+
+_PARAM_PATTERN = re.compile(r'\?(\d+)')
+
+# PostgreSQL spellings of the raw SQL
+_CAST_PATTERN = re.compile(r'::\s*\w+(\s*\[\])?')
+_ILIKE_PATTERN = re.compile(r'\bILIKE\b', re.IGNORECASE)
+_SCHEMA_PATTERN = re.compile(r'\bpublic\.', re.IGNORECASE)
+
+
+# ------------------------------------------------------------------ type conversion
+# Stored: ISO text for dates, JSON text for dicts / lists. Read: by the declared type of the column
+# (detect_types), so the rows look like the rows of psycopg2.
+
+def _from_timestamp(value:bytes):
+    try:
+        return datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+def _from_date(value:bytes):
+    try:
+        return date.fromisoformat(value.decode()[:10])
+    except ValueError:
+        return value.decode()
+
+def _from_json(value:bytes):
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value.decode()
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_adapter(dict, lambda value: json.dumps(value, ensure_ascii=False))
+sqlite3.register_adapter(list, lambda value: json.dumps(value, ensure_ascii=False))
+sqlite3.register_converter('TIMESTAMP', _from_timestamp)
+sqlite3.register_converter('DATE', _from_date)
+sqlite3.register_converter('JSON', _from_json)
+
+
+def translate(query) -> str:
+    """ The SQLite text of a raw PostgreSQL statement of the application (placeholders, casts, ILIKE). """
+    if isinstance(query, bytes): query = query.decode()
+
+    query = _CAST_PATTERN.sub('', query)
+    query = _ILIKE_PATTERN.sub('LIKE', query)
+    query = _SCHEMA_PATTERN.sub('', query)
+
+    return query.replace('%s', '?')
+
+
+def split_statements(query:str) -> list:
+    """ The statements of a ';' separated script (the ';' inside quotes are kept). """
+    statements, current = [], ''
+
+    for part in query.split(';'):
+        current += part
+        # Complete: the quotes are balanced
+        if current.count("'") % 2 == 0:
+            if current.strip(): statements.append(current.strip())
+            current = ''
+        else:
+            current += ';'
+
+    if current.strip(): statements.append(current.strip())
+
+    return statements
+
+
+def _statement_params(sql:str, params:tuple) -> tuple:
+    # sqlite3 wants exactly as many values as the highest ?n of the statement
+    numbers = [int(n) for n in _PARAM_PATTERN.findall(sql)]
+    return params[:max(numbers)] if numbers else ()
+
+
+def _first_row(cursor):
+    # An unfinished statement keeps its read snapshot (WAL) open, the cursor is closed after the row
+    try:
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+class sqlite_database(StorageBackend):
+
+    dialect = 'sqlite'
+
+    def __init__(self):
+        super().__init__()
+        self.connection = None
+        self.path = ''
+        # Optional query measuring, see enable_instrumentation()
+        self.instrumentation = None
+        # No replica on a local database, kept for the code that checks it
+        self.replica = None
+
+    def _open(self):
+        # check_same_thread=False: the page loaders stream from the main connection on a pool thread.
+        # isolation_level=None: no implicit BEGIN, the writes open their transaction themselves.
+        connection = sqlite3.connect(self.path, detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+                                     check_same_thread=False, isolation_level=None)
+
+        for pragma in PRAGMAS: connection.execute(pragma)
+
+        return connection
+
+    def connect(self, database='', **ignored):
+        """ Opens (and creates on first use) the database file `database`, host / user ... are ignored. """
+        self.path = database
+        self.connection = self._open()
+
+        version = self.connection.execute('PRAGMA user_version;').fetchone()[0]
+
+        # A new file: the schema of the current version
+        if version == 0:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION};')
+
+        elif version < SCHEMA_VERSION:
+            self._upgrade()
+
+    def _upgrade(self):
+        # IMMEDIATE takes the write lock: a second client opening the file waits (busy_timeout) and
+        # reads the version after, its steps are done then
+        self.connection.execute('BEGIN IMMEDIATE;')
+        try:
+            version = self.connection.execute('PRAGMA user_version;').fetchone()[0]
+
+            for step in sorted(step for step in UPGRADES if step > version):
+                for statement in split_statements(UPGRADES[step]): self.connection.execute(statement)
+
+            if version < SCHEMA_VERSION: self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION};')
+
+            self.connection.execute('COMMIT;')
+
+        except BaseException:
+            self.connection.execute('ROLLBACK;')
+            raise
+
+    def open_connection(self):
+        # A connection of its own for work on a background thread, the caller closes it
+        return self._open()
+
+    def close(self):
+        if self.connection is not None: self.connection.close()
+        self.connection = None
+
+    def clone(self):
+        backend = sqlite_database()
+        backend.connect(database=self.path)
+        backend.instrumentation = self.instrumentation
+        return backend
+
+    def interrupt(self):
+        # The running statement fails with 'interrupted'
+        self.connection.interrupt()
+
+    def rollback(self):
+        if self.connection.in_transaction: self.connection.execute('ROLLBACK;')
+
+    # ---------------------------------------------------------------- instrumentation
+    def enable_instrumentation(self, log_path=None, slow_threshold_ms=200.0, capture_explain=False, **options):
+        """ Starts measuring the queries, see data/instrumentation.py. No EXPLAIN plans on SQLite. """
+        self.disable_instrumentation()
+        self.instrumentation = QueryInstrumentation(log_path, slow_threshold_ms, False, **options)
+        return self.instrumentation
+
+    def disable_instrumentation(self):
+        if self.instrumentation is not None: self.instrumentation.close()
+        self.instrumentation = None
+
+    def _timed(self, method, query):
+        if self.instrumentation is None: return contextlib.nullcontext(NO_TIMER)
+
+        return QueryTimer(self.instrumentation, method, query)
+
+    # ---------------------------------------------------------------- execution
+    def _run(self, statements, params):
+        # Runs one statement, or all statements of a script in one transaction; returns the last cursor
+        if len(statements) == 1: return self.connection.execute(statements[0], params)
+
+        cursor = None
+        try:
+            self.connection.execute('BEGIN;')
+            for sql in statements:
+                cursor = self.connection.execute(sql, _statement_params(sql, params) if params else ())
+            self.connection.execute('COMMIT;')
+
+        except Exception:
+            if self.connection.in_transaction: self.connection.execute('ROLLBACK;')
+            raise
+
+        return cursor
+
+    def _run_raw(self, query, params):
+        statements = split_statements(translate(query))
+        params = tuple(params) if isinstance(params, (list, tuple)) else (() if params is None else (params,))
+
+        if len(statements) == 1: return self.connection.execute(statements[0], params)
+
+        # A script: every statement takes its values from the front of `params`
+        cursor, offset = None, 0
+        self.connection.execute('BEGIN;')
+        try:
+            for sql in statements:
+                count = sql.count('?')
+                cursor = self.connection.execute(sql, params[offset:offset + count])
+                offset += count
+            self.connection.execute('COMMIT;')
+
+        except Exception:
+            if self.connection.in_transaction: self.connection.execute('ROLLBACK;')
+            raise
+
+        return cursor
+
+    def execute(self, query, params=None):
+        # Executes INSERT / UPDATE / DELETE, autocommit
+        with self._timed('execute', query):
+            self._run_raw(query, params)
+
+    def fetchone(self, query, params=None):
+        with self._timed('fetchone', query) as timer:
+            result = _first_row(self._run_raw(query, params))
+            timer.set_result(result)
+
+        return result
+
+    def execute_and_return(self, query, params=None):
+        with self._timed('execute_and_return', query) as timer:
+            result = _first_row(self._run_raw(query, params))
+            timer.set_result(result)
+
+        return result
+
+    def fetchall(self, query, params=None):
+        with self._timed('fetchall', query) as timer:
+            result = self._run_raw(query, params).fetchall()
+            timer.set_result(result)
+
+        return result
+
+    def stream(self, query, params=None):
+        # A cursor for fetchmany(), the caller closes it
+        with self._timed('stream', query):
+            return self._run_raw(query, params)
+
+    # ---------------------------------------------------------------- named statements
+    @staticmethod
+    def get_query(name:str):
+        try:
+            return SQLITE_QUERIES[name]
+        except KeyError:
+            raise KeyError(f'Unknown query name: "{name}".') from None
+
+    @staticmethod
+    def _bind(params) -> tuple:
+        # The list parameters of the server statements are JSON arrays here
+        return tuple(json.dumps(value, ensure_ascii=False) if isinstance(value, (list, tuple)) else value
+                     for value in (params or ()))
+
+    def _named(self, name, params):
+        sql = self.get_query(name)
+        statements = sql if isinstance(sql, tuple) else (sql,)
+
+        return self._run(statements, self._bind(params))
+
+    def execute_named(self, name, params=()):
+        with self._timed('execute', queries.get_query(name)):
+            self._named(name, params)
+
+    def fetchone_named(self, name, params=()):
+        with self._timed('fetchone', queries.get_query(name)) as timer:
+            result = _first_row(self._named(name, params))
+            timer.set_result(result)
+
+        return result
+
+    def fetchall_named(self, name, params=()):
+        with self._timed('fetchall', queries.get_query(name)) as timer:
+            result = self._named(name, params).fetchall()
+            timer.set_result(result)
+
+        return result
+
+    def bulk_insert_csv(self, data, table_name, column_mapping, key_column=None):
+        """ Inserts the chunks of a pandas CSV reader in one transaction, returns the number of rows (0 on error). """
+        try:
+            total_rows = 0
+            # Keys of the table and of the inserted rows: the duplicates are skipped
+            seen = self.existing_keys(table_name, key_column) if key_column else None
+
+            sql_columns = ', '.join(column_mapping.values())
+            sql = f"INSERT INTO {table_name} ({sql_columns}) VALUES ({', '.join(['?'] * len(column_mapping))})"
+
+            self.connection.execute('BEGIN;')
+
+            for chunk in data:
+                rows = self.csv_rows(chunk, column_mapping, key_column, seen)
+                self.connection.executemany(sql, rows)
+                total_rows += len(rows)
+                print(f"Inserted {len(rows)} rows...")
+
+            self.connection.execute('COMMIT;')
+            print(f"Successfully inserted {total_rows} total rows into {table_name}")
+            return total_rows
+
+        except Exception as e:
+            if self.connection.in_transaction: self.connection.execute('ROLLBACK;')
+            print(f"Error inserting data into {table_name}: {e}")
+            return 0
@@ -18,7 +18,8 @@
 #        from png and svg files. the scripts/build_qrc.py just generates resources.qrc in resources folder. we  
 #        need to compile the resources.qrc to generate embeded icon files. any changes in the resources.qrc needs  
 #        to recompile this file. the scripts/compile_qrc.py does this task and created resources_rc.py.
-#        We imported resources_rc in the src/teacher_assistant/core/app_context.py to use icons in the app scope.
+#        The app registers the binary bundle resources/resources.rcc (pyside6-rcc --binary) in 
+#        core/app_context.py, resources_rc.py is only the fallback when the bundle is missing (core/icons.py).
 #    
  
 import os
@@ -28,32 +29,71 @@ import sys
 # This is crucial for making the project runnable from any location
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
+# First: the startup timeline starts here (core/startup.py)
+from core.startup import startup, prepare_webengine, warm_webengine
+
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication
 from PySide6.QtGui import QPixmap
 from core.app_context import app_context
+from core.diagnostics import diagnostics
+from core.settings.settings_manager import SettingsManager
 
 from ui.main_window import MainWindow
 from ui.widgets import connection_form  # a dialog to validate user and database connection
+
+startup.mark('modules imported')
+
 if __name__ == "__main__":
      
+    # The editors host Qt WebEngine views, imported later than the QApplication
+    prepare_webengine()
+
     app = QApplication(sys.argv)    
+    startup.mark('application created')
 
     # Setup the app directories
     app_context.setup_app_directories()
 
+    # Diagnostics mode (settings page > Diagnostics): event-loop watchdog and page timings
+    settings = SettingsManager()
+    if settings.get_bool("diagnostics", "enabled"):
+        diagnostics.start(float(settings.get("diagnostics", "stall_threshold_ms", 200)))
+
     # computes dpi to display edu-item size
     app_context.display_calulation(QApplication.primaryScreen().logicalDotsPerInch())
     
     main_window = MainWindow(window_title=f'TEACHER ASSISTANT | v{app_context.app_version}', logo=QPixmap(':/icons/app-icon.png'))
     
     main_window.show()
+    startup.mark('main window shown')
 
-    connection_dialog = connection_form.PostgreSqlConnectionWidget(main_window)
+    # The Chromium processes of the editors start while the user fills in the connection dialog
+    QTimer.singleShot(0, warm_webengine)
 
-    status, settings = connection_dialog.show_dialog()
+    # Storage backend (settings page > storage): a PostgreSQL server or a local SQLite file (data/sqlite_database.py)
+    if str(settings.get("storage", "backend", "postgresql")).lower() == 'sqlite':
+        from data.sqlite_database import sqlite_database
+
+        database = sqlite_database()
+        database.connect(database=settings.get("storage", "sqlite_path", "") or
+                                  os.path.join(app_context.appdata_path, 'teacher_assistant.sqlite3'))
+        app_context.set_database(database)
+
+        status = True
+    else:
+        connection_dialog = connection_form.PostgreSqlConnectionWidget(main_window)
+
+        status, _ = connection_dialog.show_dialog()
     
+    startup.mark('database connected' if status else 'connection dialog closed')
+
     if status: main_window.load_students_page(None)
     
+    # Written after the first page is painted: [appdata]/logs/startup.json
+    QTimer.singleShot(0, lambda: startup.finish(os.path.join(app_context.appdata_path, 'logs', 'startup.json'),
+                                                verbose= diagnostics.enabled))
+
     sys.exit(app.exec())
 
 # SETTINGS:
@@ -2,7 +2,9 @@
 from PySide6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget, QPushButton, QFileDialog,QLabel
 from PySide6.QtCore import Qt, QRect,Signal
 from PySide6.QtGui import QPainter, QColor,QKeyEvent,QPixmap
-from PIL import Image
+from core.startup import lazy_import
+# PIL is loaded by the first snip (core/startup.py)
+Image = lazy_import('PIL.Image')
 
 class SnippingTool(QMainWindow):
     def __init__(self):
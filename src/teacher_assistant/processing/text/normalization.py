@@ -0,0 +1,157 @@
+# teacher_assistant/processing/text/normalization.py
+# ###################################################################################################
+#                                  PERSIAN / ARABIC TEXT NORMALIZATION                              #
+# ###################################################################################################
+# The same Persian text arrives in several forms: typed on an Arabic keyboard layout (ي, ك instead  #
+# of ی, ک), with Persian (۰۱۲), Arabic-Indic (٠١٢) or ASCII digits, with or without diacritics.     #
+# Every conversion is precomputed, chosen by measuring (2000 calls, 1200 characters):               #
+#                                                                                                   #
+# - The digits: str.translate() tables. Digit-dense text (numbers, phones, ids) is what they        #
+#   convert, translate() is ~1.7x faster than a regex there.                                        #
+# - The letters, canonical(), fold(): a compiled regex of the characters to replace, only the       #
+#   matches are looked up. In Persian text they are sparse and translate(), which looks up every    #
+#   character, is 7x slower. Their characters are not ASCII: an ASCII text is returned as it is.    #
+#                                                                                                   #
+# - Digits:   to_ascii_digits(), to_persian_digits(), to_arabic_digits()                            #
+# - Letters:  to_persian_letters() ي -> ی, ك -> ک ..., to_arabic_letters() the reverse              #
+# - canonical(): the stored form of imported text: Persian letters, ASCII digits                    #
+# - fold():      the compared form (search, duplicates): canonical() plus the letter variants of     #
+#                the same sound folded (ة -> ه, أ/إ/آ -> ا), no diacritics, no tatweel, case folded  #
+# - rtl_ratio() / is_mostly_rtl(): the share of right-to-left letters, counted by two regexes       #
+#                                                                                                   #
+# Batch APIs: normalize_column(values, fn) converts a whole column (a list, or a pandas Series)     #
+# with one regex scan for all values, normalize_columns(frame, columns, fn) the text columns of a   #
+# DataFrame.                                                                                        #
+#                                                                                                   #
+# Users: the roster search (utils/search_index.py), the CSV import (data/backend.py csv_rows) and   #
+# the digits and direction of the rendered text (processing/text/text_processing.py).              #
+#####################################################################################################
+
+import re
+
+ASCII_DIGITS = '0123456789'
+PERSIAN_DIGITS = '۰۱۲۳۴۵۶۷۸۹'
+ARABIC_DIGITS = '٠١٢٣٤٥٦٧٨٩'
+
+# ---------------------------------------------------------------- replacement tables
+def _replacer(table: dict):
+    """ A function replacing the keys (single non ASCII characters) of `table` in a text by their values. """
+    pattern = re.compile('[' + ''.join(re.escape(char) for char in table) + ']')
+    lookup = table.__getitem__
+    # isascii() is a flag of the str object, no scan
+    return lambda text: text if text.isascii() else pattern.sub(lambda match: lookup(match.group()), text)
+
+
+_ASCII = dict(zip(PERSIAN_DIGITS + ARABIC_DIGITS, ASCII_DIGITS * 2))
+# Arabic code points of the Persian letters (yeh, alef maksura, kaf)
+_PERSIAN_LETTERS = {'ي': 'ی', 'ى': 'ی', 'ك': 'ک'}
+_ARABIC_LETTERS = {'ی': 'ي', 'ک': 'ك'}
+
+# fold(): canonical() and the variants of the same letter, the diacritics (fathatan .. sukun,
+# superscript alef) and the tatweel removed
+_FOLDING = {
+    **_PERSIAN_LETTERS, **_ASCII,
+    'ئ': 'ی', 'ة': 'ه', 'ۀ': 'ه', 'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ؤ': 'و',
+    **{chr(c): '' for c in range(0x064B, 0x0653)}, 'ٰ': '', 'ـ': '',
+}
+
+_TO_ASCII_DIGITS = str.maketrans(_ASCII)
+_TO_PERSIAN_DIGITS = str.maketrans(ASCII_DIGITS + ARABIC_DIGITS, PERSIAN_DIGITS * 2)
+_TO_ARABIC_DIGITS = str.maketrans(ASCII_DIGITS + PERSIAN_DIGITS, ARABIC_DIGITS * 2)
+
+def to_ascii_digits(text: str) -> str: return text if text.isascii() else text.translate(_TO_ASCII_DIGITS)
+
+def to_persian_digits(text: str) -> str: return text.translate(_TO_PERSIAN_DIGITS)
+
+def to_arabic_digits(text: str) -> str: return text.translate(_TO_ARABIC_DIGITS)
+
+
+to_persian_letters = _replacer(_PERSIAN_LETTERS)
+to_arabic_letters = _replacer(_ARABIC_LETTERS)
+
+_canonical = _replacer({**_PERSIAN_LETTERS, **_ASCII})
+_fold = _replacer(_FOLDING)
+
+# ---------------------------------------------------------------- right-to-left
+# The characters counted by rtl_ratio(): letters, digits and combining marks (not punctuation,
+# symbols or spaces)
+_RTL_RANGES = '\u0590-\u05FF\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF'
+_MARKS = '\u0300-\u036F\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06DC\u06DF-\u06E4\u06E7\u06E8\u06EA-\u06ED'
+_COUNTED = re.compile(f'[^\\W_]|[{_MARKS}]')
+_RTL = re.compile(f'(?=[{_RTL_RANGES}])(?:[^\\W_]|[{_MARKS}])')
+
+
+def canonical(text: str) -> str:
+    """ The stored form: Persian letters, ASCII digits. """
+    return _canonical(text)
+
+
+def fold(text: str) -> str:
+    """ The compared form of search and duplicate detection: 'علي ۱۲' and 'علی 12' are equal. """
+    return _fold(text).casefold()
+
+
+def rtl_ratio(text: str):
+    """ The share of right-to-left characters among the letters, digits and marks of `text`, None without any. """
+    counted = len(_COUNTED.findall(text))
+    return len(_RTL.findall(text)) / counted if counted else None
+
+
+def is_mostly_rtl(text: str, threshold: float = 0.5) -> bool:
+    """ False for a text without letters or digits. """
+    ratio = rtl_ratio(text)
+    return ratio is not None and ratio >= threshold
+
+
+# ---------------------------------------------------------------- batch
+# Separator of the joined values of a column: a control character that text cells do not contain
+_SEPARATOR = '\x1f'
+
+
+def normalize_column(values, fn=canonical):
+    """
+    `fn` (canonical, fold, to_ascii_digits, ...) applied to every value of a column: a list (returns
+    a list) or a pandas Series (returns a Series). None / NA stay None, other values are converted to str.<br>
+    The values are joined and converted by one call of `fn`, then split again.
+    """
+    if hasattr(values, 'tolist') and hasattr(values, 'index'):
+        # A pandas Series: the same values in a Series of the same index and text dtype (NA stays NA)
+        from pandas.api.types import is_string_dtype
+        converted = normalize_column(values.tolist(), fn)
+        dtype = values.dtype if is_string_dtype(values.dtype) else object
+        return values.__class__(converted, index=values.index, name=values.name, dtype=dtype)
+
+    values = list(values)
+    present = [i for i, value in enumerate(values) if not _missing(value)]
+    texts = [str(values[i]) for i in present]
+
+    joined = _SEPARATOR.join(texts)
+    parts = fn(joined).split(_SEPARATOR) if texts else []
+
+    # A value containing the separator (or fn changing it): converted one by one
+    if len(parts) != len(texts): parts = [fn(text) for text in texts]
+
+    result = [None] * len(values)
+    for i, part in zip(present, parts): result[i] = part
+    return result
+
+
+def normalize_columns(frame, columns=None, fn=canonical):
+    """ normalize_column() of the `columns` of a pandas DataFrame (default: its text columns), in place.
+        Returns the frame. """
+    if columns is None:
+        from pandas.api.types import is_object_dtype, is_string_dtype
+        columns = [column for column in frame.columns
+                   if is_object_dtype(frame[column].dtype) or is_string_dtype(frame[column].dtype)]
+
+    for column in columns: frame[column] = normalize_column(frame[column], fn)
+    return frame
+
+
+def _missing(value) -> bool:
+    # None, NaN and pandas.NA (the only value that is not equal to itself or raises on bool())
+    if value is None: return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        return True
@@ -1,15 +1,17 @@
 
 #from io import BytesIO
-from PySide6.QtGui import QPixmap,QImage,QPainter, QIcon, QPainterPath
-from PySide6.QtCore import QBuffer,QByteArray,Qt
+from PySide6.QtGui import QPixmap,QPainter, QIcon, QPainterPath
+from PySide6.QtCore import QBuffer,Qt
 import base64
-from PIL import Image
-from scipy.ndimage import sobel
+from core.startup import lazy_import
+from core.icons import svg_pixmap
+# Loaded by the first image operation that needs them (core/startup.py)
+Image = lazy_import('PIL.Image')
+ndimage = lazy_import('scipy.ndimage')
+np = lazy_import('numpy')
 
 import os
-import numpy as np
 import json
-from PySide6.QtSvg import QSvgRenderer
 
 
 from PySide6.QtGui import QPixmap, QPainter, QPainterPath, QBrush, QColor
@@ -118,7 +120,7 @@ def create_rounded_pixmap(original_pixmap:QPixmap,style="all", radius=10):
     
     return rounded
 
-def create_icon_from_svg(svg_string:str, width=64, height=64): return QIcon(create_svg_pixmap(svg_string, width=64, height=64))
+def create_icon_from_svg(svg_string:str, width=64, height=64): return QIcon(create_svg_pixmap(svg_string, width=width, height=height))
 
 def load_icons_from_json(file_path)->dict:
     """Load icon data from a JSON file."""
@@ -133,16 +135,8 @@ def load_icons_from_json(file_path)->dict:
 
   
 def create_svg_pixmap(svg_data: str, width=64, height=64) -> QPixmap:
-    """Convert SVG string data to a QPixmap of given size."""
-    renderer = QSvgRenderer(QByteArray(svg_data.encode()))
-    image = QImage(width, height, QImage.Format.Format_ARGB32)
-    image.fill(0)  # Transparent background
-
-    painter = QPainter(image)
-    renderer.render(painter)
-    painter.end()
-
-    return QPixmap.fromImage(image)
+    """Convert SVG string data to a QPixmap of given size, rendered once per (data, size) (core/icons.py)."""
+    return svg_pixmap(svg_data, width, height)
 
 
     # Function to convert QPixmap to binary data
@@ -181,8 +175,8 @@ def crop_white_background_margins(input_image_path, output_directory,
     img_array = np.array(grayscale_image)
     
     # Compute the Sobel edge detection for horizontal and vertical edges
-    edges_x = sobel(img_array, axis=0)  # Horizontal edges
-    edges_y = sobel(img_array, axis=1)  # Vertical edges
+    edges_x = ndimage.sobel(img_array, axis=0)  # Horizontal edges
+    edges_y = ndimage.sobel(img_array, axis=1)  # Vertical edges
     
     # Combine the edges
     edges = np.sqrt(edges_x**2 + edges_y**2)
@@ -1,7 +1,21 @@
 from data.database import backup_postgres_db
 from core.app_context import app_context
+from data.cache import GROUPS
+from core.startup import lazy_import
+# numpy is loaded by the first item analysis (core/startup.py)
+item_analysis = lazy_import('utils.item_analysis')
 # All developed models about Educational & Learning materials has been saved here.
 
+def quest_status(deadline, reply_date, today) -> str:
+    '''
+    Status of a quest:<br>
+    `Waiting`: not replied and still has time, `Lost`: not replied and the deadline passed,<br>
+    `Replied`: replied before the deadline, `Delayed`: replied after the deadline.
+    '''
+    if reply_date is None: return 'Waiting' if today <= deadline else 'Lost'
+
+    return 'Replied' if reply_date <= deadline else 'Delayed'
+
 # Model layer for item that needs student response and other cases about his/her activity.
 # this model modifies teacher's feedback and answer, score, received date of specified edu-item 
 class EduItemStudentService: 
@@ -33,11 +47,61 @@ class EduItemStudentService:
 
         return status, message
 
+
+    def assign_quest(self, student_id:str, items:list, assign_date:str, deadline:str, configs:str):
+        '''
+        `items`: list of (resource Id, score) pairs in question order,<br>
+        `configs`: template settings of the quest as a json string.<br>
+        The quest and one `quest_items` row per question are inserted by one statement.
+        '''
+        try:
+            ids = [int(Id) for Id, _ in items]
+            scores = [float(score) for _, score in items]
+
+            app_context.database.execute_named('assign_quest', (student_id, ids, scores, assign_date, deadline, configs))
+
+            return True, f'{len(ids)} edu-item(s) assigned to the student with Id:{student_id}.'
+
+        except Exception as e: return False, f'Database Error: {e}.'
+
+    def save_answers(self, Id:int, reply_date:str, feedback:str, scores:list, responses:str):
+        '''
+        `scores`: earned score of each question in question order (None: not scored yet),<br>
+        they are written to `quest_items`, `quests.scores_` keeps the old dash-joined copy.
+        '''
+        try:
+            app_context.database.execute_named('save_quest_answers', (reply_date, feedback, scores, responses, Id))
+
+            return True, f'Answers of the Edu-Item with Id:{Id} were updated.'
+
+        except Exception as e: return False, f'Database Error: {e}.'
+
+    def add_custom_quest(self, student_id:str, resource_id:int, max_score:float, earned_score:float,
+                         assign_date:str, deadline:str, reply_date:str, response:str, feedback:str):
+        ''' A quest with a single question that was scored outside of the application. '''
+        try:
+            app_context.database.execute_named('insert_custom_quest',
+                                               (student_id, resource_id, max_score, earned_score, assign_date,
+                                                deadline, reply_date, response, feedback))
+
+            return True, f'The custom Edu-Item was added to the student with Id:{student_id}.'
+
+        except Exception as e: return False, f'Database Error: {e}.'
+
+    def item_statistics(self, student_ids:list):
+        '''
+        Per-question statistics of a group of students, one row per resource:<br>
+        (resource Id, assigned, scored, mean earned score, mean earned/max ratio).
+        '''
+        try:
+            return True, app_context.database.fetchall_named('class_item_statistics', (list(student_ids),))
+
+        except Exception as e: return False, f'Database Error: {e}.'
     
     def remove_learning_item(self, database_Id):
         try:
             
-            app_context.database.execute(f'DELETE FROM quests WHERE Id ={database_Id};')
+            app_context.database.execute_named('delete_quest', (database_Id,))
 
             status = True
             message =f'The Edu-Item with Id:{database_Id} was removed from database.'
@@ -66,6 +130,7 @@ class ClassroomGroupService:
 
             # update ungrouped record by adding members of rmoved group.
             app_context.database.execute('UPDATE groups SET members_ = %s WHERE grade_ = 0;',(f'{ungrouped},{members}'))
+            app_context.cache.invalidate(GROUPS)
 
             return True, f'The group with Id:{group_id} removed successfully.'
         
@@ -75,11 +140,43 @@ class ClassroomGroupService:
         try:
             id = app_context.database.fetchone("INSERT INTO groups (grade_, book_, title_, events_, members_, description_) VALUES (%s, %s, %s, %s, %s, %s) RETURNING Id;",
                                 (grade, book, title,'','', description))
+            app_context.cache.invalidate(GROUPS)
 
             return True,id, f'New group with Id:{id} created successfully.'
         
         except Exception as e: return False, None, f'Error: {e}.'
     
+    # The rows of the groups manager dialog, a group is identified by its title there
+    def insert_group(self, grade, book, title, events, members, description):
+        try:
+            app_context.database.execute('INSERT INTO groups (grade_, book_, title_, events_, members_, description_) VALUES (%s, %s, %s, %s, %s, %s)',
+                                         (grade, book, title, events, members, description))
+            app_context.cache.invalidate(GROUPS)
+
+            return True, f'New group {title} created successfully.'
+
+        except Exception as e: return False, f'Error: {e}.'
+
+    def update_group_by_title(self, original_title, grade, book, title, events, members, description):
+        try:
+            app_context.database.execute('UPDATE groups SET grade_ = %s, book_ = %s, title_ = %s, events_ = %s, members_ = %s, description_ = %s '
+                                         'WHERE title_ = %s',
+                                         (grade, book, title, events, members, description, original_title))
+            app_context.cache.invalidate(GROUPS)
+
+            return True, f'The group {original_title} updated.'
+
+        except Exception as e: return False, f'Error: {e}.'
+
+    def delete_group_by_title(self, grade, title):
+        try:
+            app_context.database.execute('DELETE FROM groups WHERE grade_ = %s AND title_ = %s', (grade, title))
+            app_context.cache.invalidate(GROUPS)
+
+            return True, f'The group {title} removed successfully.'
+
+        except Exception as e: return False, f'Error: {e}.'
+
     def add_member(self, group_id:int, new_members:str):
         
         try:
@@ -101,6 +198,7 @@ class ClassroomGroupService:
 
             cmd = 'UPDATE groups SET members_ = %s WHERE Id = %s; UPDATE groups SET members_ = %s WHERE grade_ = 0;'
             app_context.database.execute(cmd,(updated_list, group_id, ungrouped,))
+            app_context.cache.invalidate(GROUPS)
             
             return True, 'The group updated.'
         
@@ -109,10 +207,28 @@ class ClassroomGroupService:
     def remove_member(self, group_id, member_id):
         pass
 
+    def analyse_items(self, group_id:int):
+        '''
+        Item analysis of the questions answered by the members of the group (utils/item_analysis.py),<br>
+        the result is stored under the scope `group:<group_id>`.
+        '''
+        try:
+            members = app_context.database.fetchone('SELECT members_ FROM groups WHERE Id = %s;', (group_id,))
+            if not members or not members[0]: return False, f'The group with Id:{group_id} has no members.'
+
+            analysis = item_analysis.analyse_students(app_context.database, [m.strip() for m in members[0].split(',') if m.strip()])
+            if not analysis.resource_ids: return False, f'No scored quest was found for the group with Id:{group_id}.'
+
+            item_analysis.save_analysis(app_context.database, f'group:{group_id}', analysis)
+
+            return True, analysis
+
+        except Exception as e: return False, f'Error:{e}.'
+
     def load_groups(self):
        
         try:
-            records = app_context.database.fetchall('SELECT id, grade_, book_, title_, events_, members_, description_ FROM groups;')
+            records = app_context.cache.fetchall_named(GROUPS, 'groups_all')
             
             return True, records
         
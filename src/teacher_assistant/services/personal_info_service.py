@@ -1,5 +1,6 @@
 from datetime import datetime
 from core.app_context import app_context
+from data.cache import GROUPS, ROSTER
 from processing.text.text_processing import parse_flexible_date
 
 # Model (Data Layer)
@@ -11,11 +12,12 @@ class PersonalInfoService:
     def delete(self,id):
         try:
 
-            app_context.database.execute(f'DELETE FROM personal_info WHERE id ={id};')
+            app_context.database.execute_named('delete_personal_info', (id,))
+            app_context.cache.invalidate(ROSTER)
 
             return True #, self.__cursor.rowcount
         
-        except Exception() as e: return False, e
+        except Exception as e: return False, e
 
     def fetch(self):
         try:
@@ -52,18 +54,62 @@ class PersonalInfoService:
                 params = (id, fname, lname, parent, phone, parent_phone, address, additional_details, photo, birth_date, gender, old_id)
 
             app_context.database.execute(query, params)
+            app_context.cache.invalidate(ROSTER)
             
             # 'ungrouped' record is recognized by grade_ = 0 currently(this is not strong condition)
-            app_context.database.execute('SELECT members_ FROM groups WHERE grade_ = 0;')
-            members = self.__cursor.fetchone()[0]
+            record = app_context.database.fetchone('SELECT members_ FROM groups WHERE grade_ = 0;')
+            members = record[0] if record else None
             
             if members:
                 i = str(members).find(id)
                 if i < 0:
                     members = f'{members},{id}'
                     app_context.database.execute('UPDATE groups SET members_ = %s WHERE grade_ = 0;',(members,))
+                    app_context.cache.invalidate(GROUPS)
 
             return True#, self.__cursor.rowcount
         
-        except Exception() as e: return False, f"Error: {e}"
+        except Exception as e: return False, f"Error: {e}"
 
+
+# The observed behaviours of the students. The roster shows the newest behaviour of every student
+# (LATERAL ... LIMIT 1 of students_all), every write invalidates the cached roster.
+class ObservedBehaviourService:
+
+    def __init__(self):
+        super().__init__()
+
+    def add(self, student_id:str, behaviour:str, analysis:str, date_time:datetime = None):
+        ''' Returns (status, Id of the new note, message). '''
+        try:
+            query  = 'INSERT INTO observed_behaviours(date_time_, student_id, observed_behaviour_, analysis_) '
+            query += 'VALUES (%s, %s, %s, %s) RETURNING Id;'
+
+            record = app_context.database.execute_and_return(query, (date_time or datetime.now(), student_id, behaviour, analysis))
+            app_context.cache.invalidate(ROSTER)
+
+            return True, record[0] if record else None, f'New behaviour note saved for the student with Id:{student_id}.'
+
+        except Exception as e: return False, None, f'Database Error: {e}.'
+
+    def update(self, Id:int, behaviour:str, analysis:str):
+        try:
+            query = 'UPDATE observed_behaviours SET observed_behaviour_=%s, analysis_=%s WHERE Id=%s;'
+
+            app_context.database.execute(query, (behaviour, analysis, Id))
+            app_context.cache.invalidate(ROSTER)
+
+            return True, 'Content updated.'
+
+        except Exception as e: return False, f'Database Error: {e}.'
+
+    def delete(self, student_id:str, Id:int):
+        try:
+            query = 'DELETE FROM observed_behaviours WHERE student_Id=%s AND Id =%s;'
+
+            app_context.database.execute(query, (student_id, Id))
+            app_context.cache.invalidate(ROSTER)
+
+            return True, f'The note with Id {Id} removed from database.'
+
+        except Exception as e: return False, f'Database Error: {e}.'
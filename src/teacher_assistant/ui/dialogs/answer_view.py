@@ -15,8 +15,8 @@ from PySideAbdhUI.Editor.document_editor import TextEditor
 from PySideAbdhUI.Widgets.Notify import PopupNotifier
 from processing.text import text_processing
 from core.app_context import app_context
-from utils.assessment_helper import (has_clean_style, replace_placeholders, unwrap_page_divs, unpack_block,
-                                     assessment_row_template, NEW_CONTENT_PLACEHOLDER)
+from services.edu_item_services import EduItemStudentService
+from utils.assessment_helper import has_clean_style, replace_placeholders, build_assessment_rows
 
 from dateutil.parser import parse
  
@@ -313,18 +313,23 @@ class AnswerView(QDialog):
 
                     score_text.append(widget.score_edit.text().strip())
             
-            cmd = 'UPDATE quests SET reply_date_=%s, feedback_=%s, scores_=%s, responses_=%s WHERE id= %s;'
-            
             reply_date = self.reply_date_edit.text().strip()
 
             if not is_valid_timestamp(reply_date):
                 PopupNotifier.Notify(self,'',f'"{reply_date}" is not valid date-time format')
                 return
 
-            app_context.database.execute(cmd, (reply_date , self.feedback_text.toPlainText().strip(),
-                                              "-".join(score_text), answer_tags, self.data['quiz-id']))
+            # Scores are stored as numbers (quest_items.earned_score), an empty field is 'not scored'
+            try:
+                scores = [float(text) if text else None for text in score_text]
+            except ValueError:
+                PopupNotifier.Notify(self,'',f'Scores must be numbers: {", ".join(score_text)}')
+                return
+
+            status, message = EduItemStudentService().save_answers(id, reply_date, self.feedback_text.toPlainText().strip(),
+                                                                   scores, answer_tags)
             
-            PopupNotifier.Notify(self, 'Save Answer','Answer updated.')
+            PopupNotifier.Notify(self, 'Save Answer','Answer updated.' if status else message)
     
 class HtmlGeneratorWorker(QObject):
     
@@ -356,61 +361,22 @@ class HtmlGeneratorWorker(QObject):
             self.error.emit(str(e))
 
     def _generate_quiz_html(self):
-        # List of questions from bank in string format  separated by '-'
-        qb_ids:str = self.data['qb_ids']
-        
-        qb_ids = qb_ids.replace('-',',')
-
-        cmd = f'SELECT content_, score_ FROM educational_resources WHERE id IN ({qb_ids});'
-
-        #cursor.execute(cmd, qb_ids)
-        records = app_context.database.fetchall(cmd)
+        # Questions of the quest (quest_items) in the assigned order, with their score of the assignment time
+        records = app_context.database.fetchall_named('quest_item_contents', (self.data['quiz-id'],))
 
         if not records: return ('','')
 
-        config_filepath = app_context.resource_path + f'\\templates\\{self.data['configs']['Template']}-config.json'
-        
-        app_context.template_config.set_path(config_filepath)
+        # The template and its config are shared with the GUI thread, they are never changed (utils/template_registry.py)
+        template = app_context.templates.get(self.data['configs']['Template'])
 
-        config = app_context.template_config.read()
-        config = config[self.data['configs']['Language']]
+        config = template.labels(self.data['configs']['Language'])
         
         # Load template
-        template_path = app_context.resource_path + f'\\templates\\{self.data['configs']['Template']}-Template.html'
-        
-        with open(template_path, encoding='utf-8') as f: html = f.read()
+        html = template.html
 
         #language = app_context.Language
-        styles = []
-        total_score = 0.0
-        row = 0
-        # Question blocks ffrom database
-        for row, item in enumerate(records):
-            total_score += item[1]
-            # unpack question blocks
-            new_style, new_content = unpack_block(item[0])
-
-            # Removes open/close of style tag.
-            new_style = new_style.replace("<style>","")
-            new_style = new_style.replace("</style>","")
-            # Join all styles
-            # Join all styles
-            styles.append(new_style)
-            # remove all div with class="page" apen/close part
-            # and return pure content
-            new_content = unwrap_page_divs(new_content)
-            # data cleaning
-            new_content = new_content.replace("\n","")
-            
-            # Generate new row for the table, this table is contains list of questions
-            # format matching data: row index, content, point
-            # this format is selected on template_changed event
-            new_row = assessment_row_template.format(row + 1, new_content, item[1])
-            new_row = new_row + NEW_CONTENT_PLACEHOLDER
-            # Inject this row to the html body
-            html = html.replace(NEW_CONTENT_PLACEHOLDER, new_row, count=1)
-            
-            row += 1
+        # Question blocks from database are injected as the rows of the template table
+        html, styles, total_score = build_assessment_rows(html, records)
 
         date_ = dateutil.parser.parse(str(self.data['assign-date']))
         date_str = date_.strftime("%Y-%m-%d")
@@ -441,14 +407,13 @@ class HtmlGeneratorWorker(QObject):
 
         quiz_id = self.data['quiz-id']
         
-        cmd = f'SELECT responses_, scores_, feedback_ FROM quests WHERE id = {quiz_id};'
-        
-        record = app_context.database.fetchone(cmd)
+        record = app_context.database.fetchone_named('quest_answers', (quiz_id,))
         #cursor.execute(cmd)
         #record = cursor.fetchone()
         if not record: return ''
   
-        scores = str(record[1]).split('-')
+        # Earned scores in question order, None: not scored yet
+        scores = ['' if score is None else f'{score:g}' for score in (record[1] or [])]
  
         # Pattern explanation:
         # <div\b   – literal "<div" followed by a word boundary (ensures it's a tag, not part of a word)
@@ -464,7 +429,7 @@ class HtmlGeneratorWorker(QObject):
         
         for i,block in enumerate(div_blocks):
 
-            result.append({'answer': block, 'score':scores[i]})
+            result.append({'answer': block, 'score':scores[i] if i < len(scores) else ''})
 
         result.append({'feedback':record[2] if record[2] else ''})
 
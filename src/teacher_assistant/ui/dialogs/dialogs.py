@@ -9,6 +9,7 @@ from core.app_context import app_context
 from processing.Imaging.Tools import bytea_to_pixmap
 from processing.utils.image_tools import convert_qpixmap_to_binary
 from view_models import PersonalInfoViewModel as pvModel
+from services.edu_item_services import ClassroomGroupService
 
 class CalendarPopup(QDialog):
     def __init__(self, parent=None):
@@ -292,6 +293,8 @@ class GroupsManagerDialog(QDialog):
         self.setWindowTitle(title)
         #self.setBaseSize(800,500)
         self.cursor = cursor
+        # The writes go through the service, it invalidates the cached groups
+        self.service = ClassroomGroupService()
         self.init_ui()
         self.load_data()
 
@@ -360,15 +363,10 @@ class GroupsManagerDialog(QDialog):
                 self.table_widget.setItem(row_idx, col_idx, QTableWidgetItem(str(col_data)))
 
     def add_group(self):
-        try:
-            self.cursor.execute(
-                "INSERT INTO groups (grade_, book_, title_, events_, members_, description_) VALUES (%s, %s, %s, %s, %s, %s)",
-                (self.grade_input.text(), self.book_input.text(), self.title_input.text(),
-                 self.events_input.text(), self.members_input.text(), self.description_input.text())
-            )
-            self.load_data()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", str(e))
+        status, msg = self.service.insert_group(self.grade_input.text(), self.book_input.text(), self.title_input.text(),
+                                                self.events_input.text(), self.members_input.text(), self.description_input.text())
+        if status: self.load_data()
+        else: QMessageBox.warning(self, "Error", msg)
     
     def update_group(self):
         selected = self.table_widget.currentRow()
@@ -380,15 +378,9 @@ class GroupsManagerDialog(QDialog):
             members = self.members_input.text()
             description = self.description_input.text()
             original_title = self.table_widget.item(selected, 2).text()
-            try:
-                self.cursor.execute("""
-                    UPDATE groups SET grade_ = %s, book_ = %s, title_ = %s, 
-                    events_ = %s, members_ = %s, description_ = %s
-                    WHERE title_ = %s
-                """, (grade, book, title, events, members, description, original_title))
-                self.load_data()
-            except Exception as e:
-                QMessageBox.warning(self, "Error", str(e))
+            status, msg = self.service.update_group_by_title(original_title, grade, book, title, events, members, description)
+            if status: self.load_data()
+            else: QMessageBox.warning(self, "Error", msg)
     
     def delete_group(self):
         if QMessageBox.warning(self,'','DELETE RECORD?',QMessageBox.StandardButton.Ok, QMessageBox.StandardButton.Cancel) == QMessageBox.StandardButton.Cancel:
@@ -398,11 +390,9 @@ class GroupsManagerDialog(QDialog):
         if selected >= 0:
             grade = self.table_widget.item(selected, 0).text()
             title = self.table_widget.item(selected, 2).text()
-            try:
-                self.cursor.execute("DELETE FROM groups WHERE grade_ = %s AND title_ = %s", (grade, title))
-                self.load_data()
-            except Exception as e:
-                QMessageBox.warning(self, "Error", str(e))
+            status, msg = self.service.delete_group_by_title(grade, title)
+            if status: self.load_data()
+            else: QMessageBox.warning(self, "Error", msg)
 
 class GroupSelectionDialog(QDialog):
    
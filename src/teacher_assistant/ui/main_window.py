@@ -8,12 +8,7 @@ from PySide6.QtGui import QIcon, QFontDatabase, QPixmap
 from PySide6.QtWidgets import (QApplication, QPushButton, QLabel, QComboBox, QRadioButton, QHBoxLayout, QVBoxLayout, QWidget)
 
 # main application mudols
-
-from ui.pages.settings_page import SettingsPage
-from ui.pages.database_manager import DatabaseManagerPage
-from ui.pages.resource_editor import EducationalResourceEditor
-from ui.pages.resource_collection import EduResourcesView
-from ui.pages.student_list import StudentListPage
+# The page modules are imported when a page is opened the first time (core/startup.py)
 from core.app_context import app_context
 
 
@@ -108,6 +103,9 @@ class MainWindow(Window.AbdhWindow):
         item = self.create_panel_button(':/icons/graduation-cap.svg','   Students',True, True,'MenuItem')
         item.clicked.connect(lambda _, sender=item:self.load_students_page(sender))
 
+        item = self.create_panel_button(':/icons/sheet.svg','   Gradebook',True, False,'MenuItem')
+        item.clicked.connect(lambda _, sender= item: self.load_gradebook_page(sender))
+
         item = self.create_panel_button(':/icons/library.svg','   Resource collection',True, False,'MenuItem')
         item.clicked.connect(lambda _, sender= item: self.load_EduResourcesViewer(sender))
         
@@ -133,20 +131,36 @@ class MainWindow(Window.AbdhWindow):
         
     def load_EduResourceEditor(self, sender:QPushButton): 
         
+        from ui.pages.resource_editor import EducationalResourceEditor
+
         self.uncheck_items(self.left_panel_layout)
         self.add_page(EducationalResourceEditor())
         sender.setChecked(True)
 
     def load_students_page(self, sender:QPushButton): 
         
+        from ui.pages.student_list import StudentListPage
+
         self.uncheck_items(self.left_panel_layout) 
 
         self.add_page(StudentListPage(parent=self))
         
         if sender: sender.setChecked(True)
 
+    def load_gradebook_page(self, sender:QPushButton):
+
+        from ui.pages.gradebook import GradebookPage
+
+        self.uncheck_items(self.left_panel_layout)
+
+        self.add_page(GradebookPage(parent=self))
+
+        if sender: sender.setChecked(True)
+
     def load_db_maintenance_page(self, sender:QPushButton):
         
+        from ui.pages.database_manager import DatabaseManagerPage
+
         self.uncheck_items(self.left_panel_layout)
 
         connection_settings :dict = app_context.settings_manager.find_value('connection')
@@ -174,6 +188,8 @@ class MainWindow(Window.AbdhWindow):
 
     def load_SettingsPage(self, sender:QPushButton):
 
+        from ui.pages.settings_page import SettingsPage
+
         self.uncheck_items(self.left_panel_layout)
         settings_page = SettingsPage()         
         self.add_page(settings_page)
@@ -182,6 +198,8 @@ class MainWindow(Window.AbdhWindow):
 
     def load_EduResourcesViewer(self, sender:QPushButton):
         
+        from ui.pages.resource_collection import EduResourcesView
+
         self.uncheck_items(self.left_panel_layout)
         
         viewer = EduResourcesView(target_students=[])
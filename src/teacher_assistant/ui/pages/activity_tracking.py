@@ -13,13 +13,17 @@ from PySideAbdhUI.Widgets.Notify import PopupNotifier
 
 from processing.Imaging.Tools import bytea_to_pixmap
 from processing.text.text_processing import local_culture_digits
-from services.edu_item_services import EduItemStudentService as edu_service
-from utils import analysis
+from services.edu_item_services import EduItemStudentService as edu_service, quest_status
+from services.personal_info_service import ObservedBehaviourService
+from core.startup import lazy_import
+# The charts need matplotlib, it is loaded by the first chart (core/startup.py)
+analysis = lazy_import('utils.analysis')
 from processing.Imaging.Tools import pixmap_to_base64
 from ui.dialogs.answer_view import AnswerView
 from ui.widgets.widgets import ObservedBehaviourWidget
 from ui.pages.resource_collection import EduResourcesView
 from core.app_context import app_context
+from core.diagnostics import page_timer
 
 class StudentActivityTrackingPage(QWidget):
     
@@ -252,16 +256,7 @@ class StudentActivityTrackingPage(QWidget):
         new_analysis  = analysis_widget.toPlainText()
 
         if new_analysis or new_behaviour:
-            try:
-                query  = 'UPDATE observed_behaviours SET observed_behaviour_=%s, analysis_=%s WHERE Id=%s;'
-                
-                #cursor = TeacherAssistant.db_connection.cursor()
-
-                app_context.database.execute(query, (new_behaviour,new_analysis,record_id))
-                msg = 'Content updated.'
-            
-            except Exception as e:
-                msg = f'Database error: {e}.'
+            _, msg = ObservedBehaviourService().update(record_id, new_behaviour, new_analysis)
 
         PopupNotifier.Notify(self,"Message",msg)   
         
@@ -308,11 +303,12 @@ class StudentActivityTrackingPage(QWidget):
 
             if behaviuor or analysis:
                 # save data
-                query  = 'INSERT INTO observed_behaviours(date_time_, student_id, observed_behaviour_, analysis_)'
-                query += 'VALUES (%s, %s, %s,%s) RETURNING Id;'
                 now = datetime.now()
-                #cursor = TeacherAssistant.db_connection.cursor()
-                id = app_context.database.fetchone(query, (now, self.student[0], behaviuor, analysis))
+                status, id, msg = ObservedBehaviourService().add(self.student[0], behaviuor, analysis, now)
+
+                if not status:
+                    PopupNotifier.Notify(self,"Message",msg, delay=3000)
+                    return
 
                 widget =  self.___create_observed_note_widget(0, id, now, behaviuor, analysis)
 
@@ -328,15 +324,23 @@ class StudentActivityTrackingPage(QWidget):
 
     def load_behav_data(self):
         
+        self.behav_list.clear()
+        # Placeholder row while the query runs on a worker thread (data/async_db.py),
+        # the future belongs to the page: closing the page cancels it
+        self.behav_list.addItem(QListWidgetItem('Loading behaviour notes...'))
+
+        future = app_context.async_db.fetchall_named('behaviours_by_student', (self.student[0],), owner=self)
+        future.then(self.show_behav_data, self.on_behav_data_failed)
+
+    def on_behav_data_failed(self, message:str):
+        self.behav_list.clear()
+        PopupNotifier.Notify(self,message= f"Error: {message}")
+
+    def show_behav_data(self, records):
+        
         try:
             self.behav_list.clear()
 
-            cmd  = "SELECT Id, date_time_, observed_behaviour_, analysis_ " 
-            cmd += "FROM observed_behaviours WHERE student_id =\'" +self.student[0]+"\' "
-            cmd += "ORDER BY date_time_ DESC;"
-            
-            records = app_context.database.fetchall(cmd)
-            
             for row, record in enumerate(records):
 
                 widget = self.___create_observed_note_widget(row, record[0], record[1], record[2], record[3])
@@ -350,17 +354,7 @@ class StudentActivityTrackingPage(QWidget):
                 
         except Exception as e: PopupNotifier.Notify(self,message= f"Error: {e}")
 
-    def calc_total(self, scores:str=''):
-        
-            if not scores: return 0.0
-        
-            lst = scores.split('-')
-            total = 0.0
-        
-            for val in lst:
-                total+= float(val)
-            return total
-    
+    @page_timer()
     def load_quests_data(self):
         
         earned_score = 0.0
@@ -376,50 +370,26 @@ class StudentActivityTrackingPage(QWidget):
 
         self.quests_list.clear()
         
-        cmd  = 'SELECT id, qb_ids_, total_score_, scores_, assign_date_, deadline_, reply_date_, configs_ FROM quests '
-        cmd += 'WHERE student_id = %s ORDER BY assign_date_ DESC;'
-
-        records = app_context.database.fetchall(cmd,(self.student[0],))
+        records = app_context.database.fetchall_named('quests_by_student', (self.student[0],))
         #         quiz-Id: record[0],       source-ids: record[1],
         #     total-score: record[2],    earned-scores: record[3],
         #   assigned-date: record[4],         deadline: record[5],  reply-date: record[6]
-        #         configs: record[7]
+        #         configs: record[7],     earned-score: record[8] (sum of quest_items)
         
         for row, record in enumerate(records):
             # Options for each quiz (Replied, Waiting, Lost)
             status = ''  
             # Sum of earned scores for all activities
-            earned_score = self.calc_total(record[3])
+            earned_score = float(record[8])
             total_score  = float(record[2]) if record[2] else 1.0
             
-            deadline: datetime = record[5]            
-            
-            # If still has not replied
-            if record[6] == None:
-                # currently has time to reply
-                if today <= deadline: 
-                    has_time += 1
-                    status = 'Waiting'
-                else: 
-                    # the time passed and student has not replied at 
-                    # this status the score is considered, and is assigned to zero
-                    lost += 1
-                    status = 'Lost'
-                # Earned score  divided by max score
-                #score_progress.append(earned_score/total_score)
-            else:  
-                # The answer has replied    
-                reply:datetime = record[6]
-                # The activity has been replied befer deadline ended
-                if reply <= deadline: 
-                    replied +=1
-                    status = 'Replied'
-                # The activity has been replied after deadline ended(delayed)
-                else: 
-                    delayed += 1
-                    status = 'Delayed'
-                # stores the score for the progress chart
-                #score_progress.append(earned_score/total_score)
+            # Waiting / Lost (not replied), Replied / Delayed (replied before / after the deadline)
+            status = quest_status(record[5], record[6], today)
+
+            if   status == 'Waiting': has_time += 1
+            elif status == 'Lost'   : lost += 1
+            elif status == 'Replied': replied += 1
+            else                    : delayed += 1
             
             # stores the score for the progress chart
             score_progress.append(earned_score/total_score)
@@ -431,7 +401,7 @@ class StudentActivityTrackingPage(QWidget):
             col0.setToolTip('Row index\nQuiz-Id')
             col0.setTextFormat(Qt.TextFormat.RichText)
 
-            template = str(record[7]['Template']).startswith('01')
+            template = str((record[7] or {}).get('Template', '')).startswith('01')
             string = f'<h2><strong>{'Quiz' if template else 'Formal'}</strong></h2>'
             col1 = QLabel(string)
             col1.setTextFormat(Qt.TextFormat.RichText)           
@@ -636,13 +606,14 @@ class StudentActivityTrackingPage(QWidget):
 
         layout.addLayout(ans_footer)
         # load old data
-        query = 'SELECT scores_, reply_date_, responses_, feedback_ FROM quests WHERE Id = %s;'
+        query = ('SELECT (SELECT COALESCE(SUM(earned_score), 0) FROM quest_items WHERE quest_id = q.id), '
+                 'reply_date_, responses_, feedback_ FROM quests q WHERE q.id = %s;')
         data = app_context.database.fetchone(query,(quiz_id,))
 
         if data:
             answer_input.document().setHtml(data[2])
             analysis_input.document().setHtml(data[3])
-            score_input.setText(str(self.calc_total(data[0])))
+            score_input.setText(f'{data[0]:g}')
             date_input.setText(str(data[1]))
 
         dlg.exec()
@@ -768,19 +739,13 @@ class StudentActivityTrackingPage(QWidget):
         
     def delete_behaviour_note(self, record_Id, record_index):
         
-        try:# drop data
-            button = QMessageBox.warning(self,'DELETE RECORD','ARE YOU SURE TO DELETE THE RECORD ?',QMessageBox.StandardButton.Ok,QMessageBox.StandardButton.Cancel)
-            if not button == QMessageBox.StandardButton.Ok : return
+        button = QMessageBox.warning(self,'DELETE RECORD','ARE YOU SURE TO DELETE THE RECORD ?',QMessageBox.StandardButton.Ok,QMessageBox.StandardButton.Cancel)
+        if not button == QMessageBox.StandardButton.Ok : return
 
-            query  = 'DELETE FROM observed_behaviours WHERE student_Id=%s AND Id =%s;'
-            
-            app_context.database.execute(query, (self.student[0],record_Id))
-            
-            self.behav_list.takeItem(record_index) # Remove from list 
-            msg = 'The note with Id ' + str(record_Id) + ' removed from database.'   
-                    
-        except Exception as e:
-            msg = f'Database Error: {e}'
+        # drop data
+        status, msg = ObservedBehaviourService().delete(self.student[0], record_Id)
+
+        if status: self.behav_list.takeItem(record_index) # Remove from list
     
         PopupNotifier.Notify(self,"Message",msg, 'bottom-right', delay=3000, background_color='#353030',border_color="#2E7D32")
         
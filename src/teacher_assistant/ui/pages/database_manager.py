@@ -3,17 +3,22 @@ from datetime import datetime
 #import pypandoc
 import psycopg2
 
+from PySide6.QtCore import QThreadPool
 from PySide6.QtGui import (Qt)
 
 from PySide6.QtWidgets import (QFileDialog, QInputDialog,
                                QCheckBox, QGridLayout, QWidget, QLabel, QMessageBox,
-                               QPushButton, QHBoxLayout, QLineEdit, QComboBox)
+                               QPushButton, QHBoxLayout, QLineEdit, QComboBox, QProgressBar)
 
 from PySideAbdhUI.Widgets.Notify import PopupNotifier
 
 #from data.view_models.EduItems import MaintenanceViewModel
 from core.app_context import app_context
-from data.database import backup_postgres_db, change_database_in_session, create_database, initialize_database, restore_postgres_db
+from data.database import change_database_in_session, create_database, initialize_database
+from data.backup_engine import DIRECTORY, BackupEngine, RestoreEngine, backup_name, pg_tool
+from data.export import DATASETS
+from data.loaders import BackupWorker, ExportWorker, RestoreWorker
+from core.settings.settings_manager import SettingsManager
 from view_models.EduItems import MaintenanceViewModel
 
 class DatabaseManagerPage(QWidget):
@@ -77,6 +82,16 @@ class DatabaseManagerPage(QWidget):
         backup_db_button.clicked.connect(self.backup_database)
         restore_db_button = QPushButton("Restore")
         restore_db_button.clicked.connect(self.restore_database)
+        # Progress and cancel of a running backup (data/loaders.py BackupWorker)
+        # The running backup or restore (one at a time)
+        self.tool_worker = None
+        self.tool_cancel_btn = QPushButton("Cancel")
+        self.tool_cancel_btn.setEnabled(False)
+        self.tool_cancel_btn.clicked.connect(lambda: self.tool_worker and self.tool_worker.stop())
+        self.tool_progress = QProgressBar()
+        self.tool_progress.setTextVisible(True)
+        self.tool_progress.setFormat('')
+        self.tool_progress.setVisible(False)
         drop_db_button = QPushButton("Drop")
         drop_db_button.clicked.connect(self.drop_database)
         save_settings_btn = QPushButton('Save settings')
@@ -87,6 +102,8 @@ class DatabaseManagerPage(QWidget):
         action_layout.addWidget(restore_db_button)
         action_layout.addWidget(drop_db_button)
         action_layout.addWidget(save_settings_btn)
+        action_layout.addWidget(self.tool_cancel_btn)
+        action_layout.addWidget(self.tool_progress, 1)
 
         main_layout.addWidget(title_lbl,0,0,1,2)        
         main_layout.addWidget(QLabel('Current database:'),1,0)
@@ -104,11 +121,20 @@ class DatabaseManagerPage(QWidget):
         main_layout.addWidget(QLabel('Restore option:'),7,0)
         main_layout.addLayout(restore_opts,7,1,1,2)
         main_layout.addLayout(action_layout,8,0,1,2)
+        main_layout.addWidget(QLabel('Export:'),9,0)
+        main_layout.addLayout(self.create_export_layout(),9,1)
 
-        main_layout.addWidget(QLabel(f'Theme: {style_path}'),9,0,1,2)
-        main_layout.addWidget(QLabel(f'Settings: {settings_path}\\settings.json'),10,0,1,2)
+        main_layout.addWidget(QLabel(f'Theme: {style_path}'),10,0,1,2)
+        main_layout.addWidget(QLabel(f'Settings: {settings_path}\\settings.json'),11,0,1,2)
         
-        main_layout.setRowStretch(11,1)
+        main_layout.setRowStretch(12,1)
+
+        # pg_dump / pg_restore, CREATE / DROP DATABASE and the server-side cursors of the export need
+        # the PostgreSQL server, a local SQLite database (settings > storage) has none of them
+        if getattr(app_context.database, 'dialect', 'postgresql') != 'postgresql':
+            for button in (create_db_button, backup_db_button, restore_db_button, drop_db_button, self.export_btn):
+                button.setEnabled(False)
+                button.setToolTip('Available with a PostgreSQL database only.')
         
         # Binding View model
         self.view_model = MaintenanceViewModel()
@@ -125,6 +151,81 @@ class DatabaseManagerPage(QWidget):
         self.view_model.bind_property('restore_target_name', '', restore_target_db_name_edit)
 
 
+    # Export of the roster, group members, quest results and behaviours (data/export.py) on the thread pool
+    def create_export_layout(self):
+
+        self.export_worker = None
+
+        export_layout = QHBoxLayout()
+
+        self.export_dataset_cmb = QComboBox()
+        self.export_dataset_cmb.addItem('All data', list(DATASETS))
+        for name, dataset in DATASETS.items(): self.export_dataset_cmb.addItem(dataset.title, [name])
+
+        self.export_format_cmb = QComboBox()
+        self.export_format_cmb.addItems(['XLSX', 'CSV'])
+
+        self.export_btn = QPushButton('Export')
+        self.export_btn.clicked.connect(self.export_data)
+
+        self.export_cancel_btn = QPushButton('Cancel')
+        self.export_cancel_btn.setEnabled(False)
+        self.export_cancel_btn.clicked.connect(lambda: self.export_worker and self.export_worker.stop())
+
+        self.export_progress = QProgressBar()
+        self.export_progress.setTextVisible(True)
+        self.export_progress.setFormat('')
+
+        export_layout.addWidget(self.export_dataset_cmb)
+        export_layout.addWidget(self.export_format_cmb)
+        export_layout.addWidget(self.export_btn)
+        export_layout.addWidget(self.export_cancel_btn)
+        export_layout.addWidget(self.export_progress, 1)
+
+        return export_layout
+
+    def export_data(self):
+
+        names = self.export_dataset_cmb.currentData()
+        fmt = self.export_format_cmb.currentText().lower()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        default_name = f"{self.view_model.database_name}_export_{timestamp}"
+
+        if fmt == 'xlsx':
+            file_path, _ = QFileDialog.getSaveFileName(self, 'Export', os.path.join(self.view_model.backup_path or '',
+                                                       default_name + '.xlsx'), 'Excel Files (*.xlsx)')
+        elif len(names) == 1:
+            file_path, _ = QFileDialog.getSaveFileName(self, 'Export', os.path.join(self.view_model.backup_path or '',
+                                                       f'{default_name}_{names[0]}.csv'), 'CSV Files (*.csv)')
+        else:
+            # One csv file per dataset in the chosen folder
+            file_path = QFileDialog.getExistingDirectory(self, 'Export to folder', self.view_model.backup_path or '')
+            if file_path: file_path = os.path.join(file_path, default_name)
+
+        if not file_path: return
+
+        self.export_worker = ExportWorker(names, file_path, fmt)
+        self.export_worker.signals.progress.connect(self.on_export_progress)
+        self.export_worker.signals.finished.connect(self.on_export_finished)
+
+        self.export_btn.setEnabled(False)
+        self.export_cancel_btn.setEnabled(True)
+
+        QThreadPool.globalInstance().start(self.export_worker)
+
+    def on_export_progress(self, title:str, done:int, total:int):
+        self.export_progress.setMaximum(max(total, 1))
+        self.export_progress.setValue(done)
+        self.export_progress.setFormat(f'{title}: {done}/{total}')
+
+    def on_export_finished(self, status:bool, message:str):
+        self.export_worker = None
+        self.export_btn.setEnabled(True)
+        self.export_cancel_btn.setEnabled(False)
+        self.export_progress.setFormat('Done' if status else '')
+
+        PopupNotifier.Notify(self, 'Export', message)
+
     def save_settings(self):
 
         app_context.settings_manager.write({"postgreSQL tools path": self.view_model.postgresql_tools_path})
@@ -145,21 +246,25 @@ class DatabaseManagerPage(QWidget):
         PopupNotifier.Notify(self,'Settings','Settings saved successfully.')
 
     def backup_database(self):
+        
+        if self.tool_worker: return
+
         # Update this path to match your PostgreSQL installation
-        PG_DUMP_PATH = self.view_model.postgresql_tools_path + '\\pg_dump.exe'
+        PG_DUMP_PATH = pg_tool(self.view_model.postgresql_tools_path, 'pg_dump')
 
         # Check if pg_dump.exe exists
         if not os.path.exists(PG_DUMP_PATH):
            PopupNotifier.Notify(self, 'Backup report', f"PostgreSQL tools not found. Ensure pg_dump.exe exists at: {PG_DUMP_PATH}.")
            return
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_filename = f"{self.view_model.database_name}_backup_{timestamp}.dump"
+        # Directory format: one file per table, dumped by parallel jobs (data/backup_engine.py)
+        backup_filename = backup_name(self.view_model.database_name, DIRECTORY)
     
         try:
             os.makedirs(self.view_model.backup_path, exist_ok=True)
         except Exception as e:
-            msg = f"Failed to create output directory: {e}."
+            PopupNotifier.Notify(self, 'Backup report', f"Failed to create output directory: {e}.")
+            return
 
         output_file = os.path.join(self.view_model.backup_path, backup_filename)
 
@@ -180,68 +285,123 @@ class DatabaseManagerPage(QWidget):
         if not dialog.textValue() == self.view_model.password:
             PopupNotifier.Notify(self,'','Pasword in wrong.')
             return
-                
-        status, msg , path = backup_postgres_db(
-                                        self.view_model.database_name,
-                                        self.view_model.user_name,
-                                        self.view_model.password,
-                                        self.view_model.host,
-                                        self.view_model.port,
-                                        output_file,
-                                        PG_DUMP_PATH)
         
-        PopupNotifier.Notify(self, 'Backup report', msg + '\n' + path)
+        settings = SettingsManager()
+
+        engine = BackupEngine(self.view_model.postgresql_tools_path,
+                              self.view_model.database_name,
+                              self.view_model.user_name,
+                              self.view_model.password,
+                              self.view_model.host,
+                              self.view_model.port)
+        
+        # pg_dump runs on the thread pool, the page shows its progress
+        self.tool_worker = BackupWorker(engine, output_file, DIRECTORY,
+                                          jobs= int(settings.get("backup", "jobs", 0)) or None,
+                                          compression= int(settings.get("backup", "compression", -1)),
+                                          verify= settings.get_bool("backup", "verify", True))
+        
+        self.tool_worker.signals.progress.connect(self.on_tool_progress)
+        self.tool_worker.signals.finished.connect(self.on_backup_finished)
+
+        self.tool_cancel_btn.setEnabled(True)
+        self.tool_progress.setVisible(True)
+
+        QThreadPool.globalInstance().start(self.tool_worker)
+
+    def on_tool_progress(self, phase:str, done:int, total:int, detail:str):
+        # Busy indicator while the total is not known
+        self.tool_progress.setMaximum(total if phase != 'schema' else 0)
+        self.tool_progress.setValue(done)
+        self.tool_progress.setFormat(f'{phase}: {done}/{total} {detail}' if phase != 'schema' else detail)
+
+    def on_tool_finished(self, status:bool):
+        # The running backup or restore (one at a time) ended, the next one can start
+        self.tool_worker = None
+        self.tool_cancel_btn.setEnabled(False)
+        self.tool_progress.setMaximum(1)
+        self.tool_progress.setValue(1 if status else 0)
+        self.tool_progress.setFormat('Done' if status else '')
+
+    def on_backup_finished(self, status:bool, message:str, path:str):
+        self.on_tool_finished(status)
+        
+        PopupNotifier.Notify(self, 'Backup report', message + ('\n' + path if path else ''))
 
     def restore_database(self):
-        # Update these paths according to your PostgreSQL installation
-        bin_path = self.view_model.postgresql_tools_path
         
-        PG_PSQL_PATH = bin_path + r"\\psql.exe"
-        PG_CREATEDB_PATH =bin_path + r"\\createdb.exe"
-        PG_RESTORE_PATH = bin_path + r"\\pg_restore.exe"
-        # Check if pg_dump.exe exists
+        if self.tool_worker: return
+
+        PG_RESTORE_PATH = pg_tool(self.view_model.postgresql_tools_path, 'pg_restore')
+        # Check if pg_restore.exe exists
         if not os.path.exists(PG_RESTORE_PATH):
-           PopupNotifier.Notify(self, 'Restore report', f"PostgreSQL tools not found. Ensure pg_dump.exe exists at: {PG_RESTORE_PATH}.")
+           PopupNotifier.Notify(self, 'Restore report', f"PostgreSQL tools not found. Ensure pg_restore.exe exists at: {PG_RESTORE_PATH}.")
            return
         
-        dump_file, _ = QFileDialog.getOpenFileName(self, "Open Backup", self.view_model.backup_path, "Dump Files (*.dump)")
+        # A custom format file, or the toc.dat of a directory format backup
+        dump_file, _ = QFileDialog.getOpenFileName(self, "Open Backup", self.view_model.backup_path,
+                                                   "Backups (*.dump toc.dat);;Dump Files (*.dump)")
         
-        if dump_file:
-            
-            target_db = self.view_model.database_name
-            
-            if not self.view_model.overwrite_restore: target_db = self.view_model.restore_target_name
+        if not dump_file: return
+
+        if os.path.basename(dump_file) == 'toc.dat': dump_file = os.path.dirname(dump_file)
             
-            if not target_db:
-                QMessageBox.warning(self, "Input Error", "Enter a database name to restore into.")
-                return
+        target_db = self.view_model.database_name
+        
+        if not self.view_model.overwrite_restore: target_db = self.view_model.restore_target_name
+        
+        if not target_db:
+            QMessageBox.warning(self, "Input Error", "Enter a database name to restore into.")
+            return
+        
+        warning = f"⚠️ WARNING: You are about to restore data on the '{target_db}'.\n"
+        warning += "⚡To confirm the action, enter password."
+        # Create the input dialog
+        dialog = QInputDialog()
+        dialog.setWindowTitle("Login")
+        dialog.setLabelText(warning)
+
+        # Set input mode to text and echo mode to password
+        dialog.setTextEchoMode(QLineEdit.EchoMode.Password)
+
+        if not dialog.exec() == QInputDialog.Accepted: return
             
-            warning = f"⚠️ WARNING: You are about to restore data on the '{target_db}'.\n"
-            warning += "⚡To confirm the action, enter password."
-            # Create the input dialog
-            dialog = QInputDialog()
-            dialog.setWindowTitle("Login")
-            dialog.setLabelText(warning)
+        if not dialog.textValue() == self.view_model.password:
+            PopupNotifier.Notify(self,'','Pasword in wrong')
+            return
 
-            # Set input mode to text and echo mode to password
-            dialog.setTextEchoMode(QLineEdit.EchoMode.Password)
+        engine = RestoreEngine(self.view_model.postgresql_tools_path,
+                               self.view_model.user_name,
+                               self.view_model.password,
+                               self.view_model.host,
+                               self.view_model.port)
 
-            if not dialog.exec() == QInputDialog.Accepted: return
-                
-            if not dialog.textValue() == self.view_model.password:
-                PopupNotifier.Notify(self,'','Pasword in wrong')
-                return
-
-            status, msg, db = restore_postgres_db(dump_file,
-                                                                 target_db,
-                                                                 self.view_model.user_name,
-                                                                 self.view_model.password,
-                                                                 self.view_model.host,
-                                                                 self.view_model.port,
-                                                                 self.view_model.overwrite_restore,
-                                                                 self.view_model.postgresql_tools_path)
-
-            QMessageBox.information(self, "Restore Database", f"Database '{db}' restored successfully from '{dump_file}'.")
+        # Overwrite: restored into a staging database that replaces the target when it is complete,
+        # the target stays usable during the restore (data/backup_engine.py)
+        self.tool_worker = RestoreWorker(engine, dump_file, target_db,
+                                         staging= self.view_model.overwrite_restore,
+                                         jobs= int(SettingsManager().get("backup", "jobs", 0)) or None)
+
+        self.tool_worker.signals.progress.connect(self.on_tool_progress)
+        self.tool_worker.signals.finished.connect(self.on_restore_finished)
+
+        self.tool_cancel_btn.setEnabled(True)
+        self.tool_progress.setVisible(True)
+
+        QThreadPool.globalInstance().start(self.tool_worker)
+
+    def on_restore_finished(self, status:bool, message:str, database:str):
+        self.on_tool_finished(status)
+
+        # The database of the session was replaced: its connections were closed by the swap
+        if status and database == self.view_model.database_name:
+            try:
+                # New connections, the same (cleared) cache: the invalidation listeners keep working on it
+                app_context.reset_database()
+            except Exception as e:
+                message += f'\nReconnect failed: {e}.'
+
+        QMessageBox.information(self, "Restore Database", message)
 
     def drop_database(self):
         
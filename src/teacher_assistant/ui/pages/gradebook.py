@@ -0,0 +1,166 @@
+# teacher_assistant/ui/pages/gradebook.py
+# The class-level overview: all students of a group x all assessments of the group in one grid.
+# The rows come from the gradebook table (kept up to date by the triggers of migration 7),
+# the whole group is loaded with one query and pivoted in memory.
+
+from datetime import datetime
+
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QBrush, QColor, QStandardItem, QStandardItemModel
+from PySide6.QtWidgets import QComboBox, QHBoxLayout, QHeaderView, QLabel, QPushButton, QTableView, QVBoxLayout, QWidget
+
+from PySideAbdhUI.Widgets.Notify import PopupNotifier
+
+from core.app_context import app_context
+from core.diagnostics import page_timer
+from services.edu_item_services import quest_status
+
+# Record fields of the 'gradebook_by_group' statement
+REC_STUDENT_ID = 0
+REC_FNAME = 1
+REC_LNAME = 2
+REC_QUEST_ID = 3
+REC_TITLE = 4
+REC_ASSIGN_DATE = 5
+REC_DEADLINE = 6
+REC_REPLY_DATE = 7
+REC_TOTAL = 8
+REC_EARNED = 9
+
+# Background of the cells that need attention
+STATUS_COLORS = {'Lost': QColor(220, 80, 80, 70), 'Delayed': QColor(230, 160, 40, 70), 'Waiting': QColor(120, 120, 120, 40)}
+
+
+def build_gradebook(records, today=None) -> tuple:
+    """
+    Pivots the gradebook rows of a group.<br>
+    Returns (students, assessments, cells):<br>
+    `students`: [(Id, name)], `assessments`: [(assign date, title)] in assign order,<br>
+    `cells`: {(student Id, assessment): (earned, total, status, quest Id)}.<br>
+    The quests of one assessment were assigned together, they share the assign date and the title.
+    """
+    today = today or datetime.now()
+
+    students, assessments, cells = {}, {}, {}
+
+    for record in records:
+        students.setdefault(record[REC_STUDENT_ID], f'{record[REC_FNAME]} {record[REC_LNAME]}')
+
+        assign_date = record[REC_ASSIGN_DATE]
+        key = (assign_date.replace(second=0, microsecond=0) if assign_date else None, record[REC_TITLE] or '')
+        assessments.setdefault(key, None)
+
+        status = quest_status(record[REC_DEADLINE], record[REC_REPLY_DATE], today) if record[REC_DEADLINE] else 'Waiting'
+        cells[(record[REC_STUDENT_ID], key)] = (record[REC_EARNED], record[REC_TOTAL], status, record[REC_QUEST_ID])
+
+    ordered = sorted(assessments, key=lambda key: (key[0] is None, key[0] or datetime.min, key[1]))
+
+    return list(students.items()), ordered, cells
+
+
+class GradebookPage(QWidget):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        self.initUI()
+
+    def initUI(self):
+
+        self.setContentsMargins(10, 0, 10, 10)
+        main_layout = QVBoxLayout(self)
+        main_layout.setSpacing(5)
+
+        page_title = QLabel('GRADEBOOK')
+        page_title.setProperty('class', 'heading2')
+
+        # Classroom groups, the user data of each item is the group Id
+        self.group_combo = QComboBox()
+        self.group_combo.setPlaceholderText('-- Choose a group --')
+
+        for group_id, title, grade, book in app_context.database.fetchall_named('gradebook_groups'):
+            self.group_combo.addItem(f'{title} ({grade} - {book})' if book else str(title), group_id)
+
+        self.group_combo.currentIndexChanged.connect(lambda _: self.load_gradebook())
+
+        refresh_btn = QPushButton('Refresh')
+        refresh_btn.setToolTip('Reload the gradebook of the group')
+        refresh_btn.clicked.connect(self.load_gradebook)
+
+        command_layout = QHBoxLayout()
+        command_layout.setSpacing(2)
+        command_layout.addWidget(page_title)
+        command_layout.addStretch()
+        command_layout.addWidget(self.group_combo)
+        command_layout.addWidget(refresh_btn)
+        main_layout.addLayout(command_layout)
+
+        self.summary_label = QLabel('')
+        main_layout.addWidget(self.summary_label)
+
+        self.model = QStandardItemModel()
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setAlternatingRowColors(True)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
+        main_layout.addWidget(self.table)
+
+    @page_timer()
+    def load_gradebook(self):
+
+        group_id = self.group_combo.currentData()
+        if group_id is None: return
+
+        try:
+            records = app_context.database.fetchall_named('gradebook_by_group', (group_id,))
+        except Exception as e:
+            PopupNotifier.Notify(self, 'Error', f'Failed to load the gradebook: {e}')
+            return
+
+        students, assessments, cells = build_gradebook(records)
+
+        # The model is filled while it is detached from the view, the view is updated once
+        self.table.setModel(None)
+        self.model.clear()
+
+        headers = ['STUDENT'] + [f'{title}\n{date:%Y-%m-%d}' if date else title for date, title in assessments] + ['TOTAL %']
+        self.model.setHorizontalHeaderLabels(headers)
+
+        for student_id, name in students:
+            name_item = QStandardItem(f'{name}\n{student_id}')
+            name_item.setData(student_id, Qt.ItemDataRole.UserRole)
+            row = [name_item]
+
+            earned_sum, total_sum = 0.0, 0.0
+
+            for key in assessments:
+                cell = cells.get((student_id, key))
+                item = QStandardItem('')
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+
+                if cell:
+                    earned, total, status, quest_id = cell
+                    item.setText(f'{earned:g} / {total:g}' if earned is not None else f'- / {total or 0:g}')
+                    item.setToolTip(f'Quiz-Id: {quest_id}\n{status}')
+                    item.setData(quest_id, Qt.ItemDataRole.UserRole)
+
+                    if status in STATUS_COLORS: item.setBackground(QBrush(STATUS_COLORS[status]))
+
+                    earned_sum += earned or 0.0
+                    total_sum += total or 0.0
+
+                row.append(item)
+
+            percent = QStandardItem(f'{100.0 * earned_sum / total_sum:.1f}' if total_sum else '')
+            percent.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+            row.append(percent)
+
+            self.model.appendRow(row)
+
+        self.table.setModel(self.model)
+        self.table.resizeRowsToContents()
+
+        self.summary_label.setText(f'{len(students)} student(s), {len(assessments)} assessment(s)')
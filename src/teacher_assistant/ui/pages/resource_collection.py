@@ -13,7 +13,6 @@
 # and column 2 has provided for nessecery command, template settings and other actions.             # 
 #####################################################################################################
 """
-import os
 
 from datetime import timedelta
 import dateutil
@@ -35,8 +34,12 @@ from PySideAbdhUI.Widgets.Widgets import SearchBox, Separator
 
 from ui.widgets.masonry_view import Card, MasonryView
 from core.app_context import app_context
-from utils.assessment_helper import (add_attr_to_root_div, has_clean_style, replace_placeholders, unpack_block, unwrap_page_divs,
-                                     Edu_Template_Files, assessment_row_template, NEW_CONTENT_PLACEHOLDER)
+from core.diagnostics import page_timer
+from data.cache import RESOURCES
+from data.notifications import change_hub
+from services.edu_item_services import EduItemStudentService
+from utils.assessment_helper import (add_attr_to_root_div, has_clean_style, replace_placeholders, unpack_block,
+                                     Edu_Template_Files, build_assessment_rows)
 
 ###################################################################
 
@@ -56,6 +59,8 @@ class EduResourcesView(QWidget):
         # Defualt dispaly configs
         self.disply_columns = 2
         self.page_size = 50
+        self.data_count = 0
+        self.loaded_count = 0
         self.initUI()
     
 
@@ -91,6 +96,10 @@ class EduResourcesView(QWidget):
         self.initalized = True
 
         self.load_data()
+
+        # Apply the resource changes of the other workstations to the cards
+        change_hub.changed.connect(self.on_table_changed)
+        change_hub.resync.connect(self.reload_data)
     
 
     def setup_tabwidgets(self):
@@ -390,7 +399,6 @@ class EduResourcesView(QWidget):
             utc_time = self.date_input.text().strip()
 
             future_time = self.get_deadline()
-            total_score  =0.0
             config = str({"Template": self.config['template'],
                           "Language": "Persian" if self.lang_cmb.currentIndex() == 0 else 'English',
                           "Font-family":self.font_family,
@@ -407,22 +415,16 @@ class EduResourcesView(QWidget):
             
             config = config.replace("'","\"")
 
-            for stu in self.target_students: 
-                qb_IDs = ''
-                # List of Edu-Items: last index was included sub totlal values
-                for item in self.current_selection: 
-                    qb_IDs += str(item['Id']) +'-'
-                    total_score += float(item["score"])
-
+            # List of Edu-Items: (Id, score) in question order, the same for all students
+            items = [(item['Id'], item['score']) for item in self.current_selection]
+            service = EduItemStudentService()
 
-                cmd = 'INSERT INTO quests(student_id, qb_ids_, assign_date_, deadline_, total_score_, configs_, reply_date_, scores_, responses_, feedback_) '
-                    
-                cmd += 'VALUES(%s, %s, %s,%s, %s, %s, %s, %s, %s, %s)'
-        
-                values = (stu['Id'], qb_IDs[:-1], str(utc_time), str(future_time),total_score, config, None, None, None, None)
+            for stu in self.target_students: 
+                status, message = service.assign_quest(stu['Id'], items, str(utc_time), str(future_time), config)
+                if not status:
+                    PopupNotifier.Notify(self,'',message)
+                    return
 
-                app_context.database.execute(cmd,values)
-                
             msg  = f'Number of {sel} edu-item{'s' if sel>1 else ''} was assigned to {stu_cnt} student{'s' if stu_cnt>1 else ''} successfully'
                 
             PopupNotifier.Notify(self,'',msg)
@@ -441,14 +443,11 @@ class EduResourcesView(QWidget):
         index = self.template_cmb.currentIndex()
 
         # index: "01-Quiz", "02-Formal-Exam"
-        # Index of template selction combobox        
-        config_filepath = os.path.join(app_context.resource_path,f'templates\\{Edu_Template_Files[index]}-config.json')
-        
-        app_context.template_config.set_path(config_filepath)
-
-        config = app_context.template_config.read()
+        # Index of template selction combobox, the template and its config are read once (utils/template_registry.py)
+        template = app_context.templates.get(Edu_Template_Files[index])
 
-        config = config[self.page_language]
+        # A copy of the labels of the language, the template itself is shared
+        config = template.labels(self.page_language)
         # Values: "01-Quiz", "02-Formal-Exam"
         config["template"] = Edu_Template_Files[index]
 
@@ -491,45 +490,15 @@ class EduResourcesView(QWidget):
     def _generate_html_content(self) -> str:
 
         # Generate HTML content with template placeholders replaced
-        # Read template file 01-Quiz-template.html or 02-Formal-Exam-Template.html
-        template_file = os.path.join(app_context.resource_path, f'templates\\{self.config['template']}-Template.html')
-        
-        with open(template_file, encoding="utf-8",mode='r') as f: html = f.read()
+        # Template file 01-Quiz-template.html or 02-Formal-Exam-Template.html, from the registry
+        html = app_context.templates.get(self.config['template']).html
         
-        styles = []
-        total_score = 0.0
-        row = 0
-        self.current_selection = []
+        self.current_selection = [card.widget.data for card in self.masonry_view.cards if card.widget.is_selected]
 
-        for card in self.masonry_view.cards:
-            widget:LearningItemWidget = card.widget
-            data = widget.data
-            
-            if widget.is_selected:
-
-                self.current_selection.append(data)
-                
-                total_score += data['score']
-                new_style, new_content = unpack_block(data["content"])
-                # Removes open/close of style tag.
-                new_style = new_style.replace("<style>","")
-                new_style = new_style.replace("</style>","")
-                # Join all styles
-                styles.append(new_style)
-                # remove all div with class="page" apen/close part
-                # and return pure content
-                #new_content = unwrap_page_divs(new_content)
-                # data cleaning
-                new_content = new_content.replace("\n","")
-                
-                # Generate new row for the table, this table is contains list of questions
-                # format matching data: row index,text_align,content,point
-                # this format is selected on template-changed event
-                new_row = assessment_row_template.format(row + 1, new_content, data['score'])
-                new_row = new_row + NEW_CONTENT_PLACEHOLDER
-                # Inject this row to the html body
-                html = html.replace(NEW_CONTENT_PLACEHOLDER, new_row, count=1)
-                row += 1
+        # The page divs of the selected items are kept here (unwrap_pages=False)
+        html, styles, total_score = build_assessment_rows(html,
+                                                          [(data['content'], data['score']) for data in self.current_selection],
+                                                          unwrap_pages=False)
         
         data = {'Student':"",
                 'Student Id':"",
@@ -558,7 +527,7 @@ class EduResourcesView(QWidget):
                 "metadata":metadata,
                 "score":score}
 
-    def _on_answer_requested(self,sender:LearningItemWidget):
+    def _on_answer_requested(self,sender:'LearningItemWidget'):
 
         r = self.rect()
         p = r.topLeft()
@@ -571,13 +540,30 @@ class EduResourcesView(QWidget):
            sender.info_panel.show()
            return
 
+        # The answer of this card is being read already
+        if getattr(sender, 'answer_future', None): return
+
+        Id = sender.data['Id']
+
+        # Read on a worker thread through the resource cache (data/async_db.py),
+        # the card owns the future: a removed card cancels the read
+        sender.answer_future = app_context.async_db.fetchone_named('resource_answer_and_metadata', (Id,),
+                                                                   region=RESOURCES, owner=sender)
+        sender.answer_future.then(lambda data: self._show_answer_panel(sender, point, data),
+                                  lambda message: self._on_answer_failed(sender, message))
+
+    def _on_answer_failed(self, sender:'LearningItemWidget', message:str):
+        sender.answer_future = None
+        print('Error:', message)
+
+    def _show_answer_panel(self, sender:'LearningItemWidget', point:QPoint, data):
+
+        sender.answer_future = None
         Id = sender.data['Id']
 
         try:
             
-            data = app_context.database.fetchone(f'SELECT answer_, metadata_ FROM educational_resources WHERE Id = {Id};')
-            
-            if data[0] == '' or not data[0]:
+            if not data or data[0] == '' or not data[0]:
                 PopupNotifier.Notify(self,'','No answer provided yet!')
                 return
             
@@ -645,10 +631,12 @@ class EduResourcesView(QWidget):
 
         text = meta.toPlainText()
         id = meta.source_Id
-        app_context.database.execute(f"UPDATE educational_resources SET metadata_ = '{text}' WHERE Id = {id};")
+        app_context.database.execute_named('update_resource_metadata', (text, id))
+        app_context.cache.invalidate(RESOURCES)
         #self.data["metadata"] = text
         PopupNotifier.Notify(self, "", "Metadata updated.")
 
+    @page_timer()
     def load_data(self, filter: str = ''):
         
         self.masonry_view.clear()
@@ -656,53 +644,87 @@ class EduResourcesView(QWidget):
         self.has_more = True
         self.current_filter = filter
         
-        # Use server-side cursor for streaming + low memory
-        search = f"%{self.current_filter}%".strip()
-        # Build safe parameterized query
-        base_query  = "SELECT Id, source_, content_, score_, metadata_ FROM educational_resources"
-        where_parts = f"(source_ ILIKE '%{search}' OR content_ ILIKE '%{search}' "
-        where_parts = f"{where_parts} OR metadata_ ILIKE '%{search}' OR TEXT(Id) ILIKE '%{search}')"
-                          
-        where_clause = "WHERE " + where_parts if where_parts else ""
-
-        order_by = "ORDER BY score_ DESC NULLS LAST, Id DESC"
-
-        full_query = f"{base_query} {where_clause} {order_by}"
-
-        rows = app_context.database.fetchall(full_query)
+        # The search text is a parameter of the prepared statement (data/queries.py)
+        rows = app_context.database.fetchall_named('search_resources', (f"%{self.current_filter}%",))
         
         if rows:
             self.data_count = len(rows)
             self.loaded_count = 0
 
             # Add each HTML item to the list widget
-            for record in rows:
-                data_dict = self._create_data_dict(record[0], record[1], record[2],'', record[4], record[3] )
-                # Create a custom widget for the item
-                viewer = TextEditor(default_size="Edu-Item")
-                
-                viewer.setFixedWidth(app_context.A4_PIXELS)
-                viewer.setPageMargins(2,8,2,8)
+            for record in rows: self.masonry_view.add_card(self._create_card(record))
 
-                # self._view_model.content is a block of question/learning material
-                block = record[2]
-                styles, block = unpack_block(block)
+    def reload_data(self): self.load_data(filter=self.current_filter)
 
-                block = add_attr_to_root_div(block, 'class="page"')
-                block = add_attr_to_root_div(block, 'contenteditable="false"')
-                
-                if not has_clean_style(styles): styles = ""
-                
-                viewer.copy_content(block, styles)
+    def _create_card(self, record) -> Card:
+        # record: a row of 'search_resources' (Id, source, content, score, metadata)
+        data_dict = self._create_data_dict(record[0], record[1], record[2],'', record[4], record[3] )
+        # Create a custom widget for the item
+        viewer = TextEditor(default_size="Edu-Item")
+        
+        viewer.setFixedWidth(app_context.A4_PIXELS)
+        viewer.setPageMargins(2,8,2,8)
 
-                w = LearningItemWidget(data=data_dict)
-                
-                w.initUI(viewer)
-                w.on_answer_requested.connect(lambda arg: self._on_answer_requested(arg))
-                
-                card = Card(w)
-                viewer.loadFinished.connect(lambda ok,c=card, sender=viewer: self._on_viewer_loaded(ok,c, sender))
-                self.masonry_view.add_card(card)
+        # self._view_model.content is a block of question/learning material
+        block = record[2]
+        styles, block = unpack_block(block)
+
+        block = add_attr_to_root_div(block, 'class="page"')
+        block = add_attr_to_root_div(block, 'contenteditable="false"')
+        
+        if not has_clean_style(styles): styles = ""
+        
+        viewer.copy_content(block, styles)
+
+        w = LearningItemWidget(data=data_dict)
+        
+        w.initUI(viewer)
+        w.on_answer_requested.connect(lambda arg: self._on_answer_requested(arg))
+        
+        card = Card(w)
+        viewer.loadFinished.connect(lambda ok,c=card, sender=viewer: self._on_viewer_loaded(ok,c, sender))
+
+        return card
+
+    def on_table_changed(self, change):
+        # Resources changed by another workstation (data/notifications.py): only their cards are rebuilt
+        if change.local or change.table != 'educational_resources': return
+
+        if change.ids is None:
+            self.load_data(filter=self.current_filter)
+            return
+
+        ids = {int(Id) for Id in change.ids}
+        # The changed resources that still match the filter, a deleted one is not in the result
+        rows = {record[0]: record for record in
+                app_context.database.fetchall_named('search_resources_by_ids', (f"%{self.current_filter}%", list(ids)))}
+
+        created = 0
+
+        for index in reversed(range(len(self.masonry_view.cards))):
+            Id = self.masonry_view.cards[index].widget.data['Id']
+            if Id not in ids: continue
+
+            self.masonry_view.remove_card(self.masonry_view.cards[index])
+
+            record = rows.pop(Id, None)
+            if record:
+                self.masonry_view.insert_card(index, self._create_card(record))
+                created += 1
+
+        # New resources at their place of the list order (score_ DESC NULLS LAST, Id DESC)
+        order = lambda Id, score: (score is not None, score or 0.0, Id)
+
+        for Id, record in rows.items():
+            index = next((i for i, card in enumerate(self.masonry_view.cards)
+                          if order(card.widget.data['Id'], card.widget.data['score']) < order(Id, record[3])),
+                         len(self.masonry_view.cards))
+            self.masonry_view.insert_card(index, self._create_card(record))
+            created += 1
+
+        # The view is updated again when the new cards are loaded (_on_viewer_loaded)
+        self.data_count += created
+        self.masonry_view.reflow()
 
     def _on_viewer_loaded(self, ok: bool,card:Card, sender:TextEditor):
         
@@ -717,7 +739,7 @@ class EduResourcesView(QWidget):
 
             self.loaded_count+=1
 
-            if self.loaded_count == self.data_count: self.masonry_view.update_view()
+            if self.loaded_count >= self.data_count: self.masonry_view.update_view()
 
 
 class LearningItemWidget(QWidget):
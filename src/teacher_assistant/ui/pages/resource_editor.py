@@ -18,6 +18,7 @@ from utils.assessment_helper import (add_attr_to_root_div, extract_editor_parts,
                                      remove_specific_attrs, unpack_block)
 
 from core.app_context import app_context
+from data.cache import RESOURCES
 
 class EducationalResourceEditor(QWidget):
 
@@ -29,6 +30,10 @@ class EducationalResourceEditor(QWidget):
         super().__init__()
         
         self.id = 0
+        # Pending reads / writes of the page (data/async_db.py)
+        self.record_future = None
+        self.save_future = None
+        self.save_action = ''
         main_layout = QVBoxLayout(self)
         self.setContentsMargins(10,0,10,10)
         main_layout.addLayout(self.create_header_panel())
@@ -535,11 +540,10 @@ class EducationalResourceEditor(QWidget):
         
         if b == QMessageBox.StandardButton.Cancel: return
 
-        query  = f"DELETE FROM educational_resources WHERE id={self.id};" 
-        
         try:
 
-            app_context.database.execute(query)
+            app_context.database.execute_named('delete_resource', (self.id,))
+            app_context.cache.invalidate(RESOURCES)
             msg = f'The record {self.id} removed from database.'
             self.clear_content()
 
@@ -559,51 +563,70 @@ class EducationalResourceEditor(QWidget):
             PopupNotifier.Notify(self, 'Warning','unsaved data detected. to ignore click "DISCARD"',
                                  ok_slot= self.tabs.currentWidget().setClean)
             return
-        if True:
-            order = 'ORDER BY Id DESC' if direction == '<' else ' ORDER BY Id ASC'
-            where =  f'WHERE Id {direction} {self.id} {order} LIMIT 1;' if not direction == '' else f'WHERE Id>0 {order} LIMIT 1;'
+        # A new click replaces the read that is still running
+        if self.record_future: self.record_future.cancel()
 
-            # Fetch the data from the database
-            query  = f"SELECT Id, source_, score_, content_, answer_, metadata_ FROM educational_resources {where}"
-            
-            row = app_context.database.fetchone(query)
-            if row:            
-                self.clear_content()
-
-                self.id = int(row[0])
-                self.source_input.setText(row[1])
-                self.score_input.setText(str(row[2]))
-                # row[3] is a block of question/learning material
-                ########## CONTENT ###################################
-                block = row[3]
-                styles, block = unpack_block(block)
-
-                block = add_attr_to_root_div(block, 'class="page"')
-                block = add_attr_to_root_div(block, 'contenteditable="true"')
- 
-                if not has_clean_style(styles): styles = ""
+        # Each direction has its own prepared statement in data/queries.py
+        direction = direction.strip()
+        
+        # Read on a worker thread (data/async_db.py), the page owns the future
+        if direction == '':
+            self.record_future = app_context.async_db.fetchone_named('resource_first', owner=self)
+        else:
+            name = {'>':'resource_next', '<':'resource_previous', '=':'resource_by_id'}[direction]
+            self.record_future = app_context.async_db.fetchone_named(name, (self.id or 0,), owner=self)
+
+        self.Id_label.setText('Loading record...')
+        self.record_future.then(self.show_record, self.on_record_failed)
+
+    def on_record_failed(self, message:str):
+        self.record_future = None
+        self.Id_label.setText('Content editing | ' + str(self.id))
+        PopupNotifier.Notify(self,"Message", f"Error: {message}.")
+
+    def show_record(self, row):
 
-                self.content_editor.copy_content(block, styles)
-                ########## CONTENT END ###################################
+        self.record_future = None
 
-                ##########    ANSWER   ###################################
-                block = row[4] if row[4] else ''
-                
-                styles, block = unpack_block(block)
-                
-                block = add_attr_to_root_div(block, 'class="page"')
-                block = add_attr_to_root_div(block, 'contenteditable="true"')
-                
-                if not has_clean_style(styles): styles = ""
+        if not row: self.Id_label.setText('Content editing | ' + str(self.id))
+        
+        if row:            
+            self.clear_content()
 
-                self.answer_editor.copy_content(block, styles)
-                ########## ANSWER END ###################################
+            self.id = int(row[0])
+            self.source_input.setText(row[1])
+            self.score_input.setText(str(row[2]))
+            # row[3] is a block of question/learning material
+            ########## CONTENT ###################################
+            block = row[3]
+            styles, block = unpack_block(block)
+
+            block = add_attr_to_root_div(block, 'class="page"')
+            block = add_attr_to_root_div(block, 'contenteditable="true"')
+ 
+            if not has_clean_style(styles): styles = ""
 
-                self.metadata_input.setPlainText(row[5])
-                
-                self.Id_label.setText('Content editing | ' + str(self.id))
+            self.content_editor.copy_content(block, styles)
+            ########## CONTENT END ###################################
 
+            ##########    ANSWER   ###################################
+            block = row[4] if row[4] else ''
             
+            styles, block = unpack_block(block)
+            
+            block = add_attr_to_root_div(block, 'class="page"')
+            block = add_attr_to_root_div(block, 'contenteditable="true"')
+            
+            if not has_clean_style(styles): styles = ""
+
+            self.answer_editor.copy_content(block, styles)
+            ########## ANSWER END ###################################
+
+            self.metadata_input.setPlainText(row[5])
+            
+            self.Id_label.setText('Content editing | ' + str(self.id))
+
+        
         #except Exception as e:
         #    PopupNotifier.Notify(self,"Message", f"Error: {e}.")
 
@@ -672,32 +695,45 @@ class EducationalResourceEditor(QWidget):
 
         details = self.metadata_input.toPlainText()
         
-        try:
+        # A second click while saving would insert the record twice
+        if self.save_future: return
 
-            query ="INSERT INTO educational_resources (source_, score_, content_, answer_, metadata_)"\
-                   "VALUES (%s, %s, %s, %s, %s) RETURNING id;"
-                
-            variables = (source, score, content, answer, details)
-
-            msg = 'inserted'
-               
-            if self.id and self.id>0:
-                query = "UPDATE educational_resources SET source_ = %s, score_= %s, content_= %s,"\
-                        "answer_= %s, metadata_= %s WHERE Id= %s RETURNING id;"
-
-                variables = (source, score, content, answer, details, self.id)
-                                
-                msg = 'updated'
-                
-            # execute the query and return id
-            self.id = app_context.database.execute_and_return(query, variables)[0]
+        query ="INSERT INTO educational_resources (source_, score_, content_, answer_, metadata_)"\
+               "VALUES (%s, %s, %s, %s, %s) RETURNING id;"
             
-            self.Id_label.setText(f'{str(self.id)} | Content recently {msg}.')
+        variables = (source, score, content, answer, details)
 
-            msg = f'Data {msg} successfully.'
+        msg = 'inserted'
+           
+        if self.id and self.id>0:
+            query = "UPDATE educational_resources SET source_ = %s, score_= %s, content_= %s,"\
+                    "answer_= %s, metadata_= %s WHERE Id= %s RETURNING id;"
 
-        except Exception() as e:
+            variables = (source, score, content, answer, details, self.id)
+                            
+            msg = 'updated'
+            
+        # execute the query on a worker thread and return id (data/async_db.py). The write is not tied to
+        # the page: it completes and drops the cached resources even if the page is closed meanwhile
+        self.Id_label.setText('Saving...')
+        self.save_action = msg
+        self.save_future = app_context.async_db.execute_and_return(query, variables, invalidate=(RESOURCES,))
+        # Bound methods: the connections end with the page
+        self.save_future.then(self.on_saved, self.on_save_failed)
 
-            msg = f'Database error: {e}.'
+    def on_saved(self, row):
+        
+        msg = self.save_action
+        self.save_future = None
+        self.id = row[0]
+        
+        self.Id_label.setText(f'{str(self.id)} | Content recently {msg}.')
 
-        PopupNotifier.Notify(self,"Message", msg)
+        PopupNotifier.Notify(self,"Message", f'Data {msg} successfully.')
+
+    def on_save_failed(self, message:str):
+
+        self.save_future = None
+        self.Id_label.setText('Content editing | ' + str(self.id))
+
+        PopupNotifier.Notify(self,"Message", f'Database error: {message}.')
@@ -1,12 +1,13 @@
 
 from PySide6.QtWidgets import ( QWidget, QVBoxLayout, QHBoxLayout, QFormLayout,QGroupBox, QLabel, QComboBox,
-                                QCheckBox, QSpinBox, QLineEdit, QPushButton, QFileDialog, QMessageBox)
+                                QCheckBox, QSpinBox, QLineEdit, QPushButton, QFileDialog, QMessageBox, QPlainTextEdit)
 from PySide6.QtCore import Qt
 from pathlib import Path
 
 from core.settings.settings_manager import SettingsManager
 from core.settings.security import encrypt, decrypt
 from core.settings.backup import backup_settings, restore_settings
+from core.diagnostics import diagnostics
 
 class SettingsPage(QWidget):
 
@@ -26,6 +27,7 @@ class SettingsPage(QWidget):
         main_layout.addWidget(self._appearance_section())
         main_layout.addWidget(self._database_section())
         main_layout.addWidget(self._backup_section())
+        main_layout.addWidget(self._diagnostics_section())
 
     def _profile_section(self):
         
@@ -62,7 +64,7 @@ class SettingsPage(QWidget):
 
         autosave = QCheckBox("Enable autosave")
         
-        autosave.setChecked(bool(self.settings.get("general", "autosave", True)))
+        autosave.setChecked(self.settings.get_bool("general", "autosave", True))
         autosave.toggled.connect(
             lambda v: self.settings.set("general", "autosave", v)
         )
@@ -144,3 +146,102 @@ class SettingsPage(QWidget):
                 self, "Restored", "Restart application to apply."
             )
 
+    def _diagnostics_section(self):
+        box = QGroupBox("Diagnostics")
+        layout = QVBoxLayout(box)
+        form = QFormLayout()
+
+        enabled = self.settings.get_bool("diagnostics", "enabled")
+
+        self.diagnostics_check = QCheckBox("Measure event-loop stalls and page load times")
+        self.diagnostics_check.setChecked(enabled or diagnostics.enabled)
+        self.diagnostics_check.toggled.connect(self._toggle_diagnostics)
+
+        self.stall_threshold = QSpinBox()
+        self.stall_threshold.setRange(50, 5000)
+        self.stall_threshold.setSingleStep(50)
+        self.stall_threshold.setSuffix(" ms")
+        self.stall_threshold.setValue(int(self.settings.get("diagnostics", "stall_threshold_ms", 200)))
+        self.stall_threshold.valueChanged.connect(self._change_stall_threshold)
+
+        # Query instrumentation (data/instrumentation.py), applied by app_context.setup_query_instrumentation()
+        self.queries_check = QCheckBox("Log slow queries to logs/queries.jsonl")
+        self.queries_check.setChecked(self.settings.get_bool("query_instrumentation", "enabled"))
+        self.queries_check.toggled.connect(lambda checked: self._set_query_instrumentation("enabled", checked))
+
+        self.slow_query_threshold = QSpinBox()
+        self.slow_query_threshold.setRange(10, 60000)
+        self.slow_query_threshold.setSingleStep(50)
+        self.slow_query_threshold.setSuffix(" ms")
+        self.slow_query_threshold.setValue(int(self.settings.get("query_instrumentation", "slow_threshold_ms", 200)))
+        self.slow_query_threshold.valueChanged.connect(lambda value: self._set_query_instrumentation("slow_threshold_ms", value))
+
+        self.explain_check = QCheckBox("Capture EXPLAIN plans of the slow queries")
+        self.explain_check.setChecked(self.settings.get_bool("query_instrumentation", "explain"))
+        self.explain_check.toggled.connect(lambda checked: self._set_query_instrumentation("explain", checked))
+
+        form.addRow("", self.diagnostics_check)
+        form.addRow("Stall threshold:", self.stall_threshold)
+        form.addRow("", self.queries_check)
+        form.addRow("Slow query threshold:", self.slow_query_threshold)
+        form.addRow("", self.explain_check)
+        layout.addLayout(form)
+
+        self.diagnostics_view = QPlainTextEdit()
+        self.diagnostics_view.setReadOnly(True)
+        self.diagnostics_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.diagnostics_view.setMinimumHeight(180)
+        layout.addWidget(self.diagnostics_view)
+
+        commands = QHBoxLayout()
+        commands.addStretch(1)
+
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.clicked.connect(self._refresh_diagnostics)
+        commands.addWidget(refresh_btn)
+
+        clear_btn = QPushButton("Clear")
+        clear_btn.clicked.connect(lambda: (diagnostics.clear(), self._refresh_diagnostics()))
+        commands.addWidget(clear_btn)
+
+        dump_btn = QPushButton("Dump to file")
+        dump_btn.clicked.connect(self._dump_diagnostics)
+        commands.addWidget(dump_btn)
+
+        layout.addLayout(commands)
+
+        self._refresh_diagnostics()
+        return box
+
+    def _toggle_diagnostics(self, checked):
+        self.settings.set("diagnostics", "enabled", checked)
+
+        if checked: diagnostics.start(self.stall_threshold.value())
+        else: diagnostics.stop()
+
+        self._refresh_diagnostics()
+
+    def _change_stall_threshold(self, value):
+        self.settings.set("diagnostics", "stall_threshold_ms", value)
+        # Read by the running watchdog at its next check: no restart, the recorded stalls are kept
+        if diagnostics.watchdog is not None: diagnostics.watchdog.threshold_ms = value
+
+    def _set_query_instrumentation(self, key, value):
+        self.settings.set("query_instrumentation", key, value)
+
+        from core.app_context import app_context
+        app_context.setup_query_instrumentation()
+
+    def _refresh_diagnostics(self):
+        if not diagnostics.enabled and not diagnostics.page_timings.summary():
+            self.diagnostics_view.setPlainText("Diagnostics mode is off.")
+        else:
+            self.diagnostics_view.setPlainText(diagnostics.report())
+
+    def _dump_diagnostics(self):
+        file, _ = QFileDialog.getSaveFileName(
+            self, "Dump Diagnostics", "diagnostics.json", "JSON Files (*.json)"
+        )
+        if file:
+            diagnostics.dump(file)
+            QMessageBox.information(self, "Saved", file)
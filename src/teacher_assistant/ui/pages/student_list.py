@@ -1,5 +1,7 @@
 # Import pandas library for CSV data manipulation and processing
-import pandas as pd
+from core.startup import lazy_import
+# Loaded by the first CSV import (core/startup.py)
+pd = lazy_import('pandas')
 # Import Iterable from typing for type hints indicating collections of items
 from typing import Iterable
 # Import GUI widget classes from PySide6.QtWidgets for building user interface components
@@ -30,6 +32,16 @@ from ui.pages.activity_tracking import StudentActivityTrackingPage
 from ui.pages.resource_collection import EduResourcesView
 # Import global application context for accessing database and settings
 from core.app_context import app_context 
+# Import the cache regions to read through and to invalidate after writes
+from data.cache import GROUPS, ROSTER
+# Import the hub of the row change notifications of the other workstations
+from data.notifications import change_hub
+# Import service of the quests (assignments) of the students
+from services.edu_item_services import EduItemStudentService
+# Import the page timing decorator of the diagnostics mode
+from core.diagnostics import page_timer
+# Import the in-memory index of the search box
+from utils.search_index import SearchIndex
 
 # ==================================================================================
 # UI LAYOUT CONFIGURATION CONSTANTS - Defines dimensions and spacing for UI elements
@@ -118,14 +130,27 @@ class StudentListPage(QWidget):
         
         # Track current position in search results for cycling through matches
         self.search_index = 0
+        # Tokens of the displayed students (utils/search_index.py), built when the roster is loaded
+        self.roster_index = SearchIndex()
+        # Table row of each displayed student ID
+        self._rows_by_id = {}
         # Boolean flag to control whether multi-row selection is enabled
         self._multi_select_enabled = False
         # Store the ID of currently selected group for grouping operations
         self._current_group_id = None  
+        # Member IDs of the selected group, the row changes of other students are ignored
+        self._current_members = set()
+        # Pending student list query (data/async_db.py), cancelled when another group is selected
+        self._students_future = None
         
         # Call method to initialize all user interface components
         self.initUI()
 
+        # Apply the changes of the other workstations to the displayed rows (data/notifications.py)
+        change_hub.changed.connect(self.on_table_changed)
+        # Notifications may have been lost while the listener was disconnected: reload the list
+        change_hub.resync.connect(self.reload_students)
+
     # Method to initialize and configure all user interface elements
     def initUI(self):
 
@@ -145,6 +170,8 @@ class StudentListPage(QWidget):
         group_model = self.load_groups()
         # Create dropdown combo box for filtering students by classroom group
         class_filter_combo = QComboBox()
+        # Keep a reference, the student list is reloaded through this combo box after imports
+        self.class_filter_combo = class_filter_combo
         # Set the data model containing list of groups
         class_filter_combo.setModel(group_model)
         # Connect selection change signal to load students for selected group
@@ -391,8 +418,12 @@ class StudentListPage(QWidget):
 
             # Read CSV file in chunks to handle large files without memory overflow
             data = pd.read_csv(csv_file[0], chunksize=CSV_CHUNK_SIZE, dtype_backend='numpy_nullable')
-            # Insert the CSV data into database using the valid column mapping
-            app_context.database.bulk_insert_csv(data, 'personal_info', valid_mapping)
+            # Insert the CSV data into database using the valid column mapping, the students
+            # already in the table (same ID, whatever digits or letters it is written with) are skipped
+            key_column = 'id' if 'id' in valid_mapping.values() else None
+            app_context.database.bulk_insert_csv(data, 'personal_info', valid_mapping, key_column)
+            # The cached roster does not contain the imported students
+            app_context.cache.invalidate(ROSTER)
             
             # Build success notification message with filename
             msg = f'Successfully loaded data from {csv_file[0]}'
@@ -401,14 +432,8 @@ class StudentListPage(QWidget):
             
             # Check if currently viewing "All" students group
             if self._current_group_id == 'All':
-                # Find the group filter combo box widget
-                for widget in self.findChildren(QComboBox):
-                    # Check if this is the group filter combo box
-                    if widget.model() == self.load_groups():
-                        # Reload student list to show newly imported students
-                        self.load_students(widget)
-                        # Exit loop after reloading
-                        break
+                # Reload student list to show newly imported students
+                self.load_students(self.class_filter_combo)
 
         # Catch any exceptions that occur during CSV loading process
         except Exception as e:
@@ -721,29 +746,12 @@ class StudentListPage(QWidget):
                                  reply_date: str, deadline: str, assignment_date: str, 
                                  score_earned: float, max_score: float):
         
-        # Wrap database insert in try-except for error handling
-        try:
-            # Define SQL INSERT statement for quests table
-            cmd = ('INSERT INTO quests (qb_Id, student_id, max_point_, earned_point_, '
-                    'assign_date_, deadline_, reply_date_, answer_, feedback_) '
-                    'VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s);')
-
-            # Execute INSERT statement with parameterized query to prevent SQL injection
-            app_context.database.execute(cmd, 
-                                            (qb_Id, stu_id, max_score, score_earned, assignment_date, 
-                                            deadline, reply_date, answer, feedback))
-
-            # Set success status flag
-            status = True
-            # Build success message
-            message = f'Custom assignment was saved successfully for student {stu_id}.'
-
-        # Catch any exceptions from database operation
-        except Exception as e:
-            # Set failure status flag
-            status = False
-            # Build error message with exception details
-            message = f'Error saving assignment: {str(e)}'
+        # One quest with a single quest item (quest_items), written by the service in one statement
+        status, message = EduItemStudentService().add_custom_quest(stu_id, qb_Id, max_score, score_earned,
+                                                                   assignment_date, deadline, reply_date,
+                                                                   answer, feedback)
+        # Build success message
+        if status: message = f'Custom assignment was saved successfully for student {stu_id}.'
 
         # Return status and message tuple
         return status, message
@@ -873,8 +881,8 @@ class StudentListPage(QWidget):
                 # Return empty model if database not available
                 return model
             
-            # Execute database query to fetch all group records with their details
-            groups = app_context.database.fetchall('SELECT id, grade_, book_, title_, events_, members_, description_ FROM groups;')                
+            # Fetch all group records with their details, through the cache (invalidated by the group writes)
+            groups = app_context.cache.fetchall_named(GROUPS, 'groups_all')
             
             # Create default "All" item as the first option in the list
             item = QStandardItem('All')
@@ -956,37 +964,24 @@ class StudentListPage(QWidget):
         self.table.setColumnWidth(0, 150)
     
     # Method to load and display students from database based on group selection
+    @page_timer()
     def load_students(self, sender: QComboBox):
         # Wrap database loading in try-except for error handling
         try:
             # Get the selected item's user data (either 'All' string or ClassroomGroupViewModel)
             selected = sender.currentData(Qt.ItemDataRole.UserRole)
             
-            # Build base SQL query with proper parameterization to prevent SQL injection
-            base_query = (
-                'SELECT t1.Id, t1.fname_, t1.lname_, t1.phone_, t1.address_, t1.photo_, '
-                't2.date_time_, t2.observed_behaviour_, t1.parent_name_, t1.parent_phone_, '
-                't1.metadata_, t1.birth_date_, t1.gender_ '
-                'FROM personal_info t1 '
-                'LEFT JOIN ('
-                '  SELECT t2.* FROM observed_behaviours t2 '
-                '  INNER JOIN ('
-                '    SELECT student_id, MAX(date_time_) AS max_created_at '
-                '    FROM observed_behaviours '
-                '    GROUP BY student_id'
-                '  ) last_records ON t2.student_id = last_records.student_id '
-                '    AND t2.date_time_ = last_records.max_created_at'
-                ') t2 ON t1.id = t2.student_id'
-            )
-            
+            # The statements are prepared from data/queries.py (shared with the benchmark suite)
             # Handle group filtering with parameterized query for safety
             if isinstance(selected, str) or not selected:
                 # Load all students from the database (no group filter)
-                query = base_query + ' ORDER BY t1.fname_, t1.lname_;'
+                query = 'students_all'
                 # No parameters needed for all students query
-                params = None
+                params = ()
                 # Track that we're viewing all students
                 self._current_group_id = 'All'
+                # Every student belongs to the list
+                self._current_members = set()
             else:
                 # Filter by group members - use parameterized query for safety
                 # Parse members string (format: ",id1,id2,id3" or "id1,id2,id3")
@@ -996,36 +991,64 @@ class StudentListPage(QWidget):
                 
                 # Check if the group has any members
                 if not members_list:
+                    # A pending load of the previous group must not fill the table afterwards
+                    if self._students_future: self._students_future.cancel()
                     # Group is empty, clear the table display
                     self._clear_table()
                     return
                 
-                # Use IN clause with parameterized query (safer than ANY with array)
-                # Create placeholders for each member ID
-                placeholders = ','.join(['%s'] * len(members_list))
-                # Build query to filter by group members
-                query = base_query + f' WHERE t1.Id IN ({placeholders}) ORDER BY t1.fname_, t1.lname_;'
-                # Set parameters to the member IDs
-                params = tuple(members_list)
+                # Filter with = ANY($1): one prepared statement whatever the size of the group
+                query = 'students_by_ids'
+                # The member IDs are passed as a single array parameter
+                params = (members_list,)
                 # Track the currently selected group ID
                 self._current_group_id = selected.Id
+                # Keep the members to filter the row change notifications
+                self._current_members = set(members_list)
             
-            # Execute the database query with parameters
-            data = app_context.database.fetchall(query, params) if params else app_context.database.fetchall(query)
-            
+            # The result of the previously selected group is not wanted anymore
+            if self._students_future: self._students_future.cancel()
+
+            # Skeleton state while the query runs: the list can not be used, the window stays responsive
+            self.table.setEnabled(False)
+            self.footer_list_count.setText('Students: loading...')
+
+            # Execute the database query on a worker thread, through the roster cache (data/async_db.py).
+            # The page owns the future: leaving the page cancels the query
+            self._students_future = app_context.async_db.fetchall_named(query, params, region=ROSTER, owner=self)
             # Update table display with retrieved student data
-            self._update_table_display(data)
+            self._students_future.finished.connect(self._on_students_loaded)
+            # Report a failed query
+            self._students_future.failed.connect(self._on_students_failed)
                         
         # Catch any exceptions from the loading process
         except Exception as e:
-            # Build error message with exception details
-            error_msg = f"Error loading students: {str(e)}"
-            # Print error to console for debugging
-            print(error_msg)
-            # Notify user of the error
-            PopupNotifier.Notify(self, "Error", error_msg, 'bottom-right', delay=5000)
-            # Clear the table display on error
-            self._clear_table()
+            # Report the error like a failed query
+            self._on_students_failed(str(e))
+
+    # Method to display the students of a finished load_students() query
+    def _on_students_loaded(self, data):
+        # The load is finished
+        self._students_future = None
+        # Leave the skeleton state
+        self.table.setEnabled(True)
+        # Update table display with retrieved student data
+        self._update_table_display(data)
+
+    # Method to report a failed load_students() query
+    def _on_students_failed(self, message: str):
+        # The load is finished
+        self._students_future = None
+        # Leave the skeleton state
+        self.table.setEnabled(True)
+        # Build error message with exception details
+        error_msg = f"Error loading students: {message}"
+        # Print error to console for debugging
+        print(error_msg)
+        # Notify user of the error
+        PopupNotifier.Notify(self, "Error", error_msg, 'bottom-right', delay=5000)
+        # Clear the table display on error
+        self._clear_table()
     
     # Method to clear all rows and data from the table
     def _clear_table(self):
@@ -1043,6 +1066,8 @@ class StudentListPage(QWidget):
         
         # Set model row count to 0 to remove all rows
         self.model.setRowCount(0)
+        # Nothing to search
+        self._index_records([])
         # Update footer to show zero students
         self.footer_list_count.setText('Students: 0')
     
@@ -1078,6 +1103,8 @@ class StudentListPage(QWidget):
                 # Create and display widgets for this student row
                 self._create_student_row(row, record)
             
+            # Index the loaded students for the search box
+            self._index_records(data)
             # Update footer with count of loaded students
             self.footer_list_count.setText(f'Students: {len(data)}')
             # Resize table rows to fit content
@@ -1090,6 +1117,136 @@ class StudentListPage(QWidget):
             # Print error message to console
             PopupNotifier.Notify(self, message=f"Error updating table display: {e}")
     
+    # Method to delete the cell widgets of one table row
+    def _delete_row_widgets(self, row: int):
+        # Iterate through all columns of the row
+        for col in range(self.model.columnCount()):
+            # Get the widget at this cell
+            widget = self.table.indexWidget(self.model.index(row, col))
+            # Delete the widget if one exists
+            if widget: widget.deleteLater()
+
+    # Method to apply a row change notification of another workstation (data/notifications.py)
+    def on_table_changed(self, change):
+        # The changes of this instance are already displayed by the page that made them
+        if change.local: return
+
+        # Group changes: the members of the selected group may have changed
+        if change.table == 'groups':
+            # Rebuild the group filter when the selected group changed (ids is None: too many groups changed)
+            if change.ids is None or self._current_group_id in change.ids: self.reload_groups()
+            return
+
+        # Only the personal info and the last behaviour are displayed in the student rows
+        if change.table not in ('personal_info', 'observed_behaviours'): return
+
+        # Too many changed rows: reload the whole list
+        if change.ids is None:
+            self.load_students(self.class_filter_combo)
+            return
+
+        # Re-read and apply only the changed students
+        self.apply_student_changes([str(Id) for Id in change.ids])
+
+    # Method to reload the students of the selected group
+    def reload_students(self): self.load_students(self.class_filter_combo)
+
+    # Method to rebuild the group filter, the selected group stays selected
+    def reload_groups(self):
+        # Remember the selected group
+        current = self._current_group_id
+        # Reload the groups (the cache region was invalidated by the notification)
+        model = self.load_groups()
+
+        # Find the row of the selected group in the new model, 'All' when it was removed
+        index = 0
+        for row in range(model.rowCount()):
+            # Group view model (or the 'All' string) of the row
+            data = model.item(row).data(Qt.ItemDataRole.UserRole)
+            # Compare by group ID
+            if getattr(data, 'Id', None) == current: index = row
+
+        # Replace the model without loading the students twice
+        self.class_filter_combo.blockSignals(True)
+        self.class_filter_combo.setModel(model)
+        self.class_filter_combo.setCurrentIndex(index)
+        self.class_filter_combo.blockSignals(False)
+
+        # Reload the students of the (new) member list
+        self.load_students(self.class_filter_combo)
+
+    # Method to apply the changed students to the table without reloading the whole list
+    def apply_student_changes(self, ids: list):
+        # In a group, only the members are displayed
+        if self._current_group_id not in (None, 'All'):
+            # Keep the changed students that are members of the selected group
+            ids = [Id for Id in ids if Id in self._current_members]
+
+        # Nothing of the displayed list changed
+        if not ids: return
+
+        # Wrap the update in try-except for error handling
+        try:
+            # Current rows of the changed students (a deleted student has no row in the result)
+            records = {record[REC_ID]: record for record in app_context.database.fetchall_named('students_by_ids', (ids,))}
+        # Catch database errors
+        except Exception as e:
+            # Print error to console for debugging
+            print(f'Error applying student changes: {e}')
+            return
+
+        # Sort key of the list (ORDER BY fname_, lname_, Id)
+        sort_key = lambda record: (record[REC_FNAME] or '', record[REC_LNAME] or '', record[REC_ID])
+
+        # Records displayed now
+        old = self._get_all_records()
+        # Deleted students are dropped, updated students are replaced in place
+        new = [records.get(record[REC_ID], record) for record in old if record[REC_ID] not in ids or record[REC_ID] in records]
+
+        # New students are inserted at their sorted position
+        present = {record[REC_ID] for record in new}
+        for Id, record in records.items():
+            # Already displayed (updated)
+            if Id in present: continue
+            # First row that sorts after the new student
+            position = next((i for i, other in enumerate(new) if sort_key(other) > sort_key(record)), len(new))
+            new.insert(position, record)
+
+        # First row whose student changed: the rows from there are rebuilt, the menus of a row keep its index
+        first = next((i for i, (a, b) in enumerate(zip(old, new)) if a[REC_ID] != b[REC_ID]), min(len(old), len(new)))
+
+        # Delete the widgets of the shifted rows
+        for row in range(first, len(old)): self._delete_row_widgets(row)
+
+        # Set the table model row count to the new number of records
+        self.model.setRowCount(len(new))
+
+        # Rebuild the shifted rows and the updated rows only
+        for row, record in enumerate(new):
+            # Unchanged row above the first shifted row
+            if row < first and record[REC_ID] not in records: continue
+            # Updated row above the first shifted row: its old widgets are deleted
+            if row < first: self._delete_row_widgets(row)
+
+            # Store the record in the first column's item (UserRole)
+            item = QStandardItem()
+            item.setData(record, Qt.ItemDataRole.UserRole)
+            self.model.setItem(row, COL_PHOTO, item)
+
+            # Create and display widgets for this student row
+            self._create_student_row(row, record)
+            # Fit the row height to the new content
+            self.table.resizeRowToContents(row)
+
+        # Update the search index of the changed students only, the row numbers of all
+        for Id in ids:
+            if Id in records: self.roster_index.set(Id, self._search_fields(records[Id]))
+            else: self.roster_index.remove(Id)
+        self._rows_by_id = {record[REC_ID]: row for row, record in enumerate(new)}
+
+        # Update footer with count of displayed students
+        self.footer_list_count.setText(f'Students: {len(new)}')
+
     # Method to retrieve student record data from model item for specific row
     def _get_record_from_row(self, row: int):
         """Get student record data from model item for the given row."""
@@ -1339,6 +1496,8 @@ class StudentListPage(QWidget):
             app_context.database.execute(
                 'UPDATE groups SET members_ = %s WHERE id = %s;',
                 (updated_members, self._current_group_id))
+            # Drop the cached groups, the members changed
+            app_context.cache.invalidate(GROUPS)
             
             # Notify user of successful removal
             PopupNotifier.Notify(self, 'Success', 'Student removed from group successfully.')
@@ -1437,9 +1596,14 @@ class StudentListPage(QWidget):
             app_context.database.execute(
                 'DELETE FROM personal_info WHERE Id = %s;',
                 (student_id,))
+            # Drop the cached roster, the student was removed
+            app_context.cache.invalidate(ROSTER)
             
             # Remove the row from the table display
             self.model.removeRow(row_index)
+            # The student is not found anymore, the rows below moved up
+            self.roster_index.remove(student_id)
+            self._rows_by_id = {record[REC_ID]: row for row, record in enumerate(self._get_all_records())}
             
             # Update footer with new student count
             self.footer_list_count.setText(f'Students: {self.model.rowCount()}')
@@ -1503,6 +1667,19 @@ class StudentListPage(QWidget):
         # Execute the dialog and wait for user completion
         self.dialog.exec()
 
+    # Method to return the searchable fields of a student record (the texts of its row)
+    @staticmethod
+    def _search_fields(record):
+        return (record[REC_ID], record[REC_FNAME], record[REC_LNAME], record[REC_PHONE],
+                record[REC_ADDRESS], record[REC_OBSERVED_BEHAVIOUR])
+
+    # Method to rebuild the search index and the row numbers of the displayed records
+    def _index_records(self, records):
+        self.roster_index.rebuild((record[REC_ID], self._search_fields(record)) for record in records)
+        self._rows_by_id = {record[REC_ID]: row for row, record in enumerate(records)}
+        # A new list: the next search starts at the top
+        self.search_index = 0
+
     # Method to search for students in the list by name, ID, phone, or address
     def find_in_list(self, search_text: str):
         """Search for students in the list based on search text."""
@@ -1515,106 +1692,34 @@ class StudentListPage(QWidget):
             # Exit method without searching
             return
 
-        # Convert search text to lowercase for case-insensitive comparison
-        search_text = search_text.strip().lower()
-        # Get the model from the table
-        model = self.table.model()
-        # Get total number of rows in the table
-        row_count = model.rowCount()
-        
         # Exit if table is empty
-        if row_count == 0:
+        if self.model.rowCount() == 0:
             return
 
+        # Rows of the students with a word starting with every word of the search text (utils/search_index.py)
+        rows = sorted(self._rows_by_id[Id] for Id in self.roster_index.search(search_text) if Id in self._rows_by_id)
         # Flag to track if a match was found
-        found = False
-        # Remember starting row for cycling through results
-        start_row = self.search_index
-        
-        # Search from current index to end, then wrap around to beginning
-        for offset in range(row_count):
-            # Calculate row index with wrapping (cycle back to beginning if at end)
-            row = (start_row + offset) % row_count
-            
-            # Search through all columns in the current row
-            for col in range(model.columnCount()):
-                # Get the model index for this cell
-                index = model.index(row, col)
-                # Get the widget associated with this cell
-                widget = self.table.indexWidget(index)
-                
-                # Initialize empty string for extracted cell text
-                cell_text = ""
-                # Check if a widget exists at this cell
-                if widget:
-                    # If widget is a simple label, get its text directly
-                    if isinstance(widget, QLabel):
-                        cell_text = widget.text()
-                    else:
-                        # Try to extract text from other widget types
-                        if hasattr(widget, "text"):
-                            # Try text() method for text-based widgets
-                            try:
-                                cell_text = widget.text()
-                            except Exception:
-                                # Fail silently if method doesn't work
-                                pass
-                        elif hasattr(widget, "toPlainText"):
-                            # Try toPlainText() method for text edit widgets
-                            try:
-                                cell_text = widget.toPlainText()
-                            except Exception:
-                                # Fail silently if method doesn't work
-                                pass
-                        else:
-                            # Look for a QLabel child widget within composite widget
-                            lbl = widget.findChild(QLabel)
-                            if lbl:
-                                # Extract text from child label
-                                cell_text = lbl.text()
-
-                # Also check record data directly for better search coverage
-                if not cell_text:
-                    # Retrieve the student record from model item
-                    record = self._get_record_from_row(row)
-                    if record:
-                        # Build searchable text from ID, name, phone, address fields
-                        searchable_text = ' '.join([
-                            str(record[REC_ID]),
-                            str(record[REC_FNAME] or ''),
-                            str(record[REC_LNAME] or ''),
-                            str(record[REC_PHONE] or ''),
-                            str(record[REC_ADDRESS] or '')
-                        ]).lower()
-                        # Check if search text is found in searchable fields
-                        if search_text in searchable_text:
-                            # Update cell_text if found
-                            cell_text = searchable_text
-
-                # Check if search term is found in the cell text
-                if cell_text and search_text in cell_text.lower():
-                    # Found a match - select and highlight this row
-                    self.table.selectRow(row)
-                    # Set this as the current index for the table
-                    self.table.setCurrentIndex(index)
-                    # Scroll table to ensure the found row is visible
-                    self.table.scrollTo(index, QAbstractItemView.ScrollHint.EnsureVisible)
-                    # Update search position to next row for cycling through results
-                    self.search_index = (row + 1) % row_count
-                    # Set flag indicating match was found
-                    found = True
-                    # Exit column loop since match is found
-                    break
-            
-            # Exit row loop if match was found
-            if found:
-                break
+        found = bool(rows)
+
+        if found:
+            # The first match from the current position, the search cycles back to the first match
+            row = next((row for row in rows if row >= self.search_index), rows[0])
+            # Get the model index of the row
+            index = self.model.index(row, COL_INFO)
+            # Found a match - select and highlight this row
+            self.table.selectRow(row)
+            # Set this as the current index for the table
+            self.table.setCurrentIndex(index)
+            # Scroll table to ensure the found row is visible
+            self.table.scrollTo(index, QAbstractItemView.ScrollHint.EnsureVisible)
+            # Update search position to next row for cycling through results
+            self.search_index = (row + 1) % self.model.rowCount()
 
         # Execute this block if no match was found
         if not found:
             # Reset search index to beginning for next search
             self.search_index = 0
             # Notify user that no matching student was found
-            PopupNotifier.Notify(self, "Search", f"No match found for '{search_text}'.", 
+            PopupNotifier.Notify(self, "Search", f"No match found for '{search_text.strip()}'.", 
                                'bottom-right', delay=2000)
 
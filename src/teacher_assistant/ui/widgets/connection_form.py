@@ -1,10 +1,18 @@
 
-from PySide6.QtCore import Qt, QObject
+import os
+
+from PySide6.QtCore import Qt, QObject, QCoreApplication
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QWidget, QFormLayout, QLineEdit, QLabel, QPushButton, QHBoxLayout, QMessageBox
 import psycopg2
 
 from core.app_context import app_context
 from data.database import change_database_in_session, create_database, initialize_database
+from data.migrations import migrate
+from data.cache import CacheInvalidationListener
+from data.notifications import start_listener
+from data.replica import start_replica
+from data.backup_scheduler import scheduler_from_settings, start_backup_scheduler
+from core.settings.settings_manager import SettingsManager
 
 class PostgreSqlConnectionWidget(QObject):
     
@@ -22,6 +30,10 @@ class PostgreSqlConnectionWidget(QObject):
         password = ''      if connection_settings is None else connection_settings["password"]
 
         #self.connection = None
+        self.cache_listener = None
+        self.change_listener = None
+        self.replica_worker = None
+        self.backup_thread = None
         self.dialog = QDialog(parent=parent)
         # Set the window flags properly
         self.dialog.setWindowFlags(Qt.WindowType.Dialog | Qt.WindowType.WindowStaysOnTopHint| Qt.WindowType.FramelessWindowHint)
@@ -136,6 +148,39 @@ class PostgreSqlConnectionWidget(QObject):
             
             if app_context.database.connection:
                 if app_context.database.connection.status == 1: # STATUS_READY
+                    # Upgrade the schema of databases created by older versions (pending steps only)
+                    status, msg = migrate(app_context.database.connection)
+                    
+                    if not status: QMessageBox.warning(self.dialog, "Database upgrade", msg)
+
+                    # Several instances on one database: the cache invalidations are exchanged with NOTIFY
+                    if SettingsManager().get_bool("cache", "notifications"):
+                        if self.cache_listener: self.cache_listener.stop()
+                        self.cache_listener = CacheInvalidationListener(app_context.cache, self)
+                        self.cache_listener.start()
+
+                    # Row changes of the other workstations are applied to the open pages (data/notifications.py)
+                    if SettingsManager().get_bool("live_updates", "enabled"):
+                        if self.change_listener: self.change_listener.stop()
+                        self.change_listener = start_listener(app_context.database, app_context.cache)
+                        QCoreApplication.instance().aboutToQuit.connect(self.change_listener.stop)
+
+                    # Offline replica: the read-mostly tables are read from a local SQLite copy (data/replica.py)
+                    settings = SettingsManager()
+                    if settings.get_bool("replica", "enabled"):
+                        if self.replica_worker: self.replica_worker.stop()
+                        path = os.path.join(app_context.appdata_path, f'replica-{self.database}.sqlite3')
+                        self.replica_worker = start_replica(app_context.database, path, app_context.cache,
+                                                            float(settings.get("replica", "sync_interval_s", 60)),
+                                                            int(settings.get("replica", "recent_days", 120)))
+                        QCoreApplication.instance().aboutToQuit.connect(self.replica_worker.stop)
+
+                    # Scheduled full and incremental backups (data/backup_scheduler.py)
+                    if settings.get_bool("backup_schedule", "enabled"):
+                        if self.backup_thread: self.backup_thread.stop()
+                        self.backup_thread = start_backup_scheduler(scheduler_from_settings(self.database))
+                        QCoreApplication.instance().aboutToQuit.connect(self.backup_thread.stop)
+
                     self.dialog.close()
         
         except Exception as e:
@@ -220,6 +220,17 @@ class MasonryView(QWidget):
         self.container.setMinimumWidth(content_w)
         self.container.setMinimumHeight(content_h)
 
+    def insert_card(self, index:int, card:Card):
+
+        card.setParent(self.container)
+        card.show()
+        self.cards.insert(index, card)
+
+    def remove_card(self, card:Card):
+
+        self.cards.remove(card)
+        card.deleteLater()
+
     def clear(self): 
         self.cards.clear()
 
@@ -15,11 +15,14 @@ from PySideAbdhUI.Widgets.Notify import PopupNotifier
 from PySideAbdhUI.Widgets.Widgets import Label
 from PySideAbdhUI.Editor.document_editor import TextEditor
 
-from processing.Imaging import ImageEditor
+from core.startup import lazy_import
+# PIL and numpy are loaded when the image editor is used (core/startup.py)
+ImageEditor = lazy_import('processing.Imaging.ImageEditor')
 from processing.Imaging.Tools import bytea_to_pixmap, pixmap_to_base64
 from processing.text import text_processing
 from core.app_context import app_context
 from services.edu_item_services import EduItemStudentService
+from services.personal_info_service import ObservedBehaviourService
 from view_models.EduItems import EduItemStudentViewModel, EduItemViewModel
 
 class ObservedBehaviourWidget(QWidget):
@@ -163,12 +166,13 @@ class ObservedBehaviourWidget(QWidget):
         ta = self.teacher_analysis_input.toPlainText()
         now = datetime.now()
         
-        # Insert personal information into the table
-        insert_query = 'INSERT INTO observed_behaviours(date_time_,student_id, observed_behaviour_, analysis_) VALUES (%s, %s, %s,%s)'
+        # Insert the behaviour note (the service invalidates the cached roster)
+        status, _, msg = ObservedBehaviourService().add(student_id, obeh, ta, now)
+
+        if not status:
+            QMessageBox.warning(self, "Error", msg)
+            return
 
-        app_context.database.execute(insert_query, (now,student_id,obeh,ta))
-        # Commit the transaction
-        # Here you can add code to process the form data (e.g., save to database, etc.)
         QMessageBox.information(self, "Success", "Student information submitted successfully!")
         self.data_modified = True
 
@@ -1,13 +1,55 @@
+import os
 import json
+import copy
+import atexit
+import tempfile
+import threading
 from typing import Any, Dict, Tuple, Optional
 
 class JSONManager:
-    def __init__(self, file_path: str = None):
+    """
+    Dictionary stored in a JSON file, nested keys in dot notation ('connection.host').
+
+    Default mode: every call reads (and every change rewrites) the file.
+
+    cached=True: the file is parsed once and the lookups are served from memory. The changes are
+    applied to memory at once and written `write_delay` seconds after the last change (one write
+    for a burst of changes), to a temporary file that replaces the original (a crash never leaves
+    a half written file). A file changed by another program (its mtime or size differs from the
+    last read / write) is parsed again, as long as no own change is waiting to be written.
+    flush() writes the pending changes now, they are also written at exit.
+    """
+    def __init__(self, file_path: str = None, cached: bool = False, write_delay: float = 0.5):
         self.file_path = file_path
+        self.cached = cached
+        self.write_delay = write_delay
+
+        # cached mode: the parsed file, the (mtime, size) it was read at, and the pending write
+        self._data = None
+        self._stamp = None
+        self._dirty = False
+        self._timer = None
+        self._lock = threading.RLock()
+
+        if cached: atexit.register(self.flush)
     
-    def set_path(self, path): self.file_path = path
+    def set_path(self, path):
+        if path == self.file_path: return
+        # The pending changes belong to the previous file
+        self.flush()
+        with self._lock:
+            self.file_path = path
+            self._data, self._stamp = None, None
 
-    def read(self) -> Dict[str, Any]:
+    # ---------------------------------------------------------------- file access
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.file_path)
+            return st.st_mtime_ns, st.st_size
+        except (OSError, TypeError):
+            return None
+
+    def _load(self) -> Dict[str, Any]:
         try:
             with open(self.file_path, 'r', encoding='utf-8') as file:
                 return json.load(file)
@@ -15,6 +57,56 @@ class JSONManager:
             return {}
         except json.JSONDecodeError:
             raise ValueError("Invalid JSON format.")
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        # Written next to the file and renamed over it: readers see the old or the new content only
+        folder = os.path.dirname(os.path.abspath(self.file_path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.tmp', dir=folder)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(data, file, indent=4)
+            os.replace(tmp_path, self.file_path)
+        except BaseException:
+            try: os.remove(tmp_path)
+            except OSError: pass
+            raise
+
+    def _cached_data(self) -> Dict[str, Any]:
+        # The in-memory dictionary, parsed again when the file was changed by someone else
+        if self._data is None or (not self._dirty and self._file_stamp() != self._stamp):
+            stamp = self._file_stamp()
+            self._data = self._load()
+            self._stamp = stamp
+        return self._data
+
+    def _changed(self) -> None:
+        # cached mode: (re)starts the debounce timer of the write
+        self._dirty = True
+        if self._timer is not None: self._timer.cancel()
+        self._timer = threading.Timer(self.write_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> None:
+        """ Writes the pending changes of the cached mode now. """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            if not self._dirty or self._data is None: return
+
+            self._save(self._data)
+            self._stamp = self._file_stamp()
+            self._dirty = False
+
+    # ---------------------------------------------------------------- dictionary access
+    def read(self) -> Dict[str, Any]:
+        if not self.cached: return self._load()
+
+        with self._lock:
+            # A copy: the caller may change it without changing the settings
+            return copy.deepcopy(self._cached_data())
     
     def write(self, data: Dict[str, Any]) -> None:
         #Write data to the JSON file, preserving existing content.
@@ -22,10 +114,15 @@ class JSONManager:
     
         if not isinstance(data, dict): raise ValueError("Data must be a dictionary.")
     
-        existing_data = self.read()
+        if self.cached:
+            with self._lock:
+                self._cached_data().update(copy.deepcopy(data))  # Merge new data with existing data
+                self._changed()
+            return
+
+        existing_data = self._load()
         existing_data.update(data)  # Merge new data with existing data
-        with open(self.file_path, 'w', encoding='utf-8') as file:
-            json.dump(existing_data, file, indent=4)
+        self._save(existing_data)
     
     def _get_nested(self, keys: str, data: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
         keys_list = keys.split('.')
@@ -36,22 +133,51 @@ class JSONManager:
                 raise TypeError(f"Cannot set nested key inside non-dictionary value: {key} -> {data[key]}")
             data = data[key]
         return data, keys_list[-1]
+
+    def _lookup(self, key: str, data: Dict[str, Any]) -> Tuple[bool, Any]:
+        # Like _get_nested without creating the missing levels: (found, value)
+        keys_list = key.split('.')
+        for k in keys_list[:-1]:
+            data = data.get(k)
+            if not isinstance(data, dict): return False, None
+        if keys_list[-1] not in data: return False, None
+        return True, data[keys_list[-1]]
     
     def update(self, key: str, value: Any) -> None:
-        data = self.read()
+        if self.cached:
+            with self._lock:
+                nested_data, last_key = self._get_nested(key, self._cached_data())
+                nested_data[last_key] = copy.deepcopy(value)
+                self._changed()
+            return
+
+        data = self._load()
         nested_data, last_key = self._get_nested(key, data)
         nested_data[last_key] = value
         self.write(data)
     
     def delete(self, key: str) -> None:
-        data = self.read()
+        if self.cached:
+            with self._lock:
+                found, _ = self._lookup(key, self._cached_data())
+                if found:
+                    nested_data, last_key = self._get_nested(key, self._data)
+                    del nested_data[last_key]
+                    self._changed()
+            return
+
+        data = self._load()
         nested_data, last_key = self._get_nested(key, data)
         if last_key in nested_data:
             del nested_data[last_key]
-            self.write(data)
+            self._save(data)
     
     def exists(self, key: str) -> bool:
-        data = self.read()
+        if self.cached:
+            with self._lock:
+                return self._lookup(key, self._cached_data())[0]
+
+        data = self._load()
         try:
             nested_data, last_key = self._get_nested(key, data)
             return last_key in nested_data
@@ -63,7 +189,11 @@ class JSONManager:
         Find and return the value associated with the given key (including nested keys).
         Returns None if the key does not exist.
         """
-        data = self.read()
+        if self.cached:
+            with self._lock:
+                return copy.deepcopy(self._lookup(key, self._cached_data())[1])
+
+        data = self._load()
         try:
             nested_data, last_key = self._get_nested(key, data)
             
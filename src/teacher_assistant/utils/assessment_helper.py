@@ -383,6 +383,36 @@ assessment_row_template += f'  <td style="border-left:none;border-right:none; wi
 assessment_row_template += f'  <td style="text-align: center; vertical-align:top; width:--SideColumnsInches--;">{{}}</td>\n'
 assessment_row_template +=  '</tr>\n'
 
+def build_assessment_rows(html:str, items, unwrap_pages:bool=True) -> tuple[str, list, float]:
+    """
+    Injects the question blocks into the table of an assessment template.<br>
+    `items`: iterable of (block, score), block is the stored <BLOCK> of an educational resource.<br>
+    Returns (html, styles, total_score), the placeholder is kept after the last row.
+    """
+    styles = []
+    rows = []
+    total_score = 0.0
+
+    for row, (block, score) in enumerate(items):
+        total_score += score
+        # unpack question blocks
+        new_style, new_content = unpack_block(block)
+        # Removes open/close of style tag.
+        new_style = new_style.replace("<style>","")
+        new_style = new_style.replace("</style>","")
+        styles.append(new_style)
+        # remove all div with class="page" apen/close part and return pure content
+        if unwrap_pages: new_content = unwrap_page_divs(new_content)
+        # data cleaning
+        new_content = new_content.replace("\n","")
+        # format matching data: row index, content, point
+        rows.append(assessment_row_template.format(row + 1, new_content, score))
+
+    # All rows are injected at once, the placeholder stays at the end for later additions
+    html = html.replace(NEW_CONTENT_PLACEHOLDER, ''.join(rows) + NEW_CONTENT_PLACEHOLDER, 1)
+
+    return html, styles, total_score
+
 def replace_placeholders(html, language_setting, data) -> str:
         
         replacements = {
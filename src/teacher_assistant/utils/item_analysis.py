@@ -0,0 +1,228 @@
+# teacher_assistant/utils/item_analysis.py
+# ###################################################################################################
+#                                       ITEM ANALYSIS                                               #
+# ###################################################################################################
+# Class-wide statistics of the questions (educational resources) of the quests. The scores of a     #
+# group of students, or of the quests of one assessment, are read from quest_items into a dense     #
+# students x items matrix (NaN: the student has no score for the question), every statistic is      #
+# computed on the whole matrix with NumPy, there is no loop over the students or the questions:     #
+#                                                                                                   #
+#   difficulty       mean earned/max ratio of the question (p-value, 1.0: everybody got full score) #
+#   discrimination   difficulty in the upper 27% minus difficulty in the lower 27% of the students  #
+#                    ranked by their total percent, below ~0.2 the question does not separate them #
+#   point_biserial   correlation of the question with the rest of the test (corrected item-total,   #
+#                    the point-biserial coefficient for right/wrong questions)                      #
+#   cronbach_alpha   reliability of the whole set, and alpha_if_deleted of each question            #
+#   distribution     histogram of the earned/max ratios of each question and of the total percents #
+#                                                                                                   #
+# The results are stored in item_statistics / item_analysis_runs under a `scope` ('group:12', ...) #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     analysis = analyse_students(app_context.database, members)                                   #
+#     save_analysis(app_context.database, f'group:{group_id}', analysis)                           #
+#####################################################################################################
+
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+# Share of the students in the upper and the lower group of the discrimination index
+GROUP_FRACTION = 0.27
+# Histogram bins of the earned/max ratio of a question and of the total percent of a student
+ITEM_BINS = 5
+TOTAL_BINS = 10
+
+
+@dataclass
+class ItemAnalysis:
+    student_ids: list
+    resource_ids: list
+    # students x items, earned scores, NaN: no score
+    scores: np.ndarray
+    # per item
+    max_scores: np.ndarray
+    responses: np.ndarray
+    mean_score: np.ndarray
+    difficulty: np.ndarray
+    discrimination: np.ndarray
+    point_biserial: np.ndarray
+    alpha_if_deleted: np.ndarray
+    # items x ITEM_BINS
+    item_distribution: np.ndarray
+    # per student, NaN: no scored question
+    total_percent: np.ndarray
+    cronbach_alpha: float
+    total_distribution: np.ndarray
+
+    def item_rows(self) -> list:
+        """ One tuple per question: (resource Id, responses, difficulty, discrimination, point-biserial). """
+        return list(zip(self.resource_ids, self.responses.tolist(), self.difficulty.tolist(),
+                        self.discrimination.tolist(), self.point_biserial.tolist()))
+
+
+def score_matrix(rows) -> tuple:
+    """
+    `rows`: (student Id, resource Id, earned score, max score) records.<br>
+    Returns (student_ids, resource_ids, scores, max_scores), `scores` is the students x items matrix.
+    """
+    if not rows: return [], [], np.empty((0, 0)), np.empty(0)
+
+    students, resources, earned, maximum = zip(*rows)
+
+    student_ids, s_index = np.unique(np.asarray(students, dtype=str), return_inverse=True)
+    resource_ids, r_index = np.unique(np.asarray(resources, dtype=np.int64), return_inverse=True)
+
+    # None -> NaN
+    earned = np.asarray(earned, dtype=float)
+    maximum = np.asarray(maximum, dtype=float)
+
+    scores = np.full((len(student_ids), len(resource_ids)), np.nan)
+    scores[s_index, r_index] = earned
+
+    # The assigned score of the question, the best observed score when it was not stored
+    max_scores = np.full(len(resource_ids), np.nan)
+    np.fmax.at(max_scores, r_index, maximum)
+    observed = np.full(len(resource_ids), np.nan)
+    np.fmax.at(observed, r_index, earned)
+    max_scores = np.where(np.isnan(max_scores) | (max_scores <= 0), observed, max_scores)
+
+    return student_ids.tolist(), resource_ids.tolist(), scores, max_scores
+
+
+def _masked_mean(values:np.ndarray, valid:np.ndarray, axis:int=0) -> np.ndarray:
+    count = valid.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(count > 0, np.where(valid, values, 0.0).sum(axis=axis) / count, np.nan)
+
+
+def _masked_correlation(x:np.ndarray, y:np.ndarray, valid:np.ndarray) -> np.ndarray:
+    """ Column-wise Pearson correlation of x and y over the valid cells only. """
+    mx = _masked_mean(x, valid)
+    my = _masked_mean(y, valid)
+
+    dx = np.where(valid, x - mx, 0.0)
+    dy = np.where(valid, y - my, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r = (dx * dy).sum(axis=0) / np.sqrt((dx * dx).sum(axis=0) * (dy * dy).sum(axis=0))
+
+    return np.where(valid.sum(axis=0) > 2, r, np.nan)
+
+
+def cronbach_alpha(scores:np.ndarray) -> tuple:
+    """
+    Reliability of the items, computed on the students that have a score for every item.<br>
+    Returns (alpha, alpha_if_deleted per item), NaN where it is not defined.
+    """
+    items = scores.shape[1]
+    alpha_if_deleted = np.full(items, np.nan)
+
+    complete = scores[~np.isnan(scores).any(axis=1)]
+    if items < 2 or complete.shape[0] < 2: return float('nan'), alpha_if_deleted
+
+    n = complete.shape[0]
+    total = complete.sum(axis=1)
+    item_var = complete.var(axis=0, ddof=1)
+    total_var = total.var(ddof=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        alpha = items / (items - 1) * (1.0 - item_var.sum() / total_var)
+
+        if items > 2:
+            # var(total - item) = var(total) + var(item) - 2 cov(total, item)
+            cov = ((complete - complete.mean(axis=0)) * (total - total.mean())[:, None]).sum(axis=0) / (n - 1)
+            rest_var = total_var + item_var - 2.0 * cov
+            alpha_if_deleted = (items - 1) / (items - 2) * (1.0 - (item_var.sum() - item_var) / rest_var)
+
+    return float(alpha), alpha_if_deleted
+
+
+def analyse(student_ids:list, resource_ids:list, scores:np.ndarray, max_scores:np.ndarray,
+            group_fraction:float=GROUP_FRACTION) -> ItemAnalysis:
+    """ All statistics of a students x items score matrix (see the module header). """
+    valid = ~np.isnan(scores)
+    items = scores.shape[1]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # earned/max ratio, questions without a positive max score are left out
+        ratio = np.clip(scores / np.where(max_scores > 0, max_scores, np.nan), 0.0, 1.0)
+        valid &= ~np.isnan(ratio)
+
+        responses = valid.sum(axis=0)
+        mean_score = _masked_mean(scores, valid)
+        difficulty = _masked_mean(ratio, valid)
+
+        # Total percent of each student over the questions he/she has a score for
+        earned = np.where(valid, scores, 0.0).sum(axis=1)
+        possible = np.where(valid, max_scores, 0.0).sum(axis=1)
+        total_percent = np.where(possible > 0, 100.0 * earned / possible, np.nan)
+
+    # Discrimination index: upper and lower group of the students ranked by total percent
+    ranked = np.flatnonzero(~np.isnan(total_percent))
+    ranked = ranked[np.argsort(total_percent[ranked], kind='stable')]
+    group = int(round(len(ranked) * group_fraction))
+
+    if group >= 1 and len(ranked) >= 2 * group:
+        lower, upper = ranked[:group], ranked[-group:]
+        discrimination = _masked_mean(ratio[upper], valid[upper]) - _masked_mean(ratio[lower], valid[lower])
+    else:
+        discrimination = np.full(items, np.nan)
+
+    # Item-rest correlation: the question is removed from the total it is compared with
+    rest = np.where(valid, ratio, 0.0).sum(axis=1)[:, None] - np.where(valid, ratio, 0.0)
+    point_biserial = _masked_correlation(np.where(valid, ratio, 0.0), rest, valid)
+
+    alpha, alpha_if_deleted = cronbach_alpha(scores)
+
+    # Histograms: the bin of every cell, then one bincount over (item, bin)
+    bins = np.minimum((np.nan_to_num(ratio) * ITEM_BINS).astype(int), ITEM_BINS - 1)
+    columns = np.broadcast_to(np.arange(items), ratio.shape)
+    item_distribution = np.bincount((columns * ITEM_BINS + bins)[valid],
+                                    minlength=items * ITEM_BINS).reshape(items, ITEM_BINS)
+
+    total_distribution, _ = np.histogram(total_percent[~np.isnan(total_percent)], bins=TOTAL_BINS, range=(0, 100))
+
+    return ItemAnalysis(student_ids=student_ids, resource_ids=resource_ids, scores=scores, max_scores=max_scores,
+                        responses=responses, mean_score=mean_score, difficulty=difficulty,
+                        discrimination=discrimination, point_biserial=point_biserial,
+                        alpha_if_deleted=alpha_if_deleted, item_distribution=item_distribution,
+                        total_percent=total_percent, cronbach_alpha=alpha, total_distribution=total_distribution)
+
+
+def analyse_students(database, student_ids:list) -> ItemAnalysis:
+    """ Item analysis of the replied quests of the students (e.g. the members of a group). """
+    rows = database.fetchall_named('item_scores_by_students', (list(student_ids),))
+    return analyse(*score_matrix(rows))
+
+
+def analyse_quests(database, quest_ids:list) -> ItemAnalysis:
+    """ Item analysis of one assessment: the replied quests among `quest_ids`. """
+    rows = database.fetchall_named('item_scores_by_quests', ([int(Id) for Id in quest_ids],))
+    return analyse(*score_matrix(rows))
+
+
+def _nullable(values:np.ndarray) -> list:
+    # NaN is stored as NULL
+    return [None if np.isnan(value) else float(value) for value in values]
+
+
+def save_analysis(database, scope:str, analysis:ItemAnalysis):
+    """ Replaces the stored results of `scope` with `analysis`. """
+    percents = analysis.total_percent[~np.isnan(analysis.total_percent)]
+    distribution = {'edges': np.linspace(0, 100, TOTAL_BINS + 1).tolist(),
+                    'counts': analysis.total_distribution.tolist()}
+
+    database.execute_named('save_item_analysis_run',
+                           (scope, len(percents), len(analysis.resource_ids),
+                            None if np.isnan(analysis.cronbach_alpha) else analysis.cronbach_alpha,
+                            float(percents.mean()) if len(percents) else None,
+                            float(percents.std(ddof=1)) if len(percents) > 1 else None,
+                            json.dumps(distribution)))
+
+    database.execute_named('save_item_statistics',
+                           (scope, [int(Id) for Id in analysis.resource_ids], analysis.responses.tolist(),
+                            _nullable(analysis.max_scores), _nullable(analysis.mean_score),
+                            _nullable(analysis.difficulty), _nullable(analysis.discrimination),
+                            _nullable(analysis.point_biserial), _nullable(analysis.alpha_if_deleted),
+                            [json.dumps(row) for row in analysis.item_distribution.tolist()]))
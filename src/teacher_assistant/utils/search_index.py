@@ -0,0 +1,122 @@
+# teacher_assistant/utils/search_index.py
+# ###################################################################################################
+#                                        SEARCH INDEX                                               #
+# ###################################################################################################
+# An in-memory inverted index of short records (the student rows of the roster): every word of the  #
+# searchable fields is a token, a token maps to the keys of the rows that contain it.                #
+#                                                                                                   #
+# - Normalization: fold() of processing/text/normalization.py, the Arabic letter variants become   #
+#   the Persian letters, all digits ASCII digits, without diacritics, case folded: 'علي' finds        #
+#   'علی', '۰۹۱۲' finds '0912'.                                                                      #
+# - Prefix matching: the tokens are kept sorted, the tokens starting with a query word are one range #
+#   of the list (bisect), not a scan of the rows. A query of several words matches the rows that     #
+#   have all of them: 'ali moh' finds 'Ali Mohammadi'.                                              #
+# - Incremental: set() / remove() update the index of one row, the index is built once when the     #
+#   roster is loaded and follows the row changes.                                                   #
+#                                                                                                   #
+# Usage:                                                                                            #
+#     index = SearchIndex()                                                                         #
+#     index.rebuild((record[0], record[1:5]) for record in records)                                 #
+#     keys = index.search('علي ۰۹۱')                                                                #
+#####################################################################################################
+
+import bisect
+import re
+
+from processing.text.normalization import fold
+
+# Words: letters and digits (the zero width non-joiner of Persian text separates two words)
+_WORD = re.compile(r'\w+')
+
+
+def normalize(text) -> str:
+    """ The text as it is indexed and searched (processing/text/normalization.py fold()). """
+    return fold(str(text)) if text is not None else ''
+
+
+def tokenize(text) -> list:
+    return _WORD.findall(normalize(text))
+
+
+class SearchIndex:
+
+    def __init__(self):
+        # key -> tokens of the row
+        self._rows = {}
+        # token -> keys of the rows that contain it
+        self._postings = {}
+        # All tokens, sorted: the tokens with a prefix are a range of this list
+        self._sorted = []
+
+    def __len__(self): return len(self._rows)
+
+    def __contains__(self, key): return key in self._rows
+
+    def clear(self):
+        self._rows.clear()
+        self._postings.clear()
+        self._sorted.clear()
+
+    def rebuild(self, items):
+        """ Replaces the index by `items`: (key, fields) pairs, fields is an iterable of values (None is skipped). """
+        self.clear()
+
+        for key, fields in items:
+            tokens = self._tokens(fields)
+            self._rows[key] = tokens
+            for token in tokens: self._postings.setdefault(token, set()).add(key)
+
+        self._sorted = sorted(self._postings)
+
+    def set(self, key, fields):
+        """ Adds the row `key` or replaces its fields. """
+        self.remove(key)
+
+        tokens = self._tokens(fields)
+        self._rows[key] = tokens
+
+        for token in tokens:
+            keys = self._postings.get(token)
+            if keys is None:
+                keys = self._postings[token] = set()
+                bisect.insort(self._sorted, token)
+            keys.add(key)
+
+    def remove(self, key):
+        for token in self._rows.pop(key, ()):
+            keys = self._postings[token]
+            keys.discard(key)
+            if keys: continue
+
+            # The last row of the token
+            del self._postings[token]
+            del self._sorted[bisect.bisect_left(self._sorted, token)]
+
+    def search(self, query) -> set:
+        """ Keys of the rows with a token starting with every word of `query` (an empty query: no rows). """
+        words = tokenize(query)
+        if not words: return set()
+
+        result = None
+        # The longest words first: they match the fewest rows, the intersection shrinks fast
+        for word in sorted(set(words), key=len, reverse=True):
+            keys = self._prefix(word)
+            result = keys if result is None else result & keys
+            if not result: return set()
+
+        return result
+
+    def _prefix(self, word: str) -> set:
+        keys = set()
+        i = bisect.bisect_left(self._sorted, word)
+
+        while i < len(self._sorted) and self._sorted[i].startswith(word):
+            keys |= self._postings[self._sorted[i]]
+            i += 1
+
+        return keys
+
+    @staticmethod
+    def _tokens(fields) -> frozenset:
+        # The fields are normalized as one text: one fold() per row
+        return frozenset(tokenize('\n'.join(str(field) for field in fields if field is not None)))
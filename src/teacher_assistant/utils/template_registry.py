@@ -0,0 +1,118 @@
+# teacher_assistant/utils/template_registry.py
+# ###################################################################################################
+#                                       TEMPLATE REGISTRY                                           #
+# ###################################################################################################
+# An assessment template is a pair of files in resources/templates:                                 #
+#                                                                                                   #
+#     01-Quiz-Template.html      the page, with the --Placeholders-- of replace_placeholders()     #
+#     01-Quiz-config.json        the labels of every language: {"Persian": {...}, "English": {...}} #
+#                                                                                                   #
+# The publishing page reads them on every change of a combo box and the worker of the answer view   #
+# on every generation. TemplateRegistry reads each template once (on its first use) into an         #
+# immutable AssessmentTemplate that can be shared by the GUI thread and the worker threads:         #
+#                                                                                                   #
+#     template = app_context.templates.get('01-Quiz')                                               #
+#     labels = template.labels('English')      # a dict copy, the caller may change it              #
+#                                                                                                   #
+# A changed file (mtime or size) is read again on the next get(), the objects handed out before     #
+# stay valid and unchanged.                                                                         #
+#####################################################################################################
+
+import os
+import json
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+
+def _freeze(value):
+    # Read-only views of the parsed JSON: dicts become mappingproxies, lists become tuples
+    if isinstance(value, dict): return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list): return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType): return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple): return [_thaw(item) for item in value]
+    return value
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+@dataclass(frozen=True)
+class AssessmentTemplate:
+    name: str
+    # Text of {name}-Template.html
+    html: str
+    # {language: {label: text}} of {name}-config.json, read-only
+    config: MappingProxyType
+
+    def labels(self, language: str) -> dict:
+        """ The labels of `language` as a new dict (KeyError if the config has no such language). """
+        return _thaw(self.config[language])
+
+
+class TemplateRegistry:
+
+    def __init__(self, folder: str = ''):
+        self.folder = folder
+        # name -> (template, stamps of its two files)
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def set_folder(self, folder: str):
+        with self._lock:
+            self.folder = folder
+            self._templates.clear()
+
+    def paths(self, name: str) -> tuple[str, str]:
+        """ (html path, config path) of the template `name`. """
+        return (os.path.join(self.folder, f'{name}-Template.html'),
+                os.path.join(self.folder, f'{name}-config.json'))
+
+    def get(self, name: str) -> AssessmentTemplate:
+        """ The template `name`, read on its first use and again after one of its files changed.
+            Raises FileNotFoundError when the html file is missing, ValueError for an invalid config. """
+        html_path, config_path = self.paths(name)
+        stamps = (_file_stamp(html_path), _file_stamp(config_path))
+
+        with self._lock:
+            entry = self._templates.get(name)
+            if entry is not None and entry[1] == stamps: return entry[0]
+
+        # Read outside the lock: a slow disk does not block the readers of the other templates
+        template = self._load(name, html_path, config_path)
+
+        with self._lock:
+            self._templates[name] = (template, stamps)
+
+        return template
+
+    def preload(self, names):
+        """ Reads the templates `names` now (e.g. at startup), the missing ones are skipped. """
+        for name in names:
+            try:
+                self.get(name)
+            except (OSError, ValueError) as e:
+                print(f'Template {name}: {e}')
+
+    @staticmethod
+    def _load(name: str, html_path: str, config_path: str) -> AssessmentTemplate:
+
+        with open(html_path, encoding='utf-8') as f: html = f.read()
+
+        try:
+            with open(config_path, encoding='utf-8') as f: config = json.load(f)
+        except FileNotFoundError:
+            config = {}
+        except json.JSONDecodeError:
+            raise ValueError(f"Invalid JSON format: {config_path}")
+
+        return AssessmentTemplate(name, html, _freeze(config))
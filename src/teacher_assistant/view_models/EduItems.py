@@ -6,6 +6,9 @@ from PySide6.QtCore import Property, Signal
 from PySideAbdhUI.Widgets.Notify  import NotifyPropertyChanged
 
 from services.edu_item_services import ClassroomGroupService, EduItemStudentService
+from core.app_context import app_context
+from data.cache import RESOURCES
+from data.queries import RESOURCE_COLUMN_UPDATES
 
         
 # View model for Edu-content      
@@ -86,8 +89,7 @@ class EduItemViewModel(NotifyPropertyChanged):
         msg =''
         try:
             
-            self.db_cursor.execute(f'SELECT answer_, metadata_ FROM educational_resources WHERE Id = {self.Id};')
-            data = self.db_cursor.fetchone()
+            data = app_context.cache.fetchone_named(RESOURCES, 'resource_answer_and_metadata', (self.Id,))
             self.answer = data[0]
             self.details = data[1]
             msg = 'answer loaded.'
@@ -97,9 +99,13 @@ class EduItemViewModel(NotifyPropertyChanged):
 
  
     def update_value(self,column_name, value):
-        msg =''
+        # Only the columns registered in the query catalog can be updated
+        if column_name not in RESOURCE_COLUMN_UPDATES:
+            return False, f'The column "{column_name}" can not be updated.'
+        
         try:
-            self.db_cursor.execute(f"UPDATE educational_resources SET {column_name} = '{value}' WHERE Id = {self.Id};")
+            app_context.database.execute_named(RESOURCE_COLUMN_UPDATES[column_name], (value, self.Id))
+            app_context.cache.invalidate(RESOURCES)
             
             return True, f'The column "{column_name}" updated successfully.'
         except Exception as e: